@@ -8,12 +8,14 @@ import wifi
 import socketpool
 import ssl
 import adafruit_requests as requests
-import math
 from secrets import secrets
+from geo_utils import haversine_distance
+from poi_index import cargar_indice
+from llm_backends import endpoint_gemini
 
 # --- CONFIGURACIÓN DE CONSTANTES Y API ---
 API_KEY = secrets["api_key"]
-ENDPOINT = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent?key={API_KEY}"
+ENDPOINT = endpoint_gemini(API_KEY)
 UMBRAL_MOVIMIENTO_METROS = 2.0
 
 # --- CONEXIÓN A INTERNET ---
@@ -28,16 +30,6 @@ socket = socketpool.SocketPool(wifi.radio)
 https = requests.Session(socket, ssl.create_default_context())
 
 # --- FUNCIONES ---
-def haversine_distance(lat1, lon1, lat2, lon2):
-    """Calcula la distancia Haversine entre dos puntos en metros."""
-    R = 6371000
-    phi1, phi2 = math.radians(lat1), math.radians(lat2)
-    delta_phi = math.radians(lat2 - lat1)
-    delta_lambda = math.radians(lon2 - lon1)
-    a = math.sin(delta_phi / 2.0)**2 + math.cos(phi1) * math.cos(phi2) * math.sin(delta_lambda / 2.0)**2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    return R * c
-
 def preguntar_gemini(pregunta):
     """Envía una pregunta a Gemini y retorna la respuesta."""
     headers = {"Content-Type": "application/json"}
@@ -56,11 +48,10 @@ def preguntar_gemini(pregunta):
         return f"Excepción al llamar a la API: {e}"
 
 # --- SIMULACIÓN DE RECORRIDO ---
-lugares_cenfotec = {
-    "Entrada Principal": {"lat": 9.93310, "lon": -84.03220},
-    "Maker Space": {"lat": 9.93320, "lon": -84.03210},
-}
-recorrido_simulado = [lugares_cenfotec["Entrada Principal"], lugares_cenfotec["Sala de Computo"]]
+# Los lugares se cargan del mismo archivo de datos que usa code.py.
+RADIO_POI_METROS = 25.0
+indice_pois = cargar_indice("pois.csv")
+recorrido_simulado = [indice_pois.poi("cenfotec"), indice_pois.poi("auditorio")]
 last_location = None
 
 # --- BUCLE PRINCIPAL (DEMO) ---
@@ -78,7 +69,11 @@ for lugar_actual in recorrido_simulado:
         print(f"\n¡Movimiento detectado! Distancia: {distancia:.2f} m.")
         
         # El sistema ha "detectado" que llegamos a un nuevo lugar.
-        nombre_lugar = [k for k, v in lugares_cenfotec.items() if v == lugar_actual][0]
+        cercano = indice_pois.mas_cercano(lugar_actual["lat"], lugar_actual["lon"], RADIO_POI_METROS)
+        if cercano is None:
+            print("No hay puntos de interés cerca.")
+            continue
+        nombre_lugar = indice_pois.poi(cercano[0])["nombre"]
         
         # Prepara la pregunta para la IA
         pregunta = f"Estoy en la {nombre_lugar} de Cenfotec. Dime algo interesante sobre este lugar."
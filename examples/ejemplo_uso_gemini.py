@@ -8,10 +8,11 @@ import socketpool
 import ssl
 import adafruit_requests as requests
 from secrets import secrets
+from llm_backends import endpoint_gemini
 
 # --- CONFIGURACIÓN DE LA API ---
 API_KEY = secrets["api_key"]
-ENDPOINT = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent?key={API_KEY}"
+ENDPOINT = endpoint_gemini(API_KEY)
 
 # --- CONEXIÓN AL WI-FI ---
 try:
@@ -3,19 +3,8 @@
 # Este script muestra cómo se usa la función Haversine para calcular la distancia
 # entre dos puntos y detectar si ha habido suficiente "movimiento".
 
-import math
-import time
-
-# --- FUNCIÓN DE DISTANCIA (HA DE SER LA MISMA QUE EN TU CÓDIGO PRINCIPAL) ---
-def haversine_distance(lat1, lon1, lat2, lon2):
-    """Calcula la distancia Haversine entre dos puntos en metros."""
-    R = 6371000
-    phi1, phi2 = math.radians(lat1), math.radians(lat2)
-    delta_phi = math.radians(lat2 - lat1)
-    delta_lambda = math.radians(lon2 - lon1)
-    a = math.sin(delta_phi / 2.0)**2 + math.cos(phi1) * math.cos(phi2) * math.sin(delta_lambda / 2.0)**2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    return R * c
+# --- FUNCIÓN DE DISTANCIA (LA MISMA QUE USA EL CÓDIGO PRINCIPAL) ---
+from geo_utils import haversine_distance
 
 # --- VARIABLES DE EJEMPLO ---
 UMBRAL_MOVIMIENTO = 2.0  # Umbral de distancia en metros para considerar "movimiento".
@@ -0,0 +1,302 @@
+# cache_utils.py
+# Módulo para la caché de respuestas de Gemini.
+# Guarda las respuestas por POI y pregunta para que una visita repetida
+# muestre el texto al instante sin gastar cuota de la API.
+#
+# Tiene dos niveles:
+#   1. RAM: un LRU acotado por número de entradas.
+#   2. Flash (opcional): un archivo de texto que sobrevive a los reinicios.
+#      En CircuitPython el sistema de archivos es de solo lectura para el
+#      código, a menos que 'boot.py' lo monte con escritura habilitada.
+#      El archivo se lee completo una sola vez, al arrancar, para armar un
+#      índice en RAM (POI -> posiciones de sus líneas): un POI que no está
+#      en el índice es un fallo sin tocar la flash, y uno que sí está se
+#      lee con un 'seek' a su línea.
+#
+# La vigencia no usa el reloj de pared: sin RTC ni NTP, 'time.time()'
+# vuelve a empezar cerca de 2000-01-01 en cada arranque y las entradas
+# anteriores parecerían del futuro (vigentes para siempre). Se mide el
+# tiempo encendido acumulado (RelojEncendido): cada arranque continúa desde
+# la marca más reciente del archivo. El tiempo apagado no envejece las
+# entradas, así que una semana de vigencia es una semana de uso.
+
+import time
+from collections import OrderedDict
+
+# Nivel en el que se encontró una respuesta (se registra en la telemetría).
+NIVEL_RAM = 0
+NIVEL_FLASH = 1
+
+# --- CONFIGURACIÓN ---
+CACHE_MAX_ENTRADAS = 32             # Entradas máximas en RAM.
+CACHE_TTL_SEGUNDOS = 7 * 24 * 3600  # Vigencia de una respuesta (una semana).
+CACHE_FLASH_MAX_BYTES = 16 * 1024   # Tamaño máximo del archivo en flash.
+
+
+def normalizar_pregunta(pregunta):
+    """Pasa la pregunta a minúsculas y colapsa los espacios repetidos."""
+    return " ".join(pregunta.lower().split())
+
+
+def clave_cache(poi_id, pregunta):
+    """Construye la clave de la caché a partir del POI y la pregunta."""
+    return f"{poi_id}|{normalizar_pregunta(pregunta)}"
+
+
+def _linea_flash(clave, marca, texto):
+    """Codifica una entrada como línea del archivo en flash."""
+    return f"{marca}\t{clave}\t{texto}\n".encode("utf-8")
+
+
+def _leer_linea_flash(linea):
+    """
+    Decodifica una línea del archivo en flash.
+
+    Returns:
+        tuple: (clave, marca, texto), o None si la línea está dañada.
+    """
+    try:
+        partes = str(linea, "utf-8").rstrip("\n").split("\t", 2)
+        if len(partes) == 3:
+            return partes[1], float(partes[0]), partes[2]
+    except ValueError:
+        pass
+    return None
+
+
+class RelojEncendido:
+    """
+    Tiempo encendido acumulado entre arranques, en segundos.
+
+    Suma 'base' (el tiempo acumulado en los arranques anteriores) al tiempo
+    monotónico transcurrido desde que se creó.
+    """
+
+    def __init__(self, base=0.0, monotonico=time.monotonic):
+        self.base = base
+        self._monotonico = monotonico
+        self._inicio = monotonico()
+
+    def __call__(self):
+        return self.base + self._monotonico() - self._inicio
+
+
+class CacheRespuestas:
+    """
+    Caché LRU de respuestas con vigencia (TTL) y un nivel opcional en flash.
+
+    Cada entrada en flash es una línea 'marca_de_tiempo<TAB>clave<TAB>texto',
+    con la marca en el reloj de la caché (por defecto, RelojEncendido).
+    El archivo solo crece al agregar líneas; cuando pasa de 'max_bytes_flash'
+    se compacta conservando la versión más reciente de cada clave vigente.
+    """
+
+    def __init__(self, max_entradas=CACHE_MAX_ENTRADAS, ttl=CACHE_TTL_SEGUNDOS,
+                 ruta_flash=None, max_bytes_flash=CACHE_FLASH_MAX_BYTES, reloj=None,
+                 telemetria=None):
+        """
+        Args:
+            max_entradas (int): Entradas máximas en el nivel de RAM.
+            ttl (float): Segundos que una respuesta se considera vigente.
+            ruta_flash (str): Archivo para el nivel en flash, o None para no usarlo.
+            max_bytes_flash (int): Tamaño a partir del cual se compacta el archivo.
+            reloj (callable): Fuente de tiempo en segundos; debe seguir
+                avanzando entre reinicios. Por defecto, un RelojEncendido que
+                continúa desde la marca más reciente del archivo en flash.
+            telemetria (Telemetria): Si se indica, registra cada acierto
+                (ver telemetry.py).
+        """
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self.ruta_flash = ruta_flash
+        self.max_bytes_flash = max_bytes_flash
+        # Índice del archivo en flash: poi_id -> [(posición, marca), ...].
+        self._indice_flash = {}
+        ultima_marca = self._cargar_indice_flash() if ruta_flash is not None else 0.0
+        if reloj is None:
+            reloj = RelojEncendido()
+        if isinstance(reloj, RelojEncendido):
+            reloj.base = max(reloj.base, ultima_marca)
+        self._reloj = reloj
+        self.telemetria = telemetria
+        self._ram = OrderedDict()  # clave -> (marca_de_tiempo, texto)
+        self.aciertos_ram = 0
+        self.aciertos_flash = 0
+        self.fallos = 0
+        self.expulsiones = 0
+
+    def _vigente(self, marca):
+        return self._reloj() - marca < self.ttl
+
+    def _guardar_en_ram(self, clave, marca, texto):
+        if clave in self._ram:
+            self._ram.pop(clave)
+        self._ram[clave] = (marca, texto)
+        while len(self._ram) > self.max_entradas:
+            # La primera clave es la usada hace más tiempo.
+            self._ram.pop(next(iter(self._ram)))
+            self.expulsiones += 1
+
+    def obtener(self, poi_id, pregunta):
+        """
+        Busca una respuesta en la caché, primero en RAM y luego en flash.
+
+        Returns:
+            str: El texto guardado, o None si no existe o ya expiró.
+        """
+        clave = clave_cache(poi_id, pregunta)
+        entrada = self._ram.get(clave)
+        if entrada is not None:
+            if self._vigente(entrada[0]):
+                # Se reinserta para marcarla como la usada más recientemente.
+                self._ram.pop(clave)
+                self._ram[clave] = entrada
+                self.aciertos_ram += 1
+                if self.telemetria is not None:
+                    self.telemetria.registrar_acierto(poi_id, NIVEL_RAM)
+                return entrada[1]
+            self._ram.pop(clave)
+            self.expulsiones += 1
+
+        entrada = self._buscar_en_flash(poi_id, clave)
+        if entrada is not None and self._vigente(entrada[0]):
+            self._guardar_en_ram(clave, entrada[0], entrada[1])
+            self.aciertos_flash += 1
+            if self.telemetria is not None:
+                self.telemetria.registrar_acierto(poi_id, NIVEL_FLASH)
+            return entrada[1]
+
+        self.fallos += 1
+        return None
+
+    def contiene(self, poi_id, pregunta):
+        """
+        True si hay una respuesta vigente, en RAM o en flash.
+
+        A diferencia de 'obtener', no cuenta aciertos ni fallos ni cambia el
+        orden del LRU (la usa la precarga para decidir qué pedir).
+        """
+        clave = clave_cache(poi_id, pregunta)
+        entrada = self._ram.get(clave)
+        if entrada is not None and self._vigente(entrada[0]):
+            return True
+        return self._buscar_en_flash(poi_id, clave) is not None
+
+    def guardar(self, poi_id, pregunta, texto):
+        """Guarda una respuesta en RAM y, si está habilitado, en flash."""
+        clave = clave_cache(poi_id, pregunta)
+        marca = self._reloj()
+        self._guardar_en_ram(clave, marca, texto)
+        self._escribir_en_flash(clave, marca, texto)
+
+    def estadisticas(self):
+        """Retorna los contadores de la caché en un diccionario."""
+        return {
+            "entradas_ram": len(self._ram),
+            "aciertos_ram": self.aciertos_ram,
+            "aciertos_flash": self.aciertos_flash,
+            "fallos": self.fallos,
+            "expulsiones": self.expulsiones,
+        }
+
+    # --- NIVEL EN FLASH ---
+    def _leer_flash(self):
+        """Genera las entradas (posición, clave, marca, texto) del archivo en orden."""
+        try:
+            archivo = open(self.ruta_flash, "rb")
+        except OSError:
+            return
+        with archivo:
+            posicion = 0
+            while True:
+                linea = archivo.readline()
+                if not linea:
+                    break
+                entrada = _leer_linea_flash(linea)
+                if entrada is not None:
+                    yield (posicion,) + entrada
+                posicion += len(linea)
+
+    def _indexar(self, clave, posicion, marca):
+        # Se indexa por POI y no por clave: así no se guarda en RAM el texto
+        # de cada pregunta. Un POI suele tener una sola pregunta.
+        poi_id = clave.split("|", 1)[0]
+        lineas = self._indice_flash.get(poi_id)
+        if lineas is None:
+            self._indice_flash[poi_id] = [(posicion, marca)]
+        else:
+            lineas.append((posicion, marca))
+
+    def _cargar_indice_flash(self):
+        """
+        Arma el índice con una sola lectura del archivo.
+
+        Returns:
+            float: Marca más reciente del archivo (0 si no hay entradas).
+        """
+        ultima = 0.0
+        for posicion, clave, marca, _ in self._leer_flash():
+            self._indexar(clave, posicion, marca)
+            if marca > ultima:
+                ultima = marca
+        return ultima
+
+    def _buscar_en_flash(self, poi_id, clave):
+        """Busca la versión vigente más reciente de una clave leyendo solo sus líneas."""
+        if self.ruta_flash is None:
+            return None
+        lineas = self._indice_flash.get(poi_id)
+        if not lineas:
+            return None
+        try:
+            with open(self.ruta_flash, "rb") as archivo:
+                # Las líneas más recientes están al final del archivo.
+                for posicion, marca in reversed(lineas):
+                    if not self._vigente(marca):
+                        continue
+                    archivo.seek(posicion)
+                    entrada = _leer_linea_flash(archivo.readline())
+                    if entrada is not None and entrada[0] == clave:
+                        return entrada[1], entrada[2]
+        except OSError:
+            pass
+        return None
+
+    def _escribir_en_flash(self, clave, marca, texto):
+        if self.ruta_flash is None:
+            return
+        linea = _linea_flash(clave, marca, texto.replace("\t", " ").replace("\n", " "))
+        try:
+            with open(self.ruta_flash, "ab") as archivo:
+                archivo.write(linea)
+                tamano = archivo.tell()
+            self._indexar(clave, tamano - len(linea), marca)
+            if tamano > self.max_bytes_flash:
+                self._compactar_flash()
+        except OSError as e:
+            print(f"No se pudo escribir la caché en flash: {e}. Se usará solo RAM.")
+            self.ruta_flash = None
+
+    def _compactar_flash(self):
+        """Reescribe el archivo con la última versión vigente de cada clave y rearma el índice."""
+        vigentes = OrderedDict()
+        for _, clave, marca, texto in self._leer_flash():
+            if clave in vigentes:
+                vigentes.pop(clave)
+            if self._vigente(marca):
+                vigentes[clave] = (marca, texto)
+        # Si aún no cabe, se descartan las entradas más antiguas.
+        tamano = sum(len(c) + len(t) + 20 for c, (m, t) in vigentes.items())
+        while vigentes and tamano > self.max_bytes_flash // 2:
+            clave = next(iter(vigentes))
+            marca, texto = vigentes.pop(clave)
+            tamano -= len(clave) + len(texto) + 20
+            self.expulsiones += 1
+        self._indice_flash = {}
+        posicion = 0
+        with open(self.ruta_flash, "wb") as archivo:
+            for clave, (marca, texto) in vigentes.items():
+                linea = _linea_flash(clave, marca, texto)
+                archivo.write(linea)
+                self._indexar(clave, posicion, marca)
+                posicion += len(linea)
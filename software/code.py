@@ -1,14 +1,34 @@
 # --- MÓDULO 1: IMPORTACIONES Y CONFIGURACIÓN ---
 # Importaciones necesarias para la funcionalidad del proyecto.
-import time
+# 'socketpool', 'ssl' y 'adafruit_requests' se importan al crear la primera
+# sesión HTTPS (ver 'crear_pool' y 'crear_sesion'), no durante el arranque.
+import sys
+from startup import RegistroArranque
+# El registro empieza antes de las demás importaciones para medirlas.
+arranque = RegistroArranque()
 import board
 import digitalio
 import busio
 import wifi
-import socketpool
-import ssl
-import adafruit_requests as requests
-import math
+import supervisor
+import asyncio
+from poi_index import cargar_indice
+from poi_tiles import abrir_teselas
+from cache_utils import CacheRespuestas
+from prefetch import Precargador
+from llm_backends import (BackendCache, BackendGemini, BackendSimulado, ConsultaCubierta,
+                          MODELO_GEMINI, endpoint_gemini)
+from resilience import PoliticaLLM, LimitadorTokens
+from connection import GestorConexion
+from content_pack import abrir_paquete
+from llm_batch import TAMANO_LOTE
+from gps_utils import RecorridoSimulado, configurar_frecuencia
+from gps_scheduler import PlanificadorGPS
+from profiling import perfil
+from telemetry import Telemetria, NIVEL_PAQUETE
+from tour_planner import (MAX_POIS_MATRIZ, PlanificadorRecorrido, Recorrido, cargar_o_calcular,
+                          vecino_mas_cercano)
+import runtime
 
 # El archivo 'secrets.py' debe contener 'ssid', 'password' y 'api_key'.
 try:
@@ -20,6 +40,20 @@ except ImportError:
 # La librería para el LCD.
 from adafruit_character_lcd.character_lcd import Character_LCD_Mono
 
+# Instrumentación (profiling.py): mide el GPS, las geocercas, las llamadas
+# HTTPS, el JSON, la LCD y la memoria asignada por iteración ('perfil memoria').
+# Desactivada no tiene costo; también se activa escribiendo 'perfil on' en la
+# consola serial, y 'perfil' vuelca el resumen.
+perfil.activo = False
+
+# Bitácora de campo (telemetry.py): posiciones, entradas y salidas de los
+# POIs, latencias y aciertos de la caché en registros binarios. Se vuelca a
+# la flash cada minuto en una sola escritura; en el host se lee con
+# tools/decode_telemetry.py.
+ARCHIVO_TELEMETRIA = "/telemetria.bin"  # Requiere que boot.py habilite la escritura.
+telemetria = Telemetria(ARCHIVO_TELEMETRIA)
+arranque.etapa("importaciones")
+
 # --- MÓDULO 2: HARDWARE Y PERIFÉRICOS ---
 # Configuración de los pines de la pantalla LCD 16x2.
 LCD_PINS = {
@@ -46,174 +80,279 @@ try:
         LCD_ROWS
     )
     lcd.clear()
+    lcd.message = "Iniciando..."
 except Exception as e:
     print(f"Error al inicializar LCD: {e}")
     # En un escenario real, se podría intentar un reinicio o una recuperación.
+arranque.etapa("lcd")
 
 # --- MÓDULO 3: CONECTIVIDAD Y API ---
 # Constantes para la API de Gemini.
 API_KEY = secrets["api_key"]
-ENDPOINT = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent?key={API_KEY}"
-API_RETRY_DELAY = 10  # Retraso en segundos antes de reintentar la llamada a la API.
-API_MAX_RETRY = 3     # Número máximo de intentos.
+MODELO_LLM = MODELO_GEMINI
+ENDPOINT = endpoint_gemini(API_KEY, MODELO_LLM)
+API_CUOTA_POR_MINUTO = 15  # Solicitudes por minuto del plan de la API.
+ARCHIVO_CACHE = "/cache_respuestas.txt"  # Requiere que boot.py habilite la escritura.
+# Con streaming, la respuesta se muestra en la LCD mientras llega (llm_stream.py).
+USAR_STREAMING = True
+# La precarga pide varios POIs en una sola llamada (llm_batch.py).
+USAR_LOTES = True
+# Proveedor de las descripciones (llm_backends.py): "gemini", "cache" (sin
+# red: solo la caché y el paquete de contenido) o "simulado" (respuestas
+# locales, para probar el dispositivo sin la API).
+BACKEND_LLM = "gemini"
+# Consultas cubiertas: si el modelo principal tarda más que su percentil 90,
+# la misma pregunta va a este modelo (con su propia cuota) y gana la primera
+# respuesta. None para no cubrir.
+MODELO_SECUNDARIO = "gemini-1.5-flash-8b"
+API_CUOTA_SECUNDARIO = 15
 
-print("Conectando al WiFi...")
-lcd.message = "Conectando WiFi"
-try:
-    wifi.radio.connect(secrets["ssid"], secrets["password"])
-    print("Conectado a", secrets["ssid"])
-    lcd.clear()
-    lcd.message = "WiFi Conectado\n" + secrets["ssid"]
-    time.sleep(2)
-except ConnectionError:
-    print("Error de conexión WiFi. Revisa tus credenciales.")
-    lcd.clear()
-    lcd.message = "WiFi Error"
-    exit()
+# Caché de respuestas por POI: las visitas repetidas no consultan la API.
+cache_respuestas = CacheRespuestas(ruta_flash=ARCHIVO_CACHE, telemetria=telemetria)
+# Paquete de contenido sin conexión (ver tools/build_content_pack.py): los
+# POIs que están en el paquete no necesitan red.
+ARCHIVO_PAQUETE = "contenido.pack"
+paquete_contenido = abrir_paquete(ARCHIVO_PAQUETE)
 
-socket = socketpool.SocketPool(wifi.radio)
-https = requests.Session(socket, ssl.create_default_context())
+def crear_pool(radio):
+    """Crea el socketpool; importa 'socketpool' la primera vez."""
+    import socketpool
+    return socketpool.SocketPool(radio)
 
-def preguntar_gemini(pregunta):
-    """
-    Envía una pregunta a la API de Gemini y retorna la respuesta.
-    Implementa reintentos en caso de fallo para mejorar la robustez.
+def crear_sesion(pool):
+    """Crea la sesión HTTPS; importa 'ssl' y 'adafruit_requests' la primera vez."""
+    import ssl
+    import adafruit_requests as requests
+    return requests.Session(pool, ssl.create_default_context())
 
-    Args:
-        pregunta (str): El texto a enviar a Gemini.
+# El gestor mantiene el socketpool y la sesión HTTPS entre consultas
+# (keep-alive) y los renueva cuando el WiFi se reconecta (ver connection.py).
+conexion = GestorConexion(wifi.radio, secrets["ssid"], secrets["password"],
+                          crear_pool=crear_pool, crear_sesion=crear_sesion)
 
-    Returns:
-        str: La respuesta de Gemini o un mensaje de error.
+def conectar_wifi():
+    conexion.conectar()
+    arranque.hito("wifi")
+
+# El arranque no espera al WiFi: la tarea de WiFi (runtime.py) conecta en su
+# primera iteración, después de la primera lectura del GPS. Mientras tanto,
+# el paquete de contenido y la caché atienden los POIs sin red. Si
+# CircuitPython ya conectó el WiFi (settings.toml), no hay nada que esperar.
+
+# Política compartida por todas las consultas (ver resilience.py): espera
+# exponencial con jitter, 'Retry-After', un limitador ajustado a la cuota y
+# un cortacircuitos que falla de inmediato si la API o el WiFi están caídos.
+politica_llm = PoliticaLLM(
+    limitador=LimitadorTokens(API_CUOTA_POR_MINUTO),
+    hay_red=lambda: conexion.connected,
+)
+
+https = conexion  # Misma interfaz que requests.Session ('post').
+
+def crear_backend():
+    """
+    Crea el backend del LLM según BACKEND_LLM y MODELO_SECUNDARIO.
+
+    La caché va en el backend exterior: un acierto no llama a ningún modelo
+    y la respuesta ganadora se guarda una sola vez.
     """
-    headers = {"Content-Type": "application/json"}
-    payload = {
-        "contents": [{"parts": [{"text": pregunta}]}],
-        "generationConfig": {"maxOutputTokens": 30}
-    }
-
-    for _ in range(API_MAX_RETRY):
-        try:
-            response = https.post(ENDPOINT, headers=headers, json=payload, timeout=15)
-            if response.status_code == 200:
-                data = response.json()
-                return data["candidates"][0]["content"]["parts"][0]["text"]
-            else:
-                print(f"Error de API: {response.status_code}. Reintentando...")
-                time.sleep(API_RETRY_DELAY)
-        except Exception as e:
-            print(f"Excepción en la llamada a la API: {e}. Reintentando...")
-            time.sleep(API_RETRY_DELAY)
-
-    return "Error de Gemini. Intenta mas tarde."
-
-# --- MÓDULO 4: LÓGICA DE NEGOCIO Y AYUDAS ---
-# Constante para el umbral de movimiento.
-UMBRAL_MOVIMIENTO_METROS = 2.0
-
-def haversine_distance(lat1, lon1, lat2, lon2):
+    if BACKEND_LLM == "cache":
+        return BackendCache(cache_respuestas, paquete_contenido)
+    if BACKEND_LLM == "simulado":
+        return BackendSimulado(cache=cache_respuestas)
+    primario = BackendGemini(https, ENDPOINT, politica=politica_llm, streaming=USAR_STREAMING)
+    if not MODELO_SECUNDARIO:
+        primario.cache = cache_respuestas
+        return primario
+    politica_secundaria = PoliticaLLM(
+        limitador=LimitadorTokens(API_CUOTA_SECUNDARIO),
+        hay_red=lambda: conexion.connected,
+    )
+    secundario = BackendGemini(https, endpoint_gemini(API_KEY, MODELO_SECUNDARIO),
+                               politica=politica_secundaria, streaming=USAR_STREAMING)
+    return ConsultaCubierta(primario, secundario, cache=cache_respuestas)
+
+backend_llm = crear_backend()
+arranque.etapa("red")
+
+# --- MÓDULO 4: DATOS Y VARIABLES DE ESTADO ---
+# Los puntos de interés se cargan desde un archivo de datos a un índice
+# espacial, así la búsqueda del lugar actual no recorre todos los POIs.
+ARCHIVO_POIS = "pois.csv"
+# POIs en teselas (poi_tiles.py): con un archivo de teselas en la flash
+# (tools/build_poi_tiles.py), solo las teselas alrededor de la ubicación
+# quedan en memoria, así caben los POIs de una ciudad entera. Las geocercas
+# cubren todos los POIs del archivo; el recorrido planificado, solo los de
+# pois.csv (que también deben estar en las teselas).
+ARCHIVO_TESELAS = "pois.tiles"
+indice_pois = abrir_teselas(ARCHIVO_TESELAS)
+if indice_pois is None:
+    indice_pois = cargar_indice(ARCHIVO_POIS)
+    pois_recorrido = indice_pois
+    ids_recorrido = None
+else:
+    pois_recorrido = cargar_indice(ARCHIVO_POIS)
+    ids_recorrido = pois_recorrido.ids
+telemetria.indice = indice_pois
+
+# Orden de visita (tour_planner.py): se planifica desde la entrada con el
+# vecino más cercano y 2-opt sobre una matriz de distancias que se guarda en
+# la flash (se recalcula solo si cambia pois.csv). Si el usuario llega a un
+# POI fuera de orden, los que faltan se replanifican desde ahí. Con más de
+# MAX_POIS_MATRIZ POIs la matriz no cabe en la RAM: solo se usa el vecino
+# más cercano sobre la rejilla y la ruta no se replanifica.
+ARCHIVO_DISTANCIAS = "/distancias.bin"  # Requiere que boot.py habilite la escritura.
+INICIO_RECORRIDO = "cenfotec"
+if len(pois_recorrido) <= MAX_POIS_MATRIZ:
+    matriz_distancias = cargar_o_calcular(ARCHIVO_DISTANCIAS, indice_pois, ids_recorrido)
+    planificador_ruta = PlanificadorRecorrido(matriz_distancias)
+    ruta_ids = planificador_ruta.planificar(inicio=INICIO_RECORRIDO)
+    recorrido = Recorrido(ruta_ids, planificador_ruta)
+else:
+    print(f"{len(pois_recorrido)} POIs: recorrido con el vecino más cercano, sin matriz.")
+    ruta_ids = vecino_mas_cercano(pois_recorrido, inicio=INICIO_RECORRIDO)
+    recorrido = Recorrido(ruta_ids)
+
+# Datos de simulación: el GPS simulado sigue la ruta planificada.
+recorrido_simulado = [indice_pois.poi(poi_id) for poi_id in ruta_ids]
+SEGUNDOS_POR_LUGAR = 30  # Tiempo que la simulación permanece en cada lugar.
+gps_simulado = RecorridoSimulado(recorrido_simulado, SEGUNDOS_POR_LUGAR)
+
+# Reproducción de un recorrido grabado (gps_replay.py): con un registro NMEA
+# ('.nmea') o una traza GPX ('.gpx') copiado a la flash, el GPS simulado lo
+# reproduce en lugar de la ruta fija. VELOCIDAD_TRAZA acelera la reproducción
+# (con 10, una caminata de 10 minutos pasa en uno).
+ARCHIVO_TRAZA = None
+VELOCIDAD_TRAZA = 1.0
+if ARCHIVO_TRAZA:
+    from gps_replay import abrir_traza
+    gps_simulado = abrir_traza(ARCHIVO_TRAZA, VELOCIDAD_TRAZA, repetir=True)
+
+# Muestreo adaptativo del GPS (gps_scheduler.py): lejos de los POIs se lee
+# cada 2, 5 o 10 segundos en lugar de cada segundo, y el sensor se configura
+# (PMTK220) a la misma frecuencia. Cerca de una geocerca se vuelve a 1 s.
+USAR_MUESTREO_ADAPTATIVO = True
+planificador_gps = PlanificadorGPS(configurar_frecuencia) if USAR_MUESTREO_ADAPTATIVO else None
+
+def construir_pregunta(nombre):
+    """Arma la pregunta para Gemini sobre un lugar (también es la clave de la caché)."""
+    return f"Estoy en {nombre}. Dime algo interesante de este lugar en una oración simple."
+
+async def consultar_poi(poi_id, al_recibir=None):
     """
-    Calcula la distancia Haversine entre dos puntos en la Tierra.
+    Consulta la descripción de un POI (desde el paquete sin conexión, la
+    caché o Gemini).
 
     Args:
-        lat1 (float): Latitud del primer punto en grados.
-        lon1 (float): Longitud del primer punto en grados.
-        lat2 (float): Latitud del segundo punto en grados.
-        lon2 (float): Longitud del segundo punto en grados.
+        poi_id (str): Id del POI.
+        al_recibir (callable): Con streaming, recibe cada fragmento de la respuesta.
 
     Returns:
-        float: Distancia en metros.
+        str: La descripción, o None si la consulta falló.
     """
-    R = 6371000  # Radio de la Tierra en metros
-    phi1, phi2 = math.radians(lat1), math.radians(lat2)
-    delta_phi = math.radians(lat2 - lat1)
-    delta_lambda = math.radians(lon2 - lon1)
-    a = math.sin(delta_phi / 2.0)**2 + math.cos(phi1) * math.cos(phi2) * math.sin(delta_lambda / 2.0)**2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    return R * c
-
-def mostrar_en_lcd(texto):
+    if paquete_contenido is not None:
+        texto = paquete_contenido.texto(poi_id)
+        if texto is not None:
+            print("Descripción obtenida del paquete de contenido.")
+            telemetria.registrar_acierto(poi_id, NIVEL_PAQUETE)
+            arranque.hito("primera_descripcion")
+            if al_recibir is not None:
+                al_recibir(texto)
+            return texto
+
+    lugar = indice_pois.poi(poi_id)
+    print(f"Consultando a {backend_llm.nombre} sobre {lugar['nombre']}...")
+    pregunta = construir_pregunta(lugar["nombre"])
+    respuesta = await backend_llm.preguntar(pregunta, al_recibir, poi_id)
+    print("Respuesta del LLM:", respuesta)
+    print("Caché:", cache_respuestas.estadisticas())
+    if respuesta:
+        arranque.hito("primera_descripcion")
+    return respuesta
+
+async def precargar_lote(poi_ids):
     """
-    Muestra un texto largo en la LCD de 16x2, con un efecto de 'scroll'
-    pausado para permitir la lectura.
+    Precarga las descripciones de varios POIs; con Gemini, en una sola llamada.
+
+    Returns:
+        list: Ids de los POIs cuya descripción quedó disponible.
     """
-    if len(texto) <= 32:
-        lcd.clear()
-        lcd.message = texto
-        time.sleep(5)
-    else:
-        for i in range(0, len(texto), 32):
-            lcd.clear()
-            line1 = texto[i:i+16]
-            line2 = texto[i+16:i+32]
-            lcd.message = f"{line1}\n{line2}"
-            time.sleep(5)
-    lcd.clear()
+    obtenidos = []
+    lugares = []
+    for poi_id in poi_ids:
+        if paquete_contenido is not None and poi_id in paquete_contenido:
+            obtenidos.append(poi_id)
+        else:
+            nombre = indice_pois.nombre(poi_id)
+            lugares.append((poi_id, nombre, construir_pregunta(nombre)))
+    if lugares:
+        obtenidos.extend(await backend_llm.preguntar_lote(lugares))
+        print("LLM:", backend_llm.estadisticas())
+    return obtenidos
 
-# --- MÓDULO 5: DATOS Y VARIABLES DE ESTADO ---
-# Datos de simulación para el recorrido dentro de la universidad.
-lugares_cenfotec = {
-    "Universidad Cenfotec": {"lat": 9.93310, "lon": -84.03220},
-    "Auditorio": {"lat": 9.93282, "lon": -84.03200},
-    "Maker Space": {"lat": 9.93305, "lon": -84.03215},
-}
-recorrido_simulado = [
-    {"nombre": "Universidad Cenfotec", "coords": lugares_cenfotec["Universidad Cenfotec"]},
-    {"nombre": "Auditorio", "coords": lugares_cenfotec["Auditorio"]},
-    {"nombre": "Maker Space", "coords": lugares_cenfotec["Maker Space"]},
-]
-
-# Variables para mantener el estado del recorrido simulado.
-last_location = None
-current_index = 0
-
-# --- MÓDULO 6: BUCLE PRINCIPAL (MAIN LOOP) ---
-print("Iniciando sistema ciberfísico...")
-while True:
-    # Reinicia la simulación si el recorrido ha terminado.
-    if current_index >= len(recorrido_simulado):
-        print("\nRecorrido terminado. Reiniciando simulación...")
-        current_index = 0
-        last_location = None
-        time.sleep(5)
-        continue
-
-    # Obtiene la ubicación actual de la simulación.
-    current_location = recorrido_simulado[current_index]
-
-    if last_location is None:
-        # En el primer inicio, se fuerza una consulta inicial.
-        distancia_movida = UMBRAL_MOVIMIENTO_METROS + 1
-    else:
-        # Calcula la distancia movida desde la última ubicación.
-        distancia_movida = haversine_distance(
-            last_location['coords']['lat'], last_location['coords']['lon'],
-            current_location['coords']['lat'], current_location['coords']['lon']
-        )
-
-    # Evalúa si se ha movido lo suficiente para una nueva consulta.
-    if distancia_movida >= UMBRAL_MOVIMIENTO_METROS:
-        print(f"\nMovimiento detectado ({distancia_movida:.2f} m).")
-
-        # Prepara y realiza la consulta a la IA.
-        pregunta = f"Estoy en {current_location['nombre']}. Dime algo interesante de este lugar en una oración simple."
-        print(f"Consultando a Gemini sobre {current_location['nombre']}...")
-        lcd.clear()
-        lcd.message = "Consultando...\n" + current_location['nombre']
-
-        respuesta = preguntar_gemini(pregunta)
-        print("Respuesta de Gemini:", respuesta)
-
-        # Muestra la respuesta en la pantalla LCD.
-        mostrar_en_lcd(respuesta)
-
-        # Actualiza el estado y avanza al siguiente punto.
-        last_location = current_location
-        current_index += 1
-
-        print("Esperando 10 segundos para la siguiente consulta...")
-        time.sleep(10) # Pausa para evitar exceder las cuotas de la API.
-
-    else:
-        # Si no hay suficiente movimiento, se espera.
-        print(f"Esperando movimiento... Distancia: {distancia_movida:.2f} m", end="\r")
-        time.sleep(1)
+def texto_sin_conexion(poi_id):
+    """Texto que se muestra cuando Gemini no respondió (sin WiFi o API caída)."""
+    return f"Estas en {indice_pois.nombre(poi_id)}. Gemini no esta disponible ahora."
+
+def leer_comando():
+    """Retorna la línea escrita en la consola serial, o None si no hay nada pendiente."""
+    if not supervisor.runtime.serial_bytes_available:
+        return None
+    return sys.stdin.readline().strip()
+
+def obtener_ubicacion():
+    """Lee la ubicación (simulada) y registra la primera del arranque."""
+    ubicacion = gps_simulado.get_current_location()
+    if ubicacion is not None and "primera_ubicacion" not in arranque.hitos:
+        arranque.hito("primera_ubicacion")
+    return ubicacion
+
+def predecir_siguientes(poi_id):
+    """Predice los próximos POIs según el recorrido planificado."""
+    return recorrido.proximos(precargador.max_pois)
+
+def descripcion_disponible(poi_id):
+    """True si la descripción del POI está en el paquete de contenido o en la caché."""
+    if paquete_contenido is not None and poi_id in paquete_contenido:
+        return True
+    return cache_respuestas.contiene(poi_id, construir_pregunta(indice_pois.nombre(poi_id)))
+
+# Precarga las descripciones de los próximos POIs mientras el usuario camina.
+# Con lotes se predicen más POIs, así cada llamada trae varios. Un POI cuya
+# respuesta la caché ya expulsó se vuelve a precargar.
+precargador = Precargador(indice_pois, max_pois=TAMANO_LOTE if USAR_LOTES else 2,
+                          disponible=descripcion_disponible)
+arranque.etapa("pois")
+
+# --- MÓDULO 5: TAREAS CONCURRENTES (MAIN LOOP) ---
+# El GPS, las consultas al LLM, la LCD y el WiFi corren como tareas de
+# asyncio (ver runtime.py), así ninguna espera detiene a las demás.
+async def main():
+    estado = runtime.Estado()
+    estado.wifi_conectado = conexion.connected
+    print(arranque.texto())
+    await runtime.ejecutar(
+        estado,
+        obtener_ubicacion=obtener_ubicacion,
+        indice=indice_pois,
+        consultar=consultar_poi,
+        lcd=lcd,
+        radio=conexion,
+        conectar=conectar_wifi,
+        precargador=precargador,
+        predecir=predecir_siguientes,
+        streaming=USAR_STREAMING,
+        sin_respuesta=texto_sin_conexion,
+        precargar_lote=precargar_lote if USAR_LOTES else None,
+        leer_comando=leer_comando,
+        planificador=planificador_gps,
+        telemetria=telemetria,
+        recorrido=recorrido,
+        # El limitador de 'politica_llm' controla el ritmo de las consultas.
+        pausa_consultas=0,
+    )
+
+# Al importarse (por ejemplo, desde la simulación en el host) no se lanza el bucle.
+if __name__ == "__main__":
+    print("Iniciando sistema ciberfísico...")
+    asyncio.run(main())
@@ -0,0 +1,226 @@
+# connection.py
+# Módulo para administrar la conexión WiFi y la sesión HTTPS.
+# Crea un solo 'socketpool' para todo el recorrido y mantiene una sola
+# sesión de requests mientras el WiFi siga conectado, así las consultas
+# reutilizan la conexión TLS abierta (keep-alive) en lugar de repetir el
+# handshake. Al renovar la sesión se conserva el pool. Detecta sockets
+# muertos sin esperar el timeout de 15 s:
+#   - Si el WiFi se reconectó, la sesión anterior se descarta antes de usarla.
+#   - Si la sesión estuvo inactiva demasiado tiempo, el servidor pudo haber
+#     cerrado el socket: se crea una nueva.
+#   - Si una solicitud sobre una conexión reutilizada falla porque el socket
+#     ya estaba cerrado, se repite una vez sobre una conexión nueva. Un
+#     timeout de lectura no se repite: Gemini pudo haber recibido (y cobrado)
+#     la solicitud.
+# Al descartar una sesión se cierran sus sockets: el socketpool del ESP32
+# tiene pocos y cada sesión abandonada dejaría uno ocupado. Si la librería
+# no permite cerrarlos, se avisa por consola.
+# También registra cuánto tardan la conexión WiFi y las solicitudes.
+
+import time
+import errno
+
+# --- CONFIGURACIÓN ---
+MAX_INACTIVIDAD = 60.0   # Segundos sin uso tras los que no se confía en el socket abierto.
+TIMEOUT_WIFI = 5.0       # Segundos máximos de cada intento de conexión WiFi (bloquea).
+
+# Errores de un socket que ya estaba cerrado al enviar. CircuitPython no
+# define todos los nombres de errno.
+_SOCKET_CERRADO = tuple(getattr(errno, nombre) for nombre in
+                        ("EPIPE", "ECONNRESET", "ECONNABORTED", "ENOTCONN", "EBADF")
+                        if hasattr(errno, nombre))
+
+
+def socket_cerrado(error):
+    """True si el error indica que el socket estaba cerrado, no que la respuesta tardó."""
+    return getattr(error, "errno", None) in _SOCKET_CERRADO
+
+
+def cerrar_sockets(sesion, pool=None):
+    """
+    Cierra los sockets que una sesión de requests mantiene abiertos.
+
+    Desde 'adafruit_requests' 3.x los sockets los administra
+    'adafruit_connection_manager' por socketpool y se cierran con su función
+    pública 'connection_manager_close_all'. Las versiones anteriores los
+    guardan en la sesión y solo se pueden cerrar con '_free_sockets'.
+
+    Args:
+        sesion (requests.Session): Sesión que se descarta.
+        pool (socketpool.SocketPool): Pool con el que se creó la sesión.
+
+    Returns:
+        bool: True si se cerraron los sockets; False si no se pudo (y se
+            avisa por consola, porque quedarían ocupados).
+    """
+    try:
+        import adafruit_connection_manager
+    except ImportError:
+        adafruit_connection_manager = None
+    try:
+        if adafruit_connection_manager is not None and pool is not None:
+            adafruit_connection_manager.connection_manager_close_all(pool)
+            return True
+        liberar = getattr(sesion, "_free_sockets", None)
+        if liberar is not None:
+            liberar()
+            return True
+    except (OSError, RuntimeError) as e:
+        print(f"No se pudieron cerrar los sockets de la sesión: {e}")
+        return False
+    print("No se pudieron cerrar los sockets de la sesión: la librería no lo permite.")
+    return False
+
+
+class GestorConexion:
+    """
+    Administra el radio WiFi, el socketpool y la sesión HTTPS.
+
+    Expone 'post()' con la misma firma que 'requests.Session', así puede
+    usarse como sesión en llm_stream.py y llm_utils.py, y 'connected' como
+    el radio, así puede usarse en la tarea de WiFi (runtime.py).
+    """
+
+    def __init__(self, radio, ssid, password, crear_pool, crear_sesion,
+                 max_inactividad=MAX_INACTIVIDAD, timeout_wifi=TIMEOUT_WIFI,
+                 reloj=time.monotonic):
+        """
+        Args:
+            radio (wifi.Radio): Radio WiFi.
+            ssid (str): Nombre de la red.
+            password (str): Contraseña de la red.
+            crear_pool (callable): Recibe el radio y retorna un socketpool.SocketPool;
+                se llama una sola vez.
+            crear_sesion (callable): Recibe el pool y retorna una sesión de requests.
+            max_inactividad (float): Segundos sin uso tras los que se renueva la sesión.
+            timeout_wifi (float): Segundos máximos de cada intento de conexión.
+            reloj (callable): Fuente de tiempo en segundos.
+        """
+        self.radio = radio
+        self.ssid = ssid
+        self.password = password
+        self.crear_pool = crear_pool
+        self.crear_sesion = crear_sesion
+        self.max_inactividad = max_inactividad
+        self.timeout_wifi = timeout_wifi
+        self.reloj = reloj
+        self._pool = None
+        self._sesion = None
+        self._generacion_sesion = -1
+        self._solicitudes_sesion = 0
+        self._ultimo_uso = 0.0
+        self.generacion = 0  # Aumenta con cada conexión WiFi.
+        self.conexiones_wifi = 0
+        self.sesiones = 0
+        self.sockets_muertos = 0
+        # Duraciones en segundos: (suma, cantidad).
+        self._tiempos = {"wifi": [0.0, 0], "primera_solicitud": [0.0, 0], "reutilizada": [0.0, 0]}
+
+    @property
+    def connected(self):
+        return bool(self.radio.connected)
+
+    def _medir(self, nombre, inicio):
+        duracion = self.reloj() - inicio
+        tiempo = self._tiempos[nombre]
+        tiempo[0] += duracion
+        tiempo[1] += 1
+        return duracion
+
+    def conectar(self):
+        """
+        Conecta el radio WiFi y descarta la sesión anterior.
+
+        'wifi.radio.connect' bloquea hasta conectar o hasta 'timeout_wifi'
+        segundos; el timeout corto limita cuánto se detienen las demás tareas.
+
+        Raises:
+            ConnectionError: Si no se pudo conectar.
+        """
+        inicio = self.reloj()
+        self.radio.connect(self.ssid, self.password, timeout=self.timeout_wifi)
+        duracion = self._medir("wifi", inicio)
+        self.generacion += 1
+        self.conexiones_wifi += 1
+        self.invalidar()
+        print(f"Conectado a {self.ssid} en {duracion:.2f} s.")
+
+    def invalidar(self):
+        """Descarta la sesión actual y cierra sus sockets; la próxima solicitud crea una nueva."""
+        sesion = self._sesion
+        self._sesion = None
+        if sesion is not None:
+            cerrar_sockets(sesion, self._pool)
+
+    def sesion(self):
+        """
+        Retorna una sesión lista para usar, creándola si hace falta.
+
+        El socketpool se crea con la primera sesión y se reutiliza en las
+        siguientes.
+
+        Raises:
+            ConnectionError: Si el WiFi no está conectado.
+        """
+        if not self.radio.connected:
+            self.invalidar()
+            raise ConnectionError("WiFi desconectado")
+        ahora = self.reloj()
+        if self._sesion is not None and (
+                self._generacion_sesion != self.generacion
+                or ahora - self._ultimo_uso > self.max_inactividad):
+            self.invalidar()
+        if self._sesion is None:
+            # El pool se crea una sola vez: con 'adafruit_connection_manager'
+            # los sockets abiertos quedan asociados a él.
+            if self._pool is None:
+                self._pool = self.crear_pool(self.radio)
+            self._sesion = self.crear_sesion(self._pool)
+            self._generacion_sesion = self.generacion
+            self._solicitudes_sesion = 0
+            self.sesiones += 1
+        return self._sesion
+
+    def post(self, url, **opciones):
+        """
+        Envía una solicitud POST por la sesión actual.
+
+        Si falla sobre una conexión reutilizada porque el socket estaba
+        cerrado, se repite una vez sobre una sesión nueva. Otros errores (por
+        ejemplo, un timeout esperando la respuesta) no se repiten.
+        """
+        for _ in range(2):
+            sesion = self.sesion()
+            reutilizada = self._solicitudes_sesion > 0
+            inicio = self.reloj()
+            try:
+                respuesta = sesion.post(url, **opciones)
+            except (OSError, RuntimeError) as e:
+                self.invalidar()
+                if not reutilizada or not socket_cerrado(e):
+                    raise
+                self.sockets_muertos += 1
+                print("Socket reutilizado muerto. Reintentando con una conexión nueva...")
+                continue
+            # La primera solicitud de una sesión incluye DNS, TCP y el
+            # handshake TLS; las siguientes reutilizan el socket.
+            self._medir("reutilizada" if reutilizada else "primera_solicitud", inicio)
+            self._solicitudes_sesion += 1
+            self._ultimo_uso = self.reloj()
+            return respuesta
+
+    def estadisticas(self):
+        """
+        Returns:
+            dict: Conteos y duraciones promedio en segundos de la conexión
+                WiFi, de la primera solicitud de cada sesión y de las
+                solicitudes que reutilizan la conexión.
+        """
+        datos = {
+            "conexiones_wifi": self.conexiones_wifi,
+            "sesiones": self.sesiones,
+            "sockets_muertos": self.sockets_muertos,
+        }
+        for nombre, (suma, cantidad) in self._tiempos.items():
+            datos[nombre] = suma / cantidad if cantidad else None
+        return datos
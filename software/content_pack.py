@@ -0,0 +1,167 @@
+# content_pack.py
+# Módulo para el paquete de contenido sin conexión.
+# El paquete es un archivo binario con la descripción precompilada de cada
+# POI (ver tools/build_content_pack.py), así los lugares conocidos no
+# necesitan red. El lector busca un POI con unas pocas lecturas en el
+# archivo, sin cargarlo completo en la memoria del microcontrolador.
+#
+# Formato (enteros little-endian):
+#   Encabezado (12 bytes): 'DCRP', versión (u8), largo de los ids (u8),
+#                          cantidad de POIs (u16), tamaño del archivo (u32).
+#   Índice: una entrada por POI, ordenadas por id:
+#           id en UTF-8 rellenado con ceros (largo de los ids) + posición
+#           del registro en el archivo (u32).
+#   Registros: largo del texto (u16) + texto en UTF-8.
+
+import struct
+
+# --- FORMATO ---
+MAGICO = b"DCRP"
+VERSION = 1
+LARGO_ID = 24                 # Bytes máximos del id de un POI.
+FORMATO_ENCABEZADO = "<4sBBHI"
+TAMANO_ENCABEZADO = 12
+MAX_TEXTO = 65535
+
+
+def escribir_paquete(ruta, textos, largo_id=LARGO_ID):
+    """
+    Escribe un paquete de contenido (se usa en el host).
+
+    Args:
+        ruta (str): Archivo de salida.
+        textos (dict): id del POI -> descripción.
+        largo_id (int): Bytes reservados para cada id en el índice.
+
+    Returns:
+        int: Tamaño del archivo en bytes.
+    """
+    ids = sorted(textos, key=lambda poi_id: poi_id.encode("utf-8"))
+    entrada = largo_id + 4
+    posicion = TAMANO_ENCABEZADO + entrada * len(ids)
+    indice = bytearray()
+    registros = bytearray()
+    for poi_id in ids:
+        clave = poi_id.encode("utf-8")
+        if len(clave) > largo_id:
+            raise ValueError(f"El id '{poi_id}' pasa de {largo_id} bytes")
+        texto = textos[poi_id].encode("utf-8")
+        if len(texto) > MAX_TEXTO:
+            raise ValueError(f"El texto de '{poi_id}' es demasiado largo")
+        indice += clave + bytes(largo_id - len(clave)) + struct.pack("<I", posicion + len(registros))
+        registros += struct.pack("<H", len(texto)) + texto
+    tamano = TAMANO_ENCABEZADO + len(indice) + len(registros)
+    with open(ruta, "wb") as archivo:
+        archivo.write(struct.pack(FORMATO_ENCABEZADO, MAGICO, VERSION, largo_id, len(ids), tamano))
+        archivo.write(indice)
+        archivo.write(registros)
+    return tamano
+
+
+class PaqueteContenido:
+    """
+    Lector de un paquete de contenido.
+
+    Mantiene el archivo abierto y solo guarda en memoria el encabezado. Cada
+    búsqueda hace una búsqueda binaria en el índice leyendo una entrada a la
+    vez, y luego lee solo el registro del POI.
+    """
+
+    def __init__(self, ruta):
+        """
+        Args:
+            ruta (str): Ruta del archivo del paquete.
+
+        Raises:
+            OSError: Si el archivo no existe.
+            ValueError: Si el archivo no es un paquete válido.
+        """
+        self._archivo = open(ruta, "rb")
+        encabezado = self._archivo.read(TAMANO_ENCABEZADO)
+        if len(encabezado) < TAMANO_ENCABEZADO:
+            self.cerrar()
+            raise ValueError("Paquete de contenido incompleto")
+        magico, version, self.largo_id, self.cantidad, self.tamano = struct.unpack(
+            FORMATO_ENCABEZADO, encabezado)
+        if magico != MAGICO or version != VERSION:
+            self.cerrar()
+            raise ValueError("El archivo no es un paquete de contenido compatible")
+        self._entrada = bytearray(self.largo_id + 4)  # Se reutiliza en cada lectura.
+        self._largo = bytearray(2)
+        self.lecturas = 0  # Lecturas al archivo, para medir las búsquedas.
+
+    def __len__(self):
+        return self.cantidad
+
+    def __contains__(self, poi_id):
+        return self._buscar(poi_id) is not None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.cerrar()
+
+    def cerrar(self):
+        self._archivo.close()
+
+    def _leer_entrada(self, i):
+        self._archivo.seek(TAMANO_ENCABEZADO + i * len(self._entrada))
+        self._archivo.readinto(self._entrada)
+        self.lecturas += 1
+        return self._entrada
+
+    def _buscar(self, poi_id):
+        """Retorna la posición del registro de un POI, o None si no está."""
+        clave = poi_id.encode("utf-8")
+        largo = self.largo_id
+        if len(clave) > largo:
+            return None
+        clave += bytes(largo - len(clave))
+        bajo, alto = 0, self.cantidad - 1
+        while bajo <= alto:
+            medio = (bajo + alto) // 2
+            entrada = self._leer_entrada(medio)
+            actual = bytes(entrada[:largo])
+            if actual == clave:
+                return struct.unpack_from("<I", entrada, largo)[0]
+            if actual < clave:
+                bajo = medio + 1
+            else:
+                alto = medio - 1
+        return None
+
+    def texto(self, poi_id):
+        """
+        Busca la descripción de un POI.
+
+        Returns:
+            str: La descripción, o None si el POI no está en el paquete.
+        """
+        posicion = self._buscar(poi_id)
+        if posicion is None:
+            return None
+        self._archivo.seek(posicion)
+        self._archivo.readinto(self._largo)
+        largo = struct.unpack("<H", self._largo)[0]
+        self.lecturas += 2
+        return str(self._archivo.read(largo), "utf-8")
+
+    def ids(self):
+        """Genera los ids de los POIs del paquete, en orden."""
+        for i in range(self.cantidad):
+            yield str(bytes(self._leer_entrada(i)[:self.largo_id]).rstrip(b"\x00"), "utf-8")
+
+
+def abrir_paquete(ruta):
+    """
+    Abre un paquete de contenido si existe.
+
+    Returns:
+        PaqueteContenido: El paquete, o None si no existe o no es válido.
+    """
+    try:
+        return PaqueteContenido(ruta)
+    except (OSError, ValueError) as e:
+        print(f"Sin paquete de contenido ({ruta}): {e}")
+        return None
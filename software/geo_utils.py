@@ -0,0 +1,223 @@
+# geo_utils.py
+# Módulo con las funciones de geometría sobre la Tierra.
+# Es la única implementación de la distancia Haversine del proyecto e
+# incluye una API por lotes para calcular la distancia de una ubicación a
+# muchos POIs a la vez, con resultados en un array('f').
+
+import math
+from array import array
+
+# NumPy solo está disponible en el host (PC). En el microcontrolador se usan
+# los bucles en Python puro.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# --- CONSTANTES ---
+RADIO_TIERRA_METROS = 6371000
+# Metros por grado de latitud, coherente con el radio usado por Haversine.
+METROS_POR_GRADO_LAT = math.pi * RADIO_TIERRA_METROS / 180.0
+# Por debajo de esta distancia la aproximación equirectangular tiene un
+# error menor a 0.1 m respecto a Haversine entre las latitudes -70° y 70°
+# (ver tests/test_geo_utils.py). Usa el coseno de la latitud de cada punto
+# en lugar del punto medio, así que el error crece con la latitud: ~0.01 m
+# a 20°, ~0.05 m a 60° y más de 0.1 m pasando los 72°.
+DISTANCIA_MAX_EQUIRECTANGULAR = 1000.0
+
+HAVERSINE = "haversine"
+EQUIRECTANGULAR = "equirectangular"
+AUTOMATICO = "automatico"  # Equirectangular, con Haversine para lo que pase de 1 km.
+
+
+def haversine_distance(lat1, lon1, lat2, lon2):
+    """
+    Calcula la distancia Haversine entre dos puntos en la Tierra.
+
+    Args:
+        lat1 (float): Latitud del primer punto en grados.
+        lon1 (float): Longitud del primer punto en grados.
+        lat2 (float): Latitud del segundo punto en grados.
+        lon2 (float): Longitud del segundo punto en grados.
+
+    Returns:
+        float: Distancia en metros.
+    """
+    R = RADIO_TIERRA_METROS
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    delta_phi = math.radians(lat2 - lat1)
+    delta_lambda = math.radians(lon2 - lon1)
+    a = math.sin(delta_phi / 2.0)**2 + math.cos(phi1) * math.cos(phi2) * math.sin(delta_lambda / 2.0)**2
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+    return R * c
+
+
+def initial_bearing(lat1, lon1, lat2, lon2):
+    """
+    Calcula el rumbo inicial para ir del primer punto al segundo.
+
+    Args:
+        lat1 (float): Latitud del primer punto en grados.
+        lon1 (float): Longitud del primer punto en grados.
+        lat2 (float): Latitud del segundo punto en grados.
+        lon2 (float): Longitud del segundo punto en grados.
+
+    Returns:
+        float: Rumbo en grados, de 0 a 360 (0 = norte, 90 = este).
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    delta_lambda = math.radians(lon2 - lon1)
+    y = math.sin(delta_lambda) * math.cos(phi2)
+    x = math.cos(phi1) * math.sin(phi2) - math.sin(phi1) * math.cos(phi2) * math.cos(delta_lambda)
+    return (math.degrees(math.atan2(y, x)) + 360.0) % 360.0
+
+
+def desplazar(lat, lon, rumbo_grados, distancia):
+    """
+    Desplaza un punto una distancia corta siguiendo un rumbo.
+
+    Args:
+        lat (float): Latitud de partida en grados.
+        lon (float): Longitud de partida en grados.
+        rumbo_grados (float): Rumbo en grados (0 = norte).
+        distancia (float): Distancia en metros (aproximación plana, < 10 km).
+
+    Returns:
+        tuple: (lat, lon) del punto desplazado.
+    """
+    rumbo = math.radians(rumbo_grados)
+    dlat = distancia * math.cos(rumbo) / METROS_POR_GRADO_LAT
+    dlon = distancia * math.sin(rumbo) / (METROS_POR_GRADO_LAT * math.cos(math.radians(lat)))
+    return lat + dlat, lon + dlon
+
+
+class PuntosGeo:
+    """
+    Tabla de puntos para calcular distancias por lotes.
+
+    Las coordenadas se guardan como desplazamientos en radianes respecto a
+    un punto de referencia, en arrays 'f' (32 bits). Así se conserva la
+    precisión al nivel del metro aunque los flotantes sean de 32 bits.
+    El coseno de la latitud de cada punto se calcula una sola vez al agregarlo.
+    """
+
+    def __init__(self, lat_referencia, lon_referencia):
+        """
+        Args:
+            lat_referencia (float): Latitud de referencia (cercana a los puntos).
+            lon_referencia (float): Longitud de referencia.
+        """
+        self._phi0 = math.radians(lat_referencia)
+        self._lambda0 = math.radians(lon_referencia)
+        self._dphi = array("f")
+        self._dlambda = array("f")
+        self._cos = array("f")
+        self._np = None  # Copias en NumPy, se crean al primer uso.
+
+    def __len__(self):
+        return len(self._dphi)
+
+    def agregar(self, lat, lon):
+        """Agrega un punto y retorna su posición en la tabla."""
+        phi = math.radians(lat)
+        self._dphi.append(phi - self._phi0)
+        self._dlambda.append(math.radians(lon) - self._lambda0)
+        self._cos.append(math.cos(phi))
+        self._np = None
+        return len(self._dphi) - 1
+
+    def distancias(self, lat, lon, salida=None, metodo=EQUIRECTANGULAR, usar_numpy=True):
+        """
+        Calcula la distancia de una ubicación a todos los puntos.
+
+        Args:
+            lat (float): Latitud de la ubicación en grados.
+            lon (float): Longitud de la ubicación en grados.
+            salida (array): Array 'f' donde escribir los resultados; se crea
+                si no se indica. Reutilizarlo evita crear uno en cada llamada.
+            metodo (str): HAVERSINE, EQUIRECTANGULAR (el más rápido; para
+                búsquedas de menos de 1 km) o AUTOMATICO (equirectangular con
+                Haversine para los puntos a más de 1 km).
+            usar_numpy (bool): Usa NumPy si está disponible.
+
+        Returns:
+            array: Distancias en metros, en el orden en que se agregaron los puntos.
+        """
+        n = len(self._dphi)
+        if salida is None:
+            salida = array("f", bytearray(4 * n))
+        elif len(salida) < n:
+            raise ValueError("El array de salida es más pequeño que la tabla")
+        dphi_q = math.radians(lat) - self._phi0
+        dlambda_q = math.radians(lon) - self._lambda0
+        if usar_numpy and np is not None:
+            self._distancias_numpy(dphi_q, dlambda_q, salida, metodo)
+        elif metodo == HAVERSINE:
+            self._haversine(dphi_q, dlambda_q, salida, range(n))
+        elif metodo == AUTOMATICO:
+            self._automatico(dphi_q, dlambda_q, salida)
+        else:
+            self._equirectangular(dphi_q, dlambda_q, salida)
+        return salida
+
+    def _haversine(self, dphi_q, dlambda_q, salida, posiciones):
+        dphi, dlambda, cos_p = self._dphi, self._dlambda, self._cos
+        cos_q = math.cos(self._phi0 + dphi_q)
+        sin, sqrt, atan2 = math.sin, math.sqrt, math.atan2
+        for i in posiciones:
+            s_phi = sin((dphi_q - dphi[i]) / 2.0)
+            s_lambda = sin((dlambda_q - dlambda[i]) / 2.0)
+            a = s_phi * s_phi + cos_q * cos_p[i] * s_lambda * s_lambda
+            salida[i] = 2 * RADIO_TIERRA_METROS * atan2(sqrt(a), sqrt(1 - a))
+
+    def _equirectangular(self, dphi_q, dlambda_q, salida):
+        dphi, dlambda, cos_p = self._dphi, self._dlambda, self._cos
+        sqrt = math.sqrt
+        R = RADIO_TIERRA_METROS
+        for i in range(len(dphi)):
+            x = (dlambda_q - dlambda[i]) * cos_p[i]
+            y = dphi_q - dphi[i]
+            salida[i] = R * sqrt(x * x + y * y)
+
+    def _automatico(self, dphi_q, dlambda_q, salida):
+        # Una sola pasada: Haversine solo para los puntos a más de 1 km.
+        dphi, dlambda, cos_p = self._dphi, self._dlambda, self._cos
+        cos_q = math.cos(self._phi0 + dphi_q)
+        sin, sqrt, atan2 = math.sin, math.sqrt, math.atan2
+        R = RADIO_TIERRA_METROS
+        maxima = DISTANCIA_MAX_EQUIRECTANGULAR / R
+        maxima *= maxima
+        for i in range(len(dphi)):
+            y = dphi_q - dphi[i]
+            dl = dlambda_q - dlambda[i]
+            x = dl * cos_p[i]
+            d2 = x * x + y * y
+            if d2 > maxima:
+                s_phi = sin(y / 2.0)
+                s_lambda = sin(dl / 2.0)
+                a = s_phi * s_phi + cos_q * cos_p[i] * s_lambda * s_lambda
+                salida[i] = 2 * R * atan2(sqrt(a), sqrt(1 - a))
+            else:
+                salida[i] = R * sqrt(d2)
+
+    def _distancias_numpy(self, dphi_q, dlambda_q, salida, metodo):
+        if self._np is None:
+            self._np = (np.array(self._dphi, dtype=np.float64),
+                        np.array(self._dlambda, dtype=np.float64),
+                        np.array(self._cos, dtype=np.float64))
+        dphi, dlambda, cos_p = self._np
+        n = len(dphi)
+        # Vista sin copia sobre el array('f') de salida.
+        destino = np.frombuffer(salida, dtype=np.float32, count=n)
+        y = dphi_q - dphi
+        x = dlambda_q - dlambda
+        if metodo == HAVERSINE:
+            a = np.sin(y / 2.0) ** 2 + math.cos(self._phi0 + dphi_q) * cos_p * np.sin(x / 2.0) ** 2
+            destino[:] = 2 * RADIO_TIERRA_METROS * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+            return
+        x *= cos_p
+        destino[:] = RADIO_TIERRA_METROS * np.sqrt(x * x + y * y)
+        if metodo == AUTOMATICO:
+            lejanos = np.nonzero(destino > DISTANCIA_MAX_EQUIRECTANGULAR)[0]
+            if len(lejanos):
+                self._haversine(dphi_q, dlambda_q, salida, lejanos.tolist())
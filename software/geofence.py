@@ -0,0 +1,368 @@
+# geofence.py
+# Módulo para el filtrado de posición y las geocercas de los POIs.
+# Suaviza las lecturas del GPS con un filtro alfa-beta y sigue, por cada POI,
+# los eventos de entrada, permanencia y salida con histéresis: se entra con
+# un radio menor que el de salida y cada cambio se confirma con varias
+# lecturas seguidas. Así el ruido de 2-5 m del GPS no dispara consultas.
+#
+# Cada lectura se procesa sin asignar memoria: los POIs cercanos se buscan
+# en buffers preasignados (IndicePOI.buscar, que conserva los más cercanos),
+# el estado se indexa por la posición del POI en el índice y, sin eventos,
+# se retorna una tupla vacía.
+#
+# El motor también estima la distancia al borde de geocerca más cercano
+# ('distancia_borde'): el de entrada de los POIs libres y el de salida de los
+# ocupados. El muestreo adaptativo del GPS (gps_scheduler.py) la usa para
+# decidir cada cuánto leer.
+
+import math
+from array import array
+from geo_utils import haversine_distance, METROS_POR_GRADO_LAT
+
+# --- CONFIGURACIÓN ---
+FILTRO_ALFA = 0.5                 # Peso de la medición en la posición filtrada.
+FILTRO_BETA = 0.1                 # Peso de la medición en la velocidad filtrada.
+FILTRO_MAX_HUECO_SEGUNDOS = 30.0  # Sin lecturas por más tiempo, el filtro se reinicia.
+RADIO_ENTRADA_METROS = 25.0
+RADIO_SALIDA_METROS = 35.0
+LECTURAS_CONFIRMACION = 3         # Lecturas seguidas para confirmar entrada o salida.
+PERMANENCIA_SEGUNDOS = 30.0       # Tiempo dentro de la geocerca para el evento de permanencia.
+MAX_CERCANOS = 16                 # POIs más cercanos del radio de búsqueda que se revisan por lectura.
+RADIO_VISTA_METROS = 100.0        # Radio en el que 'distancia_borde' busca la próxima geocerca.
+
+# Tipos de evento.
+ENTRADA = "entrada"
+PERMANENCIA = "permanencia"
+SALIDA = "salida"
+_SIN_EVENTOS = ()
+
+
+class FiltroAlfaBeta:
+    """
+    Filtro alfa-beta de posición y velocidad en un plano local (metros).
+
+    Es una versión simplificada del filtro de Kalman con ganancias fijas:
+    predice la posición con la velocidad estimada y la corrige con una
+    fracción del error de la nueva lectura.
+    """
+
+    def __init__(self, alfa=FILTRO_ALFA, beta=FILTRO_BETA, max_hueco=FILTRO_MAX_HUECO_SEGUNDOS):
+        self.alfa = alfa
+        self.beta = beta
+        self.max_hueco = max_hueco
+        self.reiniciar()
+
+    def reiniciar(self):
+        self._origen = False
+        self._lat0 = self._lon0 = 0.0
+        self._m_lon = 0.0    # Metros por grado de longitud en el origen.
+        self._t = None
+        self.x = self.y = 0.0
+        self.vx = self.vy = 0.0
+        self.lat = self.lon = 0.0  # Última posición filtrada.
+
+    def actualizar(self, lat, lon, t):
+        """
+        Incorpora una lectura del GPS.
+
+        Args:
+            lat (float): Latitud medida en grados.
+            lon (float): Longitud medida en grados.
+            t (float): Instante de la lectura en segundos.
+
+        Returns:
+            tuple: (lat, lon) filtradas en grados.
+        """
+        self.corregir(lat, lon, t)
+        return self.lat, self.lon
+
+    def corregir(self, lat, lon, t):
+        """Igual que 'actualizar', pero deja el resultado en 'lat' y 'lon' sin crear una tupla."""
+        if not self._origen or t - self._t > self.max_hueco:
+            self.reiniciar()
+            self._origen = True
+            self._lat0, self._lon0 = lat, lon
+            self._m_lon = METROS_POR_GRADO_LAT * math.cos(math.radians(lat))
+            self._t = t
+            self.lat, self.lon = lat, lon
+            return
+
+        lat0, lon0, m_lon = self._lat0, self._lon0, self._m_lon
+        zx = (lon - lon0) * m_lon
+        zy = (lat - lat0) * METROS_POR_GRADO_LAT
+        dt = t - self._t
+        self._t = t
+        if dt <= 0:
+            dt = 1e-3
+
+        px = self.x + self.vx * dt
+        py = self.y + self.vy * dt
+        rx = zx - px
+        ry = zy - py
+        self.x = px + self.alfa * rx
+        self.y = py + self.alfa * ry
+        self.vx += self.beta * rx / dt
+        self.vy += self.beta * ry / dt
+        self.lat = lat0 + self.y / METROS_POR_GRADO_LAT
+        self.lon = lon0 + self.x / m_lon
+
+    def velocidad(self):
+        """Rapidez estimada en metros por segundo."""
+        return math.sqrt(self.vx * self.vx + self.vy * self.vy)
+
+
+class _EstadoPOI:
+    """Estado de la geocerca de un POI."""
+
+    __slots__ = ("dentro", "seguidas", "desde", "permanencia", "visto")
+
+    def __init__(self):
+        self.visto = False      # Apareció en la búsqueda de la lectura actual.
+        self.dentro = False
+        self.seguidas = 0       # Lecturas seguidas que contradicen el estado actual.
+        self.desde = 0.0        # Instante de la entrada confirmada.
+        self.permanencia = False
+
+
+class MotorGeocercas:
+    """
+    Detecta entradas, permanencias y salidas de las geocercas de los POIs.
+
+    Solo una entrada confirmada debe disparar una consulta al LLM.
+    """
+
+    def __init__(self, indice, radio_entrada=RADIO_ENTRADA_METROS,
+                 radio_salida=RADIO_SALIDA_METROS, confirmacion=LECTURAS_CONFIRMACION,
+                 permanencia=PERMANENCIA_SEGUNDOS, filtro=None):
+        """
+        Args:
+            indice (IndicePOI): Índice espacial de los POIs.
+            radio_entrada (float): Radio para entrar a una geocerca, en metros.
+            radio_salida (float): Radio para salir; debe ser mayor que el de entrada.
+            confirmacion (int): Lecturas seguidas necesarias para cambiar de estado.
+            permanencia (float): Segundos dentro para emitir el evento de permanencia.
+            filtro (FiltroAlfaBeta): Filtro de posición; por defecto uno nuevo.
+        """
+        if radio_salida < radio_entrada:
+            raise ValueError("El radio de salida debe ser mayor o igual al de entrada")
+        self.indice = indice
+        self.radio_entrada = radio_entrada
+        self.radio_salida = radio_salida
+        self.confirmacion = confirmacion
+        self.permanencia = permanencia
+        self.filtro = filtro if filtro is not None else FiltroAlfaBeta()
+        self._radios = {}   # poi_id -> (entrada, salida) para radios personalizados
+        self._estados = {}  # índice del POI -> _EstadoPOI (solo POIs cercanos o con estado)
+        self._radio_busqueda = radio_salida
+        self._entrada_maxima = radio_entrada
+        # Distancia en metros al borde más cercano entre los POIs del radio de
+        # búsqueda (0 si ya se cruzó), o None si no hay ninguno.
+        self.borde = None
+        # Buffers de la búsqueda de POIs cercanos, reutilizados en cada lectura.
+        # 'L': con teselas (poi_tiles.py) los índices pueden pasar de 65535.
+        self._indices = array("L", [0] * MAX_CERCANOS)
+        self._distancias = array("d", [0.0] * MAX_CERCANOS)
+        self._lecturas = 0
+
+    @property
+    def ubicacion(self):
+        """Última posición filtrada (lat, lon), o None antes de la primera lectura."""
+        if not self._lecturas:
+            return None
+        return self.filtro.lat, self.filtro.lon
+
+    def configurar_radio(self, poi_id, entrada, salida):
+        """Define radios propios para un POI (por ejemplo, un parque grande)."""
+        if salida < entrada:
+            raise ValueError("El radio de salida debe ser mayor o igual al de entrada")
+        self._radios[poi_id] = (entrada, salida)
+        self._radio_busqueda = max(self._radio_busqueda, salida)
+        self._entrada_maxima = max(self._entrada_maxima, entrada)
+
+    def radios(self, poi_id):
+        return self._radios.get(poi_id, (self.radio_entrada, self.radio_salida))
+
+    def dentro(self):
+        """Ids de los POIs cuya geocerca está ocupada actualmente."""
+        return [self.indice.ids[i] for i, estado in self._estados.items() if estado.dentro]
+
+    def actualizar(self, lat, lon, t):
+        """
+        Procesa una lectura del GPS.
+
+        Args:
+            lat (float): Latitud medida.
+            lon (float): Longitud medida.
+            t (float): Instante de la lectura en segundos.
+
+        Returns:
+            list: Eventos (tipo, poi_id) generados por esta lectura, del POI
+                más cercano al más lejano. Sin eventos retorna una tupla
+                vacía compartida.
+        """
+        filtro = self.filtro
+        filtro.corregir(lat, lon, t)
+        lat, lon = filtro.lat, filtro.lon
+        self._lecturas += 1
+        eventos = _SIN_EVENTOS
+        estados = self._estados
+        ids = self.indice.ids
+        indices, distancias = self._indices, self._distancias
+        encontrados = self.indice.buscar(lat, lon, self._radio_busqueda, indices, distancias)
+
+        vistos = 0
+        borde = -1.0
+        for k in range(encontrados):
+            i = indices[k]
+            distancia = distancias[k]
+            if self._radios:
+                entrada, salida = self.radios(ids[i])
+            else:
+                entrada, salida = self.radio_entrada, self.radio_salida
+            estado = estados.get(i)
+            if estado is not None and estado.dentro:
+                falta = salida - distancia if distancia < salida else 0.0
+            else:
+                falta = distancia - entrada if distancia > entrada else 0.0
+            if borde < 0 or falta < borde:
+                borde = falta
+            if estado is None:
+                if distancia > entrada:
+                    continue
+                estado = estados[i] = _EstadoPOI()
+            evento = self._evaluar(i, estado, distancia <= entrada, distancia > salida, t)
+            if evento is not None:
+                eventos = self._agregar(eventos, evento, distancia)
+            if i in estados:
+                estado.visto = True
+                vistos += 1
+
+        if len(estados) > vistos:
+            # Hay POIs con estado que la búsqueda no trajo: quedaron fuera del
+            # radio o, en un grupo denso, detrás de MAX_CERCANOS más cercanos.
+            # Se evalúan con su distancia directa.
+            lats, lons = self.indice.lats, self.indice.lons
+            for i in list(estados):
+                estado = estados[i]
+                if estado.visto:
+                    estado.visto = False
+                    continue
+                distancia = haversine_distance(lat, lon, lats[i], lons[i])
+                entrada, salida = self.radios(ids[i])
+                evento = self._evaluar(i, estado, distancia <= entrada, distancia > salida, t)
+                if evento is not None:
+                    eventos = self._agregar(eventos, evento, distancia)
+                elif i in estados:
+                    if estado.dentro:
+                        falta = salida - distancia if distancia < salida else 0.0
+                    else:
+                        falta = distancia - entrada if distancia > entrada else 0.0
+                    if borde < 0 or falta < borde:
+                        borde = falta
+        elif vistos:
+            for k in range(encontrados):
+                estado = estados.get(indices[k])
+                if estado is not None:
+                    estado.visto = False
+
+        self.borde = borde if borde >= 0 else None
+
+        if eventos:
+            # Del POI más cercano al más lejano.
+            eventos.sort(key=lambda e: e[2])
+            eventos = [(tipo, poi_id) for tipo, poi_id, _ in eventos]
+        return eventos
+
+    def distancia_borde(self, radio_vista=RADIO_VISTA_METROS):
+        """
+        Distancia al borde de geocerca más cercano (entrada o salida).
+
+        'borde' solo considera los POIs del radio de búsqueda. Si es mayor que
+        lo que podría medir un POI de afuera, se mira hasta 'radio_vista'
+        alrededor de la última posición filtrada, restando el mayor radio de
+        entrada (la estimación nunca es mayor que la distancia real).
+
+        Returns:
+            float: Metros hasta el borde (0 si ya se cruzó); sin POIs en
+                'radio_vista', ese radio menos el de entrada.
+        """
+        borde = self.borde
+        if not self._lecturas:
+            return 0.0
+        if borde is not None and borde <= self._radio_busqueda - self._entrada_maxima:
+            return borde
+        # Los POIs con estado ya están en 'borde'; los demás del radio de
+        # búsqueda darían un borde menor que la cota anterior.
+        cercano = self.indice.distancia_minima(self.filtro.lat, self.filtro.lon, radio_vista,
+                                               self._estados)
+        if cercano is None:
+            cercano = radio_vista
+        lejos = max(cercano - self._entrada_maxima, 0.0)
+        return lejos if borde is None or lejos < borde else borde
+
+    @staticmethod
+    def _agregar(eventos, evento, distancia):
+        """Agrega un evento con su distancia (la lista se crea con el primero)."""
+        if eventos is _SIN_EVENTOS:
+            eventos = []
+        eventos.append((evento[0], evento[1], distancia))
+        return eventos
+
+    def _evaluar(self, i, estado, adentro, afuera, t):
+        """
+        Actualiza el estado de un POI con una lectura.
+
+        Returns:
+            tuple: Evento (tipo, poi_id), o None.
+        """
+        if estado.dentro:
+            estado.seguidas = estado.seguidas + 1 if afuera else 0
+            if estado.seguidas >= self.confirmacion:
+                del self._estados[i]
+                return (SALIDA, self.indice.ids[i])
+            if not estado.permanencia and t - estado.desde >= self.permanencia:
+                estado.permanencia = True
+                return (PERMANENCIA, self.indice.ids[i])
+            return None
+        if not adentro:
+            del self._estados[i]
+            return None
+        estado.seguidas += 1
+        if estado.seguidas >= self.confirmacion:
+            estado.dentro = True
+            estado.seguidas = 0
+            estado.desde = t
+            return (ENTRADA, self.indice.ids[i])
+        return None
+
+
+def evaluar_traza(ubicaciones, motor):
+    """
+    Pasa una traza grabada por el motor y calcula métricas de eventos.
+
+    Args:
+        ubicaciones (iterable): Tuplas (lat, lon, t) en orden temporal.
+        motor (MotorGeocercas): Motor de geocercas a evaluar.
+
+    Returns:
+        dict: Kilómetros recorridos (según la posición filtrada), cantidad de
+            cada tipo de evento y entradas por kilómetro.
+    """
+    conteo = {ENTRADA: 0, PERMANENCIA: 0, SALIDA: 0}
+    metros = 0.0
+    anterior = None
+    for lat, lon, t in ubicaciones:
+        for tipo, _ in motor.actualizar(lat, lon, t):
+            conteo[tipo] += 1
+        actual = motor.ubicacion
+        if anterior is not None:
+            metros += haversine_distance(anterior[0], anterior[1], actual[0], actual[1])
+        anterior = actual
+    km = metros / 1000.0
+    return {
+        "km": km,
+        "entradas": conteo[ENTRADA],
+        "permanencias": conteo[PERMANENCIA],
+        "salidas": conteo[SALIDA],
+        "entradas_por_km": conteo[ENTRADA] / km if km > 0 else 0.0,
+    }
@@ -0,0 +1,455 @@
+# gps_replay.py
+# Módulo con fuentes de ubicación para reproducir recorridos.
+# Todas tienen la misma interfaz que el GPS ('get_current_location'), así
+# el resto del sistema (geocercas, caché, precarga) no distingue entre un
+# recorrido reproducido y el sensor:
+#   - ReproductorNMEA: registros NMEA grabados del GPS, leídos línea por
+#     línea con el mismo parser que usa el sensor (ParserNMEA).
+#   - ReproductorGPX: trazas GPX (por ejemplo, exportadas de una app de
+#     caminata), interpolando entre los puntos.
+#   - TrazaSintetica: una caminata generada entre puntos de paso, con ruido
+#     y pérdidas de señal configurables.
+# Cada fuente avanza con el reloj multiplicado por 'velocidad': con 60, una
+# hora de caminata se reproduce en un minuto. Con el reloj virtual de la
+# simulación (tests/simulador), horas de recorrido toman segundos.
+
+import math
+import random
+import time
+from array import array
+from geo_utils import METROS_POR_GRADO_LAT, haversine_distance, initial_bearing
+from gps_utils import ParserNMEA, Ubicacion
+
+# --- CONFIGURACIÓN ---
+VELOCIDAD_MARCHA = 1.4          # Metros por segundo de una persona caminando.
+SEGUNDOS_POR_PUNTO_GPX = 1.0    # Separación de los puntos GPX sin '<time>'.
+_SEGUNDOS_DIA = 86400
+_NUDOS_POR_MPS = 1.943844
+
+
+def hora_nmea(linea):
+    """
+    Hora UTC de una sentencia GGA o RMC, en segundos desde la medianoche.
+
+    Args:
+        linea (bytes): Sentencia NMEA.
+
+    Returns:
+        float: Segundos, o None si la sentencia no trae hora.
+    """
+    if len(linea) < 14 or linea[0] != 36 or linea[3:6] not in (b"GGA", b"RMC"):
+        return None
+    campo = linea[7:linea.find(b",", 7)]
+    if len(campo) < 6:
+        return None
+    try:
+        return int(campo[0:2]) * 3600 + int(campo[2:4]) * 60 + float(campo[4:])
+    except ValueError:
+        return None
+
+
+def segundos_iso(texto):
+    """
+    Convierte una fecha ISO 8601 ('2025-08-18T15:30:00Z') a segundos desde 1970.
+
+    Acepta fracciones de segundo y zonas como '+02:00'. Sin zona se asume UTC.
+    """
+    anio, mes, dia = int(texto[0:4]), int(texto[5:7]), int(texto[8:10])
+    hora, minuto = int(texto[11:13]), int(texto[14:16])
+    resto = texto[17:]
+    fin = 0
+    while fin < len(resto) and (resto[fin].isdigit() or resto[fin] == "."):
+        fin += 1
+    segundos = float(resto[:fin])
+    zona = resto[fin:]
+    desfase = 0
+    if zona and zona[0] in "+-":
+        desfase = (int(zona[1:3]) * 60 + int(zona[4:6])) * 60
+        if zona[0] == "-":
+            desfase = -desfase
+    # Días desde 1970-01-01 (algoritmo 'days from civil' de H. Hinnant).
+    a = anio - (1 if mes <= 2 else 0)
+    era = a // 400
+    anio_era = a - era * 400
+    dia_anio = (153 * (mes + (-3 if mes > 2 else 9)) + 2) // 5 + dia - 1
+    dia_era = anio_era * 365 + anio_era // 4 - anio_era // 100 + dia_anio
+    dias = era * 146097 + dia_era - 719468
+    return dias * _SEGUNDOS_DIA + hora * 3600 + minuto * 60 + segundos - desfase
+
+
+def _atributo(etiqueta, nombre):
+    """Valor de un atributo (con comillas simples o dobles) dentro de una etiqueta XML."""
+    for comilla in ('"', "'"):
+        clave = " " + nombre + "=" + comilla
+        inicio = etiqueta.find(clave)
+        if inicio >= 0:
+            inicio += len(clave)
+            return etiqueta[inicio:etiqueta.find(comilla, inicio)]
+    return None
+
+
+def leer_gpx(texto, segundos_por_punto=SEGUNDOS_POR_PUNTO_GPX):
+    """
+    Lee los puntos de una traza GPX ('<trkpt lat lon>' con '<time>' opcional).
+
+    Args:
+        texto (str): Contenido del archivo GPX.
+        segundos_por_punto (float): Separación de los puntos que no traen hora.
+
+    Returns:
+        tuple: Arrays 'd' (latitudes, longitudes, segundos desde el primer punto).
+    """
+    lats, lons, tiempos = array("d"), array("d"), array("d")
+    primero = None
+    posicion = texto.find("<trkpt")
+    while posicion >= 0:
+        cierre_etiqueta = texto.find(">", posicion)
+        etiqueta = texto[posicion:cierre_etiqueta]
+        siguiente = texto.find("<trkpt", cierre_etiqueta)
+        fin_punto = texto.find("</trkpt>", cierre_etiqueta)
+        if etiqueta.endswith("/") or fin_punto < 0 or (0 <= siguiente < fin_punto):
+            fin_punto = cierre_etiqueta  # '<trkpt .../>' sin hijos.
+        cuerpo = texto[cierre_etiqueta:fin_punto]
+        lat, lon = _atributo(etiqueta, "lat"), _atributo(etiqueta, "lon")
+        if lat is not None and lon is not None:
+            inicio_hora = cuerpo.find("<time>")
+            t = None
+            if inicio_hora >= 0:
+                t = segundos_iso(cuerpo[inicio_hora + 6:cuerpo.find("</time>", inicio_hora)].strip())
+                if primero is None:
+                    primero = t
+                t -= primero
+            elif tiempos:
+                t = tiempos[-1] + segundos_por_punto
+            else:
+                t = 0.0
+            lats.append(float(lat))
+            lons.append(float(lon))
+            tiempos.append(t)
+        posicion = siguiente
+    return lats, lons, tiempos
+
+
+class ReproductorNMEA:
+    """
+    Reproduce un registro NMEA respetando la hora de cada sentencia.
+
+    El archivo se lee línea por línea a medida que avanza el reloj, así un
+    registro de horas no se carga completo en memoria. Las sentencias sin
+    hora (GSA, GSV) se procesan junto con la anterior.
+    """
+
+    def __init__(self, fuente, velocidad=1.0, repetir=False, reloj=time.monotonic):
+        """
+        Args:
+            fuente (str | list): Ruta del registro, o las líneas (bytes o str).
+            velocidad (float): Segundos del registro por segundo del reloj.
+            repetir (bool): Al terminar, vuelve a empezar.
+            reloj (callable): Fuente de tiempo en segundos.
+        """
+        self.fuente = fuente
+        self.velocidad = velocidad
+        self.repetir = repetir
+        self._reloj = reloj
+        self.parser = ParserNMEA()
+        self.terminado = False
+        self.vueltas = 0
+        self._archivo = None
+        self._lineas = None
+        self._desfase = 0.0     # Segundos sumados a las horas (medianoche y vueltas).
+        self._ultima_hora = None
+        self._primera_hora = None
+        self._primera_cruda = None  # Hora de la primera sentencia, sin desfase.
+        self._abrir()
+        self._pendiente, self._hora_pendiente = self._leer()
+        self._inicio = reloj()
+
+    def _abrir(self):
+        if isinstance(self.fuente, str):
+            self._archivo = open(self.fuente, "rb")
+        else:
+            self._lineas = iter(self.fuente)
+
+    def _leer(self):
+        """Retorna la siguiente línea y su hora en la línea de tiempo, o (None, None)."""
+        if self._archivo is not None:
+            linea = self._archivo.readline()
+            if not linea:
+                self._archivo.close()
+                self._archivo = None
+                return None, None
+        else:
+            linea = next(self._lineas, None)
+            if linea is None:
+                return None, None
+            if isinstance(linea, str):
+                linea = linea.encode("ascii")
+        if not linea.endswith(b"\n"):
+            linea += b"\n"
+        hora = hora_nmea(linea)
+        if hora is not None:
+            if self._primera_cruda is None:
+                self._primera_cruda = hora
+            hora += self._desfase
+            if self._ultima_hora is not None and hora < self._ultima_hora - _SEGUNDOS_DIA / 2:
+                self._desfase += _SEGUNDOS_DIA  # Pasó la medianoche UTC.
+                hora += _SEGUNDOS_DIA
+            if self._primera_hora is None:
+                self._primera_hora = hora
+            self._ultima_hora = hora
+        return linea, hora
+
+    def _reiniciar(self):
+        """Empieza otra vuelta: las horas siguen un segundo después de la última."""
+        self.vueltas += 1
+        self._desfase = self._ultima_hora + 1.0 - self._primera_cruda
+        self._abrir()
+        self._pendiente, self._hora_pendiente = self._leer()
+
+    def tiempo(self):
+        """Hora actual de la reproducción en la línea de tiempo del registro."""
+        primera = self._primera_hora if self._primera_hora is not None else 0.0
+        return primera + (self._reloj() - self._inicio) * self.velocidad
+
+    def get_current_location(self):
+        """Retorna la última ubicación reproducida (Ubicacion), o None sin fix."""
+        ahora = self.tiempo()
+        while self._pendiente is not None:
+            if self._hora_pendiente is not None and self._hora_pendiente > ahora:
+                break
+            self.parser.alimentar(self._pendiente)
+            self._pendiente, self._hora_pendiente = self._leer()
+            if self._pendiente is None and self.repetir and self._ultima_hora is not None:
+                self._reiniciar()
+        if self._pendiente is None:
+            self.terminado = True
+        return self.parser.ubicacion()
+
+
+class ReproductorGPX:
+    """Reproduce una traza GPX interpolando la posición entre sus puntos."""
+
+    def __init__(self, fuente, velocidad=1.0, repetir=False, reloj=time.monotonic,
+                 segundos_por_punto=SEGUNDOS_POR_PUNTO_GPX):
+        """
+        Args:
+            fuente (str): Ruta del archivo GPX, o su contenido si empieza con '<'.
+            velocidad (float): Segundos de la traza por segundo del reloj.
+            repetir (bool): Al terminar, vuelve a empezar.
+            reloj (callable): Fuente de tiempo en segundos.
+            segundos_por_punto (float): Separación de los puntos sin '<time>'.
+
+        Raises:
+            ValueError: Si la traza no tiene puntos.
+        """
+        if not fuente.lstrip().startswith("<"):
+            with open(fuente, "r") as archivo:
+                fuente = archivo.read()
+        self.lats, self.lons, self.tiempos = leer_gpx(fuente, segundos_por_punto)
+        if not self.tiempos:
+            raise ValueError("La traza GPX no tiene puntos")
+        self.velocidad = velocidad
+        self.repetir = repetir
+        self.terminado = False
+        self._reloj = reloj
+        self._inicio = reloj()
+        self._indice = 0
+        self._ubicacion = Ubicacion()
+
+    def duracion(self):
+        return self.tiempos[-1]
+
+    def ubicacion_en(self, t):
+        """Ubicación interpolada a los 't' segundos de la traza (Ubicacion reutilizada)."""
+        tiempos = self.tiempos
+        if t <= 0 or len(tiempos) == 1:
+            return self._ubicacion.actualizar(self.lats[0], self.lons[0])
+        if t >= tiempos[-1]:
+            return self._ubicacion.actualizar(self.lats[-1], self.lons[-1])
+        # El tiempo casi siempre avanza: se sigue desde el último segmento.
+        i = self._indice
+        if tiempos[i] > t:
+            i = 0
+        while tiempos[i + 1] < t:
+            i += 1
+        self._indice = i
+        tramo = tiempos[i + 1] - tiempos[i]
+        f = (t - tiempos[i]) / tramo if tramo > 0 else 1.0
+        return self._ubicacion.actualizar(self.lats[i] + (self.lats[i + 1] - self.lats[i]) * f,
+                                          self.lons[i] + (self.lons[i + 1] - self.lons[i]) * f)
+
+    def get_current_location(self):
+        """Retorna la ubicación de la traza en el instante actual."""
+        t = (self._reloj() - self._inicio) * self.velocidad
+        duracion = self.duracion()
+        if t >= duracion:
+            if self.repetir and duracion > 0:
+                t %= duracion
+            else:
+                self.terminado = True
+        return self.ubicacion_en(t)
+
+
+class TrazaSintetica:
+    """
+    Caminata generada entre puntos de paso.
+
+    Recorre los puntos en orden a velocidad constante, con una pausa en cada
+    uno. A cada lectura se le suma ruido gaussiano (en metros) y, con la
+    probabilidad 'perdida', la lectura se pierde (sin fix).
+    """
+
+    def __init__(self, puntos, velocidad_marcha=VELOCIDAD_MARCHA, pausa=0.0, ruido_metros=0.0,
+                 perdida=0.0, velocidad=1.0, repetir=True, semilla=None, reloj=time.monotonic):
+        """
+        Args:
+            puntos (list): Diccionarios con 'lat' y 'lon', en orden de visita.
+            velocidad_marcha (float): Metros por segundo entre los puntos.
+            pausa (float): Segundos que se permanece en cada punto.
+            ruido_metros (float): Desviación estándar del ruido en cada eje.
+            perdida (float): Probabilidad (0 a 1) de una lectura sin fix.
+            velocidad (float): Segundos de la caminata por segundo del reloj.
+            repetir (bool): Al llegar al último punto, vuelve al primero.
+            semilla (int): Semilla del generador aleatorio (recorridos repetibles).
+            reloj (callable): Fuente de tiempo en segundos.
+        """
+        self.puntos = puntos
+        self.velocidad_marcha = velocidad_marcha
+        self.pausa = pausa
+        self.ruido_metros = ruido_metros
+        self.perdida = perdida
+        self.velocidad = velocidad
+        self.repetir = repetir
+        self.terminado = False
+        if semilla is not None:
+            random.seed(semilla)
+        # Instante en que empieza la pausa en cada punto y en que se sale de él.
+        self._llegadas = array("d")
+        self._salidas = array("d")
+        t = 0.0
+        cantidad = len(puntos)
+        tramos = cantidad if repetir and cantidad > 1 else cantidad - 1
+        for i in range(cantidad):
+            self._llegadas.append(t)
+            t += pausa
+            self._salidas.append(t)
+            if i < tramos:
+                a, b = puntos[i], puntos[(i + 1) % cantidad]
+                t += haversine_distance(a["lat"], a["lon"], b["lat"], b["lon"]) / velocidad_marcha
+        self._duracion = t
+        self._reloj = reloj
+        self._inicio = reloj()
+        self._ubicacion = Ubicacion()
+
+    def duracion(self):
+        """Segundos de una vuelta completa (o del recorrido, sin repetir)."""
+        return self._duracion
+
+    def posicion_en(self, t):
+        """Posición sin ruido (lat, lon) a los 't' segundos de la caminata."""
+        puntos = self.puntos
+        ultimo = len(puntos) - 1
+        if self.repetir and self._duracion > 0:
+            t %= self._duracion
+        i = ultimo
+        while i > 0 and t < self._llegadas[i]:
+            i -= 1
+        punto = puntos[i]
+        if t < self._salidas[i] or ultimo == 0 or (i == ultimo and not self.repetir):
+            return punto["lat"], punto["lon"]
+        destino = puntos[(i + 1) % len(puntos)]
+        fin = self._llegadas[i + 1] if i < ultimo else self._duracion
+        if fin <= self._salidas[i]:
+            return destino["lat"], destino["lon"]  # Puntos repetidos.
+        f = (t - self._salidas[i]) / (fin - self._salidas[i])
+        return (punto["lat"] + (destino["lat"] - punto["lat"]) * f,
+                punto["lon"] + (destino["lon"] - punto["lon"]) * f)
+
+    def ubicacion_en(self, t):
+        """Lectura del GPS a los 't' segundos, con ruido; None si se perdió."""
+        if self.perdida and random.random() < self.perdida:
+            return None
+        lat, lon = self.posicion_en(t)
+        if self.ruido_metros:
+            # Box-Muller: dos valores gaussianos independientes (norte y este).
+            radio = self.ruido_metros * math.sqrt(-2.0 * math.log(1.0 - random.random()))
+            angulo = 2 * math.pi * random.random()
+            lat += radio * math.cos(angulo) / METROS_POR_GRADO_LAT
+            lon += radio * math.sin(angulo) / (METROS_POR_GRADO_LAT * math.cos(math.radians(lat)))
+        return self._ubicacion.actualizar(lat, lon)
+
+    def get_current_location(self):
+        """Retorna la lectura simulada en el instante actual."""
+        t = (self._reloj() - self._inicio) * self.velocidad
+        if not self.repetir and t >= self._duracion:
+            self.terminado = True
+        return self.ubicacion_en(t)
+
+
+def _checksum(cuerpo):
+    suma = 0
+    for c in cuerpo:
+        suma ^= ord(c)
+    return f"${cuerpo}*{suma:02X}"
+
+
+def _coordenada_nmea(valor, ancho_grados, positivo, negativo):
+    hemisferio = positivo if valor >= 0 else negativo
+    valor = abs(valor)
+    grados = int(valor)
+    minutos = (valor - grados) * 60
+    return f"{grados:0{ancho_grados}d}{minutos:07.4f}", hemisferio
+
+
+def sentencias_nmea(fuente, duracion, periodo=1.0, hora_inicio=12 * 3600.0, fecha="180825"):
+    """
+    Genera un registro NMEA (RMC y GGA por lectura) a partir de una fuente.
+
+    Args:
+        fuente (TrazaSintetica | ReproductorGPX): Objeto con 'ubicacion_en(t)'.
+        duracion (float): Segundos a generar.
+        periodo (float): Segundos entre lecturas.
+        hora_inicio (float): Hora UTC de la primera lectura, en segundos.
+        fecha (str): Fecha 'ddmmaa' de las sentencias RMC.
+
+    Yields:
+        str: Sentencias NMEA con checksum, sin fin de línea.
+    """
+    anterior = None
+    t = 0.0
+    while t < duracion:
+        segundos = (hora_inicio + t) % _SEGUNDOS_DIA
+        hora = (f"{int(segundos // 3600):02d}{int(segundos % 3600 // 60):02d}"
+                f"{segundos % 60:05.2f}")
+        ubicacion = fuente.ubicacion_en(t)
+        if ubicacion is None:
+            yield _checksum(f"GPRMC,{hora},V,,,,,,,{fecha},,,N")
+            yield _checksum(f"GPGGA,{hora},,,,,0,00,99.99,,,,,,")
+        else:
+            lat, ns = _coordenada_nmea(ubicacion["lat"], 2, "N", "S")
+            lon, eo = _coordenada_nmea(ubicacion["lon"], 3, "E", "W")
+            nudos = rumbo = 0.0
+            if anterior is not None:
+                metros = haversine_distance(anterior[0], anterior[1],
+                                            ubicacion["lat"], ubicacion["lon"])
+                nudos = metros / periodo * _NUDOS_POR_MPS
+                rumbo = initial_bearing(anterior[0], anterior[1],
+                                        ubicacion["lat"], ubicacion["lon"])
+            yield _checksum(f"GPRMC,{hora},A,{lat},{ns},{lon},{eo},{nudos:.2f},{rumbo:.2f},"
+                            f"{fecha},,,A")
+            yield _checksum(f"GPGGA,{hora},{lat},{ns},{lon},{eo},1,08,1.00,1150.0,M,6.0,M,,")
+        # La fuente reutiliza su Ubicacion: se copian los valores.
+        anterior = None if ubicacion is None else (ubicacion["lat"], ubicacion["lon"])
+        t += periodo
+
+
+def abrir_traza(ruta, velocidad=1.0, repetir=False, reloj=time.monotonic):
+    """
+    Crea el reproductor que corresponde a la extensión del archivo.
+
+    Returns:
+        ReproductorGPX si la ruta termina en '.gpx'; si no, ReproductorNMEA.
+    """
+    if ruta.lower().endswith(".gpx"):
+        return ReproductorGPX(ruta, velocidad, repetir, reloj)
+    return ReproductorNMEA(ruta, velocidad, repetir, reloj)
@@ -0,0 +1,146 @@
+# gps_scheduler.py
+# Módulo para el muestreo adaptativo del GPS.
+# En lugar de leer el GPS cada segundo, el periodo se elige según la rapidez
+# estimada y la distancia a la geocerca más cercana (geofence.py): cerca de
+# un POI se lee a la frecuencia normal y lejos de todos, más despacio. La
+# frecuencia del sensor (PMTK220) sigue al periodo del bucle, así se ahorran
+# despertares de la CPU y tráfico del UART.
+#
+# El periodo nunca deja que el usuario llegue al borde entre dos lecturas,
+# suponiendo al menos la rapidez de alguien que empieza a caminar. Así,
+# cuando cruza la geocerca ya se lee a la frecuencia normal y la entrada se
+# confirma con el mismo retraso que con el periodo fijo.
+
+from array import array
+from gps_utils import comando_frecuencia
+from geofence import RADIO_VISTA_METROS
+
+# --- CONFIGURACIÓN ---
+NIVELES_MS = (1000, 2000, 5000, 10000)  # Periodos posibles (el GPS acepta hasta 10 s).
+VELOCIDAD_MINIMA = 1.5    # m/s que se suponen aunque el usuario esté quieto.
+FACTOR_VELOCIDAD = 1.25   # Margen sobre la rapidez estimada (acelerar, ruido del filtro).
+MARGEN_METROS = 5.0       # Ruido de la posición filtrada.
+MUESTRAS_PARA_BAJAR = 2   # Lecturas seguidas que piden un periodo más largo antes de subirlo.
+
+
+class PlanificadorGPS:
+    """
+    Elige el periodo del GPS y del bucle de muestreo en cada lectura.
+
+    Los periodos se limitan a unos pocos niveles para no enviar un comando
+    al sensor en cada lectura. Se pasa a un nivel más rápido de inmediato y
+    a uno más lento de a un nivel, después de 'muestras_para_bajar' lecturas.
+    """
+
+    def __init__(self, configurar=None, niveles=NIVELES_MS, velocidad_minima=VELOCIDAD_MINIMA,
+                 margen=MARGEN_METROS, radio_vista=RADIO_VISTA_METROS,
+                 muestras_para_bajar=MUESTRAS_PARA_BAJAR):
+        """
+        Args:
+            configurar (callable): Recibe el comando PMTK220 (bytes) cuando
+                cambia el periodo; por ejemplo, 'gps_sensor.send_command'.
+            niveles (tuple): Periodos posibles en milisegundos, de menor a mayor.
+            velocidad_minima (float): Rapidez mínima supuesta en m/s.
+            margen (float): Metros que se restan a la distancia al borde.
+            radio_vista (float): Radio en el que se busca la próxima geocerca.
+            muestras_para_bajar (int): Lecturas antes de alargar el periodo.
+        """
+        self.configurar = configurar
+        self.niveles = niveles
+        self.velocidad_minima = velocidad_minima
+        self.margen = margen
+        self.radio_vista = radio_vista
+        self.muestras_para_bajar = muestras_para_bajar
+        # Comandos precalculados: cambiar de nivel no arma cadenas nuevas.
+        self._comandos = tuple(comando_frecuencia(ms) for ms in niveles)
+        self.nivel = 0
+        self._seguidas = 0
+        self.cambios = 0                                   # Comandos enviados al GPS.
+        self.muestras = array("L", [0] * len(niveles))     # Lecturas por nivel.
+        self.borde = 0.0       # Última distancia al borde, en metros.
+        self.velocidad = 0.0   # Última rapidez estimada, en m/s.
+
+    @property
+    def periodo(self):
+        """Periodo actual en segundos."""
+        return self.niveles[self.nivel] / 1000
+
+    def periodo_deseado(self, borde, velocidad):
+        """
+        Periodo más largo que no deja llegar al borde entre dos lecturas.
+
+        Se divide entre dos porque la lectura puede tener hasta un periodo
+        de antigüedad (el GPS y el bucle no están sincronizados).
+
+        Args:
+            borde (float): Metros hasta la geocerca más cercana.
+            velocidad (float): Rapidez estimada en m/s.
+
+        Returns:
+            float: Segundos.
+        """
+        velocidad = max(velocidad * FACTOR_VELOCIDAD, self.velocidad_minima)
+        return (borde - self.margen) / (2 * velocidad)
+
+    def _nivel_para(self, segundos):
+        ms = segundos * 1000
+        nivel = 0
+        while nivel + 1 < len(self.niveles) and self.niveles[nivel + 1] <= ms:
+            nivel += 1
+        return nivel
+
+    def _cambiar(self, nivel):
+        self.nivel = nivel
+        self._seguidas = 0
+        self.cambios += 1
+        if self.configurar is not None:
+            self.configurar(self._comandos[nivel])
+
+    def actualizar(self, geocercas):
+        """
+        Elige el periodo después de procesar una lectura.
+
+        Args:
+            geocercas (MotorGeocercas): Motor ya actualizado con la lectura.
+
+        Returns:
+            float: Segundos hasta la siguiente lectura.
+        """
+        self.velocidad = geocercas.filtro.velocidad()
+        self.borde = geocercas.distancia_borde(self.radio_vista)
+        nivel = self._nivel_para(self.periodo_deseado(self.borde, self.velocidad))
+        if nivel < self.nivel:
+            self._cambiar(nivel)
+        elif nivel > self.nivel:
+            self._seguidas += 1
+            if self._seguidas >= self.muestras_para_bajar:
+                self._cambiar(self.nivel + 1)
+        else:
+            self._seguidas = 0
+        self.muestras[self.nivel] += 1
+        return self.periodo
+
+    def sin_fix(self):
+        """
+        Sin posición no se sabe qué tan cerca está la próxima geocerca: se
+        vuelve al periodo más corto.
+
+        Returns:
+            float: Segundos hasta la siguiente lectura.
+        """
+        if self.nivel:
+            self._cambiar(0)
+        self.muestras[0] += 1
+        return self.periodo
+
+    def estadisticas(self):
+        """
+        Returns:
+            dict: Lecturas totales, lecturas por periodo (ms) y comandos
+                enviados al GPS.
+        """
+        return {
+            "lecturas": sum(self.muestras),
+            "por_periodo": {ms: self.muestras[i] for i, ms in enumerate(self.niveles)},
+            "cambios": self.cambios,
+        }
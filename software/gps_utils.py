@@ -3,9 +3,19 @@
 # Diseñado para interactuar con un sensor GPS real (ej. Neo-6M).
 
 import time
-import math
-import busio
-import board
+from array import array
+# La geometría vive en geo_utils.py; se reexporta para el código que la
+# importaba desde este módulo.
+from geo_utils import haversine_distance, initial_bearing
+from profiling import perfil
+# 'busio' y 'board' solo existen en el microcontrolador; en el host se omiten
+# para poder reutilizar la lógica de distancia en pruebas y herramientas.
+try:
+    import busio
+    import board
+except ImportError:
+    busio = None
+    board = None
 # Importa la biblioteca Adafruit GPS para manejar el sensor.
 # Si no la tienes instalada, debes agregarla a tu carpeta 'lib'.
 try:
@@ -17,16 +27,320 @@ except ImportError:
 # --- CONFIGURACIÓN DE HARDWARE GPS (COMENTADA) ---
 # Esta sección muestra cómo inicializarías el GPS en un proyecto real.
 # Debes conectar el GPS a los pines UART (RX y TX) del ESP32.
+# Las sentencias se leen con ParserNMEA (más abajo) en lugar de
+# 'adafruit_gps.GPS.update()', que crea cadenas nuevas por cada sentencia.
 
 # try:
-#     uart = busio.UART(board.TX, board.RX, baudrate=9600, timeout=3000)
+#     uart = busio.UART(board.TX, board.RX, baudrate=9600, timeout=0)
 #     gps_sensor = adafruit_gps.GPS(uart, debug=False)
-#     # Envía comandos al GPS para configurar las sentencias NMEA y la tasa de actualización.
-#     gps_sensor.send_command(b"PMTK314,0,1,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0")
+#     # Envía comandos al GPS para configurar las sentencias NMEA (solo RMC y GGA) y la tasa de actualización.
+#     gps_sensor.send_command(b"PMTK314,0,1,0,1,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0")
 #     gps_sensor.send_command(b"PMTK220,1000") # Actualización cada 1 segundo
+#     parser_nmea = ParserNMEA()
 # except Exception as e:
 #     print(f"Error al inicializar el sensor GPS: {e}")
-#     gps_sensor = None
+#     uart = None
+
+
+# --- PARSER NMEA INCREMENTAL ---
+# Índices de los valores decodificados dentro de 'ParserNMEA.valores'.
+LAT = 0
+LON = 1
+ALTITUD = 2       # Metros sobre el nivel del mar (GGA).
+HDOP = 3          # Dilución horizontal de la precisión (GGA).
+VELOCIDAD = 4     # Nudos (RMC).
+RUMBO = 5         # Grados respecto al norte (RMC).
+HORA = 6          # Hora UTC como número hhmmss.ss.
+NUM_VALORES = 7
+
+NMEA_MAX_LONGITUD = 96  # Las sentencias NMEA miden como máximo 82 caracteres.
+NMEA_MAX_CAMPOS = 20
+
+_DOLAR = 36       # '$'
+_ASTERISCO = 42   # '*'
+_COMA = 44        # ','
+_PUNTO = 46       # '.'
+_CERO = 48        # '0'
+_CR = 13
+_LF = 10
+
+
+def _valor_hex(c):
+    """Valor de un dígito hexadecimal en ASCII, o -1 si no es válido."""
+    if 48 <= c <= 57:
+        return c - 48
+    if 65 <= c <= 70:
+        return c - 55
+    if 97 <= c <= 102:
+        return c - 87
+    return -1
+
+
+class Ubicacion:
+    """
+    Lectura de posición con 'lat' y 'lon' en grados, sin diccionario.
+
+    Cada fuente de ubicación guarda una sola instancia y la actualiza en
+    cada lectura, así muestrear el GPS no crea objetos nuevos en el heap.
+    Se lee con atributos o como el diccionario que retornaban las fuentes
+    ('ubicacion["lat"]'). Para conservar una lectura hay que copiar los
+    valores: la siguiente lectura los reemplaza.
+    """
+
+    __slots__ = ("lat", "lon")
+
+    def __init__(self, lat=0.0, lon=0.0):
+        self.lat = lat
+        self.lon = lon
+
+    def __getitem__(self, clave):
+        if clave == "lat":
+            return self.lat
+        if clave == "lon":
+            return self.lon
+        raise KeyError(clave)
+
+    def actualizar(self, lat, lon):
+        """Reemplaza las coordenadas y retorna la misma instancia."""
+        self.lat = lat
+        self.lon = lon
+        return self
+
+
+class ParserNMEA:
+    """
+    Parser incremental de sentencias NMEA que no crea cadenas ni listas.
+
+    Los bytes del UART se copian a un 'bytearray' reutilizable; el checksum
+    se valida en el mismo buffer y solo se decodifican las sentencias GGA y
+    RMC, directamente a posiciones preasignadas de 'valores' (array 'd').
+    Los números se arman dígito por dígito, sin cadenas intermedias ni
+    'split', así que solo se crean los flotantes del resultado.
+    """
+
+    def __init__(self, tamano_lectura=64):
+        """
+        Args:
+            tamano_lectura (int): Bytes que se leen del UART en cada llamada.
+        """
+        self._buffer = bytearray(NMEA_MAX_LONGITUD)
+        self._largo = 0
+        self._en_sentencia = False
+        self._comas = array("H", [0] * NMEA_MAX_CAMPOS)
+        self._lectura = bytearray(tamano_lectura)
+        self.valores = array("d", [0.0] * NUM_VALORES)
+        self.calidad_fix = 0   # 0 = sin fix (GGA).
+        self.satelites = 0     # Satélites en uso (GGA).
+        self.rmc_valido = False
+        self._fix = False      # Resultado de la última sentencia GGA o RMC.
+        self.sentencias = 0    # Sentencias con checksum válido.
+        self.errores = 0       # Sentencias descartadas por checksum o longitud.
+        self.fixes = 0         # Sentencias GGA/RMC con posición válida.
+        self._ubicacion = Ubicacion()
+
+    @property
+    def has_fix(self):
+        """
+        True si la última sentencia GGA o RMC trajo una posición válida.
+
+        Manda la más reciente: una GGA con calidad 0 después de una RMC con
+        estado 'A' indica que el fix se perdió (y al revés).
+        """
+        return self._fix
+
+    @property
+    def latitude(self):
+        return self.valores[LAT]
+
+    @property
+    def longitude(self):
+        return self.valores[LON]
+
+    def leer_uart(self, uart):
+        """
+        Lee los bytes disponibles del UART y los procesa.
+
+        Returns:
+            int: Cantidad de fixes nuevos decodificados.
+        """
+        with perfil.medir("gps_uart"):
+            leidos = uart.readinto(self._lectura)
+            if not leidos:
+                return 0
+            return self.alimentar(self._lectura, leidos)
+
+    def alimentar(self, datos, cantidad=None):
+        """
+        Procesa un bloque de bytes (pueden ser sentencias incompletas).
+
+        Args:
+            datos (bytes | bytearray): Bytes recibidos del GPS.
+            cantidad (int): Bytes válidos de 'datos'; por defecto todos.
+
+        Returns:
+            int: Cantidad de fixes nuevos decodificados.
+        """
+        if cantidad is None:
+            cantidad = len(datos)
+        buffer = self._buffer
+        largo = self._largo
+        en_sentencia = self._en_sentencia
+        fixes = 0
+        for i in range(cantidad):
+            c = datos[i]
+            if c == _DOLAR:
+                en_sentencia = True
+                largo = 0
+            elif not en_sentencia:
+                continue
+            elif c == _LF or c == _CR:
+                en_sentencia = False
+                self._largo = largo
+                if self._procesar():
+                    fixes += 1
+                continue
+            if largo >= NMEA_MAX_LONGITUD:
+                # Sentencia demasiado larga: se descarta hasta el próximo '$'.
+                en_sentencia = False
+                self.errores += 1
+                continue
+            buffer[largo] = c
+            largo += 1
+        self._largo = largo
+        self._en_sentencia = en_sentencia
+        return fixes
+
+    def _procesar(self):
+        """Valida y decodifica la sentencia del buffer. Retorna True si hubo fix."""
+        buffer = self._buffer
+        largo = self._largo
+        # Formato: $TTSSS,campo,...,campo*HH
+        if largo < 10 or buffer[largo - 3] != _ASTERISCO:
+            self.errores += 1
+            return False
+        suma = 0
+        for i in range(1, largo - 3):
+            suma ^= buffer[i]
+        alto = _valor_hex(buffer[largo - 2])
+        bajo = _valor_hex(buffer[largo - 1])
+        if alto < 0 or bajo < 0 or suma != alto * 16 + bajo:
+            self.errores += 1
+            return False
+        self.sentencias += 1
+
+        # Posiciones de las comas; el último "separador" es el asterisco.
+        comas = self._comas
+        campos = 0
+        for i in range(6, largo - 2):
+            c = buffer[i]
+            if (c == _COMA or c == _ASTERISCO) and campos < NMEA_MAX_CAMPOS:
+                comas[campos] = i
+                campos += 1
+
+        if buffer[3] == 71 and buffer[4] == 71 and buffer[5] == 65:    # GGA
+            return self._procesar_gga(campos)
+        if buffer[3] == 82 and buffer[4] == 77 and buffer[5] == 67:    # RMC
+            return self._procesar_rmc(campos)
+        return False
+
+    def _campo(self, n):
+        """Retorna (inicio, fin) del campo n (el campo 0 es el tipo de sentencia)."""
+        return self._comas[n - 1] + 1, self._comas[n]
+
+    def _entero(self, n):
+        inicio, fin = self._campo(n)
+        valor = 0
+        for i in range(inicio, fin):
+            valor = valor * 10 + self._buffer[i] - _CERO
+        return valor
+
+    def _decimal(self, n):
+        """Decodifica un campo numérico con signo opcional y parte decimal."""
+        inicio, fin = self._campo(n)
+        buffer = self._buffer
+        negativo = inicio < fin and buffer[inicio] == 45  # '-'
+        if negativo:
+            inicio += 1
+        entero = 0
+        escala = 0
+        for i in range(inicio, fin):
+            c = buffer[i]
+            if c == _PUNTO:
+                escala = 1
+            else:
+                entero = entero * 10 + c - _CERO
+                if escala:
+                    escala *= 10
+        valor = entero / escala if escala else float(entero)
+        return -valor if negativo else valor
+
+    def _coordenada(self, n, hemisferio):
+        """Convierte un campo 'gggmm.mmmm' y su hemisferio a grados decimales."""
+        inicio, fin = self._campo(n)
+        if inicio == fin:
+            return None
+        valor = self._decimal(n)
+        grados = int(valor // 100)
+        grados += (valor - grados * 100) / 60.0
+        inicio, fin = self._campo(hemisferio)
+        if inicio < fin and self._buffer[inicio] in (83, 87):  # 'S' u 'O' ('W')
+            grados = -grados
+        return grados
+
+    def _guardar_posicion(self, campo_lat, campo_lon):
+        lat = self._coordenada(campo_lat, campo_lat + 1)
+        lon = self._coordenada(campo_lon, campo_lon + 1)
+        if lat is None or lon is None:
+            return False
+        self.valores[LAT] = lat
+        self.valores[LON] = lon
+        return True
+
+    def _procesar_gga(self, campos):
+        # 1 hora, 2-3 latitud, 4-5 longitud, 6 calidad, 7 satélites, 8 HDOP, 9 altitud.
+        if campos < 10:
+            return False
+        self._fix = False
+        self.calidad_fix = self._entero(6)
+        if self.calidad_fix == 0:
+            return False
+        if not self._guardar_posicion(2, 4):
+            return False
+        self.valores[HORA] = self._decimal(1)
+        self.satelites = self._entero(7)
+        self.valores[HDOP] = self._decimal(8)
+        self.valores[ALTITUD] = self._decimal(9)
+        self._fix = True
+        self.fixes += 1
+        return True
+
+    def _procesar_rmc(self, campos):
+        # 1 hora, 2 estado (A/V), 3-4 latitud, 5-6 longitud, 7 velocidad, 8 rumbo.
+        if campos < 9:
+            return False
+        self._fix = False
+        inicio, fin = self._campo(2)
+        self.rmc_valido = inicio < fin and self._buffer[inicio] == 65  # 'A'
+        if not self.rmc_valido:
+            return False
+        if not self._guardar_posicion(3, 5):
+            return False
+        self.valores[HORA] = self._decimal(1)
+        self.valores[VELOCIDAD] = self._decimal(7)
+        self.valores[RUMBO] = self._decimal(8)
+        self._fix = True
+        self.fixes += 1
+        return True
+
+    def ubicacion(self):
+        """
+        Returns:
+            Ubicacion: La última posición (siempre la misma instancia), o
+                None si no hay fix.
+        """
+        if not self.has_fix:
+            return None
+        return self._ubicacion.actualizar(self.valores[LAT], self.valores[LON])
 
 
 def get_current_location():
@@ -36,37 +350,73 @@ def get_current_location():
     Si el sensor no tiene una conexión satelital (fix), retorna None.
     
     Returns:
-        dict: Un diccionario con las coordenadas 'lat' y 'lon', o None si no hay datos.
+        Ubicacion: Las coordenadas 'lat' y 'lon', o None si no hay datos.
     """
     # En un proyecto real, se usaría esta lógica:
-    # if gps_sensor is None:
+    # if uart is None:
     #     return None
-    # gps_sensor.update()
-    # if not gps_sensor.has_fix:
-    #     return None
-    # return {"lat": gps_sensor.latitude, "lon": gps_sensor.longitude}
+    # parser_nmea.leer_uart(uart)
+    # return parser_nmea.ubicacion()
     
     # Para la simulación, retornamos None. El código principal manejará la simulación.
     return None
 
 
-def haversine_distance(lat1, lon1, lat2, lon2):
+def comando_frecuencia(periodo_ms):
     """
-    Calcula la distancia Haversine entre dos puntos en la Tierra.
-    
+    Comando PMTK220 que fija cada cuánto calcula y envía el GPS una posición.
+
     Args:
-        lat1 (float): Latitud del primer punto en grados.
-        lon1 (float): Longitud del primer punto en grados.
-        lat2 (float): Latitud del segundo punto en grados.
-        lon2 (float): Longitud del segundo punto en grados.
-        
+        periodo_ms (int): Milisegundos entre posiciones (100 a 10000).
+
     Returns:
-        float: Distancia en metros.
+        bytes: El comando sin '$' ni checksum, como lo recibe 'send_command'.
+    """
+    if not 100 <= periodo_ms <= 10000:
+        raise ValueError("El periodo del GPS debe estar entre 100 y 10000 ms")
+    return b"PMTK220,%d" % periodo_ms
+
+
+def configurar_frecuencia(comando):
     """
-    R = 6371000  # Radio de la Tierra en metros
-    phi1, phi2 = math.radians(lat1), math.radians(lat2)
-    delta_phi = math.radians(lat2 - lat1)
-    delta_lambda = math.radians(lon2 - lon1)
-    a = math.sin(delta_phi / 2.0)**2 + math.cos(phi1) * math.cos(phi2) * math.sin(delta_lambda / 2.0)**2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    return R * c
+    Envía al sensor un comando de frecuencia (ver 'comando_frecuencia').
+
+    Con el GPS a la misma frecuencia que el muestreo, el UART solo transporta
+    las sentencias que se leen y su buffer no se llena entre lecturas.
+    """
+    # En un proyecto real, se usaría esta lógica:
+    # if uart is not None:
+    #     gps_sensor.send_command(comando)
+    pass
+
+
+class RecorridoSimulado:
+    """
+    Fuente de ubicación simulada que recorre una lista de puntos.
+
+    Tiene la misma interfaz que el GPS real ('get_current_location'), así el
+    resto del sistema no distingue entre la simulación y el sensor.
+    """
+
+    def __init__(self, puntos, segundos_por_punto=15.0, reloj=time.monotonic):
+        """
+        Args:
+            puntos (list): Diccionarios con 'lat' y 'lon', en orden de visita.
+            segundos_por_punto (float): Tiempo que se permanece en cada punto.
+            reloj (callable): Fuente de tiempo en segundos.
+        """
+        self.puntos = puntos
+        self.segundos_por_punto = segundos_por_punto
+        self._reloj = reloj
+        self._inicio = reloj()
+        self._ubicacion = Ubicacion()
+
+    def posicion(self):
+        """Índice del punto actual; al terminar, el recorrido vuelve a empezar."""
+        transcurrido = self._reloj() - self._inicio
+        return int(transcurrido // self.segundos_por_punto) % len(self.puntos)
+
+    def get_current_location(self):
+        """Retorna la ubicación simulada actual (Ubicacion reutilizada)."""
+        punto = self.puntos[self.posicion()]
+        return self._ubicacion.actualizar(punto["lat"], punto["lon"])
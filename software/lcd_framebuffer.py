@@ -0,0 +1,248 @@
+# lcd_framebuffer.py
+# Módulo con un framebuffer para la pantalla LCD de caracteres.
+# Guarda una copia (sombra) de lo que muestra la LCD y, en cada cuadro,
+# solo envía por el bus de 4 bits los movimientos de cursor y caracteres de
+# las celdas que cambiaron. Se evita 'lcd.clear()', que es lento y hace que
+# la pantalla parpadee. Los mensajes se copian al buffer carácter por
+# carácter, sin dividirlos en líneas ni crear subcadenas.
+# La LCD solo tiene ASCII: las vocales con tilde, la 'ü' y la 'ñ' se
+# muestran con su letra base y se quitan '¿' y '¡'.
+
+from profiling import perfil
+
+# --- CONFIGURACIÓN ---
+LCD_COLUMNAS = 16
+LCD_FILAS = 2
+_ESPACIO = 32
+_DESCONOCIDO = 0  # Valor de la sombra cuando no se sabe qué muestra la LCD.
+_FUERA_DE_RANGO = 63  # '?' para los caracteres que la LCD no tiene.
+_OMITIR = -1  # Caracteres que no se muestran.
+
+_TRANSLITERACION = {
+    "á": "a", "é": "e", "í": "i", "ó": "o", "ú": "u", "ü": "u", "ñ": "n",
+    "Á": "A", "É": "E", "Í": "I", "Ó": "O", "Ú": "U", "Ü": "U", "Ñ": "N",
+    "¿": "", "¡": "",
+}
+_CODIGOS = {ord(c): (ord(base) if base else _OMITIR) for c, base in _TRANSLITERACION.items()}
+
+
+def transliterar(texto):
+    """Reemplaza los caracteres del español que la LCD no tiene (ver '_TRANSLITERACION')."""
+    for c in texto:
+        if ord(c) > 126:
+            return "".join(_TRANSLITERACION.get(c, c) for c in texto)
+    return texto
+
+
+def _codigo(c):
+    """Código de la LCD de un carácter: ASCII, su letra base, '?' o _OMITIR."""
+    codigo = ord(c)
+    if 32 <= codigo < 127:
+        return codigo
+    return _CODIGOS.get(codigo, _FUERA_DE_RANGO)
+
+
+def codigos_lcd(texto):
+    """Convierte un texto a los códigos de la LCD (ver '_codigo'; '?' para lo que no tiene)."""
+    codigos = bytearray()
+    for c in texto:
+        codigo = _codigo(c)
+        if codigo != _OMITIR:
+            codigos.append(codigo)
+    return codigos
+
+
+class FramebufferLCD:
+    """
+    Framebuffer con actualización por diferencias sobre 'Character_LCD_Mono'.
+
+    Se escribe en un buffer de trabajo y 'actualizar()' envía a la LCD solo
+    las celdas distintas a la sombra. Cuenta las escrituras al bus (comandos
+    de cursor más caracteres) de cada cuadro.
+    """
+
+    def __init__(self, lcd, columnas=LCD_COLUMNAS, filas=LCD_FILAS):
+        """
+        Args:
+            lcd (Character_LCD_Mono): Pantalla con 'column', 'row' y 'message'.
+            columnas (int): Columnas de la pantalla.
+            filas (int): Filas de la pantalla.
+        """
+        self.lcd = lcd
+        self.columnas = columnas
+        self.filas = filas
+        self._buffer = bytearray(b" " * (columnas * filas))
+        # La sombra empieza desconocida: el primer cuadro redibuja todo.
+        self._sombra = bytearray(columnas * filas)
+        self.escrituras_ultimo_cuadro = 0
+        self.escrituras_totales = 0
+        self.cuadros = 0
+
+    def limpiar(self):
+        """Llena el buffer de trabajo con espacios (no toca la LCD)."""
+        buffer = self._buffer
+        for i in range(len(buffer)):
+            buffer[i] = _ESPACIO
+
+    def escribir(self, texto, fila=0, columna=0):
+        """
+        Escribe texto en el buffer de trabajo; lo que no cabe se recorta.
+
+        Args:
+            texto (str): Texto a escribir (ver 'codigos_lcd' para los caracteres no ASCII).
+            fila (int): Fila inicial.
+            columna (int): Columna inicial.
+
+        Returns:
+            int: Columna siguiente al último carácter escrito.
+        """
+        if fila >= self.filas:
+            return columna
+        base = fila * self.columnas
+        for c in texto:
+            if columna >= self.columnas:
+                break
+            codigo = _codigo(c)
+            if codigo == _OMITIR:
+                continue
+            self._buffer[base + columna] = codigo
+            columna += 1
+        return columna
+
+    def escribir_linea(self, texto, fila):
+        """Reemplaza una fila completa, rellenando con espacios."""
+        if fila >= self.filas:
+            return
+        base = fila * self.columnas
+        for i in range(self.escribir(texto, fila), self.columnas):
+            self._buffer[base + i] = _ESPACIO
+
+    def mostrar(self, mensaje):
+        """
+        Reemplaza toda la pantalla con un mensaje ('\\n' separa las filas) y la actualiza.
+
+        Returns:
+            int: Escrituras al bus de este cuadro.
+        """
+        self.limpiar()
+        buffer, columnas = self._buffer, self.columnas
+        fila = columna = 0
+        for c in mensaje:
+            if c == "\n":
+                fila += 1
+                columna = 0
+                if fila >= self.filas:
+                    break
+            elif columna < columnas:
+                codigo = _codigo(c)
+                if codigo != _OMITIR:
+                    buffer[fila * columnas + columna] = codigo
+                    columna += 1
+        return self.actualizar()
+
+    def escribir_ventana(self, codigos, inicio, fila):
+        """
+        Llena una fila con 'codigos' desde la posición 'inicio', volviendo
+        al principio al llegar al final (ventana de una marquesina).
+
+        Args:
+            codigos (bytearray): Códigos de la LCD (ver 'codigos_lcd').
+            inicio (int): Posición del primer código visible.
+            fila (int): Fila a reemplazar.
+        """
+        if fila >= self.filas or not codigos:
+            return
+        buffer, n = self._buffer, len(codigos)
+        base = fila * self.columnas
+        for columna in range(self.columnas):
+            buffer[base + columna] = codigos[(inicio + columna) % n]
+
+    def invalidar(self):
+        """Marca la sombra como desconocida (por ejemplo, si otro código escribió en la LCD)."""
+        sombra = self._sombra
+        for i in range(len(sombra)):
+            sombra[i] = _DESCONOCIDO
+
+    def actualizar(self):
+        """
+        Envía a la LCD solo las celdas que cambiaron desde el último cuadro.
+
+        Dos tramos con cambios separados por una sola celda igual se envían
+        juntos: reescribir esa celda cuesta lo mismo que mover el cursor.
+
+        Returns:
+            int: Escrituras al bus de este cuadro.
+        """
+        with perfil.medir("lcd"):
+            return self._enviar_cambios()
+
+    def _enviar_cambios(self):
+        buffer, sombra, columnas = self._buffer, self._sombra, self.columnas
+        escrituras = 0
+        for fila in range(self.filas):
+            base = fila * columnas
+            columna = 0
+            while columna < columnas:
+                if buffer[base + columna] == sombra[base + columna]:
+                    columna += 1
+                    continue
+                inicio = columna
+                fin = columna + 1  # Fin (exclusivo) del tramo con cambios.
+                columna += 1
+                while columna < columnas:
+                    if buffer[base + columna] != sombra[base + columna]:
+                        fin = columna + 1
+                    elif columna - fin >= 1:
+                        break
+                    columna += 1
+                # 'message' ya mueve el cursor a (column, row): llamar antes a
+                # 'cursor_position' enviaría dos comandos por tramo.
+                lcd = self.lcd
+                lcd.column = inicio
+                lcd.row = fila
+                lcd.message = str(buffer[base + inicio:base + fin], "ascii")
+                for i in range(base + inicio, base + fin):
+                    sombra[i] = buffer[i]
+                escrituras += 1 + fin - inicio
+        self.escrituras_ultimo_cuadro = escrituras
+        self.escrituras_totales += escrituras
+        self.cuadros += 1
+        return escrituras
+
+
+class Marquesina:
+    """Desplazamiento horizontal suave de un texto más largo que una fila."""
+
+    def __init__(self, texto, columnas=LCD_COLUMNAS, separador="   "):
+        texto = transliterar(texto)
+        self.texto = texto + separador if len(texto) > columnas else texto
+        self.columnas = columnas
+        self.posicion = 0
+        self._codigos = codigos_lcd(self.texto)  # Se convierte una sola vez.
+
+    def necesaria(self):
+        """True si el texto no cabe en una fila y hay que desplazarlo."""
+        return len(self.texto) > self.columnas
+
+    def cuadro(self):
+        """Retorna la ventana visible actual y avanza una posición."""
+        if not self.necesaria():
+            return self.texto
+        texto, n = self.texto, len(self.texto)
+        inicio = self.posicion
+        self.posicion = (self.posicion + 1) % n
+        ventana = texto[inicio:inicio + self.columnas]
+        if len(ventana) < self.columnas:
+            ventana += texto[:self.columnas - len(ventana)]
+        return ventana
+
+    def dibujar(self, pantalla, fila):
+        """
+        Escribe la ventana visible en una fila del framebuffer y avanza una
+        posición, sin crear cadenas (a diferencia de 'cuadro').
+        """
+        if not self.necesaria():
+            pantalla.escribir_linea(self.texto, fila)
+            return
+        pantalla.escribir_ventana(self._codigos, self.posicion, fila)
+        self.posicion = (self.posicion + 1) % len(self._codigos)
@@ -0,0 +1,597 @@
+# llm_backends.py
+# Módulo con los proveedores de respuestas del LLM, intercambiables entre sí.
+# Todos tienen la misma interfaz ('preguntar'), así code.py no depende de un
+# modelo ni de un endpoint fijo:
+#   - BackendGemini: la API de Gemini, con o sin streaming.
+#   - BackendSimulado: respuestas locales con latencia configurable, para
+#     probar sin la API.
+#   - BackendCache: solo la caché y el paquete de contenido, sin red.
+#   - ConsultaCubierta: combina dos backends. Si el primario no dio su primer
+#     texto dentro de su percentil 90 de latencia, la misma pregunta va al
+#     secundario (otro modelo u otro endpoint) y gana la primera respuesta.
+#
+# Cada backend lleva un histograma de su latencia hasta el primer texto; la
+# consulta cubierta lo usa para ajustar sola la espera antes de cubrir.
+#
+# La precarga pide varios POIs con 'preguntar_lote'. Solo BackendGemini sabe
+# pedirlos en una llamada (llm_batch.py); los demás responden uno por uno con
+# 'preguntar', así el backend sin red tampoco usa la red al precargar.
+
+import time
+import random
+import asyncio
+from array import array
+from llm_batch import ClienteLotes, TAMANO_LOTE
+from llm_codec import ENCABEZADOS_JSON, ExtractorTexto, leer_texto, plantilla
+from llm_stream import MAX_TOKENS, endpoint_stream, preguntar_gemini_stream
+from resilience import PoliticaLLM
+from profiling import perfil
+
+# --- CONFIGURACIÓN ---
+URL_API = "https://generativelanguage.googleapis.com/v1beta/models/"
+MODELO_GEMINI = "gemini-1.5-flash"
+
+# Cubetas del histograma: límites superiores en ms, con razón 1.25 desde
+# 20 ms hasta unos 20 s (el error relativo de un percentil es < 25%).
+LIMITES_MS = tuple(int(20 * 1.25 ** i) for i in range(32))
+MAX_MUESTRAS = 200              # Al llegar, los conteos se reducen a la mitad.
+
+PERCENTIL_COBERTURA = 0.9
+ESPERA_COBERTURA_INICIAL = 2.0  # Segundos, mientras el primario tiene pocas muestras.
+ESPERA_COBERTURA_MINIMA = 0.3
+ESPERA_COBERTURA_MAXIMA = 8.0
+MUESTRAS_MINIMAS = 10
+
+
+def endpoint_gemini(api_key=None, modelo=MODELO_GEMINI, url_base=URL_API):
+    """
+    Arma la URL de 'generateContent' de un modelo.
+
+    Args:
+        api_key (str): Clave de la API (None: sin clave, por ejemplo para un gateway).
+        modelo (str): Nombre del modelo.
+        url_base (str): Raíz de la API, terminada en '/models/'.
+
+    Returns:
+        str: La URL; con streaming se convierte con 'llm_stream.endpoint_stream'.
+    """
+    url = f"{url_base}{modelo}:generateContent"
+    if api_key:
+        url += f"?key={api_key}"
+    return url
+
+
+def modelo_de(endpoint):
+    """Nombre del modelo de una URL de la API ('' si no lo tiene)."""
+    ruta = endpoint.partition("?")[0]
+    return ruta.rpartition("/")[2].partition(":")[0]
+
+
+class HistogramaLatencia:
+    """
+    Histograma de latencias con cubetas de ancho logarítmico.
+
+    Ocupa un arreglo fijo de enteros, así registrar no asigna memoria. Al
+    llegar a 'max_muestras' los conteos se reducen a la mitad: las muestras
+    recientes pesan más y el percentil sigue los cambios de la red.
+    """
+
+    def __init__(self, limites=LIMITES_MS, max_muestras=MAX_MUESTRAS):
+        """
+        Args:
+            limites (tuple): Límite superior de cada cubeta, en ms, creciente.
+            max_muestras (int): Muestras a partir de las cuales se envejece.
+        """
+        self.limites = limites
+        self.max_muestras = max_muestras
+        self.conteos = array("L", [0] * (len(limites) + 1))
+        self.cantidad = 0   # Muestras vigentes (después de envejecer).
+        self.total = 0      # Muestras registradas desde el inicio.
+        self.maxima_ms = 0
+
+    def registrar(self, segundos):
+        ms = int(segundos * 1000)
+        limites = self.limites
+        i = 0
+        while i < len(limites) and ms > limites[i]:
+            i += 1
+        self.conteos[i] += 1
+        self.cantidad += 1
+        self.total += 1
+        if ms > self.maxima_ms:
+            self.maxima_ms = ms
+        if self.cantidad >= self.max_muestras:
+            self._envejecer()
+
+    def _envejecer(self):
+        cantidad = 0
+        for i in range(len(self.conteos)):
+            self.conteos[i] //= 2
+            cantidad += self.conteos[i]
+        self.cantidad = cantidad
+
+    def percentil(self, fraccion):
+        """
+        Args:
+            fraccion (float): Por ejemplo, 0.9 para el percentil 90.
+
+        Returns:
+            float: Límite superior de la cubeta del percentil, en segundos, o
+                None si no hay muestras.
+        """
+        if not self.cantidad:
+            return None
+        objetivo = max(1, int(fraccion * self.cantidad + 0.999999))
+        acumulado = 0
+        for i, conteo in enumerate(self.conteos):
+            acumulado += conteo
+            if acumulado >= objetivo:
+                if i < len(self.limites):
+                    return self.limites[i] / 1000
+                break
+        return self.maxima_ms / 1000
+
+    def resumen(self):
+        """Returns: dict: 'cantidad', 'p50_ms', 'p90_ms', 'p99_ms' y 'max_ms'."""
+        datos = {"cantidad": self.total, "max_ms": self.maxima_ms}
+        for nombre, fraccion in (("p50_ms", 0.5), ("p90_ms", 0.9), ("p99_ms", 0.99)):
+            segundos = self.percentil(fraccion)
+            datos[nombre] = None if segundos is None else int(segundos * 1000)
+        return datos
+
+
+class BackendLLM:
+    """
+    Base de los backends: caché, métricas y entrega del texto.
+
+    Las subclases implementan '_preguntar', que retorna el texto o None y
+    llama a 'recibir' con cada fragmento si hay streaming. Si no lo llama,
+    'preguntar' entrega la respuesta completa como un único fragmento.
+    """
+
+    nombre = "llm"
+
+    def __init__(self, cache=None, nombre=None, reloj=time.monotonic):
+        """
+        Args:
+            cache (CacheRespuestas): Caché de respuestas opcional. Un acierto
+                no llama al backend ni cuenta en el histograma.
+            nombre (str): Nombre para las estadísticas.
+            reloj (callable): Fuente de tiempo en segundos.
+        """
+        if nombre is not None:
+            self.nombre = nombre
+        self.cache = cache
+        self.reloj = reloj
+        self.histograma = HistogramaLatencia()
+        self.consultas = 0
+        self.fallidas = 0
+        self.canceladas = 0
+
+    def disponible(self):
+        """True si una consulta podría salir ya, sin esperas (ver ConsultaCubierta)."""
+        return True
+
+    async def preguntar(self, pregunta, al_recibir=None, poi_id=None):
+        """
+        Consulta una pregunta.
+
+        Registra en el histograma el tiempo hasta el primer texto de las
+        consultas exitosas.
+
+        Args:
+            pregunta (str): El texto a enviar.
+            al_recibir (callable): Recibe cada fragmento de texto en cuanto llega.
+            poi_id (str): Id del POI, usado como clave de la caché.
+
+        Returns:
+            str: La respuesta completa, o None si falló.
+        """
+        if self.cache is not None:
+            guardada = self.cache.obtener(poi_id, pregunta)
+            if guardada is not None:
+                perfil.contar("cache_aciertos")
+                if al_recibir is not None:
+                    al_recibir(guardada)
+                return guardada
+
+        self.consultas += 1
+        inicio = self.reloj()
+        primero = [None]
+
+        def recibir(fragmento):
+            if primero[0] is None:
+                primero[0] = self.reloj() - inicio
+            if al_recibir is not None:
+                al_recibir(fragmento)
+
+        try:
+            texto = await self._preguntar(pregunta, recibir, poi_id)
+        except asyncio.CancelledError:
+            self.canceladas += 1
+            raise
+        if not texto:
+            self.fallidas += 1
+            return None
+        if primero[0] is None:
+            recibir(texto)
+        self.histograma.registrar(primero[0])
+        if self.cache is not None:
+            self.cache.guardar(poi_id, pregunta, texto)
+        return texto
+
+    async def _preguntar(self, pregunta, recibir, poi_id):
+        raise NotImplementedError
+
+    async def preguntar_lote(self, lugares):
+        """
+        Obtiene las descripciones de varios POIs (para la precarga).
+
+        Los que no están en la caché se piden en lote si el backend puede
+        ('_pedir_lote'); los que el lote no trajo se consultan uno por uno.
+
+        Args:
+            lugares (list): Tuplas (poi_id, nombre, pregunta). La pregunta es
+                la que se haría por separado y sirve como clave de la caché.
+
+        Returns:
+            dict: id del POI -> descripción, para los POIs que se obtuvieron.
+        """
+        resultado = {}
+        pendientes = []
+        for poi_id, nombre, pregunta in lugares:
+            guardada = self.cache.obtener(poi_id, pregunta) if self.cache is not None else None
+            if guardada is not None:
+                resultado[poi_id] = guardada
+            else:
+                pendientes.append((poi_id, nombre, pregunta))
+        textos = await self._pedir_lote(pendientes) if len(pendientes) > 1 else {}
+        for poi_id, _, pregunta in pendientes:
+            texto = textos.get(poi_id)
+            if texto is not None:
+                if self.cache is not None:
+                    self.cache.guardar(poi_id, pregunta, texto)
+            else:
+                texto = await self.preguntar(pregunta, poi_id=poi_id)
+            if texto:
+                resultado[poi_id] = texto
+        return resultado
+
+    async def _pedir_lote(self, lugares):
+        """Pide varios POIs en una llamada; sin soporte de lotes retorna {}."""
+        return {}
+
+    def estadisticas(self):
+        """Returns: dict: Consultas, fallidas, canceladas y el resumen del histograma."""
+        datos = {"nombre": self.nombre, "consultas": self.consultas,
+                 "fallidas": self.fallidas, "canceladas": self.canceladas}
+        datos.update(self.histograma.resumen())
+        return datos
+
+
+class BackendGemini(BackendLLM):
+    """
+    La API de Gemini, con la política de reintentos de resilience.py.
+
+    Con streaming usa 'streamGenerateContent' (llm_stream.py); sin streaming,
+    'generateContent' y la respuesta completa.
+    """
+
+    def __init__(self, https_session, endpoint, politica=None, streaming=True,
+                 max_tokens=MAX_TOKENS, tamano_lote=TAMANO_LOTE, cache=None, nombre=None,
+                 reloj=time.monotonic):
+        """
+        Args:
+            https_session (requests.Session): Sesión de requests.
+            endpoint (str): URL de 'generateContent' (ver 'endpoint_gemini').
+            politica (PoliticaLLM): Reintentos, limitador y cortacircuitos del
+                endpoint. Otro modelo tiene su propia cuota y su propia política.
+            streaming (bool): Si se recibe la respuesta por partes.
+            max_tokens (int): Límite de tokens de la respuesta.
+            tamano_lote (int): POIs máximos por llamada de 'preguntar_lote'.
+            cache, nombre, reloj: Ver BackendLLM. Por defecto, el nombre es el modelo.
+        """
+        super().__init__(cache, nombre or modelo_de(endpoint) or "gemini", reloj)
+        self.https = https_session
+        self.endpoint = endpoint
+        self.endpoint_stream = endpoint_stream(endpoint)
+        self.politica = politica if politica is not None else PoliticaLLM()
+        self.streaming = streaming
+        self.max_tokens = max_tokens
+        self.plantilla = plantilla(max_tokens)
+        self.extractor = ExtractorTexto()
+        # Los lotes usan el mismo endpoint y la misma política; la caché y
+        # las consultas individuales las maneja 'preguntar_lote'.
+        self.lotes = ClienteLotes(https_session, endpoint, politica=self.politica,
+                                  tamano_lote=tamano_lote)
+
+    def disponible(self):
+        return self.politica.disponible()
+
+    async def _pedir_lote(self, lugares):
+        return await self.lotes.preguntar(lugares)
+
+    def estadisticas(self):
+        """Returns: dict: Las de BackendLLM y las de los lotes."""
+        datos = super().estadisticas()
+        datos["lotes"] = self.lotes.estadisticas()
+        return datos
+
+    async def _preguntar(self, pregunta, recibir, poi_id):
+        if self.streaming:
+            return await preguntar_gemini_stream(
+                self.https, self.endpoint_stream, pregunta, recibir, politica=self.politica,
+                max_tokens=self.max_tokens, reloj=self.reloj)
+        return await self._generar(pregunta)
+
+    async def _generar(self, pregunta):
+        """Consulta 'generateContent'; las esperas ceden el control a las demás tareas."""
+        politica = self.politica
+
+        for intento in range(politica.intentos):
+            if not politica.permitir():
+                print("Gemini no disponible (sin red o circuito abierto).")
+                return None
+            espera = politica.turno()
+            while espera:
+                await asyncio.sleep(espera)
+                espera = politica.turno()
+
+            codigo = None
+            encabezados = None
+            response = None
+            try:
+                perfil.contar("api_solicitudes")
+                with perfil.medir("https_post"):
+                    response = self.https.post(self.endpoint, headers=ENCABEZADOS_JSON,
+                                               data=self.plantilla.cuerpo(pregunta), stream=True,
+                                               timeout=15)
+                codigo = response.status_code
+                encabezados = response.headers
+                if codigo == 200:
+                    # Solo se extrae el texto, sin armar el JSON completo (llm_codec.py).
+                    with perfil.medir("json"):
+                        texto = leer_texto(response, self.extractor)
+                    if texto:
+                        politica.registrar(200)
+                        return texto
+                    print("La respuesta no trajo texto.")
+                    codigo = None
+                else:
+                    print(f"Error de API: {codigo}.")
+            except Exception as e:
+                print(f"Excepción en la llamada a la API: {e}.")
+                codigo = None
+            finally:
+                # La sesión reutiliza el socket: la respuesta de un error se
+                # cierra antes de reintentar.
+                if response is not None:
+                    response.close()
+
+            espera = politica.registrar(codigo, encabezados, intento)
+            if espera is None:
+                return None
+            print(f"Reintentando en {espera:.1f} s...")
+            await asyncio.sleep(espera)
+        return None
+
+
+def responder_simulado(pregunta):
+    return f"Respuesta simulada: {pregunta}"
+
+
+class BackendSimulado(BackendLLM):
+    """
+    Backend local que no usa la red: responde tras una latencia configurable.
+
+    Sirve para probar el dispositivo sin la API y para medir la consulta
+    cubierta con distribuciones de latencia conocidas.
+    """
+
+    nombre = "simulado"
+
+    def __init__(self, latencia=0.5, responder=responder_simulado, entre_fragmentos=None,
+                 probabilidad_falla=0.0, aleatorio=random.random, cache=None, nombre=None,
+                 reloj=time.monotonic):
+        """
+        Args:
+            latencia (float o callable): Segundos hasta el primer texto, o una
+                función sin argumentos que los retorna (una distribución).
+            responder (callable): Recibe la pregunta y retorna el texto.
+            entre_fragmentos (float): Si se indica, el texto se entrega palabra
+                por palabra con esta pausa, como el streaming.
+            probabilidad_falla (float): Fracción de consultas que fallan tras la latencia.
+            aleatorio (callable): Fuente de números en [0, 1).
+            cache, nombre, reloj: Ver BackendLLM.
+        """
+        super().__init__(cache, nombre, reloj)
+        self.latencia = latencia
+        self.responder = responder
+        self.entre_fragmentos = entre_fragmentos
+        self.probabilidad_falla = probabilidad_falla
+        self.aleatorio = aleatorio
+
+    async def _preguntar(self, pregunta, recibir, poi_id):
+        latencia = self.latencia() if callable(self.latencia) else self.latencia
+        await asyncio.sleep(latencia)
+        if self.probabilidad_falla and self.aleatorio() < self.probabilidad_falla:
+            return None
+        texto = self.responder(pregunta)
+        if self.entre_fragmentos is not None:
+            palabras = texto.split(" ")
+            for i, palabra in enumerate(palabras):
+                if i:
+                    await asyncio.sleep(self.entre_fragmentos)
+                recibir(palabra if i == len(palabras) - 1 else palabra + " ")
+        return texto
+
+
+class BackendCache(BackendLLM):
+    """
+    Backend sin red: responde solo con la caché y el paquete de contenido.
+
+    Una pregunta que no está en ninguno de los dos falla de inmediato.
+    """
+
+    nombre = "cache"
+
+    def __init__(self, cache=None, paquete=None, nombre=None, reloj=time.monotonic):
+        """
+        Args:
+            cache (CacheRespuestas): Caché de respuestas.
+            paquete (PaqueteContenido): Paquete de contenido sin conexión.
+            nombre, reloj: Ver BackendLLM.
+        """
+        super().__init__(cache, nombre, reloj)
+        self.paquete = paquete
+
+    async def _preguntar(self, pregunta, recibir, poi_id):
+        if self.paquete is None:
+            return None
+        return self.paquete.texto(poi_id)
+
+
+class ConsultaCubierta(BackendLLM):
+    """
+    Consulta cubierta (hedged request) sobre dos backends.
+
+    La pregunta va al primario. Si no entregó su primer texto dentro del
+    percentil 'percentil' de su histograma, la misma pregunta va también al
+    secundario y gana el primero que entregue texto: el otro se cancela y
+    sus fragmentos no llegan a 'al_recibir'. Si el primario falla antes de
+    cubrir, el secundario responde en su lugar; si el que ganó falla después
+    de su primer fragmento, se consulta al otro. Solo se cubre si el
+    secundario puede salir ya (sin esperar a su limitador).
+
+    Con una sesión bloqueante como 'adafruit_requests', la espera vence
+    mientras la consulta cede el control: esperando al limitador, entre
+    reintentos o entre fragmentos. Con sesiones asíncronas (el host, un
+    gateway) también cubre la espera de la red.
+    """
+
+    nombre = "cubierta"
+
+    def __init__(self, primario, secundario, percentil=PERCENTIL_COBERTURA,
+                 espera_inicial=ESPERA_COBERTURA_INICIAL, espera_minima=ESPERA_COBERTURA_MINIMA,
+                 espera_maxima=ESPERA_COBERTURA_MAXIMA, muestras_minimas=MUESTRAS_MINIMAS,
+                 cache=None, nombre=None, reloj=time.monotonic):
+        """
+        Args:
+            primario (BackendLLM): Backend que recibe todas las preguntas.
+            secundario (BackendLLM): Backend de cobertura (otro modelo o endpoint).
+            percentil (float): Percentil de la latencia del primario tras el cual se cubre.
+            espera_inicial (float): Espera mientras el primario tiene menos de
+                'muestras_minimas' muestras.
+            espera_minima, espera_maxima (float): Límites de la espera, en segundos.
+            muestras_minimas (int): Muestras necesarias para usar el percentil.
+            cache, nombre, reloj: Ver BackendLLM.
+        """
+        super().__init__(cache, nombre, reloj)
+        self.primario = primario
+        self.secundario = secundario
+        self.percentil = percentil
+        self.espera_inicial = espera_inicial
+        self.espera_minima = espera_minima
+        self.espera_maxima = espera_maxima
+        self.muestras_minimas = muestras_minimas
+        self.cubiertas = 0      # Consultas que se enviaron también al secundario.
+        self.ganadas = 0        # Cubiertas que respondió primero el secundario.
+        self.recuperadas = 0    # Fallas del primario que respondió el secundario.
+
+    def disponible(self):
+        return self.primario.disponible() or self.secundario.disponible()
+
+    async def _pedir_lote(self, lugares):
+        # El lote no se cubre (la precarga no tiene apuro): va al primario, o
+        # al secundario si el primario no puede salir ya. Los POIs que falten
+        # se consultan con 'preguntar', que sí se cubre.
+        backend = self.primario
+        if not backend.disponible() and self.secundario.disponible():
+            backend = self.secundario
+        return await backend._pedir_lote(lugares)
+
+    def espera_cobertura(self):
+        """Segundos que se espera al primario antes de cubrir."""
+        histograma = self.primario.histograma
+        if histograma.cantidad < self.muestras_minimas:
+            espera = self.espera_inicial
+        else:
+            espera = histograma.percentil(self.percentil)
+        return min(max(espera, self.espera_minima), self.espera_maxima)
+
+    async def _preguntar(self, pregunta, recibir, poi_id):
+        listo = asyncio.Event()
+        resultados = {}
+        dueno = []  # Backend que entregó el primer texto: solo sus fragmentos se muestran.
+
+        def receptor(backend):
+            def recibir_de(fragmento):
+                if not dueno:
+                    dueno.append(backend)
+                    listo.set()
+                if dueno[0] is backend:
+                    recibir(fragmento)
+            return recibir_de
+
+        async def correr(backend):
+            try:
+                resultados[backend] = await backend.preguntar(pregunta, receptor(backend), poi_id)
+            except Exception as e:
+                print(f"Excepción en el backend {backend.nombre}: {e}.")
+                resultados[backend] = None
+            listo.set()
+
+        primario, secundario = self.primario, self.secundario
+        tareas = {primario: asyncio.create_task(correr(primario))}
+        try:
+            try:
+                await asyncio.wait_for(listo.wait(), self.espera_cobertura())
+            except asyncio.TimeoutError:
+                if secundario.disponible():
+                    self.cubiertas += 1
+                    tareas[secundario] = asyncio.create_task(correr(secundario))
+            while True:
+                if dueno:
+                    ganador = dueno[0]
+                    for backend, tarea in tareas.items():
+                        if backend is not ganador and backend not in resultados:
+                            tarea.cancel()
+                    if ganador in resultados:
+                        otro = secundario if ganador is primario else primario
+                        if not resultados[ganador] and otro not in resultados and otro.disponible():
+                            # El dueño falló después de su primer fragmento y el
+                            # otro ya se había cancelado: se le pregunta de nuevo
+                            # y sus fragmentos siguen a los ya mostrados.
+                            dueno[0] = otro
+                            tareas[otro] = asyncio.create_task(correr(otro))
+                            listo.clear()
+                            await listo.wait()
+                            continue
+                        if ganador is secundario:
+                            if primario in resultados and not resultados[primario]:
+                                self.recuperadas += 1
+                            else:
+                                self.ganadas += 1
+                        return resultados[ganador]
+                elif len(resultados) == len(tareas):
+                    # Todos fallaron sin entregar texto.
+                    if secundario in tareas or not secundario.disponible():
+                        return None
+                    tareas[secundario] = asyncio.create_task(correr(secundario))
+                listo.clear()
+                await listo.wait()
+        finally:
+            for tarea in tareas.values():
+                if not tarea.done():
+                    tarea.cancel()
+
+    def estadisticas(self):
+        """Returns: dict: Las de BackendLLM, la espera actual y las de cada backend."""
+        datos = super().estadisticas()
+        datos["cubiertas"] = self.cubiertas
+        datos["ganadas_secundario"] = self.ganadas
+        datos["recuperadas"] = self.recuperadas
+        datos["espera_cobertura_ms"] = int(self.espera_cobertura() * 1000)
+        datos["primario"] = self.primario.estadisticas()
+        datos["secundario"] = self.secundario.estadisticas()
+        return datos
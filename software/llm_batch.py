@@ -0,0 +1,188 @@
+# llm_batch.py
+# Módulo para pedir a Gemini la descripción de varios POIs en una sola llamada.
+# La pregunta lista los lugares y pide como respuesta un arreglo JSON con un
+# objeto {"id", "texto"} por lugar, y la respuesta se separa por POI. La caché
+# y la consulta individual de los POIs que el lote no trajo las maneja el
+# backend (ver BackendLLM.preguntar_lote en llm_backends.py).
+
+import json
+import asyncio
+from llm_codec import ENCABEZADOS_JSON, ExtractorTexto, leer_texto, plantilla
+from resilience import PoliticaLLM
+
+# --- CONFIGURACIÓN ---
+TAMANO_LOTE = 4           # POIs por llamada.
+TOKENS_POR_POI = 45       # Cada descripción más la estructura JSON.
+CONFIGURACION_LOTE = {"responseMimeType": "application/json"}
+INSTRUCCIONES_LOTE = (
+    "Eres un guía turístico del campus de la Universidad Cenfotec. Para cada lugar "
+    "de la lista, escribe un dato interesante en una oración simple, sin enlaces. "
+    "Responde solo con un arreglo JSON de objetos con las claves \"id\" y \"texto\", "
+    "en el mismo orden de la lista."
+)
+
+
+def construir_prompt_lote(lugares):
+    """
+    Arma la pregunta para un lote de lugares.
+
+    Args:
+        lugares (list): Tuplas (poi_id, nombre).
+
+    Returns:
+        str: La pregunta con un lugar por línea ('- id: nombre').
+    """
+    lineas = [INSTRUCCIONES_LOTE, "Lugares:"]
+    for poi_id, nombre in lugares:
+        lineas.append(f"- {poi_id}: {nombre}")
+    return "\n".join(lineas)
+
+
+def separar_respuesta(texto, ids):
+    """
+    Separa la respuesta de un lote en una descripción por POI.
+
+    Acepta el arreglo rodeado de otro texto (por ejemplo, un bloque
+    ```json) y arreglos de textos sin id, que se asignan en orden.
+
+    Args:
+        texto (str): Respuesta del modelo.
+        ids (list): Ids de los POIs pedidos, en orden.
+
+    Returns:
+        dict: id del POI -> descripción, solo para los ids pedidos.
+
+    Raises:
+        ValueError: Si la respuesta no contiene un arreglo JSON válido.
+    """
+    inicio = texto.find("[")
+    fin = texto.rfind("]")
+    if inicio < 0 or fin < inicio:
+        raise ValueError("La respuesta no contiene un arreglo JSON")
+    datos = json.loads(texto[inicio:fin + 1])
+    if not isinstance(datos, list):
+        raise ValueError("La respuesta no es un arreglo")
+    resultado = {}
+    for i, elemento in enumerate(datos):
+        if isinstance(elemento, dict):
+            poi_id = elemento.get("id")
+            descripcion = elemento.get("texto")
+        elif isinstance(elemento, str) and i < len(ids):
+            poi_id, descripcion = ids[i], elemento
+        else:
+            continue
+        if poi_id in ids and isinstance(descripcion, str) and descripcion.strip():
+            resultado[poi_id] = descripcion.strip()
+    return resultado
+
+
+class ClienteLotes:
+    """
+    Consulta descripciones de varios POIs por llamada a la API.
+
+    Lleva la cuenta de las llamadas hechas y de las que se ahorraron frente
+    a consultar cada POI por separado.
+    """
+
+    def __init__(self, https_session, endpoint, politica=None, tamano_lote=TAMANO_LOTE):
+        """
+        Args:
+            https_session (requests.Session): Sesión de requests (o GestorConexion).
+            endpoint (str): URL de 'generateContent'.
+            politica (PoliticaLLM): Reintentos, limitador y cortacircuitos compartidos.
+            tamano_lote (int): POIs máximos por llamada.
+        """
+        self.https_session = https_session
+        self.endpoint = endpoint
+        self.politica = politica if politica is not None else PoliticaLLM()
+        self.tamano_lote = tamano_lote
+        self.llamadas_lote = 0
+        self.pois_por_lote = 0       # POIs resueltos con llamadas de lote.
+        self.respuestas_invalidas = 0
+        self.extractor = ExtractorTexto()
+
+    async def preguntar(self, lugares):
+        """
+        Obtiene las descripciones de varios POIs.
+
+        Un POI que queda solo en su lote no se pide: una llamada de lote no
+        ahorra nada frente a la consulta individual.
+
+        Args:
+            lugares (list): Tuplas (poi_id, nombre, pregunta).
+
+        Returns:
+            dict: id del POI -> descripción, para los POIs que trajeron los lotes.
+        """
+        resultado = {}
+        for i in range(0, len(lugares), self.tamano_lote):
+            lote = lugares[i:i + self.tamano_lote]
+            if len(lote) > 1:
+                textos = await self._pedir_lote(lote)
+                self.pois_por_lote += len(textos)
+                resultado.update(textos)
+        return resultado
+
+    async def _pedir_lote(self, lote):
+        """Hace la llamada de un lote; retorna {} si falló o no se pudo interpretar."""
+        ids = [poi_id for poi_id, _, _ in lote]
+        prompt = construir_prompt_lote([(poi_id, nombre) for poi_id, nombre, _ in lote])
+        solicitud = plantilla(TOKENS_POR_POI * len(lote), CONFIGURACION_LOTE)
+        politica = self.politica
+        for intento in range(politica.intentos):
+            if not politica.permitir():
+                return {}
+            espera = politica.turno()
+            while espera:
+                await asyncio.sleep(espera)
+                espera = politica.turno()
+
+            self.llamadas_lote += 1
+            codigo = None
+            encabezados = None
+            response = None
+            try:
+                response = self.https_session.post(self.endpoint, headers=ENCABEZADOS_JSON,
+                                                   data=solicitud.cuerpo(prompt), stream=True,
+                                                   timeout=15)
+                codigo = response.status_code
+                encabezados = response.headers
+                if codigo == 200:
+                    texto = leer_texto(response, self.extractor)
+                    politica.registrar(200)
+                    try:
+                        if texto is None:
+                            raise ValueError("la respuesta no trajo texto")
+                        return separar_respuesta(texto, ids)
+                    except ValueError as e:
+                        # Respuesta truncada o con otro formato: no se reintenta
+                        # el lote, el backend consulta cada POI por separado.
+                        print(f"Respuesta de lote inválida: {e}")
+                        self.respuestas_invalidas += 1
+                        return {}
+                print(f"Error de API en el lote: {codigo}.")
+            except Exception as e:
+                print(f"Excepción en el lote: {e}.")
+                codigo = None
+            finally:
+                # También si la lectura falla a la mitad: la sesión reutiliza el socket.
+                if response is not None:
+                    response.close()
+
+            espera = politica.registrar(codigo, encabezados, intento)
+            if espera is None:
+                return {}
+            await asyncio.sleep(espera)
+        return {}
+
+    def estadisticas(self):
+        """
+        Returns:
+            dict: Llamadas hechas y llamadas ahorradas frente a una por POI.
+        """
+        return {
+            "llamadas_lote": self.llamadas_lote,
+            "pois_por_lote": self.pois_por_lote,
+            "llamadas_ahorradas": self.pois_por_lote - self.llamadas_lote,
+            "respuestas_invalidas": self.respuestas_invalidas,
+        }
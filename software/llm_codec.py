@@ -0,0 +1,254 @@
+# llm_codec.py
+# Módulo para codificar las solicitudes a Gemini y leer sus respuestas con
+# pocas asignaciones de memoria.
+#
+# Solicitud: el JSON de 'generateContent' es siempre el mismo salvo la
+# pregunta. PlantillaSolicitud lo serializa una vez (prefijo y sufijo) y en
+# cada llamada escribe la pregunta escapada en un buffer reutilizable, sin
+# armar los diccionarios ni llamar a json.dumps.
+#
+# Respuesta: de todo el cuerpo (candidatos, calificaciones de seguridad,
+# metadatos de uso) solo interesa 'candidates[0].content.parts[*].text'.
+# ExtractorTexto recorre los bytes a medida que llegan del socket, busca la
+# clave "text" y decodifica su cadena (con los escapes de JSON) sin
+# construir el árbol de objetos. Los bloques pueden cortarse en cualquier
+# punto, incluso a mitad de la clave, de un escape o de un carácter UTF-8.
+
+import json
+
+# --- CONFIGURACIÓN ---
+CAPACIDAD_INICIAL = 512     # Bytes del buffer de la solicitud; crece si hace falta.
+TAMANO_BLOQUE = 256         # Bytes leídos del socket por iteración.
+ENCABEZADOS_JSON = {"Content-Type": "application/json"}
+MARCA_PREGUNTA = "@@PREGUNTA@@"
+CLAVE_TEXTO = b'"text"'
+
+# Escapes para escribir una cadena JSON: comillas, barra y caracteres de control.
+ESCAPES_ESCRITURA = {34: b'\\"', 92: b"\\\\", 8: b"\\b", 12: b"\\f", 10: b"\\n",
+                     13: b"\\r", 9: b"\\t"}
+for _c in range(32):
+    if _c not in ESCAPES_ESCRITURA:
+        ESCAPES_ESCRITURA[_c] = ("\\u%04x" % _c).encode()
+# Escapes al leer: el byte que sigue a la barra -> el byte que representa.
+ESCAPES_LECTURA = {34: 34, 92: 92, 47: 47, 98: 8, 102: 12, 110: 10, 114: 13, 116: 9}
+ESPACIOS = b" \t\r\n"
+
+# Estados del extractor.
+BUSCAR = 0          # Buscando la clave "text".
+DOS_PUNTOS = 1      # Después de la clave, se espera ':'.
+COMILLA = 2         # Después de ':', se espera el '"' de la cadena.
+CADENA = 3          # Dentro de la cadena.
+
+
+class PlantillaSolicitud:
+    """
+    Cuerpo de 'generateContent' preserializado.
+
+    El buffer se reutiliza entre llamadas: el cuerpo retornado es válido
+    hasta la siguiente llamada a 'cuerpo'.
+    """
+
+    def __init__(self, max_tokens, configuracion=None, capacidad=CAPACIDAD_INICIAL):
+        """
+        Args:
+            max_tokens (int): Límite de tokens de la respuesta.
+            configuracion (dict): Otras claves de 'generationConfig' (por
+                ejemplo, 'responseMimeType').
+            capacidad (int): Tamaño inicial del buffer, en bytes.
+        """
+        generacion = {"maxOutputTokens": max_tokens}
+        if configuracion:
+            generacion.update(configuracion)
+        plantilla = json.dumps({"contents": [{"parts": [{"text": MARCA_PREGUNTA}]}],
+                                "generationConfig": generacion})
+        prefijo, sufijo = plantilla.split(MARCA_PREGUNTA)
+        self.prefijo = prefijo.encode()
+        self.sufijo = sufijo.encode()
+        self._buffer = bytearray(max(capacidad, len(self.prefijo) + len(self.sufijo)))
+        self._buffer[:len(self.prefijo)] = self.prefijo
+        self.crecimientos = 0
+
+    def cuerpo(self, pregunta):
+        """
+        Escribe el cuerpo de la solicitud para una pregunta.
+
+        Args:
+            pregunta (str): El texto a enviar.
+
+        Returns:
+            memoryview: El JSON codificado en UTF-8, listo para 'post(data=...)'.
+        """
+        datos = pregunta.encode("utf-8")
+        vista = memoryview(datos)
+        pos = len(self.prefijo)
+        inicio = 0
+        if not datos or (min(datos) >= 32 and b'"' not in datos and b"\\" not in datos):
+            # Caso común: nada que escapar, se copia de una vez.
+            pos = self._escribir(vista, pos)
+        else:
+            for i in range(len(datos)):
+                byte = datos[i]
+                if byte >= 32 and byte != 34 and byte != 92:
+                    continue
+                pos = self._escribir(vista[inicio:i], pos)
+                pos = self._escribir(ESCAPES_ESCRITURA[byte], pos)
+                inicio = i + 1
+            pos = self._escribir(vista[inicio:], pos)
+        pos = self._escribir(self.sufijo, pos)
+        return memoryview(self._buffer)[:pos]
+
+    def _escribir(self, datos, pos):
+        fin = pos + len(datos)
+        if fin > len(self._buffer):
+            nuevo = bytearray(max(2 * len(self._buffer), fin + len(self.sufijo)))
+            nuevo[:pos] = memoryview(self._buffer)[:pos]
+            self._buffer = nuevo
+            self.crecimientos += 1
+        self._buffer[pos:fin] = datos
+        return fin
+
+
+class ExtractorTexto:
+    """
+    Extrae los textos de una respuesta JSON de Gemini a medida que llega.
+
+    Une los valores de todas las claves "text" (las partes del candidato;
+    con un solo candidato, que es el valor por defecto de la API).
+    """
+
+    def __init__(self):
+        self.reiniciar()
+
+    def reiniciar(self):
+        """Prepara el extractor para una respuesta nueva."""
+        self._texto = bytearray()
+        self._resto = b""
+        self._estado = BUSCAR
+        self._alto = 0      # Primera mitad de un par sustituto (\\ud83d\\ude00).
+        self.partes = 0     # Cadenas "text" completas.
+
+    def alimentar(self, datos):
+        """
+        Procesa un bloque de bytes recibido.
+
+        Args:
+            datos (bytes): Bloque leído del socket.
+        """
+        if self._resto:
+            datos = self._resto + datos
+            self._resto = b""
+        vista = memoryview(datos)
+        n = len(datos)
+        pos = 0
+        while pos < n:
+            estado = self._estado
+            if estado == BUSCAR:
+                i = datos.find(CLAVE_TEXTO, pos)
+                if i < 0:
+                    # La clave puede quedar partida entre este bloque y el siguiente.
+                    self._resto = bytes(vista[max(pos, n - len(CLAVE_TEXTO) + 1):])
+                    return
+                pos = i + len(CLAVE_TEXTO)
+                self._estado = DOS_PUNTOS
+            elif estado != CADENA:
+                byte = datos[pos]
+                if byte in ESPACIOS:
+                    pos += 1
+                elif byte == (58 if estado == DOS_PUNTOS else 34):
+                    pos += 1
+                    self._estado = estado + 1
+                else:
+                    # Era "text" dentro de otra cosa: se sigue buscando desde aquí.
+                    self._estado = BUSCAR
+            else:
+                comilla = datos.find(b'"', pos)
+                fin = comilla if comilla >= 0 else n
+                barra = datos.find(b"\\", pos, fin)
+                if barra >= 0:
+                    fin = barra
+                self._texto.extend(vista[pos:fin])
+                if barra >= 0:
+                    usados = self._escape(datos, barra, n)
+                    if not usados:
+                        self._resto = bytes(vista[barra:])
+                        return
+                    pos = barra + usados
+                elif comilla >= 0:
+                    pos = comilla + 1
+                    self.partes += 1
+                    self._estado = BUSCAR
+                else:
+                    pos = n
+
+    def _escape(self, datos, i, n):
+        """Decodifica el escape en 'i'; retorna los bytes usados (0 si está incompleto)."""
+        if i + 1 >= n:
+            return 0
+        letra = datos[i + 1]
+        if letra != 117:  # 'u'
+            self._texto.append(ESCAPES_LECTURA.get(letra, letra))
+            return 2
+        if i + 6 > n:
+            return 0
+        codigo = int(str(datos[i + 2:i + 6], "ascii"), 16)
+        if 0xD800 <= codigo < 0xDC00:
+            self._alto = codigo
+            return 6
+        if 0xDC00 <= codigo < 0xE000:
+            if not self._alto:
+                codigo = 0xFFFD
+            else:
+                codigo = 0x10000 + ((self._alto - 0xD800) << 10) + (codigo - 0xDC00)
+        self._alto = 0
+        self._texto.extend(chr(codigo).encode("utf-8"))
+        return 6
+
+    def texto(self):
+        """
+        Returns:
+            str: El texto de la respuesta, o None si no tenía ninguna cadena "text" completa.
+        """
+        if not self.partes:
+            return None
+        return str(self._texto, "utf-8")
+
+
+_plantillas = {}
+
+
+def plantilla(max_tokens, configuracion=None):
+    """
+    Plantilla compartida para un límite de tokens y una configuración.
+
+    Todas las consultas con los mismos parámetros usan el mismo buffer. Es
+    seguro con asyncio porque entre 'cuerpo' y 'post' no hay ningún 'await'.
+
+    Returns:
+        PlantillaSolicitud: La plantilla, creada la primera vez.
+    """
+    clave = (max_tokens, tuple(sorted(configuracion.items())) if configuracion else None)
+    encontrada = _plantillas.get(clave)
+    if encontrada is None:
+        encontrada = _plantillas[clave] = PlantillaSolicitud(max_tokens, configuracion)
+    return encontrada
+
+
+def leer_texto(response, extractor=None, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Lee el cuerpo de una respuesta de 'generateContent' y extrae su texto.
+
+    Args:
+        response (requests.Response): Respuesta con el estado 200.
+        extractor (ExtractorTexto): Extractor a reutilizar (None: uno nuevo).
+        tamano_bloque (int): Bytes leídos del socket por iteración.
+
+    Returns:
+        str: El texto, o None si la respuesta no trajo texto.
+    """
+    if extractor is None:
+        extractor = ExtractorTexto()
+    else:
+        extractor.reiniciar()
+    for bloque in response.iter_content(tamano_bloque):
+        extractor.alimentar(bloque)
+    return extractor.texto()
@@ -0,0 +1,231 @@
+# llm_stream.py
+# Módulo para recibir las respuestas de Gemini por partes (streaming).
+# Usa el endpoint 'streamGenerateContent' con eventos SSE ('alt=sse'): cada
+# evento es una línea 'data: {...}' con un fragmento de la respuesta. El
+# parser procesa los bytes a medida que llegan del socket, así las primeras
+# palabras se pueden mostrar en la LCD antes de que termine la respuesta.
+
+import json
+import time
+import asyncio
+from llm_codec import ENCABEZADOS_JSON, ExtractorTexto, plantilla
+from resilience import PoliticaLLM
+from profiling import perfil
+
+# --- CONFIGURACIÓN ---
+TAMANO_CHUNK = 64       # Bytes leídos del socket por iteración.
+MAX_LINEA = 4096        # Una línea SSE más larga se descarta (protege la RAM).
+MAX_TOKENS = 30
+
+
+def endpoint_stream(endpoint):
+    """
+    Convierte la URL de 'generateContent' en la de 'streamGenerateContent' con SSE.
+
+    Args:
+        endpoint (str): URL de la API, por ejemplo '.../gemini-1.5-flash:generateContent?key=...'.
+
+    Returns:
+        str: URL equivalente para recibir la respuesta por eventos.
+    """
+    base, _, consulta = endpoint.partition("?")
+    if base.endswith(":generateContent"):
+        base = base[:-len(":generateContent")] + ":streamGenerateContent"
+    return base + "?alt=sse" + ("&" + consulta if consulta else "")
+
+
+def texto_de_evento(datos):
+    """
+    Extrae el texto de un fragmento de respuesta de Gemini.
+
+    Returns:
+        str: El texto del fragmento ('' si el evento no trae texto).
+    """
+    if "error" in datos:
+        raise ValueError(f"Error en el stream: {datos['error'].get('message', datos['error'])}")
+    candidatos = datos.get("candidates")
+    if not candidatos:
+        return ""
+    partes = candidatos[0].get("content", {}).get("parts", [])
+    return "".join(parte.get("text", "") for parte in partes)
+
+
+class ParserStreamGemini:
+    """
+    Parser incremental de la respuesta SSE de 'streamGenerateContent'.
+
+    Recibe los bytes tal como llegan (los cortes pueden caer en cualquier
+    punto, incluso a mitad de un carácter UTF-8) y retorna los fragmentos de
+    texto de cada evento completo.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._extractor = ExtractorTexto()
+        self.eventos = 0
+        self.errores = 0
+        self.terminado = False  # True al recibir un 'finishReason'.
+
+    def alimentar(self, datos):
+        """
+        Procesa un bloque de bytes recibido.
+
+        Args:
+            datos (bytes): Bloque leído del socket.
+
+        Returns:
+            list: Fragmentos de texto de los eventos completados por este bloque.
+        """
+        buffer = self._buffer
+        buffer.extend(datos)
+        fragmentos = []
+        inicio = 0
+        while True:
+            fin = buffer.find(b"\n", inicio)
+            if fin < 0:
+                break
+            linea = bytes(buffer[inicio:fin]).strip()
+            inicio = fin + 1
+            if linea.startswith(b"data:"):
+                texto = self._procesar(linea[5:])
+                if texto:
+                    fragmentos.append(texto)
+        if inicio:
+            buffer = self._buffer = buffer[inicio:]
+        if len(buffer) > MAX_LINEA:
+            self.errores += 1
+            self._buffer = bytearray()
+        return fragmentos
+
+    def _procesar(self, carga):
+        # Camino rápido: el texto se extrae sin construir el árbol del evento
+        # (que también trae las calificaciones de seguridad).
+        extractor = self._extractor
+        with perfil.medir("json"):
+            extractor.reiniciar()
+            extractor.alimentar(carga)
+            texto = extractor.texto()
+        if texto is not None:
+            self.eventos += 1
+            if b'"finishReason"' in carga:
+                self.terminado = True
+            return texto
+        # Eventos sin texto (el último, un error) o malformados: JSON completo.
+        try:
+            with perfil.medir("json"):
+                datos = json.loads(str(carga, "utf-8"))
+        except ValueError:
+            self.errores += 1
+            return ""
+        self.eventos += 1
+        candidatos = datos.get("candidates")
+        if candidatos and candidatos[0].get("finishReason"):
+            self.terminado = True
+        return texto_de_evento(datos)
+
+
+async def preguntar_gemini_stream(https_session, endpoint, pregunta, al_recibir=None,
+                                  cache=None, poi_id=None, politica=None,
+                                  tamano_chunk=TAMANO_CHUNK, max_tokens=MAX_TOKENS,
+                                  reloj=time.monotonic):
+    """
+    Envía una pregunta a Gemini y entrega la respuesta por partes.
+
+    Entre cada bloque leído del socket se cede el control a las demás tareas
+    (por ejemplo, a la LCD para mostrar lo que ya llegó). Solo se reintenta si
+    aún no se entregó ningún fragmento; si la conexión se corta a mitad de la
+    respuesta se retorna None, y si el stream termina sin 'finishReason' se
+    retorna el texto parcial. En ambos casos no se guarda nada en la caché.
+
+    Args:
+        https_session (requests.Session): Sesión de requests.
+        endpoint (str): URL de 'streamGenerateContent' (ver 'endpoint_stream').
+        pregunta (str): El texto a enviar a Gemini.
+        al_recibir (callable): Recibe cada fragmento de texto en cuanto llega.
+        cache (CacheRespuestas): Caché de respuestas opcional.
+        poi_id (str): Id del POI, usado como clave de la caché.
+        politica (PoliticaLLM): Reintentos, limitador y cortacircuitos
+            compartidos entre consultas (ver resilience.py).
+        tamano_chunk (int): Bytes leídos del socket por iteración.
+        max_tokens (int): Límite de tokens de la respuesta.
+        reloj (callable): Fuente de tiempo para las métricas.
+
+    Returns:
+        str: La respuesta (parcial si el stream terminó antes de tiempo), o
+            None si falló.
+    """
+    if cache is not None:
+        guardada = cache.obtener(poi_id, pregunta)
+        if guardada is not None:
+            perfil.contar("cache_aciertos")
+            if al_recibir is not None:
+                al_recibir(guardada)
+            return guardada
+
+    if politica is None:
+        politica = PoliticaLLM()
+    solicitud = plantilla(max_tokens)
+
+    for intento in range(politica.intentos):
+        if not politica.permitir():
+            print("Gemini no disponible (sin red o circuito abierto).")
+            return None
+        espera = politica.turno()
+        while espera:
+            await asyncio.sleep(espera)
+            espera = politica.turno()
+
+        partes = []
+        codigo = None
+        encabezados = None
+        inicio = reloj()
+        response = None
+        try:
+            perfil.contar("api_solicitudes")
+            with perfil.medir("https_post"):
+                response = https_session.post(endpoint, headers=ENCABEZADOS_JSON,
+                                              data=solicitud.cuerpo(pregunta), stream=True,
+                                              timeout=15)
+            codigo = response.status_code
+            encabezados = response.headers
+            if codigo == 200:
+                parser = ParserStreamGemini()
+                for bloque in response.iter_content(tamano_chunk):
+                    for fragmento in parser.alimentar(bloque):
+                        if not partes:
+                            print(f"Primer fragmento en {reloj() - inicio:.2f} s.")
+                        partes.append(fragmento)
+                        if al_recibir is not None:
+                            al_recibir(fragmento)
+                    await asyncio.sleep(0)
+                if partes:
+                    texto = "".join(partes)
+                    if not parser.terminado:
+                        # El servidor cerró el stream sin 'finishReason': el
+                        # texto ya mostrado se retorna, pero no cuenta como
+                        # éxito ni se guarda en la caché.
+                        print("La respuesta llegó incompleta.")
+                        politica.registrar(None, encabezados, intento)
+                        return texto
+                    politica.registrar(200)
+                    print(f"Respuesta completa en {reloj() - inicio:.2f} s.")
+                    if cache is not None:
+                        cache.guardar(poi_id, pregunta, texto)
+                    return texto
+                print("La respuesta no trajo texto.")
+                codigo = None
+            else:
+                print(f"Error de API: {codigo}.")
+        except Exception as e:
+            print(f"Excepción en el stream: {e}.")
+            codigo = None
+        finally:
+            if response is not None:
+                response.close()
+
+        espera = politica.registrar(codigo, encabezados, intento)
+        if partes or espera is None:
+            return None
+        print(f"Reintentando en {espera:.1f} s...")
+        await asyncio.sleep(espera)
+    return None
@@ -5,12 +5,16 @@ import time
 import socketpool
 import ssl
 import adafruit_requests as requests
+from llm_codec import ENCABEZADOS_JSON, leer_texto, plantilla
+from resilience import PoliticaLLM
+from profiling import perfil
 
 # Constantes para la API (pueden ser movidas a un archivo de configuración si es necesario)
-API_RETRY_DELAY = 10
-API_MAX_RETRY = 3
+# Los reintentos, el límite de solicitudes y el cortacircuitos están en resilience.py.
+MENSAJE_ERROR = "Error de Gemini. Intenta mas tarde."
 
-def preguntar_gemini(https_session, endpoint, api_key, pregunta):
+def preguntar_gemini(https_session, endpoint, api_key, pregunta, cache=None, poi_id=None,
+                     politica=None):
     """
     Envía una pregunta a la API de Gemini y retorna la respuesta.
     
@@ -19,27 +23,67 @@ def preguntar_gemini(https_session, endpoint, api_key, pregunta):
         endpoint (str): URL de la API.
         api_key (str): Clave de la API.
         pregunta (str): El texto a enviar a Gemini.
+        cache (CacheRespuestas): Caché de respuestas opcional (ver cache_utils.py).
+        poi_id (str): Id del POI al que se refiere la pregunta, usado como clave de la caché.
+        politica (PoliticaLLM): Reintentos, limitador y cortacircuitos compartidos
+            entre consultas. Con el circuito abierto se retorna el error sin llamar a la API.
         
     Returns:
         str: La respuesta de Gemini o un mensaje de error.
     """
-    headers = {"Content-Type": "application/json"}
-    payload = {
-        "contents": [{"parts": [{"text": pregunta}]}],
-        "generationConfig": {"maxOutputTokens": 30}
-    }
+    if cache is not None:
+        guardada = cache.obtener(poi_id, pregunta)
+        if guardada is not None:
+            perfil.contar("cache_aciertos")
+            return guardada
+
+    if politica is None:
+        politica = PoliticaLLM()
+    solicitud = plantilla(30)
     
-    for _ in range(API_MAX_RETRY):
+    for intento in range(politica.intentos):
+        if not politica.permitir():
+            print("Gemini no disponible (sin red o circuito abierto).")
+            return MENSAJE_ERROR
+        espera = politica.turno()
+        while espera:
+            time.sleep(espera)
+            espera = politica.turno()
+
+        codigo = None
+        encabezados = None
+        response = None
         try:
-            response = https_session.post(endpoint, headers=headers, json=payload, timeout=15)
-            if response.status_code == 200:
-                data = response.json()
-                return data["candidates"][0]["content"]["parts"][0]["text"]
+            perfil.contar("api_solicitudes")
+            with perfil.medir("https_post"):
+                response = https_session.post(endpoint, headers=ENCABEZADOS_JSON,
+                                              data=solicitud.cuerpo(pregunta), stream=True,
+                                              timeout=15)
+            codigo = response.status_code
+            encabezados = response.headers
+            if codigo == 200:
+                with perfil.medir("json"):
+                    texto = leer_texto(response)
+                if texto:
+                    politica.registrar(200)
+                    if cache is not None:
+                        cache.guardar(poi_id, pregunta, texto)
+                    return texto
+                print("La respuesta no trajo texto.")
+                codigo = None
             else:
-                print(f"Error de API: {response.status_code}. Reintentando...")
-                time.sleep(API_RETRY_DELAY)
+                print(f"Error de API: {codigo}.")
         except Exception as e:
-            print(f"Excepción en la API: {e}. Reintentando...")
-            time.sleep(API_RETRY_DELAY)
+            print(f"Excepción en la API: {e}.")
+            codigo = None
+        finally:
+            if response is not None:
+                response.close()
+
+        espera = politica.registrar(codigo, encabezados, intento)
+        if espera is None:
+            break
+        print(f"Reintentando en {espera:.1f} s...")
+        time.sleep(espera)
             
-    return "Error de Gemini. Intenta mas tarde."
+    return MENSAJE_ERROR
@@ -0,0 +1,346 @@
+# poi_index.py
+# Módulo para el índice espacial de puntos de interés (POIs).
+# Divide el mapa en una rejilla de celdas fijas (en metros) para que las
+# búsquedas por cercanía solo revisen las celdas alrededor de la ubicación,
+# en lugar de recorrer todos los POIs cargados.
+#
+# Las coordenadas se guardan en arrays de flotantes y las celdas en arrays
+# de índices, con claves enteras: un POI ocupa unos pocos bytes en lugar de
+# un diccionario, y buscar no crea tuplas. 'buscar' llena buffers del
+# llamador y no asigna memoria; 'en_radio' es la versión cómoda con listas.
+
+import math
+from array import array
+from geo_utils import haversine_distance, METROS_POR_GRADO_LAT
+
+# --- CONFIGURACIÓN ---
+TAMANO_CELDA_METROS = 100.0      # Lado de cada celda de la rejilla.
+_BITS_CELDA = 15                 # Bits de cada coordenada de celda en la clave.
+_MASCARA_CELDA = (1 << _BITS_CELDA) - 1
+_MAX_INDICE_H = 0xFFFF           # Mayor índice que cabe en una celda 'H'.
+
+
+def guardar_cercano(indices, distancias, encontrados, i, distancia):
+    """
+    Agrega un POI a los buffers de 'buscar' conservando los más cercanos.
+
+    Con los buffers llenos, el POI reemplaza al más lejano si está más cerca
+    (en un grupo denso se quedan los N más cercanos, no los primeros que
+    aparecen en la rejilla).
+
+    Args:
+        indices (array): Buffer de índices.
+        distancias (array): Buffer de distancias, del mismo tamaño.
+        encontrados (int): Entradas ocupadas de los buffers.
+        i (int): Índice del POI.
+        distancia (float): Su distancia en metros.
+
+    Returns:
+        int: Entradas ocupadas después de agregarlo.
+    """
+    if encontrados < len(indices):
+        indices[encontrados] = i
+        distancias[encontrados] = distancia
+        return encontrados + 1
+    lejano = 0
+    for k in range(1, encontrados):
+        if distancias[k] > distancias[lejano]:
+            lejano = k
+    if distancia < distancias[lejano]:
+        indices[lejano] = i
+        distancias[lejano] = distancia
+    return encontrados
+
+
+class IndicePOI:
+    """
+    Índice espacial de POIs basado en una rejilla de celdas fijas.
+
+    Los POIs se guardan en tablas paralelas (ids y nombres en listas,
+    latitudes y longitudes en arrays 'd') y cada celda de la rejilla guarda
+    solo los índices de los POIs que contiene: array 'H' hasta 65536 POIs y
+    'L' a partir de ahí ('H' los truncaría sin error en CircuitPython).
+    """
+
+    def __init__(self, tamano_celda=TAMANO_CELDA_METROS, lat_referencia=0.0):
+        """
+        Args:
+            tamano_celda (float): Lado de la celda en metros.
+            lat_referencia (float): Latitud usada para escalar la longitud.
+                Debe ser cercana a la zona donde están los POIs. Con None, la
+                rejilla se arma al llamar a 'fijar_referencia' y no se puede
+                buscar antes.
+        """
+        self.tamano_celda = tamano_celda
+        self.ids = []
+        self.nombres = []
+        self.lats = array("d")
+        self.lons = array("d")
+        self._posicion = {}  # id -> índice en las tablas paralelas
+        self._celdas = {}    # clave de la celda -> array de índices
+        self._tipo_celda = "H"
+        self._grados_lat = tamano_celda / METROS_POR_GRADO_LAT
+        self._grados_lon = None
+        if lat_referencia is not None:
+            self.fijar_referencia(lat_referencia)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _celda(self, lat, lon):
+        """Retorna la celda (cx, cy) que contiene el punto."""
+        return (int(math.floor(lon / self._grados_lon)),
+                int(math.floor(lat / self._grados_lat)))
+
+    def _celdas_lon(self, lat, radio_metros):
+        """
+        Celdas a cada lado, en longitud, que cubren el radio a la latitud 'lat'.
+
+        El ancho en metros de una celda depende de la latitud: lejos de la
+        latitud de referencia puede ser menor que 'tamano_celda'.
+        """
+        metros = self._grados_lon * METROS_POR_GRADO_LAT * max(math.cos(math.radians(lat)), 0.01)
+        return int(math.ceil(radio_metros / metros))
+
+    @staticmethod
+    def _clave(cx, cy):
+        """
+        Clave entera de una celda (cabe en un entero pequeño de CircuitPython).
+
+        Celdas a más de 2^15 celdas de distancia comparten clave; solo agrega
+        candidatos, que luego se descartan por distancia.
+        """
+        return ((cx & _MASCARA_CELDA) << _BITS_CELDA) | (cy & _MASCARA_CELDA)
+
+    def fijar_referencia(self, lat_referencia):
+        """
+        Cambia la latitud de referencia y rearma la rejilla con los POIs cargados.
+
+        Args:
+            lat_referencia (float): Latitud usada para escalar la longitud.
+        """
+        cos_lat = max(math.cos(math.radians(lat_referencia)), 0.01)
+        self._grados_lon = self.tamano_celda / (METROS_POR_GRADO_LAT * cos_lat)
+        self._celdas = {}
+        for i in range(len(self.ids)):
+            self._indexar(i)
+
+    def _indexar(self, i):
+        """Agrega el POI 'i' a la celda que le corresponde."""
+        if i > _MAX_INDICE_H and self._tipo_celda == "H":
+            # Al pasar de 65536 POIs las celdas se convierten a 'L' (una sola vez).
+            self._tipo_celda = "L"
+            for clave, celda in list(self._celdas.items()):
+                self._celdas[clave] = array("L", celda)
+        clave = self._clave(*self._celda(self.lats[i], self.lons[i]))
+        celda = self._celdas.get(clave)
+        if celda is None:
+            self._celdas[clave] = array(self._tipo_celda, [i])
+        else:
+            celda.append(i)
+
+    def agregar(self, poi_id, nombre, lat, lon):
+        """
+        Agrega un POI al índice.
+
+        Args:
+            poi_id (str): Identificador único del POI.
+            nombre (str): Nombre legible del lugar.
+            lat (float): Latitud en grados.
+            lon (float): Longitud en grados.
+        """
+        if poi_id in self._posicion:
+            raise ValueError(f"POI duplicado: {poi_id}")
+        i = len(self.ids)
+        self.ids.append(poi_id)
+        self.nombres.append(nombre)
+        self.lats.append(lat)
+        self.lons.append(lon)
+        self._posicion[poi_id] = i
+        if self._grados_lon is not None:
+            self._indexar(i)
+
+    def poi(self, poi_id):
+        """
+        Retorna los datos de un POI por su id.
+
+        Returns:
+            dict: Diccionario con 'id', 'nombre', 'lat' y 'lon', o None si no existe.
+        """
+        i = self._posicion.get(poi_id)
+        if i is None:
+            return None
+        return {"id": self.ids[i], "nombre": self.nombres[i],
+                "lat": self.lats[i], "lon": self.lons[i]}
+
+    def posicion(self, poi_id):
+        """Índice del POI en las tablas paralelas, o None si no existe."""
+        return self._posicion.get(poi_id)
+
+    def nombre(self, poi_id):
+        """Nombre de un POI sin armar su diccionario, o None si no existe."""
+        i = self._posicion.get(poi_id)
+        return None if i is None else self.nombres[i]
+
+    def _candidatos(self, lat, lon, radio_metros):
+        """Genera los índices de los POIs en las celdas que cubren el radio."""
+        cx, cy = self._celda(lat, lon)
+        n = int(math.ceil(radio_metros / self.tamano_celda))
+        nx = self._celdas_lon(lat, radio_metros)
+        for dx in range(-nx, nx + 1):
+            for dy in range(-n, n + 1):
+                celda = self._celdas.get(self._clave(cx + dx, cy + dy))
+                if celda:
+                    for i in celda:
+                        yield i
+
+    def buscar(self, lat, lon, radio_metros, indices, distancias):
+        """
+        Busca los POIs dentro de un radio sin asignar memoria.
+
+        Args:
+            lat (float): Latitud de la ubicación actual.
+            lon (float): Longitud de la ubicación actual.
+            radio_metros (float): Radio de búsqueda en metros.
+            indices (array): Buffer donde se escriben los índices encontrados
+                ('H', o 'L' con más de 65536 POIs).
+            distancias (array): Buffer 'd' (del mismo tamaño) para sus distancias.
+
+        Returns:
+            int: Cantidad de POIs encontrados (sin orden), como máximo el
+                tamaño de los buffers; si hay más, quedan los más cercanos.
+        """
+        cx = int(math.floor(lon / self._grados_lon))
+        cy = int(math.floor(lat / self._grados_lat))
+        n = int(math.ceil(radio_metros / self.tamano_celda))
+        nx = self._celdas_lon(lat, radio_metros)
+        lats, lons, celdas = self.lats, self.lons, self._celdas
+        encontrados = 0
+        for dx in range(-nx, nx + 1):
+            for dy in range(-n, n + 1):
+                celda = celdas.get(self._clave(cx + dx, cy + dy))
+                if celda is None:
+                    continue
+                for i in celda:
+                    distancia = haversine_distance(lat, lon, lats[i], lons[i])
+                    if distancia <= radio_metros:
+                        encontrados = guardar_cercano(indices, distancias, encontrados,
+                                                      i, distancia)
+        return encontrados
+
+    def distancia_minima(self, lat, lon, radio_metros, excluir=None):
+        """
+        Distancia al POI más cercano dentro de un radio, sin asignar memoria.
+
+        Args:
+            lat (float): Latitud de la ubicación actual.
+            lon (float): Longitud de la ubicación actual.
+            radio_metros (float): Radio de búsqueda en metros.
+            excluir (dict | set): Índices de POIs que no se consideran.
+
+        Returns:
+            float: Distancia en metros, o None si no hay POIs en el radio.
+        """
+        cx = int(math.floor(lon / self._grados_lon))
+        cy = int(math.floor(lat / self._grados_lat))
+        n = int(math.ceil(radio_metros / self.tamano_celda))
+        nx = self._celdas_lon(lat, radio_metros)
+        lats, lons, celdas = self.lats, self.lons, self._celdas
+        minima = radio_metros
+        hay = False
+        for dx in range(-nx, nx + 1):
+            for dy in range(-n, n + 1):
+                celda = celdas.get(self._clave(cx + dx, cy + dy))
+                if celda is None:
+                    continue
+                for i in celda:
+                    if excluir is not None and i in excluir:
+                        continue
+                    distancia = haversine_distance(lat, lon, lats[i], lons[i])
+                    if distancia <= minima:
+                        minima = distancia
+                        hay = True
+        return minima if hay else None
+
+    def en_radio(self, lat, lon, radio_metros):
+        """
+        Busca todos los POIs dentro de un radio.
+
+        Args:
+            lat (float): Latitud de la ubicación actual.
+            lon (float): Longitud de la ubicación actual.
+            radio_metros (float): Radio de búsqueda en metros.
+
+        Returns:
+            list: Tuplas (id, distancia) ordenadas de la más cercana a la más lejana.
+        """
+        encontrados = []
+        for i in self._candidatos(lat, lon, radio_metros):
+            distancia = haversine_distance(lat, lon, self.lats[i], self.lons[i])
+            if distancia <= radio_metros:
+                encontrados.append((self.ids[i], distancia))
+        encontrados.sort(key=lambda par: par[1])
+        return encontrados
+
+    def mas_cercano(self, lat, lon, radio_metros, excluir=None):
+        """
+        Busca el POI más cercano dentro de un radio.
+
+        Args:
+            lat (float): Latitud de la ubicación actual.
+            lon (float): Longitud de la ubicación actual.
+            radio_metros (float): Radio de búsqueda en metros.
+            excluir (dict | set): Índices de POIs que no se consideran.
+
+        Returns:
+            tuple: (id, distancia) del POI más cercano, o None si no hay ninguno.
+        """
+        mejor = None
+        mejor_distancia = radio_metros
+        for i in self._candidatos(lat, lon, radio_metros):
+            if excluir is not None and i in excluir:
+                continue
+            distancia = haversine_distance(lat, lon, self.lats[i], self.lons[i])
+            if distancia <= mejor_distancia:
+                mejor = i
+                mejor_distancia = distancia
+        if mejor is None:
+            return None
+        return (self.ids[mejor], mejor_distancia)
+
+
+def cargar_indice(ruta, tamano_celda=TAMANO_CELDA_METROS):
+    """
+    Carga los POIs desde un archivo CSV con el formato 'id,nombre,lat,lon'.
+
+    La primera línea es el encabezado. Las líneas vacías o que empiezan
+    con '#' se ignoran. El archivo se lee línea por línea para no cargarlo
+    completo en memoria. La rejilla se arma al final, con el centro del
+    rango de latitudes como referencia: un POI lejano al principio del
+    archivo no deforma las celdas de los demás.
+
+    Args:
+        ruta (str): Ruta del archivo de datos.
+        tamano_celda (float): Lado de la celda de la rejilla en metros.
+
+    Returns:
+        IndicePOI: El índice con todos los POIs del archivo.
+    """
+    indice = IndicePOI(tamano_celda, lat_referencia=None)
+    lat_min = lat_max = None
+    with open(ruta, "r") as archivo:
+        archivo.readline()  # Encabezado
+        for linea in archivo:
+            linea = linea.strip()
+            if not linea or linea.startswith("#"):
+                continue
+            poi_id, resto = linea.split(",", 1)
+            nombre, lat, lon = resto.rsplit(",", 2)
+            lat, lon = float(lat), float(lon)
+            indice.agregar(poi_id, nombre, lat, lon)
+            if lat_min is None or lat < lat_min:
+                lat_min = lat
+            if lat_max is None or lat > lat_max:
+                lat_max = lat
+    indice.fijar_referencia(0.0 if lat_min is None else (lat_min + lat_max) / 2.0)
+    return indice
@@ -0,0 +1,606 @@
+# poi_tiles.py
+# Módulo para los POIs en teselas: conjuntos de datos más grandes que la RAM.
+# La herramienta del host (tools/build_poi_tiles.py) divide los POIs en
+# teselas geográficas (cuadrados de unos cientos de metros) y las escribe en
+# un archivo binario. En el dispositivo, IndiceTeselas solo guarda en memoria
+# el directorio de las teselas y unas pocas teselas residentes (LRU); las
+# demás se leen de la flash cuando una búsqueda las necesita. Así los POIs de
+# una ciudad entera caben en una cantidad de memoria acotada.
+#
+# La interfaz es la de IndicePOI (poi_index.py), así las geocercas, la
+# precarga, la telemetría y el planificador del recorrido lo usan sin
+# cambios. El índice de un POI es su posición en el archivo (ordenado por
+# tesela): no cambia aunque su tesela salga de la memoria. Las búsquedas por
+# id miran primero las teselas residentes y, si no está, hacen una búsqueda
+# binaria en el índice de ids del archivo.
+#
+# 'precargar' lee por adelantado las teselas alrededor de la ubicación y las
+# que siguen en la dirección del movimiento. La llama la tarea de teselas
+# (runtime.py), así cruzar a una tesela nueva no detiene la tarea del GPS
+# mientras lee la flash.
+#
+# Formato (enteros little-endian):
+#   Encabezado (32 bytes): 'POIT', versión (u8), largo de los ids (u8),
+#                          reservado (u16), cantidad de teselas (u32),
+#                          cantidad de POIs (u32), tamaño del archivo (u32),
+#                          lado de la tesela en metros (f32),
+#                          latitud de referencia (f64).
+#   Directorio: una entrada por tesela no vacía, ordenadas por clave:
+#               columna (i32), fila (i32), posición del bloque (u32),
+#               índice de su primer POI (u32).
+#   Índice de ids: una entrada por POI, ordenadas por id: id en UTF-8
+#                  rellenado con ceros (largo de los ids) + índice (u32).
+#   Bloques: uno por tesela, en el orden del directorio. Por POI: lat y
+#            lon en 1e-7 grados (i32), largo del id (u8), largo del nombre
+#            (u8), id y nombre en UTF-8.
+
+import math
+import struct
+from array import array
+from geo_utils import haversine_distance, METROS_POR_GRADO_LAT
+from poi_index import guardar_cercano
+
+# --- FORMATO ---
+MAGICO = b"POIT"
+VERSION = 1
+LARGO_ID = 24                 # Bytes máximos del id de un POI.
+FORMATO_ENCABEZADO = "<4sBBHIIIfd"
+TAMANO_ENCABEZADO = 32
+FORMATO_ENTRADA = "<iiII"
+TAMANO_ENTRADA = 16
+FORMATO_POI = "<iiBB"
+TAMANO_POI = 10
+ESCALA = 10000000             # Coordenadas en 1e-7 grados.
+MAX_NOMBRE = 255
+
+# --- CONFIGURACIÓN ---
+TAMANO_TESELA_METROS = 250.0  # Lado de cada tesela.
+MAX_RESIDENTES = 12           # Teselas en memoria a la vez.
+ANTICIPACION_METROS = 250.0   # Distancia hacia adelante que se precarga.
+MARGEN_PRECARGA_METROS = 100.0  # Radio precargado alrededor de cada punto.
+MOVIMIENTO_MINIMO_METROS = 5.0  # Desplazamiento mínimo para actualizar la dirección.
+MAX_CARGAS_PRECARGA = 2       # Teselas leídas por llamada a 'precargar'.
+_BITS_TESELA = 15             # Bits de cada coordenada de tesela en la clave.
+_MASCARA_TESELA = (1 << _BITS_TESELA) - 1
+
+
+def clave_tesela(columna, fila):
+    """Clave entera de una tesela (cabe en un entero pequeño de CircuitPython)."""
+    return ((columna & _MASCARA_TESELA) << _BITS_TESELA) | (fila & _MASCARA_TESELA)
+
+
+def _grados(tamano_tesela, lat_referencia):
+    """Lado de la tesela en grados de latitud y de longitud."""
+    cos_lat = max(math.cos(math.radians(lat_referencia)), 0.01)
+    return (tamano_tesela / METROS_POR_GRADO_LAT,
+            tamano_tesela / (METROS_POR_GRADO_LAT * cos_lat))
+
+
+def escribir_teselas(ruta, pois, tamano_tesela=TAMANO_TESELA_METROS, lat_referencia=None,
+                     largo_id=LARGO_ID):
+    """
+    Escribe un archivo de teselas (se usa en el host).
+
+    Args:
+        ruta (str): Archivo de salida.
+        pois (list): Tuplas (id, nombre, lat, lon).
+        tamano_tesela (float): Lado de cada tesela en metros.
+        lat_referencia (float): Latitud usada para escalar la longitud; por
+            defecto, la del primer POI.
+        largo_id (int): Bytes reservados para cada id en el índice de ids.
+
+    Returns:
+        int: Tamaño del archivo en bytes.
+    """
+    if lat_referencia is None:
+        lat_referencia = pois[0][2] if pois else 0.0
+    grados_lat, grados_lon = _grados(tamano_tesela, lat_referencia)
+    teselas = {}
+    vistos = set()
+    for poi_id, nombre, lat, lon in pois:
+        if poi_id in vistos:
+            raise ValueError(f"POI duplicado: {poi_id}")
+        vistos.add(poi_id)
+        if len(poi_id.encode("utf-8")) > largo_id:
+            raise ValueError(f"El id '{poi_id}' pasa de {largo_id} bytes")
+        if len(nombre.encode("utf-8")) > MAX_NOMBRE:
+            raise ValueError(f"El nombre de '{poi_id}' es demasiado largo")
+        columna = int(math.floor(lon / grados_lon))
+        fila = int(math.floor(lat / grados_lat))
+        teselas.setdefault((clave_tesela(columna, fila), columna, fila), []).append(
+            (poi_id, nombre, lat, lon))
+
+    orden = sorted(teselas)
+    entrada_id = largo_id + 4
+    posicion = (TAMANO_ENCABEZADO + TAMANO_ENTRADA * len(orden)
+                + entrada_id * len(vistos))
+    directorio = bytearray()
+    bloques = bytearray()
+    indices = {}
+    primero = 0
+    for clave in orden:
+        _, columna, fila = clave
+        directorio += struct.pack(FORMATO_ENTRADA, columna, fila, posicion + len(bloques),
+                                  primero)
+        for poi_id, nombre, lat, lon in teselas[clave]:
+            codigo, texto = poi_id.encode("utf-8"), nombre.encode("utf-8")
+            bloques += struct.pack(FORMATO_POI, round(lat * ESCALA), round(lon * ESCALA),
+                                   len(codigo), len(texto))
+            bloques += codigo + texto
+            indices[codigo] = primero
+            primero += 1
+    ids = bytearray()
+    for codigo in sorted(indices):
+        ids += codigo + bytes(largo_id - len(codigo)) + struct.pack("<I", indices[codigo])
+    tamano = posicion + len(bloques)
+    with open(ruta, "wb") as archivo:
+        archivo.write(struct.pack(FORMATO_ENCABEZADO, MAGICO, VERSION, largo_id, 0, len(orden),
+                                  primero, tamano, tamano_tesela, lat_referencia))
+        archivo.write(directorio)
+        archivo.write(ids)
+        archivo.write(bloques)
+    return tamano
+
+
+class Tesela:
+    """POIs de una tesela residente, en tablas paralelas como IndicePOI."""
+
+    def __init__(self, numero, primero):
+        self.numero = numero
+        self.primero = primero  # Índice global del primer POI.
+        self.ids = []
+        self.nombres = []
+        self.lats = array("d")
+        self.lons = array("d")
+        self.uso = 0            # Último acceso, para el LRU.
+
+
+class Columna:
+    """
+    Vista de una columna (ids, nombres, lats o lons) por índice global.
+
+    Permite 'indice.ids[i]' como en IndicePOI: si la tesela del POI no
+    está residente, se lee de la flash.
+    """
+
+    def __init__(self, indice, nombre):
+        self._indice = indice
+        self._nombre = nombre
+
+    def __len__(self):
+        return len(self._indice)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self._indice)
+        tesela = self._indice.tesela_de(i)
+        return getattr(tesela, self._nombre)[i - tesela.primero]
+
+
+class IndiceTeselas:
+    """
+    Índice de POIs leído de un archivo de teselas, con un LRU de teselas residentes.
+
+    En memoria quedan el directorio (12 bytes por tesela, en arrays) y a lo
+    sumo 'max_residentes' teselas. Mantiene el archivo abierto.
+    """
+
+    def __init__(self, ruta, max_residentes=MAX_RESIDENTES, anticipacion=ANTICIPACION_METROS,
+                 margen=MARGEN_PRECARGA_METROS):
+        """
+        Args:
+            ruta (str): Ruta del archivo de teselas.
+            max_residentes (int): Teselas en memoria a la vez.
+            anticipacion (float): Metros hacia adelante que precarga 'precargar'.
+            margen (float): Radio precargado alrededor de la ubicación y del
+                punto de adelante.
+
+        Raises:
+            OSError: Si el archivo no existe.
+            ValueError: Si el archivo no es un archivo de teselas válido.
+        """
+        self._archivo = open(ruta, "rb")
+        encabezado = self._archivo.read(TAMANO_ENCABEZADO)
+        if len(encabezado) < TAMANO_ENCABEZADO:
+            self.cerrar()
+            raise ValueError("Archivo de teselas incompleto")
+        (magico, version, self.largo_id, _, self.cantidad_teselas, self.cantidad, self.tamano,
+         self.tamano_tesela, self.lat_referencia) = struct.unpack(FORMATO_ENCABEZADO, encabezado)
+        if magico != MAGICO or version != VERSION:
+            self.cerrar()
+            raise ValueError("El archivo no es un archivo de teselas compatible")
+        self._grados_lat, self._grados_lon = _grados(self.tamano_tesela, self.lat_referencia)
+        self._metros_lon = self.tamano_tesela / self._grados_lon  # Metros por grado de longitud.
+
+        # Directorio, con un centinela al final (fin del archivo y total de POIs).
+        n = self.cantidad_teselas
+        self._claves = array("L", [0] * n)
+        self._posiciones = array("L", [0] * (n + 1))
+        self._primeros = array("L", [0] * (n + 1))
+        entrada = bytearray(TAMANO_ENTRADA)
+        for k in range(n):
+            self._archivo.readinto(entrada)
+            columna, fila, posicion, primero = struct.unpack(FORMATO_ENTRADA, entrada)
+            self._claves[k] = clave_tesela(columna, fila)
+            self._posiciones[k] = posicion
+            self._primeros[k] = primero
+        self._posiciones[n] = self.tamano
+        self._primeros[n] = self.cantidad
+        # La tesela más poblada acota la memoria de cada tesela residente.
+        self.max_por_tesela = 0
+        for k in range(n):
+            self.max_por_tesela = max(self.max_por_tesela,
+                                      self._primeros[k + 1] - self._primeros[k])
+        self._inicio_ids = TAMANO_ENCABEZADO + TAMANO_ENTRADA * n
+        self._entrada_id = bytearray(self.largo_id + 4)  # Se reutiliza en cada lectura.
+
+        self.max_residentes = max_residentes
+        self.anticipacion = anticipacion
+        self.margen = margen
+        self._residentes = {}   # número de tesela -> Tesela
+        self._reloj = 0
+        self._lat_previa = None
+        self._lon_previa = None
+        self._direccion = None  # Vector unitario (este, norte) del movimiento.
+        self.ids = Columna(self, "ids")
+        self.nombres = Columna(self, "nombres")
+        self.lats = Columna(self, "lats")
+        self.lons = Columna(self, "lons")
+        self.aciertos = 0       # Accesos a teselas residentes.
+        self.cargas = 0         # Teselas leídas de la flash.
+        self.precargas = 0      # De ellas, leídas por 'precargar'.
+        self.desalojos = 0
+        self.lecturas_ids = 0   # Lecturas del índice de ids.
+
+    def __len__(self):
+        return self.cantidad
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.cerrar()
+
+    def cerrar(self):
+        self._archivo.close()
+
+    # --- TESELAS ---
+
+    def _numero(self, columna, fila):
+        """Número de la tesela en el directorio, o -1 si está vacía."""
+        clave = clave_tesela(columna, fila)
+        claves = self._claves
+        bajo, alto = 0, len(claves) - 1
+        while bajo <= alto:
+            medio = (bajo + alto) // 2
+            actual = claves[medio]
+            if actual == clave:
+                return medio
+            if actual < clave:
+                bajo = medio + 1
+            else:
+                alto = medio - 1
+        return -1
+
+    def _tesela(self, numero):
+        """Retorna una tesela, leyéndola de la flash si no está residente."""
+        self._reloj += 1
+        tesela = self._residentes.get(numero)
+        if tesela is None:
+            tesela = self._cargar(numero)
+        else:
+            self.aciertos += 1
+        tesela.uso = self._reloj
+        return tesela
+
+    def _cargar(self, numero):
+        """Lee una tesela de la flash y desaloja la menos usada si no hay lugar."""
+        if len(self._residentes) >= self.max_residentes:
+            vieja = None
+            for tesela in self._residentes.values():
+                if vieja is None or tesela.uso < vieja.uso:
+                    vieja = tesela
+            del self._residentes[vieja.numero]
+            self.desalojos += 1
+        primero = self._primeros[numero]
+        tesela = Tesela(numero, primero)
+        self._archivo.seek(self._posiciones[numero])
+        datos = self._archivo.read(self._posiciones[numero + 1] - self._posiciones[numero])
+        p = 0
+        for _ in range(self._primeros[numero + 1] - primero):
+            lat, lon, largo_id, largo_nombre = struct.unpack_from(FORMATO_POI, datos, p)
+            p += TAMANO_POI
+            tesela.ids.append(str(datos[p:p + largo_id], "utf-8"))
+            p += largo_id
+            tesela.nombres.append(str(datos[p:p + largo_nombre], "utf-8"))
+            p += largo_nombre
+            tesela.lats.append(lat / ESCALA)
+            tesela.lons.append(lon / ESCALA)
+        self._residentes[numero] = tesela
+        self.cargas += 1
+        return tesela
+
+    def tesela_de(self, i):
+        """
+        Tesela que contiene el POI de índice global 'i'.
+
+        Raises:
+            IndexError: Si el índice está fuera de rango.
+        """
+        if not 0 <= i < self.cantidad:
+            raise IndexError("Índice de POI fuera de rango")
+        primeros = self._primeros
+        bajo, alto = 0, self.cantidad_teselas - 1
+        while bajo < alto:
+            medio = (bajo + alto + 1) // 2
+            if primeros[medio] <= i:
+                bajo = medio
+            else:
+                alto = medio - 1
+        return self._tesela(bajo)
+
+    def residentes(self):
+        """Cantidad de teselas en memoria."""
+        return len(self._residentes)
+
+    def _asegurar(self, lat, lon, radio_metros, maximo):
+        """Carga las teselas que cubren un radio; retorna cuántas leyó (a lo sumo 'maximo')."""
+        cargadas = 0
+        dlat = radio_metros / METROS_POR_GRADO_LAT
+        dlon = radio_metros / self._metros_lon
+        for columna in range(int(math.floor((lon - dlon) / self._grados_lon)),
+                             int(math.floor((lon + dlon) / self._grados_lon)) + 1):
+            for fila in range(int(math.floor((lat - dlat) / self._grados_lat)),
+                              int(math.floor((lat + dlat) / self._grados_lat)) + 1):
+                numero = self._numero(columna, fila)
+                if numero < 0:
+                    continue
+                if numero not in self._residentes:
+                    if cargadas >= maximo:
+                        continue
+                    cargadas += 1
+                self._tesela(numero)
+        return cargadas
+
+    def precargar(self, lat, lon, max_cargas=MAX_CARGAS_PRECARGA):
+        """
+        Lee por adelantado las teselas cercanas y las que siguen en la dirección del movimiento.
+
+        La dirección sale de las ubicaciones de las llamadas anteriores; se
+        actualiza cuando el desplazamiento pasa de unos metros, así el ruido
+        del GPS estando quieto no la cambia.
+
+        Args:
+            lat (float): Latitud actual.
+            lon (float): Longitud actual.
+            max_cargas (int): Teselas que se leen como máximo en esta llamada.
+
+        Returns:
+            int: Teselas leídas de la flash.
+        """
+        if self._lat_previa is None:
+            self._lat_previa, self._lon_previa = lat, lon
+        else:
+            este = (lon - self._lon_previa) * self._metros_lon
+            norte = (lat - self._lat_previa) * METROS_POR_GRADO_LAT
+            avance = math.sqrt(este * este + norte * norte)
+            if avance >= MOVIMIENTO_MINIMO_METROS:
+                self._direccion = (este / avance, norte / avance)
+                self._lat_previa, self._lon_previa = lat, lon
+        cargadas = self._asegurar(lat, lon, self.margen, max_cargas)
+        if self._direccion is not None and cargadas < max_cargas:
+            este, norte = self._direccion
+            cargadas += self._asegurar(
+                lat + norte * self.anticipacion / METROS_POR_GRADO_LAT,
+                lon + este * self.anticipacion / self._metros_lon,
+                self.margen, max_cargas - cargadas)
+        self.precargas += cargadas
+        return cargadas
+
+    # --- BÚSQUEDAS POR ID ---
+
+    def posicion(self, poi_id):
+        """Índice global del POI, o None si no existe."""
+        for tesela in self._residentes.values():
+            if poi_id in tesela.ids:
+                return tesela.primero + tesela.ids.index(poi_id)
+        clave = poi_id.encode("utf-8")
+        largo = self.largo_id
+        if len(clave) > largo:
+            return None
+        clave += bytes(largo - len(clave))
+        entrada = self._entrada_id
+        bajo, alto = 0, self.cantidad - 1
+        while bajo <= alto:
+            medio = (bajo + alto) // 2
+            self._archivo.seek(self._inicio_ids + medio * len(entrada))
+            self._archivo.readinto(entrada)
+            self.lecturas_ids += 1
+            actual = bytes(entrada[:largo])
+            if actual == clave:
+                return struct.unpack_from("<I", entrada, largo)[0]
+            if actual < clave:
+                bajo = medio + 1
+            else:
+                alto = medio - 1
+        return None
+
+    def poi(self, poi_id):
+        """
+        Retorna los datos de un POI por su id.
+
+        Returns:
+            dict: Diccionario con 'id', 'nombre', 'lat' y 'lon', o None si no existe.
+        """
+        i = self.posicion(poi_id)
+        if i is None:
+            return None
+        tesela = self.tesela_de(i)
+        k = i - tesela.primero
+        return {"id": tesela.ids[k], "nombre": tesela.nombres[k],
+                "lat": tesela.lats[k], "lon": tesela.lons[k]}
+
+    def nombre(self, poi_id):
+        """Nombre de un POI sin armar su diccionario, o None si no existe."""
+        i = self.posicion(poi_id)
+        if i is None:
+            return None
+        tesela = self.tesela_de(i)
+        return tesela.nombres[i - tesela.primero]
+
+    # --- BÚSQUEDAS POR CERCANÍA ---
+
+    def buscar(self, lat, lon, radio_metros, indices, distancias):
+        """
+        Busca los POIs dentro de un radio (ver IndicePOI.buscar).
+
+        Con las teselas residentes no asigna memoria; una tesela que falta se
+        lee de la flash.
+
+        Args:
+            lat (float): Latitud de la ubicación actual.
+            lon (float): Longitud de la ubicación actual.
+            radio_metros (float): Radio de búsqueda en metros.
+            indices (array): Buffer 'L' donde se escriben los índices globales.
+            distancias (array): Buffer 'd' (del mismo tamaño) para sus distancias.
+
+        Returns:
+            int: Cantidad de POIs encontrados (sin orden), como máximo el
+                tamaño de los buffers; si hay más, quedan los más cercanos.
+        """
+        dlat = radio_metros / METROS_POR_GRADO_LAT
+        dlon = radio_metros / self._metros_lon
+        encontrados = 0
+        for columna in range(int(math.floor((lon - dlon) / self._grados_lon)),
+                             int(math.floor((lon + dlon) / self._grados_lon)) + 1):
+            for fila in range(int(math.floor((lat - dlat) / self._grados_lat)),
+                              int(math.floor((lat + dlat) / self._grados_lat)) + 1):
+                numero = self._numero(columna, fila)
+                if numero < 0:
+                    continue
+                tesela = self._tesela(numero)
+                lats, lons, primero = tesela.lats, tesela.lons, tesela.primero
+                for k in range(len(lats)):
+                    distancia = haversine_distance(lat, lon, lats[k], lons[k])
+                    if distancia <= radio_metros:
+                        encontrados = guardar_cercano(indices, distancias, encontrados,
+                                                      primero + k, distancia)
+        return encontrados
+
+    def distancia_minima(self, lat, lon, radio_metros, excluir=None):
+        """
+        Distancia al POI más cercano dentro de un radio (ver IndicePOI.distancia_minima).
+
+        Args:
+            lat (float): Latitud de la ubicación actual.
+            lon (float): Longitud de la ubicación actual.
+            radio_metros (float): Radio de búsqueda en metros.
+            excluir (dict | set): Índices globales de POIs que no se consideran.
+
+        Returns:
+            float: Distancia en metros, o None si no hay POIs en el radio.
+        """
+        dlat = radio_metros / METROS_POR_GRADO_LAT
+        dlon = radio_metros / self._metros_lon
+        minima = radio_metros
+        hay = False
+        for columna in range(int(math.floor((lon - dlon) / self._grados_lon)),
+                             int(math.floor((lon + dlon) / self._grados_lon)) + 1):
+            for fila in range(int(math.floor((lat - dlat) / self._grados_lat)),
+                              int(math.floor((lat + dlat) / self._grados_lat)) + 1):
+                numero = self._numero(columna, fila)
+                if numero < 0:
+                    continue
+                tesela = self._tesela(numero)
+                lats, lons, primero = tesela.lats, tesela.lons, tesela.primero
+                for k in range(len(lats)):
+                    if excluir is not None and primero + k in excluir:
+                        continue
+                    distancia = haversine_distance(lat, lon, lats[k], lons[k])
+                    if distancia <= minima:
+                        minima = distancia
+                        hay = True
+        return minima if hay else None
+
+    def en_radio(self, lat, lon, radio_metros):
+        """
+        Busca todos los POIs dentro de un radio.
+
+        Returns:
+            list: Tuplas (id, distancia) ordenadas de la más cercana a la más lejana.
+        """
+        encontrados = []
+        dlat = radio_metros / METROS_POR_GRADO_LAT
+        dlon = radio_metros / self._metros_lon
+        for columna in range(int(math.floor((lon - dlon) / self._grados_lon)),
+                             int(math.floor((lon + dlon) / self._grados_lon)) + 1):
+            for fila in range(int(math.floor((lat - dlat) / self._grados_lat)),
+                              int(math.floor((lat + dlat) / self._grados_lat)) + 1):
+                numero = self._numero(columna, fila)
+                if numero < 0:
+                    continue
+                tesela = self._tesela(numero)
+                for k in range(len(tesela.ids)):
+                    distancia = haversine_distance(lat, lon, tesela.lats[k], tesela.lons[k])
+                    if distancia <= radio_metros:
+                        encontrados.append((tesela.ids[k], distancia))
+        encontrados.sort(key=lambda par: par[1])
+        return encontrados
+
+    def mas_cercano(self, lat, lon, radio_metros):
+        """
+        Busca el POI más cercano dentro de un radio.
+
+        Returns:
+            tuple: (id, distancia) del POI más cercano, o None si no hay ninguno.
+        """
+        encontrados = self.en_radio(lat, lon, radio_metros)
+        return encontrados[0] if encontrados else None
+
+    def recorrer(self):
+        """
+        Genera todos los POIs (id, nombre, lat, lon) en el orden de sus índices.
+
+        Lee las teselas una por una sin pasar por el LRU (para el host).
+        """
+        for numero in range(self.cantidad_teselas):
+            residente = self._residentes.get(numero)
+            tesela = residente if residente is not None else self._cargar_aparte(numero)
+            for k in range(len(tesela.ids)):
+                yield tesela.ids[k], tesela.nombres[k], tesela.lats[k], tesela.lons[k]
+
+    def _cargar_aparte(self, numero):
+        """Lee una tesela sin dejarla residente."""
+        residentes, cargas = self._residentes, self.cargas
+        self._residentes = {}
+        try:
+            return self._cargar(numero)
+        finally:
+            self._residentes, self.cargas = residentes, cargas
+
+    def estadisticas(self):
+        """
+        Returns:
+            dict: Teselas residentes y totales, POIs, POIs de la tesela más
+                poblada, aciertos, cargas (y cuántas fueron precargas),
+                desalojos y lecturas del índice de ids.
+        """
+        return {"residentes": len(self._residentes), "teselas": self.cantidad_teselas,
+                "pois": self.cantidad, "max_por_tesela": self.max_por_tesela,
+                "aciertos": self.aciertos, "cargas": self.cargas,
+                "precargas": self.precargas, "desalojos": self.desalojos,
+                "lecturas_ids": self.lecturas_ids}
+
+
+def abrir_teselas(ruta, max_residentes=MAX_RESIDENTES):
+    """
+    Abre un archivo de teselas si existe y es válido.
+
+    Returns:
+        IndiceTeselas: El índice, o None (se usa el CSV completo, pois.csv).
+    """
+    try:
+        return IndiceTeselas(ruta, max_residentes)
+    except (OSError, ValueError) as e:
+        print(f"Teselas de POIs no disponibles ({ruta}): {e}")
+        return None
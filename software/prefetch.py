@@ -0,0 +1,119 @@
+# prefetch.py
+# Módulo para la precarga (prefetch) de descripciones de POIs.
+# Toma los próximos POIs del recorrido planeado (tour_planner.py) y consulta
+# su descripción antes de que el usuario llegue. Al llegar, la respuesta ya
+# está en la caché.
+
+from collections import OrderedDict
+
+# --- CONFIGURACIÓN ---
+PREFETCH_MAX_POIS = 2             # POIs a precargar por adelantado.
+PREFETCH_MAX_REGISTRADOS = 32     # POIs recordados sin 'disponible' (como CACHE_MAX_ENTRADAS).
+
+
+class Precargador:
+    """
+    Decide qué POIs precargar y consulta su descripción por adelantado.
+
+    La consulta se delega en 'consultar(poi_id)', que debe usar la misma
+    caché que el bucle principal para que la respuesta quede disponible.
+    Para saber si un POI ya está precargado conviene indicar 'disponible',
+    que revisa la caché: si la caché expulsó la respuesta, el POI se vuelve
+    a precargar. Sin 'disponible' se recuerdan los últimos POIs precargados.
+    """
+
+    def __init__(self, indice, consultar=None, max_pois=PREFETCH_MAX_POIS, disponible=None,
+                 max_registrados=PREFETCH_MAX_REGISTRADOS):
+        """
+        Args:
+            indice (IndicePOI): Índice espacial de los POIs.
+            consultar (callable): Función que recibe un id de POI, obtiene su
+                descripción, la deja en la caché y retorna True si lo logró.
+                Solo la usa 'precargar'; puede omitirse si la consulta la hace
+                otra tarea con 'filtrar_nuevos' y 'marcar_precargado'.
+            max_pois (int): Cantidad de POIs a predecir.
+            disponible (callable): Recibe un id de POI y retorna True si su
+                descripción ya está en la caché (o en el paquete de contenido).
+            max_registrados (int): POIs precargados que se recuerdan cuando
+                no se indica 'disponible'; se olvidan los más antiguos.
+        """
+        self.indice = indice
+        self.consultar = consultar
+        self.max_pois = max_pois
+        self.disponible = disponible
+        self.max_registrados = max_registrados
+        self._precargados = OrderedDict()  # poi_id -> None, del más antiguo al más reciente.
+        self.consultas = 0
+
+    def predecir_por_ruta(self, ruta, posicion):
+        """
+        Predice los próximos POIs según el recorrido planeado.
+
+        Args:
+            ruta (list): Lista de ids de POI en orden de visita.
+            posicion (int): Índice del POI actual dentro de la ruta.
+
+        Returns:
+            list: Ids de los próximos POIs.
+        """
+        return ruta[posicion + 1:posicion + 1 + self.max_pois]
+
+    def filtrar_nuevos(self, poi_ids):
+        """Retorna los ids que aún no se han precargado."""
+        return [poi_id for poi_id in poi_ids if not self.precargado(poi_id)]
+
+    def precargado(self, poi_id):
+        """True si la descripción del POI ya está disponible."""
+        if self.disponible is not None:
+            return self.disponible(poi_id)
+        return poi_id in self._precargados
+
+    def filtrar_lote(self, poi_ids):
+        """
+        Decide qué POIs pedir en una consulta por lotes (ver llm_batch.py).
+
+        Para que cada llamada traiga varios POIs, solo se pide un lote cuando
+        el próximo POI aún no está precargado o cuando falta al menos la
+        mitad de los predichos; si no, se espera a que falten más.
+
+        Returns:
+            list: Ids a pedir en un lote, o una lista vacía.
+        """
+        nuevos = self.filtrar_nuevos(poi_ids)
+        if not nuevos:
+            return []
+        if poi_ids[0] in nuevos or 2 * len(nuevos) >= len(poi_ids):
+            return nuevos
+        return []
+
+    def marcar_precargado(self, poi_id):
+        """Registra un POI cuya descripción ya quedó en la caché."""
+        self.consultas += 1
+        if self.disponible is not None:
+            return
+        precargados = self._precargados
+        if poi_id in precargados:
+            precargados.pop(poi_id)
+        precargados[poi_id] = None
+        while len(precargados) > self.max_registrados:
+            precargados.pop(next(iter(precargados)))
+
+    def precargar(self, poi_ids):
+        """
+        Consulta la descripción de los POIs que aún no se han precargado.
+
+        Returns:
+            int: Cantidad de POIs consultados en esta llamada.
+        """
+        nuevos = self.filtrar_nuevos(poi_ids)
+        for poi_id in nuevos:
+            if self.consultar(poi_id):
+                self.marcar_precargado(poi_id)
+        return len(nuevos)
+
+    def olvidar(self, poi_id=None):
+        """Permite volver a precargar un POI, o todos si no se indica ninguno."""
+        if poi_id is None:
+            self._precargados.clear()
+        else:
+            self._precargados.pop(poi_id, None)
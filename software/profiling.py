@@ -0,0 +1,335 @@
+# profiling.py
+# Módulo de instrumentación para medir dónde se va el tiempo en el dispositivo.
+# Ofrece tramos ('with perfil.medir("gps"):') y contadores
+# ('perfil.contar("api_solicitudes")') medidos con 'time.monotonic_ns'.
+#
+# Cada tramo terminado se guarda en un buffer circular preasignado (arrays
+# de tamaño fijo), así medir no crea objetos en el heap ni fragmenta la
+# memoria. Además se acumulan, por nombre, la cantidad, el total y el máximo.
+# Desactivado, 'medir' retorna siempre el mismo objeto que no hace nada y
+# 'contar' retorna de inmediato.
+#
+# El resumen se vuelca por la consola serial o a un archivo con
+# 'perfil.volcar()' o con un comando escrito en la consola (ver
+# 'atender_comando').
+#
+# Con el perfil activo también se registra la memoria (MonitorMemoria): los
+# bytes que asigna cada iteración del bucle y las recolecciones del gc.
+
+import gc
+import time
+from array import array
+
+# --- CONFIGURACIÓN ---
+CAPACIDAD = 128                  # Tramos guardados en el buffer circular.
+MAX_NOMBRES = 24                 # Nombres de tramos distintos.
+MAX_MICROSEGUNDOS = 0xFFFFFFFF   # Límite de una duración en el buffer (u32).
+ARCHIVO_VOLCADO = "/perfil.txt"  # Requiere que boot.py habilite la escritura.
+
+
+class _TramoNulo:
+    """Tramo que no mide nada (instrumentación desactivada)."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+_NULO = _TramoNulo()
+
+
+class Tramo:
+    """Mide una sección de código; se reutiliza en cada 'with'."""
+
+    def __init__(self, perfil, indice):
+        self._perfil = perfil
+        self._indice = indice
+        self._inicio = 0
+
+    def __enter__(self):
+        self._inicio = self._perfil.reloj_ns()
+        return self
+
+    def __exit__(self, *args):
+        self._perfil.registrar(self._indice, self._perfil.reloj_ns() - self._inicio)
+        return False
+
+
+class MonitorMemoria:
+    """
+    Estadísticas del recolector de basura (gc) por iteración del bucle.
+
+    'muestrear()' se llama una vez por iteración y compara 'gc.mem_alloc()'
+    con la muestra anterior: la diferencia son los bytes que asignaron las
+    tareas en esa iteración. Si la memoria asignada bajó, el recolector
+    corrió en el medio; se cuenta la recolección y esa iteración no se mide.
+    En CPython no existe 'gc.mem_alloc' y el monitor queda no disponible.
+
+    Args:
+        modulo_gc (module): Módulo con 'mem_alloc' y 'mem_free' (por defecto 'gc').
+    """
+
+    def __init__(self, modulo_gc=gc):
+        self._gc = modulo_gc
+        self.disponible = hasattr(modulo_gc, "mem_alloc") and hasattr(modulo_gc, "mem_free")
+        self.reiniciar()
+
+    def reiniciar(self):
+        self.iteraciones = 0       # Iteraciones medidas (sin recolección en el medio).
+        self.recolecciones = 0
+        self.bytes_total = 0
+        self.bytes_max = 0
+        self.libre_min = -1        # Menor memoria libre vista (-1: sin muestras).
+        self._anterior = -1
+
+    def muestrear(self):
+        """Registra una iteración del bucle."""
+        if not self.disponible:
+            return
+        asignada = self._gc.mem_alloc()
+        libre = self._gc.mem_free()
+        if self._anterior >= 0:
+            diferencia = asignada - self._anterior
+            if diferencia < 0:
+                self.recolecciones += 1
+            else:
+                self.iteraciones += 1
+                self.bytes_total += diferencia
+                if diferencia > self.bytes_max:
+                    self.bytes_max = diferencia
+        self._anterior = asignada
+        if self.libre_min < 0 or libre < self.libre_min:
+            self.libre_min = libre
+
+    def resumen(self):
+        """
+        Returns:
+            dict: 'iteraciones', 'recolecciones', 'bytes_promedio' y
+                'bytes_max' por iteración, y 'libre_min' (bytes).
+        """
+        return {
+            "iteraciones": self.iteraciones,
+            "recolecciones": self.recolecciones,
+            "bytes_promedio": self.bytes_total / self.iteraciones if self.iteraciones else 0,
+            "bytes_max": self.bytes_max,
+            "libre_min": self.libre_min,
+        }
+
+    def texto(self):
+        """Resumen en texto para la consola serial."""
+        if not self.disponible:
+            return "Memoria: gc.mem_alloc no está disponible."
+        d = self.resumen()
+        return (f"Memoria: {d['bytes_promedio']:.0f} B/iteración (máx. {d['bytes_max']}), "
+                f"{d['recolecciones']} recolecciones en {d['iteraciones'] + d['recolecciones']} "
+                f"iteraciones, mínimo libre {d['libre_min']} B")
+
+
+class Perfil:
+    """
+    Tramos y contadores de la instrumentación.
+
+    Args:
+        capacidad (int): Tramos guardados en el buffer circular.
+        max_nombres (int): Nombres de tramos distintos; los que pasen del
+            límite no se miden.
+        activo (bool): Si es False, medir no tiene costo.
+        reloj_ns (callable): Fuente de tiempo en nanosegundos.
+    """
+
+    def __init__(self, capacidad=CAPACIDAD, max_nombres=MAX_NOMBRES, activo=False,
+                 reloj_ns=time.monotonic_ns):
+        self.activo = activo
+        self.reloj_ns = reloj_ns
+        self.capacidad = capacidad
+        self.max_nombres = max_nombres
+        # Buffer circular: nombre (índice) y duración en microsegundos.
+        self._evento_nombre = array("B", [0] * capacidad)
+        self._evento_us = array("L", [0] * capacidad)
+        self._siguiente = 0
+        self.eventos = 0   # Tramos registrados desde el último reinicio.
+        # Acumulados por nombre.
+        self._cantidad = array("L", [0] * max_nombres)
+        self._total_us = [0] * max_nombres
+        self._max_us = array("L", [0] * max_nombres)
+        self._nombres = []
+        self._tramos = {}
+        self.contadores = {}
+        self.memoria = MonitorMemoria()
+
+    def medir(self, nombre):
+        """
+        Retorna el tramo para medir una sección con 'with'.
+
+        El tramo de cada nombre se crea la primera vez y luego se reutiliza.
+        """
+        if not self.activo:
+            return _NULO
+        tramo = self._tramos.get(nombre)
+        if tramo is None:
+            if len(self._nombres) >= self.max_nombres:
+                return _NULO
+            tramo = Tramo(self, len(self._nombres))
+            self._nombres.append(nombre)
+            self._tramos[nombre] = tramo
+        return tramo
+
+    def contar(self, nombre, cantidad=1):
+        """Suma 'cantidad' al contador 'nombre'."""
+        if not self.activo:
+            return
+        self.contadores[nombre] = self.contadores.get(nombre, 0) + cantidad
+
+    def muestrear_memoria(self):
+        """Registra la memoria de una iteración del bucle (solo con el perfil activo)."""
+        if self.activo:
+            self.memoria.muestrear()
+
+    def registrar(self, indice, nanosegundos):
+        """Guarda la duración de un tramo terminado."""
+        microsegundos = nanosegundos // 1000
+        if microsegundos > MAX_MICROSEGUNDOS:
+            microsegundos = MAX_MICROSEGUNDOS
+        posicion = self._siguiente
+        self._evento_nombre[posicion] = indice
+        self._evento_us[posicion] = microsegundos
+        self._siguiente = (posicion + 1) % self.capacidad
+        self.eventos += 1
+        self._cantidad[indice] += 1
+        self._total_us[indice] += microsegundos
+        if microsegundos > self._max_us[indice]:
+            self._max_us[indice] = microsegundos
+
+    def reiniciar(self):
+        """Borra los tramos y contadores medidos (los nombres se conservan)."""
+        self._siguiente = 0
+        self.eventos = 0
+        for i in range(self.max_nombres):
+            self._cantidad[i] = 0
+            self._total_us[i] = 0
+            self._max_us[i] = 0
+        self.contadores = {}
+        self.memoria.reiniciar()
+
+    def recientes(self, nombre):
+        """
+        Returns:
+            list: Duraciones en microsegundos de los tramos 'nombre' que
+                siguen en el buffer circular, del más antiguo al más reciente.
+        """
+        if nombre not in self._tramos:
+            return []
+        indice = self._tramos[nombre]._indice
+        guardados = min(self.eventos, self.capacidad)
+        inicio = (self._siguiente - guardados) % self.capacidad
+        duraciones = []
+        for i in range(guardados):
+            posicion = (inicio + i) % self.capacidad
+            if self._evento_nombre[posicion] == indice:
+                duraciones.append(self._evento_us[posicion])
+        return duraciones
+
+    def resumen(self):
+        """
+        Returns:
+            dict: Por nombre de tramo, 'cantidad', 'total_ms', 'promedio_ms',
+                'max_ms' y 'p95_ms' (de los tramos que siguen en el buffer).
+        """
+        datos = {}
+        for indice, nombre in enumerate(self._nombres):
+            cantidad = self._cantidad[indice]
+            if not cantidad:
+                continue
+            recientes = sorted(self.recientes(nombre))
+            p95 = recientes[min(len(recientes) - 1, len(recientes) * 95 // 100)] if recientes else 0
+            total = self._total_us[indice]
+            datos[nombre] = {
+                "cantidad": cantidad,
+                "total_ms": total / 1000,
+                "promedio_ms": total / cantidad / 1000,
+                "max_ms": self._max_us[indice] / 1000,
+                "p95_ms": p95 / 1000,
+            }
+        return datos
+
+    def texto_resumen(self):
+        """Resumen en texto, con los tramos ordenados por tiempo total."""
+        resumen = self.resumen()
+        lineas = [f"Perfil: {self.eventos} tramos (últimos {min(self.eventos, self.capacidad)} en buffer)",
+                  "tramo                cant.   total ms  prom. ms   máx. ms   p95 ms"]
+        for nombre in sorted(resumen, key=lambda n: -resumen[n]["total_ms"]):
+            d = resumen[nombre]
+            lineas.append(f"{nombre:<20}{d['cantidad']:>6}{d['total_ms']:>11.1f}"
+                          f"{d['promedio_ms']:>10.2f}{d['max_ms']:>10.2f}{d['p95_ms']:>9.2f}")
+        for nombre in sorted(self.contadores):
+            lineas.append(f"contador {nombre}: {self.contadores[nombre]}")
+        if self.memoria.disponible and self.memoria.iteraciones:
+            lineas.append(self.memoria.texto())
+        return "\n".join(lineas)
+
+    def volcar(self, ruta=None):
+        """
+        Escribe el resumen por la consola serial o en un archivo.
+
+        Args:
+            ruta (str): Archivo de destino; None para la consola. Si no se
+                puede escribir (flash de solo lectura), se usa la consola.
+
+        Returns:
+            str: El resumen.
+        """
+        texto = self.texto_resumen()
+        if ruta is not None:
+            try:
+                with open(ruta, "w") as archivo:
+                    archivo.write(texto + "\n")
+                print(f"Perfil guardado en {ruta}.")
+                return texto
+            except OSError as e:
+                print(f"No se pudo escribir {ruta}: {e}")
+        print(texto)
+        return texto
+
+
+# Instancia compartida por los módulos instrumentados (desactivada).
+perfil = Perfil()
+
+
+def atender_comando(linea, instancia=None, ruta=ARCHIVO_VOLCADO):
+    """
+    Atiende un comando de la consola serial sobre la instrumentación.
+
+    Comandos: 'perfil' (vuelca el resumen), 'perfil archivo' (lo guarda en
+    'ruta'), 'perfil memoria' (estadísticas del gc), 'perfil on',
+    'perfil off' y 'perfil reset'.
+
+    Returns:
+        bool: True si la línea era un comando de perfil.
+    """
+    if instancia is None:
+        instancia = perfil
+    partes = linea.strip().lower().split()
+    if not partes or partes[0] != "perfil":
+        return False
+    orden = partes[1] if len(partes) > 1 else ""
+    if orden == "":
+        instancia.volcar()
+    elif orden == "archivo":
+        instancia.volcar(ruta)
+    elif orden == "memoria":
+        print(instancia.memoria.texto())
+    elif orden == "on":
+        instancia.activo = True
+        print("Perfil activado.")
+    elif orden == "off":
+        instancia.activo = False
+        print("Perfil desactivado.")
+    elif orden == "reset":
+        instancia.reiniciar()
+        print("Perfil reiniciado.")
+    else:
+        print("Comandos: perfil, perfil archivo, perfil memoria, perfil on, perfil off, "
+              "perfil reset")
+    return True
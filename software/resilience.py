@@ -0,0 +1,290 @@
+# resilience.py
+# Módulo con la política de reintentos de las llamadas a la API de Gemini.
+# Reúne tres mecanismos:
+#   - Espera exponencial con jitter entre reintentos, respetando el
+#     encabezado 'Retry-After' cuando la API lo envía (errores 429 y 503).
+#   - Limitador de cubeta de tokens ajustado a la cuota de la API, en lugar
+#     de una pausa fija después de cada consulta.
+#   - Cortacircuitos: tras varias fallas seguidas deja de llamar a la API por
+#     un tiempo y las consultas fallan de inmediato (se usa la caché o un
+#     texto sin conexión), en vez de esperar todos los reintentos.
+
+import time
+import random
+
+# --- CONFIGURACIÓN ---
+INTENTOS_MAXIMOS = 3
+ESPERA_BASE = 1.0              # Segundos de la primera espera entre reintentos.
+ESPERA_MAXIMA = 30.0           # Tope de la espera; un 'Retry-After' mayor abre el circuito.
+CUOTA_POR_MINUTO = 15          # Solicitudes por minuto permitidas por la API.
+RAFAGA = 3                     # Solicitudes seguidas permitidas antes de limitar.
+FALLAS_PARA_ABRIR = 3          # Fallas seguidas que abren el circuito.
+TIEMPO_ABIERTO = 30.0          # Segundos que el circuito se mantiene abierto.
+TIEMPO_ABIERTO_MAXIMO = 300.0  # Tope al duplicar el tiempo tras una prueba fallida.
+TIEMPO_PRUEBA = 30.0           # Si la llamada de prueba no informa su resultado, se permite otra.
+
+# Códigos de estado que vale la pena reintentar. El resto (400, 401, 403,
+# 404...) no se arregla reintentando.
+CODIGOS_REINTENTABLES = (408, 429, 500, 502, 503, 504)
+
+# Estados del cortacircuitos.
+CERRADO = "cerrado"
+ABIERTO = "abierto"
+SEMIABIERTO = "semiabierto"
+
+
+def es_reintentable(codigo):
+    """True si una respuesta con este código de estado se puede reintentar."""
+    return codigo in CODIGOS_REINTENTABLES
+
+
+def leer_retry_after(headers):
+    """
+    Lee el encabezado 'Retry-After' (en segundos) de una respuesta.
+
+    Args:
+        headers (dict): Encabezados de la respuesta (sin importar mayúsculas).
+
+    Returns:
+        float: Segundos a esperar, o None si no viene o no es un número.
+    """
+    if not headers:
+        return None
+    for nombre, valor in headers.items():
+        if nombre.lower() == "retry-after":
+            try:
+                return max(float(valor), 0.0)
+            except ValueError:
+                return None  # Formato de fecha HTTP: no se soporta.
+    return None
+
+
+class EsperaExponencial:
+    """Espera exponencial con jitter completo ('full jitter')."""
+
+    def __init__(self, base=ESPERA_BASE, maxima=ESPERA_MAXIMA, aleatorio=random.random):
+        self.base = base
+        self.maxima = maxima
+        self.aleatorio = aleatorio
+
+    def espera(self, intento, retry_after=None):
+        """
+        Calcula la espera antes de un reintento.
+
+        Args:
+            intento (int): Número de reintento, empezando en 0.
+            retry_after (float): Segundos pedidos por el servidor, si los hay.
+
+        Returns:
+            float: Segundos a esperar.
+        """
+        if retry_after is not None:
+            return min(retry_after, self.maxima)
+        # Un valor aleatorio entre 0 y el tope evita que varios clientes
+        # reintenten a la vez.
+        return self.aleatorio() * min(self.maxima, self.base * (2 ** intento))
+
+
+class LimitadorTokens:
+    """
+    Limitador de cubeta de tokens.
+
+    La cubeta se llena a 'tasa' tokens por segundo hasta 'capacidad'. Cada
+    solicitud a la API consume un token; si no hay, se espera.
+    """
+
+    def __init__(self, por_minuto=CUOTA_POR_MINUTO, capacidad=RAFAGA, reloj=time.monotonic):
+        """
+        Args:
+            por_minuto (float): Solicitudes por minuto (la cuota de la API).
+            capacidad (int): Tokens máximos acumulados (ráfaga permitida).
+            reloj (callable): Fuente de tiempo en segundos.
+        """
+        self.tasa = por_minuto / 60.0
+        self.capacidad = capacidad
+        self.reloj = reloj
+        self.tokens = float(capacidad)
+        self._ultimo = reloj()
+
+    def _rellenar(self):
+        ahora = self.reloj()
+        self.tokens = min(self.capacidad, self.tokens + (ahora - self._ultimo) * self.tasa)
+        self._ultimo = ahora
+
+    def tomar(self):
+        """
+        Intenta tomar un token.
+
+        Returns:
+            float: 0 si se tomó el token; si no, los segundos que faltan para que haya uno.
+        """
+        self._rellenar()
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / self.tasa
+
+    def disponible(self):
+        """True si hay un token libre ahora (no lo toma)."""
+        self._rellenar()
+        return self.tokens >= 1.0
+
+
+class CortaCircuitos:
+    """
+    Cortacircuitos para la API.
+
+    CERRADO: las llamadas pasan. Tras 'umbral' fallas seguidas pasa a
+    ABIERTO: las llamadas fallan de inmediato durante 'tiempo_abierto'.
+    Luego pasa a SEMIABIERTO y deja pasar una sola llamada de prueba; las
+    demás se rechazan hasta que la prueba informe su resultado: si funciona
+    se cierra; si falla se abre de nuevo por el doble de tiempo. Una prueba
+    que no informa nada en 'tiempo_prueba' (por ejemplo, una consulta
+    cancelada) deja pasar otra.
+    """
+
+    def __init__(self, umbral=FALLAS_PARA_ABRIR, tiempo_abierto=TIEMPO_ABIERTO,
+                 tiempo_maximo=TIEMPO_ABIERTO_MAXIMO, tiempo_prueba=TIEMPO_PRUEBA,
+                 reloj=time.monotonic):
+        self.umbral = umbral
+        self.tiempo_abierto = tiempo_abierto
+        self.tiempo_maximo = tiempo_maximo
+        self.tiempo_prueba = tiempo_prueba
+        self.reloj = reloj
+        self.estado = CERRADO
+        self.fallas = 0
+        self.aperturas = 0
+        self._hasta = 0.0
+        self._duracion = tiempo_abierto
+
+    def permitir(self):
+        """True si se puede llamar a la API ahora (en SEMIABIERTO, solo la prueba)."""
+        if self.estado == CERRADO:
+            return True
+        ahora = self.reloj()
+        if ahora < self._hasta:
+            return False
+        # ABIERTO vencido o prueba sin resultado: esta llamada es la prueba.
+        self.estado = SEMIABIERTO
+        self._hasta = ahora + self.tiempo_prueba
+        return True
+
+    def exito(self):
+        self.estado = CERRADO
+        self.fallas = 0
+        self._duracion = self.tiempo_abierto
+
+    def fallo(self):
+        self.fallas += 1
+        if self.estado == SEMIABIERTO:
+            # La prueba falló: se abre por más tiempo.
+            self.abrir(min(self._duracion * 2, self.tiempo_maximo))
+        elif self.fallas >= self.umbral:
+            self.abrir(self._duracion)
+
+    def abrir(self, segundos):
+        """Abre el circuito por una cantidad de segundos."""
+        self.estado = ABIERTO
+        self._duracion = segundos
+        self._hasta = self.reloj() + segundos
+        self.aperturas += 1
+
+    def restante(self):
+        """Segundos que faltan para volver a probar la API (0 si se puede llamar ya)."""
+        if self.estado == CERRADO:
+            return 0.0
+        return max(self._hasta - self.reloj(), 0.0)
+
+
+class PoliticaLLM:
+    """
+    Política completa de un cliente de la API: reintentos, limitador y cortacircuitos.
+
+    Es compartida por todas las consultas, así el limitador y el
+    cortacircuitos ven todas las llamadas a la API.
+    """
+
+    def __init__(self, intentos=INTENTOS_MAXIMOS, espera=None, limitador=None,
+                 cortacircuitos=None, hay_red=None):
+        """
+        Args:
+            intentos (int): Intentos máximos por consulta.
+            espera (EsperaExponencial): Cálculo de la espera entre reintentos.
+            limitador (LimitadorTokens): Limitador de solicitudes (None: sin límite).
+            cortacircuitos (CortaCircuitos): Cortacircuitos (None: uno nuevo).
+            hay_red (callable): Retorna False si no hay WiFi; la consulta falla sin intentarlo.
+        """
+        self.intentos = intentos
+        self.espera = espera if espera is not None else EsperaExponencial()
+        self.limitador = limitador
+        self.cortacircuitos = cortacircuitos if cortacircuitos is not None else CortaCircuitos()
+        self.hay_red = hay_red
+        self.solicitudes = 0
+        self.rapidas = 0  # Consultas que fallaron de inmediato sin llamar a la API.
+
+    def permitir(self):
+        """True si se puede intentar una llamada (hay red y el circuito lo permite)."""
+        if (self.hay_red is not None and not self.hay_red()) or not self.cortacircuitos.permitir():
+            self.rapidas += 1
+            return False
+        return True
+
+    def disponible(self):
+        """
+        True si una solicitud podría salir ya: hay red, el circuito no está
+        abierto y el limitador tiene un token. No consume el token ni cuenta
+        como un rechazo (ver llm_backends.ConsultaCubierta).
+        """
+        if self.hay_red is not None and not self.hay_red():
+            return False
+        if self.cortacircuitos.restante() > 0:
+            return False
+        return self.limitador is None or self.limitador.disponible()
+
+    def turno(self):
+        """
+        Pide un turno al limitador para hacer una solicitud.
+
+        Returns:
+            float: 0 si se puede hacer ya; si no, los segundos a esperar antes de volver a pedirlo.
+        """
+        if self.limitador is None:
+            espera = 0.0
+        else:
+            espera = self.limitador.tomar()
+        if not espera:
+            self.solicitudes += 1
+        return espera
+
+    def registrar(self, codigo, headers=None, intento=0):
+        """
+        Registra el resultado de una solicitud.
+
+        Args:
+            codigo (int): Código de estado HTTP, o None si hubo una excepción.
+            headers (dict): Encabezados de la respuesta.
+            intento (int): Número de intento de esta solicitud, empezando en 0.
+
+        Returns:
+            float: Segundos a esperar antes de reintentar, o None si no se
+                debe reintentar (éxito, error definitivo, último intento o
+                circuito abierto).
+        """
+        if codigo == 200:
+            self.cortacircuitos.exito()
+            return None
+        if codigo is not None and not es_reintentable(codigo):
+            # La API respondió: el error es de la solicitud (400, 401...) y
+            # no cuenta para abrir el circuito.
+            self.cortacircuitos.exito()
+            return None
+        self.cortacircuitos.fallo()
+        retry_after = leer_retry_after(headers)
+        if retry_after is not None and retry_after > self.espera.maxima:
+            # El servidor pide esperar más de lo razonable: se deja de
+            # llamar a la API durante ese tiempo.
+            self.cortacircuitos.abrir(retry_after)
+            return None
+        if intento + 1 >= self.intentos or self.cortacircuitos.estado == ABIERTO:
+            return None
+        return self.espera.espera(intento, retry_after)
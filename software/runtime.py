@@ -0,0 +1,490 @@
+# runtime.py
+# Módulo con las tareas concurrentes del sistema (asyncio).
+# El bucle principal se divide en tareas cooperativas que comparten un
+# estado común:
+#   - GPS: muestrea la ubicación y detecta la entrada a un POI (geofence.py).
+#     Con un planificador (gps_scheduler.py), el periodo se adapta a la
+#     distancia a la próxima geocerca. Con un recorrido (tour_planner.py),
+#     cada entrada avanza la secuencia de próximos POIs.
+#   - LLM: atiende las consultas pendientes y precarga los próximos POIs.
+#   - LCD: muestra los mensajes página por página (lcd_framebuffer.py). Las
+#     respuestas por streaming se muestran mientras van llegando.
+#   - WiFi: supervisa la conexión y reconecta si se pierde. Cada intento de
+#     conexión ('wifi.radio.connect') bloquea el bucle hasta su timeout
+#     (TIMEOUT_WIFI en connection.py): durante ese tiempo el GPS, las
+#     geocercas y la LCD quedan detenidos.
+#   - Comandos (opcional): atiende la consola serial, por ejemplo para volcar
+#     la instrumentación (profiling.py).
+#   - Telemetría (opcional): vuelca la bitácora (telemetry.py) a la flash en
+#     escrituras grandes, fuera de las demás tareas.
+#   - Teselas (con un IndiceTeselas, poi_tiles.py): lee de la flash las
+#     teselas de POIs en la dirección del movimiento antes de que el GPS
+#     llegue a ellas.
+# Las pausas usan 'await asyncio.sleep', así una consulta en curso o un
+# mensaje largo en la pantalla no detienen el muestreo del GPS.
+#
+# El hardware se recibe como parámetro, por lo que las mismas tareas corren
+# en el microcontrolador y en el host con hardware falso.
+
+import time
+import asyncio
+from geofence import MotorGeocercas, ENTRADA, SALIDA
+from lcd_framebuffer import FramebufferLCD, Marquesina
+from resilience import EsperaExponencial
+from profiling import perfil, atender_comando
+from telemetry import PRIMER_TEXTO, PRECARGA
+
+# --- CONFIGURACIÓN ---
+PERIODO_GPS = 1.0               # Segundos entre muestras del GPS.
+PERIODO_WIFI = 10.0             # Segundos entre revisiones de la conexión WiFi.
+PERIODO_COMANDOS = 0.5          # Segundos entre revisiones de la consola serial.
+PERIODO_TELEMETRIA = 1.0        # Segundos entre revisiones de la bitácora (telemetry.py).
+PERIODO_TESELAS = 2.0           # Segundos entre precargas de teselas de POIs (poi_tiles.py).
+PAUSA_PAGINA_LCD = 5.0          # Segundos que se muestra cada página en la LCD.
+PAUSA_DESPLAZAMIENTO = 0.4      # Segundos entre pasos al desplazar una fila larga.
+# Pausa mínima entre consultas. La cuota de la API la controla el limitador
+# del cliente (resilience.py), así no se espera cuando hay cuota disponible.
+PAUSA_ENTRE_CONSULTAS = 0.0
+MENSAJE_ERROR = "Error de Gemini. Intenta mas tarde."
+LCD_COLUMNAS = 16
+LCD_FILAS = 2
+
+
+class Estado:
+    """Estado compartido entre las tareas."""
+
+    def __init__(self, pausa_pagina=PAUSA_PAGINA_LCD):
+        self.activo = True
+        self.pausa_pagina = pausa_pagina
+        self.ubicacion = None          # Última muestra del GPS.
+        self.muestras_gps = 0
+        self.poi_actual = None
+        self.wifi_conectado = False
+        self.reconexiones = 0
+        # Consultas pendientes (ids de POI) para la tarea del LLM.
+        self.pendientes = []
+        self.hay_pendientes = asyncio.Event()
+        # Mensajes (texto, pausa_por_pagina) para la tarea de la LCD.
+        self.mensajes = []
+        self.hay_mensajes = asyncio.Event()
+
+    def encolar_consulta(self, poi_id):
+        self.pendientes.append(poi_id)
+        self.hay_pendientes.set()
+
+    def mostrar(self, texto, pausa=None):
+        """
+        Encola un mensaje para la LCD.
+
+        Con pausa 0 el mensaje es de estado: se muestra hasta que llegue el
+        siguiente, sin retrasarlo. Sin pausa se usa la pausa por página.
+        """
+        if pausa is None:
+            pausa = self.pausa_pagina
+        self.mensajes.append((texto, pausa))
+        self.hay_mensajes.set()
+
+
+class Flujo:
+    """
+    Texto que llega por partes (respuesta por streaming) para la LCD.
+
+    La tarea del LLM agrega los fragmentos y la tarea de la LCD muestra cada
+    página en cuanto tiene texto, sin esperar la respuesta completa.
+    """
+
+    def __init__(self):
+        self.partes = []
+        self.completo = False
+        self.hay_texto = asyncio.Event()
+
+    def agregar(self, fragmento):
+        # La LCD no tiene saltos de línea: se reemplazan por espacios.
+        self.partes.append(fragmento.replace("\n", " "))
+        self.hay_texto.set()
+
+    def terminar(self):
+        self.completo = True
+        self.hay_texto.set()
+
+    def texto(self):
+        return "".join(self.partes)
+
+    async def esperar(self):
+        """Espera a que llegue más texto o a que termine el flujo."""
+        await self.hay_texto.wait()
+        self.hay_texto.clear()
+
+
+def paginar(texto, columnas=LCD_COLUMNAS, filas=LCD_FILAS):
+    """
+    Divide un texto en páginas del tamaño de la LCD.
+
+    Returns:
+        list: Páginas con una línea por fila separadas por '\\n'.
+    """
+    if "\n" in texto:
+        return [texto]
+    paginas = []
+    por_pagina = columnas * filas
+    for i in range(0, max(len(texto), 1), por_pagina):
+        bloque = texto[i:i + por_pagina]
+        paginas.append("\n".join([bloque[j:j + columnas] for j in range(0, len(bloque), columnas)]))
+    return paginas
+
+
+async def tarea_gps(estado, obtener_ubicacion, geocercas, periodo=PERIODO_GPS,
+                    planificador=None, telemetria=None, recorrido=None):
+    """
+    Muestrea el GPS y encola una consulta al confirmar la entrada a un POI.
+
+    Args:
+        estado (Estado): Estado compartido.
+        obtener_ubicacion (callable): Retorna {'lat', 'lon'} o None sin fix.
+        geocercas (MotorGeocercas): Filtra la posición y detecta los eventos.
+        periodo (float): Segundos entre muestras.
+        planificador (PlanificadorGPS): Si se indica, elige el periodo
+            después de cada muestra en lugar de usar 'periodo'.
+        telemetria (Telemetria): Si se indica, registra cada muestra y cada
+            evento de las geocercas.
+        recorrido (Recorrido): Si se indica, recibe cada POI consultado.
+    """
+    while estado.activo:
+        with perfil.medir("gps"):
+            ubicacion = obtener_ubicacion()
+        if ubicacion is not None:
+            estado.ubicacion = ubicacion
+            estado.muestras_gps += 1
+            with perfil.medir("geocercas"):
+                eventos = geocercas.actualizar(ubicacion["lat"], ubicacion["lon"], time.monotonic())
+            consultado = False
+            for tipo, poi_id in eventos:
+                # Con varios argumentos, 'print' no arma una cadena nueva.
+                print("Geocerca:", tipo, "en", poi_id, end=".\n")
+                if telemetria is not None:
+                    telemetria.registrar_evento(tipo, poi_id, ubicacion["lat"], ubicacion["lon"])
+                # Si varias geocercas se confirman en la misma lectura (POIs
+                # traslapados), solo se consulta la más cercana.
+                if tipo == ENTRADA and not consultado:
+                    consultado = True
+                    estado.poi_actual = poi_id
+                    if recorrido is not None:
+                        recorrido.visitar(poi_id)
+                    estado.encolar_consulta(poi_id)
+                elif tipo == SALIDA and estado.poi_actual == poi_id:
+                    estado.poi_actual = None
+            if planificador is not None:
+                periodo = planificador.actualizar(geocercas)
+            if telemetria is not None:
+                telemetria.registrar_fix(ubicacion["lat"], ubicacion["lon"], periodo)
+        else:
+            if planificador is not None:
+                periodo = planificador.sin_fix()
+            if telemetria is not None:
+                telemetria.registrar_sin_fix(periodo)
+        perfil.muestrear_memoria()
+        await asyncio.sleep(periodo)
+
+
+async def tarea_llm(estado, indice, consultar, precargador=None, predecir=None,
+                    pausa=PAUSA_ENTRE_CONSULTAS, streaming=False, sin_respuesta=None,
+                    precargar_lote=None, telemetria=None):
+    """
+    Atiende las consultas pendientes y precarga los próximos POIs.
+
+    Args:
+        estado (Estado): Estado compartido.
+        indice (IndicePOI): Índice espacial de los POIs.
+        consultar (coroutine function): Recibe un id de POI y retorna su
+            descripción, o None si falló.
+        precargador (Precargador): Lleva el registro de los POIs ya precargados.
+        predecir (callable): Recibe el id del POI actual y retorna los ids de
+            los próximos POIs.
+        pausa (float): Segundos entre consultas a la API.
+        streaming (bool): Si es True, 'consultar' recibe además una función
+            a la que entrega cada fragmento de la respuesta en cuanto llega,
+            y la LCD lo muestra sin esperar la respuesta completa.
+        sin_respuesta (callable): Recibe el id del POI y retorna el texto a
+            mostrar si la consulta falló; por defecto, un mensaje de error.
+        precargar_lote (coroutine function): Recibe una lista de ids y retorna
+            los que obtuvo; si se indica, la precarga pide todos los POIs
+            predichos en una sola llamada (ver llm_batch.py).
+        telemetria (Telemetria): Si se indica, registra la latencia de cada
+            consulta, del primer fragmento y de cada precarga.
+    """
+    while estado.activo:
+        await estado.hay_pendientes.wait()
+        poi_id = estado.pendientes.pop(0)
+        if not estado.pendientes:
+            estado.hay_pendientes.clear()
+
+        nombre = indice.nombre(poi_id)
+        error = sin_respuesta(poi_id) if sin_respuesta is not None else MENSAJE_ERROR
+        estado.mostrar("Consultando...\n" + nombre, pausa=0)
+        perfil.contar("consultas")
+        inicio = time.monotonic()
+        if streaming:
+            flujo = Flujo()
+
+            def al_recibir(fragmento):
+                # El flujo se encola con el primer fragmento, así el mensaje
+                # "Consultando..." queda en pantalla hasta que llegue texto.
+                if not flujo.partes:
+                    estado.mostrar(flujo)
+                    if telemetria is not None:
+                        telemetria.registrar_latencia(poi_id, time.monotonic() - inicio, 1,
+                                                      PRIMER_TEXTO)
+                flujo.agregar(fragmento)
+
+            with perfil.medir("consulta"):
+                texto = await consultar(poi_id, al_recibir)
+            if flujo.partes:
+                if not texto:
+                    flujo.agregar(" (respuesta incompleta)")
+                flujo.terminar()
+            else:
+                estado.mostrar(texto if texto else error)
+        else:
+            with perfil.medir("consulta"):
+                texto = await consultar(poi_id)
+            estado.mostrar(texto if texto else error)
+        if telemetria is not None:
+            telemetria.registrar_latencia(poi_id, time.monotonic() - inicio, 1 if texto else 0)
+
+        # Precarga mientras no haya llegadas nuevas que atender.
+        if precargador is not None and predecir is not None:
+            if precargar_lote is not None:
+                lote = precargador.filtrar_lote(predecir(poi_id))
+                if lote and not estado.pendientes:
+                    antes = time.monotonic()
+                    obtenidos = await precargar_lote(lote)
+                    for obtenido in obtenidos:
+                        precargador.marcar_precargado(obtenido)
+                    if telemetria is not None:
+                        telemetria.registrar_latencia(None, time.monotonic() - antes,
+                                                      len(obtenidos), PRECARGA)
+            else:
+                for siguiente in precargador.filtrar_nuevos(predecir(poi_id)):
+                    if estado.pendientes:
+                        break
+                    antes = time.monotonic()
+                    obtenido = await consultar(siguiente)
+                    if obtenido:
+                        precargador.marcar_precargado(siguiente)
+                    if telemetria is not None:
+                        telemetria.registrar_latencia(siguiente, time.monotonic() - antes,
+                                                      1 if obtenido else 0, PRECARGA)
+
+        restante = pausa - (time.monotonic() - inicio)
+        if restante > 0:
+            await asyncio.sleep(restante)
+
+
+async def _mostrar_flujo(pantalla, flujo, pausa):
+    """Muestra un Flujo página por página a medida que llega el texto."""
+    por_pagina = pantalla.columnas * pantalla.filas
+    inicio = 0
+    while True:
+        pagina = flujo.texto()[inicio:inicio + por_pagina]
+        if pagina:
+            pantalla.mostrar(paginar(pagina, pantalla.columnas, pantalla.filas)[0])
+        if len(pagina) == por_pagina or (flujo.completo and pagina):
+            # Página llena (o la última): se deja en pantalla y se avanza.
+            await asyncio.sleep(pausa)
+            inicio += por_pagina
+        elif flujo.completo:
+            return
+        else:
+            await flujo.esperar()
+
+
+async def tarea_lcd(estado, pantalla, pausa_desplazamiento=PAUSA_DESPLAZAMIENTO):
+    """
+    Muestra los mensajes encolados en la LCD.
+
+    Los mensajes con pausa se muestran página por página; un Flujo se muestra
+    mientras va llegando, llenando cada página antes de pasar a la siguiente.
+    En los mensajes de estado (pausa 0), las filas que no caben se desplazan
+    horizontalmente hasta que llegue el siguiente mensaje.
+
+    Args:
+        estado (Estado): Estado compartido.
+        pantalla (FramebufferLCD): Framebuffer sobre la LCD.
+        pausa_desplazamiento (float): Segundos entre cada paso del desplazamiento.
+    """
+    while estado.activo:
+        await estado.hay_mensajes.wait()
+        texto, pausa = estado.mensajes.pop(0)
+        if not estado.mensajes:
+            estado.hay_mensajes.clear()
+        if isinstance(texto, Flujo):
+            await _mostrar_flujo(pantalla, texto, pausa)
+            if not estado.mensajes:
+                pantalla.mostrar("")
+            continue
+        if pausa:
+            for pagina in paginar(texto, pantalla.columnas, pantalla.filas):
+                pantalla.mostrar(pagina)
+                await asyncio.sleep(pausa)
+            if not estado.mensajes:
+                pantalla.mostrar("")
+            continue
+
+        marquesinas = [Marquesina(linea, pantalla.columnas)
+                       for linea in texto.split("\n")[:pantalla.filas]]
+        while True:
+            for fila, marquesina in enumerate(marquesinas):
+                marquesina.dibujar(pantalla, fila)
+            for fila in range(len(marquesinas), pantalla.filas):
+                pantalla.escribir_linea("", fila)
+            pantalla.actualizar()
+            if estado.mensajes or not any(m.necesaria() for m in marquesinas):
+                break
+            # Espera el siguiente paso, pero un mensaje nuevo interrumpe el
+            # desplazamiento de inmediato.
+            try:
+                await asyncio.wait_for(estado.hay_mensajes.wait(), pausa_desplazamiento)
+                break
+            except asyncio.TimeoutError:
+                pass
+
+
+async def tarea_wifi(estado, radio, conectar, periodo=PERIODO_WIFI, espera=None):
+    """
+    Revisa la conexión WiFi y reconecta si se perdió.
+
+    Los intentos fallidos se repiten con espera exponencial (con jitter) en
+    lugar del periodo fijo, hasta un máximo de 'periodo' por 2 elevado a 4.
+    'conectar' bloquea el bucle: antes de cada intento se cede el control
+    para que las demás tareas atiendan lo pendiente.
+
+    Args:
+        estado (Estado): Estado compartido.
+        radio (wifi.Radio): Radio WiFi (o un objeto con el atributo 'connected',
+            como GestorConexion de connection.py).
+        conectar (callable): Intenta conectar con un timeout corto; puede
+            lanzar ConnectionError.
+        periodo (float): Segundos entre revisiones.
+        espera (EsperaExponencial): Espera entre intentos fallidos.
+    """
+    if espera is None:
+        espera = EsperaExponencial(base=periodo, maxima=periodo * 16)
+    fallos = 0
+    conectado_antes = bool(radio.connected)
+    while estado.activo:
+        estado.wifi_conectado = bool(radio.connected)
+        pausa = periodo
+        if not estado.wifi_conectado:
+            print("WiFi desconectado. Reconectando..." if conectado_antes else "Conectando al WiFi...")
+            await asyncio.sleep(0)
+            try:
+                conectar()
+                estado.reconexiones += 1
+                estado.wifi_conectado = True
+                conectado_antes = True
+                fallos = 0
+            except ConnectionError as e:
+                print(f"No se pudo reconectar el WiFi: {e}")
+                pausa = espera.espera(fallos)
+                fallos += 1
+        await asyncio.sleep(pausa)
+
+
+async def tarea_comandos(estado, leer_comando, atender=atender_comando,
+                         periodo=PERIODO_COMANDOS):
+    """
+    Atiende los comandos escritos en la consola serial.
+
+    Args:
+        estado (Estado): Estado compartido.
+        leer_comando (callable): Retorna la línea escrita, o None si no hay
+            nada pendiente (no debe bloquear).
+        atender (callable): Recibe la línea; por defecto, los comandos de
+            la instrumentación (ver profiling.py).
+        periodo (float): Segundos entre revisiones.
+    """
+    while estado.activo:
+        linea = leer_comando()
+        if linea:
+            atender(linea)
+        await asyncio.sleep(periodo)
+
+
+async def tarea_telemetria(estado, telemetria, periodo=PERIODO_TELEMETRIA):
+    """
+    Vuelca la bitácora a la flash cuando se llena o pasa su periodo.
+
+    Las demás tareas solo escriben en el buffer en RAM; la escritura a la
+    flash ocurre aquí, entre sus pausas. Al terminar se vuelca lo pendiente.
+
+    Args:
+        estado (Estado): Estado compartido.
+        telemetria (Telemetria): Bitácora (ver telemetry.py).
+        periodo (float): Segundos entre revisiones.
+    """
+    while estado.activo:
+        if telemetria.debe_volcar():
+            with perfil.medir("telemetria"):
+                telemetria.volcar()
+        await asyncio.sleep(periodo)
+    telemetria.volcar()
+
+
+async def tarea_teselas(estado, indice, periodo=PERIODO_TESELAS):
+    """
+    Precarga las teselas de POIs alrededor de la ubicación y hacia adelante.
+
+    Cada lectura de la flash ocurre aquí, entre las pausas de las demás
+    tareas; así la búsqueda de la tarea del GPS encuentra las teselas ya
+    residentes.
+
+    Args:
+        estado (Estado): Estado compartido.
+        indice (IndiceTeselas): Índice de POIs en teselas (ver poi_tiles.py).
+        periodo (float): Segundos entre precargas.
+    """
+    while estado.activo:
+        ubicacion = estado.ubicacion
+        if ubicacion is not None:
+            with perfil.medir("teselas"):
+                indice.precargar(ubicacion["lat"], ubicacion["lon"])
+        await asyncio.sleep(periodo)
+
+
+async def ejecutar(estado, obtener_ubicacion, indice, consultar, lcd, radio, conectar,
+                   precargador=None, predecir=None, geocercas=None, periodo_gps=PERIODO_GPS,
+                   pausa_consultas=PAUSA_ENTRE_CONSULTAS, periodo_wifi=PERIODO_WIFI,
+                   streaming=False, sin_respuesta=None, precargar_lote=None, leer_comando=None,
+                   planificador=None, telemetria=None, recorrido=None):
+    """
+    Lanza todas las tareas del sistema y espera a que terminen.
+
+    Si no se indica un motor de geocercas, se crea uno con los radios por
+    defecto. Si 'lcd' no es un FramebufferLCD, se envuelve en uno. Con
+    'streaming', la respuesta se muestra mientras llega (ver tarea_llm). Con
+    'leer_comando', también se atienden los comandos de la consola serial.
+    Con 'planificador', el periodo del GPS es adaptativo (ver tarea_gps).
+    Con 'telemetria', las tareas llenan la bitácora y una tarea más la
+    vuelca a la flash. Con 'recorrido', la tarea del GPS avanza la secuencia
+    de próximos POIs. Si el índice es un IndiceTeselas (poi_tiles.py), una
+    tarea más precarga sus teselas.
+    """
+    if geocercas is None:
+        geocercas = MotorGeocercas(indice)
+    pantalla = lcd if isinstance(lcd, FramebufferLCD) else FramebufferLCD(lcd)
+    tareas = [
+        tarea_gps(estado, obtener_ubicacion, geocercas, periodo=periodo_gps,
+                  planificador=planificador, telemetria=telemetria, recorrido=recorrido),
+        tarea_llm(estado, indice, consultar, precargador, predecir,
+                  pausa=pausa_consultas, streaming=streaming, sin_respuesta=sin_respuesta,
+                  precargar_lote=precargar_lote, telemetria=telemetria),
+        tarea_lcd(estado, pantalla),
+        tarea_wifi(estado, radio, conectar, periodo=periodo_wifi),
+    ]
+    if leer_comando is not None:
+        tareas.append(tarea_comandos(estado, leer_comando))
+    if telemetria is not None:
+        tareas.append(tarea_telemetria(estado, telemetria))
+    if hasattr(indice, "precargar"):
+        tareas.append(tarea_teselas(estado, indice))
+    await asyncio.gather(*tareas)
@@ -0,0 +1,57 @@
+# startup.py
+# Módulo para medir el arranque por etapas.
+# code.py marca el fin de cada etapa (importaciones, LCD, datos, GPS, red)
+# y los hitos que ocurren ya con el bucle principal corriendo (primera
+# ubicación, WiFi conectado, primera respuesta), y el desglose se imprime
+# por la consola serial.
+
+import time
+
+
+class RegistroArranque:
+    """
+    Tiempos del arranque.
+
+    Attributes:
+        etapas (list): Tuplas (nombre, segundos) en orden.
+        hitos (dict): Nombre -> segundos desde el inicio, solo la primera vez.
+    """
+
+    def __init__(self, reloj=time.monotonic):
+        """
+        Args:
+            reloj (callable): Fuente de tiempo en segundos.
+        """
+        self._reloj = reloj
+        self.inicio = reloj()
+        self._ultima = self.inicio
+        self.etapas = []
+        self.hitos = {}
+
+    def etapa(self, nombre):
+        """Marca el fin de una etapa; dura desde el fin de la anterior."""
+        ahora = self._reloj()
+        self.etapas.append((nombre, ahora - self._ultima))
+        self._ultima = ahora
+
+    def hito(self, nombre):
+        """
+        Registra un hito la primera vez que ocurre.
+
+        Returns:
+            bool: True si es la primera vez.
+        """
+        if nombre in self.hitos:
+            return False
+        self.hitos[nombre] = self._reloj() - self.inicio
+        print(f"Arranque: {nombre} a los {self.hitos[nombre]:.2f} s.")
+        return True
+
+    def total(self):
+        """Segundos desde el inicio hasta el fin de la última etapa."""
+        return self._ultima - self.inicio
+
+    def texto(self):
+        """Desglose de las etapas en una línea."""
+        partes = [f"{nombre} {segundos:.2f} s" for nombre, segundos in self.etapas]
+        return f"Arranque: {', '.join(partes)} (total {self.total():.2f} s)"
@@ -0,0 +1,335 @@
+# telemetry.py
+# Módulo para la telemetría y la bitácora de visitas.
+# Guarda lo que pasa en el campo (posiciones, entradas y salidas de los POIs,
+# latencias de las consultas y aciertos de la caché) para analizarlo después
+# en el host (ver tools/decode_telemetry.py).
+#
+# Cada suceso es un registro binario de tamaño fijo que se escribe en un
+# buffer circular reservado al arrancar: registrar no arma listas ni cadenas
+# y no toca la flash. La tarea de telemetría (runtime.py) vuelca los registros
+# pendientes al archivo en una o dos escrituras grandes, cada
+# 'periodo_volcado' segundos o cuando el buffer pasa de la marca de nivel.
+# Si la flash no da abasto, se descartan los registros más antiguos y se
+# anota cuántos se perdieron.
+#
+# Formato (enteros little-endian):
+#   Encabezado (8 bytes): 'TLMT', versión (u8), tamaño del registro (u8),
+#                         reservado (u16). Solo al crear el archivo.
+#   Registros (16 bytes): tipo (u8), dato (u8), valor (u16), t_ms (u32),
+#                         a (i32), b (i32).
+#
+#   tipo          dato                  valor            a               b
+#   INICIO        versión               -                capacidad       -
+#   FIX           1 con posición        periodo (ms)     lat (µ°)        lon (µ°)
+#   EVENTO_POI    1 entrada, 2 salida   índice del POI   lat (µ°)        lon (µ°)
+#   LATENCIA      origen                índice del POI   milisegundos    resultado
+#   ACIERTO_CACHE nivel                 índice del POI   -               -
+#   PERDIDOS      -                     -                cantidad        -
+#
+# 't_ms' es el reloj monotónico del arranque; cada arranque empieza con un
+# registro INICIO. El índice del POI es su posición en pois.csv
+# (IndicePOI.posicion) o en el archivo de teselas (poi_tiles.py), o SIN_POI.
+
+import os
+import struct
+import time
+from geofence import ENTRADA
+from cache_utils import NIVEL_RAM, NIVEL_FLASH
+
+# --- FORMATO ---
+MAGICO = b"TLMT"
+VERSION = 1
+FORMATO_ENCABEZADO = "<4sBBH"
+TAMANO_ENCABEZADO = 8
+FORMATO_REGISTRO = "<BBHIii"
+TAMANO_REGISTRO = 16
+SIN_POI = 0xFFFF
+
+# Tipos de registro.
+INICIO = 0
+FIX = 1
+EVENTO_POI = 2
+LATENCIA = 3
+ACIERTO_CACHE = 4
+PERDIDOS = 5
+NOMBRES_TIPO = ("inicio", "fix", "evento_poi", "latencia", "acierto_cache", "perdidos")
+
+# Origen de una latencia.
+CONSULTA = 0        # Consulta completa al entrar a un POI.
+PRIMER_TEXTO = 1    # Hasta el primer fragmento de una respuesta por streaming.
+PRECARGA = 2        # Precarga (resultado: POIs obtenidos).
+NOMBRES_ORIGEN = ("consulta", "primer_texto", "precarga")
+
+# Nivel de un acierto: NIVEL_RAM y NIVEL_FLASH son los de la caché
+# (cache_utils.py); NIVEL_PAQUETE, el paquete de contenido.
+NIVEL_PAQUETE = 2
+NOMBRES_NIVEL = ("ram", "flash", "paquete")
+
+# --- CONFIGURACIÓN ---
+CAPACIDAD = 256                  # Registros en RAM (4 KB).
+MARCA_VOLCADO = 192              # Pendientes a partir de los cuales se vuelca antes de tiempo.
+PERIODO_VOLCADO = 60.0           # Segundos máximos entre volcados.
+MAX_BYTES_ARCHIVO = 256 * 1024   # Al pasar de este tamaño, el archivo se rota a '.old'.
+
+
+def _milisegundos():
+    return time.monotonic_ns() // 1000000
+
+
+def _micro_grados(grados):
+    return int(grados * 1000000)
+
+
+class Telemetria:
+    """
+    Bitácora de registros binarios con escritura diferida a la flash.
+
+    Los registros se escriben con 'struct.pack_into' sobre un bytearray fijo;
+    el volcado escribe vistas (memoryview) del buffer, sin copiarlo.
+    """
+
+    def __init__(self, ruta=None, indice=None, capacidad=CAPACIDAD, marca=MARCA_VOLCADO,
+                 periodo_volcado=PERIODO_VOLCADO, max_bytes=MAX_BYTES_ARCHIVO,
+                 reloj_ms=_milisegundos):
+        """
+        Args:
+            ruta (str): Archivo de la bitácora, o None para solo guardar en RAM.
+            indice (IndicePOI): Traduce los ids de POI a su índice; puede
+                asignarse después de cargar los POIs.
+            capacidad (int): Registros del buffer circular.
+            marca (int): Pendientes que adelantan el volcado.
+            periodo_volcado (float): Segundos máximos entre volcados.
+            max_bytes (int): Tamaño del archivo que provoca la rotación.
+            reloj_ms (callable): Reloj monotónico en milisegundos.
+        """
+        self.ruta = ruta
+        self.indice = indice
+        self.capacidad = capacidad
+        self.marca = min(marca, capacidad)
+        self.periodo_volcado_ms = int(periodo_volcado * 1000)
+        self.max_bytes = max_bytes
+        self.reloj_ms = reloj_ms
+        self._buffer = bytearray(capacidad * TAMANO_REGISTRO)
+        self._vista = memoryview(self._buffer)
+        self._aviso = bytearray(TAMANO_REGISTRO)   # Registro PERDIDOS del volcado.
+        self._siguiente = 0
+        self.pendientes = 0
+        self.registros = 0     # Registros desde el arranque.
+        self.perdidos = 0      # Descartados sin volcar desde el arranque.
+        self._perdidos_sin_aviso = 0
+        self.volcados = 0
+        self.bytes_escritos = 0
+        self._tamano = 0       # Tamaño del archivo después del último volcado.
+        self._ultimo_volcado = reloj_ms()
+        self._escribir(INICIO, VERSION, 0, capacidad, 0)
+
+    # --- REGISTROS ---
+    def _escribir(self, tipo, dato, valor, a, b):
+        struct.pack_into(FORMATO_REGISTRO, self._buffer, self._siguiente * TAMANO_REGISTRO,
+                         tipo, dato, valor, self.reloj_ms() & 0xFFFFFFFF, a, b)
+        self._siguiente += 1
+        if self._siguiente == self.capacidad:
+            self._siguiente = 0
+        self.registros += 1
+        if self.pendientes < self.capacidad:
+            self.pendientes += 1
+        else:
+            # Se sobrescribió el registro pendiente más antiguo.
+            self.perdidos += 1
+            self._perdidos_sin_aviso += 1
+
+    def _indice_poi(self, poi_id):
+        if poi_id is None or self.indice is None:
+            return SIN_POI
+        posicion = self.indice.posicion(poi_id)
+        return SIN_POI if posicion is None or posicion >= SIN_POI else posicion
+
+    def registrar_fix(self, lat, lon, periodo):
+        """
+        Registra una lectura del GPS con posición.
+
+        Args:
+            lat (float): Latitud en grados.
+            lon (float): Longitud en grados.
+            periodo (float): Segundos hasta la siguiente lectura.
+        """
+        self._escribir(FIX, 1, min(int(periodo * 1000), 0xFFFF),
+                       _micro_grados(lat), _micro_grados(lon))
+
+    def registrar_sin_fix(self, periodo):
+        """Registra una lectura del GPS sin posición."""
+        self._escribir(FIX, 0, min(int(periodo * 1000), 0xFFFF), 0, 0)
+
+    def registrar_evento(self, tipo, poi_id, lat, lon):
+        """
+        Registra la entrada o la salida de un POI (geofence.py).
+
+        Args:
+            tipo (str): ENTRADA o SALIDA.
+            poi_id (str): Id del POI.
+            lat (float): Latitud de la lectura que confirmó el evento.
+            lon (float): Longitud de la lectura.
+        """
+        self._escribir(EVENTO_POI, 1 if tipo == ENTRADA else 2, self._indice_poi(poi_id),
+                       _micro_grados(lat), _micro_grados(lon))
+
+    def registrar_latencia(self, poi_id, segundos, resultado, origen=CONSULTA):
+        """
+        Registra la duración de una consulta.
+
+        Args:
+            poi_id (str): Id del POI, o None (por ejemplo, un lote).
+            segundos (float): Duración.
+            resultado (int): 1 si hubo respuesta y 0 si falló; en una
+                precarga, los POIs obtenidos.
+            origen (int): CONSULTA, PRIMER_TEXTO o PRECARGA.
+        """
+        self._escribir(LATENCIA, origen, self._indice_poi(poi_id), int(segundos * 1000),
+                       int(resultado))
+
+    def registrar_acierto(self, poi_id, nivel):
+        """
+        Registra una descripción servida sin llamar a la API.
+
+        Args:
+            poi_id (str): Id del POI.
+            nivel (int): NIVEL_RAM, NIVEL_FLASH o NIVEL_PAQUETE.
+        """
+        self._escribir(ACIERTO_CACHE, nivel, self._indice_poi(poi_id), 0, 0)
+
+    # --- VOLCADO ---
+    def debe_volcar(self):
+        """True si hay pendientes sobre la marca o pasó el periodo de volcado."""
+        if self.pendientes >= self.marca:
+            return True
+        return (self.pendientes > 0
+                and self.reloj_ms() - self._ultimo_volcado >= self.periodo_volcado_ms)
+
+    def pendientes_en_orden(self):
+        """
+        Returns:
+            list: Una o dos vistas (memoryview) con los registros pendientes,
+                del más antiguo al más reciente.
+        """
+        inicio = self._siguiente - self.pendientes
+        if inicio >= 0:
+            return [self._vista[inicio * TAMANO_REGISTRO:self._siguiente * TAMANO_REGISTRO]]
+        inicio += self.capacidad
+        return [self._vista[inicio * TAMANO_REGISTRO:],
+                self._vista[:self._siguiente * TAMANO_REGISTRO]]
+
+    def _rotar(self):
+        """Renombra el archivo lleno a '<ruta>.old' (reemplaza el anterior)."""
+        antiguo = self.ruta + ".old"
+        try:
+            os.remove(antiguo)
+        except OSError:
+            pass
+        os.rename(self.ruta, antiguo)
+
+    def volcar(self):
+        """
+        Escribe los registros pendientes al final del archivo.
+
+        Sin ruta (o si la flash es de solo lectura) los registros se quedan
+        en el buffer circular.
+
+        Returns:
+            int: Bytes escritos.
+        """
+        self._ultimo_volcado = self.reloj_ms()
+        if self.ruta is None or not self.pendientes:
+            return 0
+        escritos = 0
+        try:
+            if self._tamano >= self.max_bytes:
+                self._rotar()
+            with open(self.ruta, "ab") as archivo:
+                if archivo.tell() == 0:
+                    escritos += archivo.write(struct.pack(
+                        FORMATO_ENCABEZADO, MAGICO, VERSION, TAMANO_REGISTRO, 0))
+                if self._perdidos_sin_aviso:
+                    struct.pack_into(FORMATO_REGISTRO, self._aviso, 0, PERDIDOS, 0, 0,
+                                     self.reloj_ms() & 0xFFFFFFFF, self._perdidos_sin_aviso, 0)
+                    escritos += archivo.write(self._aviso)
+                for vista in self.pendientes_en_orden():
+                    escritos += archivo.write(vista)
+                self._tamano = archivo.tell()
+        except OSError as e:
+            print(f"No se pudo escribir la telemetría: {e}. Se guardará solo en RAM.")
+            self.ruta = None
+            return 0
+        self.bytes_escritos += escritos
+        self.volcados += 1
+        self.pendientes = 0
+        self._perdidos_sin_aviso = 0
+        return escritos
+
+    def estadisticas(self):
+        """Retorna los contadores de la bitácora en un diccionario."""
+        return {
+            "registros": self.registros,
+            "pendientes": self.pendientes,
+            "perdidos": self.perdidos,
+            "volcados": self.volcados,
+            "bytes_escritos": self.bytes_escritos,
+        }
+
+
+# --- LECTURA (en el host) ---
+def decodificar(datos):
+    """
+    Decodifica una bitácora completa (se usa en el host).
+
+    Un registro incompleto al final (corte de energía durante un volcado) se
+    ignora.
+
+    Args:
+        datos (bytes): Contenido del archivo, con o sin encabezado.
+
+    Returns:
+        list: Diccionarios con 'sesion' (número de arranque, desde 0),
+            't_ms', 'tipo' y los campos propios de cada tipo.
+
+    Raises:
+        ValueError: Si el encabezado no es de una bitácora compatible.
+    """
+    inicio = 0
+    if datos[:4] == MAGICO:
+        _, version, tamano, _ = struct.unpack_from(FORMATO_ENCABEZADO, datos, 0)
+        if version != VERSION or tamano != TAMANO_REGISTRO:
+            raise ValueError(f"Versión de telemetría no compatible: {version}")
+        inicio = TAMANO_ENCABEZADO
+    registros = []
+    sesion = -1
+    for posicion in range(inicio, len(datos) - TAMANO_REGISTRO + 1, TAMANO_REGISTRO):
+        tipo, dato, valor, t_ms, a, b = struct.unpack_from(FORMATO_REGISTRO, datos, posicion)
+        if tipo == INICIO:
+            sesion += 1
+        registro = {"sesion": max(sesion, 0), "t_ms": t_ms,
+                    "tipo": NOMBRES_TIPO[tipo] if tipo < len(NOMBRES_TIPO) else str(tipo)}
+        if tipo == INICIO:
+            registro["capacidad"] = a
+        elif tipo == FIX:
+            registro["con_fix"] = bool(dato)
+            registro["periodo_ms"] = valor
+            if dato:
+                registro["lat"] = a / 1000000
+                registro["lon"] = b / 1000000
+        elif tipo == EVENTO_POI:
+            registro["evento"] = "entrada" if dato == 1 else "salida"
+            registro["poi"] = None if valor == SIN_POI else valor
+            registro["lat"] = a / 1000000
+            registro["lon"] = b / 1000000
+        elif tipo == LATENCIA:
+            registro["origen"] = NOMBRES_ORIGEN[dato] if dato < len(NOMBRES_ORIGEN) else str(dato)
+            registro["poi"] = None if valor == SIN_POI else valor
+            registro["latencia_ms"] = a
+            registro["resultado"] = b
+        elif tipo == ACIERTO_CACHE:
+            registro["nivel"] = NOMBRES_NIVEL[dato] if dato < len(NOMBRES_NIVEL) else str(dato)
+            registro["poi"] = None if valor == SIN_POI else valor
+        elif tipo == PERDIDOS:
+            registro["perdidos"] = a
+        registros.append(registro)
+    return registros
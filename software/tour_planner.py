@@ -0,0 +1,387 @@
+# tour_planner.py
+# Módulo para planificar el orden de visita de los POIs.
+# En lugar de seguir una lista escrita a mano, el recorrido se arma con la
+# heurística del vecino más cercano y se acorta con 2-opt (invertir tramos
+# de la ruta mientras eso la acorte), dentro de un presupuesto de tiempo.
+#
+# Las distancias entre todos los POIs se calculan una sola vez en una
+# matriz (array 'f', 4 * n * n bytes) que se reutiliza en cada replanificación
+# y puede guardarse en la flash para no recalcularla en cada arranque. Con
+# más de MAX_POIS_MATRIZ POIs la matriz no cabe en la RAM: el recorrido se
+# arma solo con el vecino más cercano, buscando en la rejilla del índice
+# (ver 'vecino_mas_cercano'), y no se replanifica.
+#
+# El recorrido es abierto: empieza en un POI o en la ubicación actual y
+# termina en el último POI, sin volver al inicio.
+
+import struct
+import time
+from array import array
+from geo_utils import PuntosGeo, HAVERSINE, haversine_distance
+
+# --- CONFIGURACIÓN ---
+PRESUPUESTO_SEGUNDOS = 0.5        # Tiempo máximo de una planificación.
+PRESUPUESTO_REPLANEO = 0.05       # Tiempo máximo al replanificar durante el recorrido.
+MEJORA_MINIMA = 0.01              # Metros; evita ciclos por redondeo de los flotantes.
+MAX_POIS_MATRIZ = 100             # POIs máximos con matriz (4 * n * n bytes: 40 KB con 100).
+CELDAS_BUSQUEDA_VECINO = 16       # Radio máximo, en celdas, al buscar el vecino en la rejilla.
+
+# --- FORMATO DE LA MATRIZ EN FLASH ---
+# Encabezado (12 bytes): 'DMAT', versión (u8), reservado (u8), cantidad de
+# POIs (u16), firma de los ids (u32). Luego las distancias en metros
+# (float32 little-endian), fila por fila.
+MAGICO = b"DMAT"
+VERSION = 1
+FORMATO_ENCABEZADO = "<4sBBHI"
+TAMANO_ENCABEZADO = 12
+
+
+def firma_ids(ids):
+    """Firma FNV-1a de 32 bits de los ids en orden (igual en el host y en el dispositivo)."""
+    firma = 0x811C9DC5
+    for poi_id in ids:
+        for byte in poi_id.encode("utf-8") + b"\n":
+            firma = ((firma ^ byte) * 0x01000193) & 0xFFFFFFFF
+    return firma
+
+
+class MatrizDistancias:
+    """
+    Distancias entre todos los pares de un conjunto de POIs.
+
+    Los POIs se identifican por su posición en 'ids'; la distancia de i a j
+    está en 'valores[i * n + j]'.
+    """
+
+    def __init__(self, indice, poi_ids=None, valores=None):
+        """
+        Args:
+            indice (IndicePOI): Índice con las coordenadas de los POIs.
+            poi_ids (list): POIs de la matriz; por defecto, todos los del índice.
+            valores (array): Distancias ya calculadas (ver 'cargar'); si no se
+                indican, se calculan con Haversine.
+        """
+        self.indice = indice
+        self.ids = list(indice.ids if poi_ids is None else poi_ids)
+        self.n = len(self.ids)
+        self._posicion = {poi_id: i for i, poi_id in enumerate(self.ids)}
+        self._puntos = None
+        if valores is None:
+            valores = array("f", bytearray(4 * self.n * self.n))
+            fila = array("f", bytearray(4 * self.n))
+            for i, poi_id in enumerate(self.ids):
+                poi = indice.posicion(poi_id)
+                self.desde(indice.lats[poi], indice.lons[poi], fila)
+                fila[i] = 0.0
+                valores[i * self.n:(i + 1) * self.n] = fila
+        self.valores = valores
+
+    def posicion(self, poi_id):
+        """Posición del POI en la matriz, o None si no está."""
+        return self._posicion.get(poi_id)
+
+    def distancia(self, i, j):
+        return self.valores[i * self.n + j]
+
+    def desde(self, lat, lon, salida=None):
+        """
+        Distancias de una ubicación a todos los POIs de la matriz.
+
+        Returns:
+            array: Array 'f' con una distancia por POI, en el orden de 'ids'.
+        """
+        if self._puntos is None:
+            lats, lons = self.indice.lats, self.indice.lons
+            posiciones = [self.indice.posicion(poi_id) for poi_id in self.ids]
+            # El primer POI es la referencia de la tabla (ver PuntosGeo).
+            if posiciones:
+                self._puntos = PuntosGeo(lats[posiciones[0]], lons[posiciones[0]])
+            else:
+                self._puntos = PuntosGeo(0.0, 0.0)
+            for i in posiciones:
+                self._puntos.agregar(lats[i], lons[i])
+        return self._puntos.distancias(lat, lon, salida, metodo=HAVERSINE)
+
+    def guardar(self, ruta):
+        """Escribe la matriz en un archivo (por ejemplo, en la flash)."""
+        with open(ruta, "wb") as archivo:
+            archivo.write(struct.pack(FORMATO_ENCABEZADO, MAGICO, VERSION, 0, self.n,
+                                      firma_ids(self.ids)))
+            archivo.write(self.valores)
+
+    @classmethod
+    def cargar(cls, ruta, indice, poi_ids=None):
+        """
+        Lee una matriz guardada con 'guardar'.
+
+        Returns:
+            MatrizDistancias: La matriz, o None si el archivo no existe o es
+                de otro conjunto de POIs (hay que recalcularla).
+        """
+        ids = list(indice.ids if poi_ids is None else poi_ids)
+        try:
+            with open(ruta, "rb") as archivo:
+                encabezado = archivo.read(TAMANO_ENCABEZADO)
+                if len(encabezado) < TAMANO_ENCABEZADO:
+                    return None
+                magico, version, _, n, firma = struct.unpack(FORMATO_ENCABEZADO, encabezado)
+                if (magico != MAGICO or version != VERSION or n != len(ids)
+                        or firma != firma_ids(ids)):
+                    return None
+                valores = array("f", bytearray(4 * n * n))
+                if archivo.readinto(valores) != 4 * n * n:
+                    return None
+        except OSError:
+            return None
+        return cls(indice, ids, valores)
+
+
+def cargar_o_calcular(ruta, indice, poi_ids=None):
+    """
+    Carga la matriz de la flash o, si no está vigente, la calcula y la guarda.
+
+    Si no se puede escribir (flash de solo lectura), la matriz calculada se
+    usa igual.
+
+    Returns:
+        MatrizDistancias: La matriz de los POIs.
+    """
+    if ruta is not None:
+        matriz = MatrizDistancias.cargar(ruta, indice, poi_ids)
+        if matriz is not None:
+            return matriz
+    matriz = MatrizDistancias(indice, poi_ids)
+    if ruta is not None:
+        try:
+            matriz.guardar(ruta)
+        except OSError as e:
+            print(f"No se pudo guardar la matriz de distancias: {e}")
+    return matriz
+
+
+def vecino_mas_cercano(indice, inicio=None):
+    """
+    Ordena los POIs de un índice con el vecino más cercano, sin matriz.
+
+    Cada paso busca el POI pendiente más cercano en la rejilla del índice,
+    duplicando el radio hasta encontrarlo; si pasa de CELDAS_BUSQUEDA_VECINO
+    celdas, recorre los pendientes. La memoria crece con n, no con n * n.
+
+    Args:
+        indice (IndicePOI): POIs del recorrido.
+        inicio (str): POI donde empieza; por defecto, el primero del índice.
+
+    Returns:
+        list: Ids de los POIs en orden de visita.
+    """
+    n = len(indice)
+    lats, lons = indice.lats, indice.lons
+    actual = indice.posicion(inicio) if inicio is not None else None
+    if actual is None:
+        actual = 0
+    visitados = {}  # índice -> True
+    orden = []
+    maximo = indice.tamano_celda * CELDAS_BUSQUEDA_VECINO
+    while n:
+        visitados[actual] = True
+        orden.append(indice.ids[actual])
+        if len(orden) == n:
+            break
+        lat, lon = lats[actual], lons[actual]
+        siguiente = None
+        radio = indice.tamano_celda
+        while siguiente is None and radio <= maximo:
+            siguiente = indice.mas_cercano(lat, lon, radio, visitados)
+            radio *= 2
+        if siguiente is not None:
+            actual = indice.posicion(siguiente[0])
+            continue
+        mejor = None
+        for i in range(n):
+            if i not in visitados:
+                distancia = haversine_distance(lat, lon, lats[i], lons[i])
+                if mejor is None or distancia < mejor:
+                    mejor, actual = distancia, i
+    return orden
+
+
+class PlanificadorRecorrido:
+    """
+    Ordena un conjunto de POIs para recorrerlos con poca distancia total.
+
+    'planificar' arma la ruta con el vecino más cercano y la mejora con
+    2-opt hasta que ya no haya mejoras o se acabe el presupuesto; la ruta
+    siempre es válida aunque la mejora quede a medias.
+    """
+
+    def __init__(self, matriz, presupuesto=PRESUPUESTO_SEGUNDOS, reloj=time.monotonic):
+        """
+        Args:
+            matriz (MatrizDistancias): Distancias entre los POIs.
+            presupuesto (float): Segundos máximos por planificación; el
+                vecino más cercano siempre se completa y 2-opt usa el resto.
+            reloj (callable): Fuente de tiempo en segundos.
+        """
+        self.matriz = matriz
+        self.presupuesto = presupuesto
+        self.reloj = reloj
+        self._desde_origen = array("f", bytearray(4 * matriz.n))
+        self.ultimo = {}   # Estadísticas de la última planificación.
+
+    def planificar(self, poi_ids=None, inicio=None, lat=None, lon=None, presupuesto=None):
+        """
+        Planifica el orden de visita.
+
+        Args:
+            poi_ids (list): POIs a visitar; por defecto, todos los de la matriz.
+            inicio (str): POI donde empieza el recorrido (queda primero).
+            lat (float): Sin 'inicio', latitud desde donde se parte.
+            lon (float): Sin 'inicio', longitud desde donde se parte.
+            presupuesto (float): Segundos máximos; por defecto, los del planificador.
+
+        Returns:
+            list: Ids de los POIs en orden de visita.
+        """
+        comienzo = self.reloj()
+        matriz = self.matriz
+        if poi_ids is None:
+            pendientes = list(range(matriz.n))
+        else:
+            pendientes = [matriz.posicion(poi_id) for poi_id in poi_ids
+                          if matriz.posicion(poi_id) is not None]
+        origen = None
+        orden = []
+        if inicio is not None and matriz.posicion(inicio) is not None:
+            primero = matriz.posicion(inicio)
+            if primero in pendientes:
+                pendientes.remove(primero)
+            orden.append(primero)
+        elif lat is not None and lon is not None:
+            origen = matriz.desde(lat, lon, self._desde_origen)
+
+        orden = self._vecino_mas_cercano(orden, pendientes, origen)
+        inicial = self._longitud(orden, origen)
+        if presupuesto is None:
+            presupuesto = self.presupuesto
+        mejoras, completo = self._dos_opt(orden, origen, 0 if origen is not None else 1,
+                                          comienzo + presupuesto)
+        self.ultimo = {
+            "pois": len(orden),
+            "longitud_inicial": inicial,
+            "longitud": self._longitud(orden, origen),
+            "mejoras": mejoras,
+            "completo": completo,
+            "segundos": self.reloj() - comienzo,
+        }
+        return [matriz.ids[i] for i in orden]
+
+    def _vecino_mas_cercano(self, orden, pendientes, origen):
+        valores, n = self.matriz.valores, self.matriz.n
+        pendientes = list(pendientes)
+        while pendientes:
+            if orden:
+                fila = orden[-1] * n
+                mejor = min(range(len(pendientes)), key=lambda k: valores[fila + pendientes[k]])
+            elif origen is not None:
+                mejor = min(range(len(pendientes)), key=lambda k: origen[pendientes[k]])
+            else:
+                mejor = 0
+            orden.append(pendientes.pop(mejor))
+        return orden
+
+    def _longitud(self, orden, origen):
+        valores, n = self.matriz.valores, self.matriz.n
+        total = origen[orden[0]] if origen is not None and orden else 0.0
+        for a, b in zip(orden, orden[1:]):
+            total += valores[a * n + b]
+        return total
+
+    def _dos_opt(self, orden, origen, primero, limite):
+        """
+        Invierte tramos orden[i..j] mientras acorten la ruta.
+
+        El tramo que va de 'a' (antes de i) a 'd' (después de j) cambia
+        a-b ... c-d por a-c ... b-d; el último POI no tiene sucesor.
+
+        Returns:
+            tuple: (mejoras aplicadas, True si terminó antes del límite).
+        """
+        valores, n = self.matriz.valores, self.matriz.n
+        m = len(orden)
+        reloj = self.reloj
+        mejoras = 0
+        mejoro = True
+        while mejoro:
+            mejoro = False
+            for i in range(primero, m - 1):
+                if reloj() > limite:
+                    return mejoras, False
+                b = orden[i]
+                if i > 0:
+                    a = orden[i - 1] * n
+                    ab = valores[a + b]
+                else:
+                    a = -1
+                    ab = origen[b]
+                for j in range(i + 1, m):
+                    c = orden[j]
+                    ac = valores[a + c] if a >= 0 else origen[c]
+                    if j + 1 < m:
+                        d = orden[j + 1]
+                        delta = ac + valores[b * n + d] - ab - valores[c * n + d]
+                    else:
+                        delta = ac - ab
+                    if delta < -MEJORA_MINIMA:
+                        orden[i:j + 1] = orden[i:j + 1][::-1]
+                        mejoras += 1
+                        mejoro = True
+                        b = orden[i]
+                        ab = valores[a + b] if a >= 0 else origen[b]
+        return mejoras, True
+
+
+class Recorrido:
+    """
+    Secuencia de los próximos POIs para el bucle principal.
+
+    La tarea del GPS avisa cada entrada a un POI con 'visitar' y la precarga
+    pide los siguientes con 'proximos'. Si el usuario llega a un POI fuera
+    de orden, los POIs que faltan se replanifican desde ahí (con el
+    planificador) o se sigue la ruta desde ese POI (sin planificador).
+    Al terminar la ruta, volver a uno de sus POIs empieza otra vuelta.
+    """
+
+    def __init__(self, ruta, planificador=None, presupuesto=PRESUPUESTO_REPLANEO):
+        """
+        Args:
+            ruta (list): Ids de los POIs en orden de visita.
+            planificador (PlanificadorRecorrido): Replanifica los POIs pendientes.
+            presupuesto (float): Segundos máximos al replanificar.
+        """
+        self.ruta = list(ruta)
+        self.planificador = planificador
+        self.presupuesto = presupuesto
+        self.pendientes = list(ruta)
+        self.actual = None
+        self.replanificaciones = 0
+
+    def visitar(self, poi_id):
+        """Registra la llegada a un POI y actualiza los pendientes."""
+        self.actual = poi_id
+        if self.pendientes and self.pendientes[0] == poi_id:
+            self.pendientes.pop(0)
+        elif poi_id in self.pendientes:
+            if self.planificador is None:
+                self.pendientes = self.pendientes[self.pendientes.index(poi_id) + 1:]
+            else:
+                self.pendientes.remove(poi_id)
+                self.pendientes = self.planificador.planificar(
+                    self.pendientes, inicio=poi_id, presupuesto=self.presupuesto)[1:]
+                self.replanificaciones += 1
+        elif not self.pendientes and poi_id in self.ruta:
+            # Nueva vuelta desde este POI.
+            self.pendientes = self.ruta[self.ruta.index(poi_id) + 1:]
+
+    def proximos(self, cantidad):
+        """Ids de los próximos POIs por visitar."""
+        return self.pendientes[:cantidad]
@@ -0,0 +1,66 @@
+# Benchmark del arranque del firmware (code.py) en el hardware simulado.
+# Uso (en el host): python tests/bench_arranque.py
+#
+# Mide, en segundos del reloj virtual desde que empieza code.py: la primera
+# muestra del GPS, la conexión WiFi y la primera descripción en la LCD. Se
+# mide con el paquete de contenido (el primer POI no necesita red) y sin él.
+
+import contextlib
+import os
+import sys
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(os.path.dirname(AQUI), "software"))
+if AQUI not in sys.path:
+    sys.path.insert(0, AQUI)
+
+from simulador import Medidor, Simulador  # noqa: E402
+
+
+class _Descartar:
+    def write(self, texto):
+        return len(texto)
+
+    def flush(self):
+        pass
+
+
+def medir_arranque(paquete, duracion=10):
+    """
+    Returns:
+        dict: Segundos hasta 'primer_gps', 'wifi' y 'primera_descripcion'
+            (None si no ocurrió en 'duracion' segundos).
+    """
+    with contextlib.redirect_stdout(_Descartar()), Simulador(paquete=paquete) as sim:
+        inicio = sim.reloj.monotonic()
+        firmware = sim.importar_firmware()
+        medidor = Medidor(sim, firmware)
+        sim.correr(firmware.main(), duracion=duracion - (sim.reloj.monotonic() - inicio))
+        descripcion = None
+        for instante, visible in sim.lcd.cuadros:
+            primera = visible.split("\n")[0].rstrip()
+            if primera and any(texto.startswith(primera) for texto in medidor.textos.values()):
+                descripcion = instante - inicio
+                break
+        return {
+            "primer_gps": medidor.muestras[0] - inicio if medidor.muestras else None,
+            "wifi": sim.radio.conexiones[0] - inicio if sim.radio.conexiones else None,
+            "primera_descripcion": descripcion,
+        }
+
+
+def _s(valor):
+    return f"{valor:7.2f} s" if valor is not None else "      -  "
+
+
+def main():
+    print(f"{'Escenario':<16}{'1er GPS':>10}{'WiFi':>10}{'1a descripción':>16}")
+    for nombre, paquete in (("con paquete", True), ("sin paquete", False)):
+        m = medir_arranque(paquete)
+        print(f"{nombre:<16}{_s(m['primer_gps']):>10}{_s(m['wifi']):>10}"
+              f"{_s(m['primera_descripcion']):>16}")
+    print("(segundos del reloj virtual desde el inicio de code.py)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# Benchmark: latencia de cola con y sin consultas cubiertas (llm_backends.py).
+# Uso (en el host): python tests/bench_cobertura.py [consultas]
+#
+# Dos backends simulados con una distribución de latencia parecida a la de
+# la API en el campus: la mayoría de las respuestas llega en menos de un
+# segundo, pero una de cada diez se queda esperando (cuota, un reintento,
+# una red lenta) entre 3 y 8 segundos. El secundario es un modelo más
+# pequeño y algo más rápido, con una cola independiente. Las consultas corren
+# con el reloj virtual de la simulación, así el resultado no depende del host.
+
+import os
+import random
+import sys
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(os.path.dirname(AQUI), "software"))
+
+from llm_backends import BackendSimulado, ConsultaCubierta  # noqa: E402
+from simulador.reloj import RelojVirtual, correr  # noqa: E402
+
+CONSULTAS = 1000
+PROBABILIDAD_COLA = 0.1
+
+
+def distribucion(azar, mediana, cola=PROBABILIDAD_COLA):
+    def latencia():
+        if azar.random() < cola:
+            return azar.uniform(3.0, 8.0)
+        return azar.lognormvariate(0, 0.3) * mediana
+    return latencia
+
+
+def percentil(valores, fraccion):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * fraccion))]
+
+
+def medir(nombre, crear, consultas):
+    reloj = RelojVirtual()
+    backend, backends = crear(reloj)
+    latencias = []
+
+    async def principal():
+        for i in range(consultas):
+            inicio = reloj.monotonic()
+            await backend.preguntar(f"pregunta {i}")
+            latencias.append(reloj.monotonic() - inicio)
+
+    correr(reloj, principal())
+    solicitudes = sum(b.consultas for b in backends)
+    extra = (solicitudes - consultas) / consultas * 100
+    print(f"{nombre:<22}{percentil(latencias, 0.5):>7.2f}{percentil(latencias, 0.9):>7.2f}"
+          f"{percentil(latencias, 0.99):>7.2f}{max(latencias):>7.2f}{extra:>9.1f}%")
+    return backend
+
+
+def main():
+    consultas = int(sys.argv[1]) if len(sys.argv) > 1 else CONSULTAS
+
+    def par(reloj):
+        primario = BackendSimulado(distribucion(random.Random(1), 0.7), reloj=reloj.monotonic)
+        secundario = BackendSimulado(distribucion(random.Random(2), 0.5), reloj=reloj.monotonic)
+        return primario, secundario
+
+    def solo_primario(reloj):
+        primario, _ = par(reloj)
+        return primario, [primario]
+
+    def cubierta(**opciones):
+        def crear(reloj):
+            primario, secundario = par(reloj)
+            return ConsultaCubierta(primario, secundario, reloj=reloj.monotonic, **opciones), \
+                [primario, secundario]
+        return crear
+
+    print(f"{'Modo':<22}{'p50':>7}{'p90':>7}{'p99':>7}{'max':>7}{'extra':>10}")
+    medir("solo primario", solo_primario, consultas)
+    medir("cubierta fija 2 s", cubierta(espera_minima=2.0, espera_maxima=2.0), consultas)
+    adaptativa = medir("cubierta p90", cubierta(), consultas)
+    medir("cubierta p95", cubierta(percentil=0.95), consultas)
+    datos = adaptativa.estadisticas()
+    print(f"(segundos; 'extra' son las solicitudes adicionales al secundario. Con p90 "
+          f"la espera terminó en {datos['espera_cobertura_ms']} ms; se cubrieron "
+          f"{datos['cubiertas']} consultas y el secundario ganó {datos['ganadas_secundario']})")
+
+
+if __name__ == "__main__":
+    main()
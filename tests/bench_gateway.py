@@ -0,0 +1,138 @@
+# Prueba de carga del gateway de la flota (tools/gemini_gateway.py).
+# Uso (en el host): python tests/bench_gateway.py [dispositivos]
+#
+# Simula cientos de dispositivos, cada uno con su conexión keep-alive al
+# gateway, contra un upstream falso con latencia (sin red ni API). Los
+# dispositivos van en grupos de visita: cada grupo recorre la misma ruta de
+# POIs con pequeños desfases, así que muchos llegan al mismo POI casi a la
+# vez. Compara las llamadas a la API con las que haría cada dispositivo por
+# su cuenta y verifica que se respetó la cuota de la flota.
+
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import time
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+RAIZ = os.path.dirname(AQUI)
+sys.path.append(os.path.join(RAIZ, "software"))
+sys.path.append(os.path.join(RAIZ, "tools"))
+
+from gemini_falso import UpstreamSimulado  # noqa: E402
+from gemini_gateway import Gateway, ServidorGateway  # noqa: E402
+from resilience import LimitadorTokens  # noqa: E402
+
+# --- ESCENARIO ---
+DISPOSITIVOS = 300
+GRUPOS = 12               # Grupos de visita; cada uno sigue su propia ruta.
+POIS = 60
+POIS_POR_RUTA = 8
+PAUSA_ENTRE_POIS = 0.4    # Segundos (tiempo comprimido) entre un POI y el siguiente.
+DESFASE = 0.3             # Segundos máximos de diferencia dentro de un grupo.
+LATENCIA_API = 0.25
+CUOTA_POR_MINUTO = 180    # 3 llamadas por segundo: la cuota limita el ritmo.
+RAFAGA = 4
+RUTA = "/v1beta/models/gemini-1.5-flash:streamGenerateContent?alt=sse"
+
+
+def pregunta(poi):
+    return f"Estoy en el Lugar {poi}. Dime algo interesante."
+
+
+async def post(lector, escritor, cuerpo):
+    """Envía una solicitud HTTP/1.1 por una conexión abierta; retorna (código, cuerpo)."""
+    datos = json.dumps(cuerpo).encode()
+    escritor.write(f"POST {RUTA} HTTP/1.1\r\nHost: gateway\r\nContent-Type: application/json\r\n"
+                   f"Content-Length: {len(datos)}\r\n\r\n".encode() + datos)
+    await escritor.drain()
+    codigo = int((await lector.readline()).split()[1])
+    largo = 0
+    while True:
+        linea = await lector.readline()
+        if linea == b"\r\n":
+            break
+        nombre, _, valor = linea.decode().partition(":")
+        if nombre.lower() == "content-length":
+            largo = int(valor)
+    return codigo, await lector.readexactly(largo)
+
+
+async def dispositivo(puerto, ruta, desfase, latencias, codigos):
+    lector, escritor = await asyncio.open_connection("127.0.0.1", puerto)
+    await asyncio.sleep(desfase)
+    for poi in ruta:
+        inicio = time.monotonic()
+        codigo, _ = await post(lector, escritor, {
+            "contents": [{"parts": [{"text": pregunta(poi)}]}],
+            "generationConfig": {"maxOutputTokens": 30},
+        })
+        latencias.append(time.monotonic() - inicio)
+        codigos[codigo] = codigos.get(codigo, 0) + 1
+        await asyncio.sleep(PAUSA_ENTRE_POIS)
+    escritor.close()
+
+
+async def simular(dispositivos):
+    azar = random.Random(7)
+    rutas = [azar.sample(range(POIS), POIS_POR_RUTA) for _ in range(GRUPOS)]
+    upstream = UpstreamSimulado(latencia=LATENCIA_API)
+    gateway = Gateway(upstream, limitador=LimitadorTokens(CUOTA_POR_MINUTO, RAFAGA))
+    servidor = await ServidorGateway(gateway, "127.0.0.1", 0).iniciar()
+    latencias = []
+    codigos = {}
+    inicio = time.monotonic()
+    await asyncio.gather(*[
+        dispositivo(servidor.puerto, rutas[i % GRUPOS], azar.uniform(0, DESFASE), latencias,
+                    codigos)
+        for i in range(dispositivos)])
+    duracion = time.monotonic() - inicio
+    estado = gateway.estadisticas()
+    await servidor.cerrar()
+    return estado, upstream, latencias, codigos, duracion
+
+
+def maximo_en_ventana(instantes, ventana):
+    """Llamadas máximas que empezaron dentro de una misma ventana de 'ventana' segundos."""
+    instantes = sorted(instantes)
+    maximo = 0
+    inicio = 0
+    for fin, instante in enumerate(instantes):
+        while instante - instantes[inicio] >= ventana:
+            inicio += 1
+        maximo = max(maximo, fin - inicio + 1)
+    return maximo
+
+
+def main():
+    dispositivos = int(sys.argv[1]) if len(sys.argv) > 1 else DISPOSITIVOS
+    with contextlib.redirect_stdout(io.StringIO()):
+        estado, upstream, latencias, codigos, duracion = asyncio.run(simular(dispositivos))
+    latencias.sort()
+    p50 = latencias[len(latencias) // 2] * 1000
+    p95 = latencias[int(len(latencias) * 0.95)] * 1000
+    por_segundo = CUOTA_POR_MINUTO / 60
+    pico = maximo_en_ventana(upstream.instantes, 1.0)
+
+    print(f"{dispositivos} dispositivos, {GRUPOS} grupos, {POIS_POR_RUTA} POIs por ruta, "
+          f"{duracion:.1f} s")
+    print(f"  Solicitudes de los dispositivos: {estado['solicitudes']:>6}  "
+          f"(sin gateway: {estado['solicitudes']} llamadas a la API)")
+    print(f"  Llamadas a la API:               {estado['llamadas_upstream']:>6}  "
+          f"({estado['preguntas_upstream']} preguntas)")
+    print(f"  Unidas a una llamada en curso:   {estado['unidas']:>6}")
+    print(f"  Aciertos de la caché:            {estado['aciertos_cache']:>6}")
+    print(f"  Códigos HTTP:                    {codigos}")
+    print(f"  Latencia p50 / p95:              {p50:.0f} / {p95:.0f} ms "
+          f"(API: {LATENCIA_API * 1000:.0f} ms)")
+    print(f"  Pico de llamadas por segundo:    {pico:>6}  "
+          f"(cuota: {por_segundo:.0f}/s + ráfaga de {RAFAGA})")
+    if pico > por_segundo + RAFAGA:
+        raise SystemExit("Error: el gateway superó la cuota de la flota.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# Benchmark de distancias de una ubicación a N POIs (geo_utils.py).
+# Uso (en el host): python tests/bench_geo.py
+#
+# Compara llamar a 'haversine_distance' por cada POI contra la API por lotes
+# de 'PuntosGeo' (Haversine, equirectangular y, si está instalado, NumPy).
+
+import os
+import random
+import sys
+import time
+from array import array
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(os.path.dirname(AQUI), "software"))
+
+import geo_utils  # noqa: E402
+from geo_utils import AUTOMATICO, EQUIRECTANGULAR, HAVERSINE, PuntosGeo, haversine_distance  # noqa: E402
+
+LAT0, LON0 = 9.93300, -84.03200
+TAMANOS = (1000, 10000, 100000)
+
+
+def cronometrar(funcion, minimo=0.2):
+    """Retorna los milisegundos por llamada, repitiendo hasta 'minimo' segundos."""
+    vueltas = 0
+    inicio = time.perf_counter()
+    while True:
+        funcion()
+        vueltas += 1
+        duracion = time.perf_counter() - inicio
+        if duracion >= minimo:
+            return duracion * 1000 / vueltas
+
+
+def main():
+    rnd = random.Random(1)
+    print(f"NumPy: {'disponible' if geo_utils.np is not None else 'no disponible'}")
+    print(f"{'POIs':>8}{'escalar':>11}{'lote hav':>11}{'lote equi':>11}{'lote auto':>11}{'numpy':>9}  (ms por ubicación)")
+    for n in TAMANOS:
+        lats = [LAT0 + rnd.uniform(-0.05, 0.05) for _ in range(n)]
+        lons = [LON0 + rnd.uniform(-0.05, 0.05) for _ in range(n)]
+        tabla = PuntosGeo(LAT0, LON0)
+        for lat, lon in zip(lats, lons):
+            tabla.agregar(lat, lon)
+        salida = array("f", bytearray(4 * n))
+
+        def escalar():
+            for i in range(n):
+                salida[i] = haversine_distance(LAT0, LON0, lats[i], lons[i])
+
+        tiempos = [
+            cronometrar(escalar),
+            cronometrar(lambda: tabla.distancias(LAT0, LON0, salida, HAVERSINE, usar_numpy=False)),
+            cronometrar(lambda: tabla.distancias(LAT0, LON0, salida, EQUIRECTANGULAR, usar_numpy=False)),
+            cronometrar(lambda: tabla.distancias(LAT0, LON0, salida, AUTOMATICO, usar_numpy=False)),
+        ]
+        if geo_utils.np is not None:
+            numpy_ms = f"{cronometrar(lambda: tabla.distancias(LAT0, LON0, salida)):>9.3f}"
+        else:
+            numpy_ms = f"{'-':>9}"
+        print(f"{n:>8}" + "".join(f"{t:>11.3f}" for t in tiempos) + numpy_ms
+              + f"  x{tiempos[0] / tiempos[2]:.1f} equi vs escalar")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# Benchmark de disparos de consultas: umbral de movimiento vs. geocercas.
+# Uso (en el host): python tests/bench_geocercas.py
+#
+# Compara la lógica anterior de code.py (consultar cada vez que la posición
+# se aleja 2 m de la última consulta) con el motor de geocercas, sobre el
+# registro grabado del campus y sobre 10 minutos de ruido estacionario.
+
+import math
+import os
+import random
+import sys
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(os.path.dirname(AQUI), "software"))
+
+from geofence import MotorGeocercas, evaluar_traza  # noqa: E402
+from gps_utils import HORA, ParserNMEA, haversine_distance  # noqa: E402
+from poi_index import cargar_indice  # noqa: E402
+
+UMBRAL_MOVIMIENTO_METROS = 2.0
+
+
+def traza_nmea(ruta):
+    """Lee un registro NMEA y retorna las lecturas (lat, lon, t) de las sentencias GGA."""
+    parser = ParserNMEA()
+    traza = []
+    with open(ruta, "rb") as archivo:
+        for linea in archivo:
+            if b"GGA" in linea and parser.alimentar(linea):
+                hora = parser.valores[HORA]
+                t = (hora // 10000) * 3600 + (hora // 100 % 100) * 60 + hora % 100
+                traza.append((parser.latitude, parser.longitude, t))
+    return traza
+
+
+def traza_estacionaria(lat, lon, segundos=600, sigma_metros=3.0):
+    rnd = random.Random(5)
+    m_lon = 111320.0 * math.cos(math.radians(lat))
+    return [(lat + rnd.gauss(0, sigma_metros) / 111320.0,
+             lon + rnd.gauss(0, sigma_metros) / m_lon, float(t)) for t in range(segundos)]
+
+
+def disparos_por_umbral(traza):
+    disparos = 0
+    ultima = None
+    for lat, lon, _ in traza:
+        if ultima is None or haversine_distance(ultima[0], ultima[1], lat, lon) >= UMBRAL_MOVIMIENTO_METROS:
+            disparos += 1
+            ultima = (lat, lon)
+    return disparos
+
+
+def main():
+    indice = cargar_indice(os.path.join(os.path.dirname(AQUI), "software", "pois.csv"))
+    auditorio = indice.poi("auditorio")
+    trazas = (
+        ("Recorrido del campus", traza_nmea(os.path.join(AQUI, "datos", "recorrido_cenfotec.nmea"))),
+        ("Parado 10 min (ruido 3 m)", traza_estacionaria(auditorio["lat"], auditorio["lon"])),
+    )
+    print(f"{'Traza':<28}{'km':>7}{'umbral 2 m':>12}{'geocercas':>11}{'entradas/km':>13}")
+    for nombre, traza in trazas:
+        metricas = evaluar_traza(traza, MotorGeocercas(indice))
+        print(f"{nombre:<28}{metricas['km']:>7.3f}{disparos_por_umbral(traza):>12}"
+              f"{metricas['entradas']:>11}{metricas['entradas_por_km']:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
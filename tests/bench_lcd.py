@@ -0,0 +1,69 @@
+# Benchmark de escrituras al bus de la LCD: borrar y reescribir vs. framebuffer.
+# Uso (en el host): python tests/bench_lcd.py
+#
+# Reproduce dos escenarios con una LCD falsa que cuenta las escrituras (cada
+# comando y cada carácter es una escritura de 8 bits, dos pulsos en el bus de
+# 4 bits): mostrar una respuesta larga página por página y desplazar el
+# nombre largo de un lugar en la segunda fila.
+
+import os
+import sys
+import time
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(os.path.dirname(AQUI), "software"))
+
+from lcd_falsa import LCDFalsa  # noqa: E402
+from lcd_framebuffer import FramebufferLCD, Marquesina  # noqa: E402
+
+RESPUESTA = ("El campus de Cenfotec fue uno de los primeros en Costa Rica en ofrecer "
+             "carreras enfocadas en la tecnología de la información.")
+NOMBRE = "Laboratorio de Innovación Maker Space"
+
+
+def cuadros_paginado():
+    cuadros = ["Consultando...\nUniversidad"]
+    for i in range(0, len(RESPUESTA), 32):
+        cuadros.append(RESPUESTA[i:i + 16] + "\n" + RESPUESTA[i + 16:i + 32])
+    return cuadros
+
+
+def cuadros_desplazamiento():
+    marquesina = Marquesina(NOMBRE)
+    return ["Consultando...\n" + marquesina.cuadro() for _ in range(60)]
+
+
+def con_clear(cuadros):
+    """Enfoque actual: lcd.clear() y el mensaje completo en cada cuadro."""
+    lcd = LCDFalsa()
+    for cuadro in cuadros:
+        lcd.clear()
+        lcd.message = cuadro
+    return lcd
+
+
+def con_framebuffer(cuadros):
+    lcd = LCDFalsa()
+    pantalla = FramebufferLCD(lcd)
+    for cuadro in cuadros:
+        pantalla.mostrar(cuadro)
+    return lcd
+
+
+def main():
+    print(f"{'Escenario':<16}{'cuadros':>8}{'clear+msg':>11}{'framebuffer':>13}{'borrados':>10}{'us/cuadro fb':>14}")
+    for nombre, cuadros in (("Paginado", cuadros_paginado()),
+                            ("Desplazamiento", cuadros_desplazamiento())):
+        antes = con_clear(cuadros)
+        despues = con_framebuffer(cuadros)
+        inicio = time.perf_counter()
+        for _ in range(100):
+            con_framebuffer(cuadros)
+        us = (time.perf_counter() - inicio) * 1e6 / (100 * len(cuadros))
+        print(f"{nombre:<16}{len(cuadros):>8}{antes.escrituras / len(cuadros):>11.1f}"
+              f"{despues.escrituras / len(cuadros):>13.1f}{antes.borrados:>6} -> {despues.borrados}{us:>10.1f}")
+    print("(escrituras al bus por cuadro)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# Benchmark de llamadas a la API por recorrido: una por POI vs. por lotes.
+# Uso (en el host): python tests/bench_lotes.py
+#
+# Recorre la ruta planificada de code.py (los POIs de software/pois.csv)
+# y un recorrido más largo de 12 POIs. En cada POI se consulta su
+# descripción (con streaming, como en code.py) y se precargan los próximos:
+#   - Individual: cada POI predicho con su propia llamada (2 por adelantado).
+#   - Lotes: los POIs predichos en una sola llamada (4 por adelantado).
+# Cuenta las solicitudes que recibe el servidor de Gemini falso.
+
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+SOFTWARE = os.path.join(os.path.dirname(AQUI), "software")
+sys.path.append(SOFTWARE)
+
+from cache_utils import CacheRespuestas  # noqa: E402
+from gemini_falso import ServidorGeminiFalso, SesionHost  # noqa: E402
+from llm_batch import TAMANO_LOTE, ClienteLotes  # noqa: E402
+from llm_stream import endpoint_stream, preguntar_gemini_stream  # noqa: E402
+from poi_index import IndicePOI, cargar_indice  # noqa: E402
+from prefetch import Precargador  # noqa: E402
+from tour_planner import MatrizDistancias, PlanificadorRecorrido  # noqa: E402
+
+
+def responder_lote(prompt):
+    elementos = []
+    for linea in prompt.splitlines():
+        if linea.startswith("- "):
+            poi_id, nombre = linea[2:].split(": ", 1)
+            elementos.append({"id": poi_id, "texto": f"Dato de {nombre}."})
+    return json.dumps(elementos)
+
+
+def pregunta(indice, poi_id):
+    return f"Estoy en {indice.poi(poi_id)['nombre']}. Dime algo interesante."
+
+
+async def recorrer(indice, ruta, servidor, lotes):
+    cache = CacheRespuestas(max_entradas=64)
+    sesion = SesionHost()
+    url_stream = endpoint_stream(servidor.url())
+
+    async def consultar(poi_id):
+        return await preguntar_gemini_stream(sesion, url_stream, pregunta(indice, poi_id),
+                                             cache=cache, poi_id=poi_id)
+
+    cliente = ClienteLotes(sesion, servidor.url())
+    precargador = Precargador(indice, max_pois=TAMANO_LOTE if lotes else 2)
+    for posicion, poi_id in enumerate(ruta):
+        await consultar(poi_id)
+        predichos = precargador.predecir_por_ruta(ruta, posicion)
+        if lotes:
+            lote = precargador.filtrar_lote(predichos)
+            if lote:
+                lugares = [(i, indice.poi(i)["nombre"], pregunta(indice, i)) for i in lote]
+                textos = await cliente.preguntar(lugares)
+                # Como BackendLLM.preguntar_lote: lo que el lote no trajo se
+                # consulta por separado.
+                for i, _, texto_pregunta in lugares:
+                    if i in textos:
+                        cache.guardar(i, texto_pregunta, textos[i])
+                        precargador.marcar_precargado(i)
+                    elif await consultar(i):
+                        precargador.marcar_precargado(i)
+        else:
+            for siguiente in precargador.filtrar_nuevos(predichos):
+                if await consultar(siguiente):
+                    precargador.marcar_precargado(siguiente)
+
+
+def medir(indice, ruta, lotes):
+    with ServidorGeminiFalso(responder=responder_lote) as servidor:
+        with contextlib.redirect_stdout(io.StringIO()):
+            asyncio.run(recorrer(indice, ruta, servidor, lotes))
+        return len(servidor.solicitudes)
+
+
+def main():
+    indice_campus = cargar_indice(os.path.join(SOFTWARE, "pois.csv"))
+    # Igual que code.py: desde la entrada, con el planificador de recorridos.
+    recorrido_simulado = PlanificadorRecorrido(MatrizDistancias(indice_campus)).planificar(
+        inicio="cenfotec")
+
+    indice_largo = IndicePOI(lat_referencia=9.93)
+    ruta_larga = []
+    for i in range(12):
+        indice_largo.agregar(f"poi{i}", f"Lugar {i}", 9.930 + i * 0.0005, -84.032)
+        ruta_larga.append(f"poi{i}")
+
+    print(f"{'Recorrido':<22}{'POIs':>6}{'individual':>12}{'lotes':>8}{'ahorradas':>11}")
+    for nombre, indice, ruta in (("recorrido_simulado", indice_campus, recorrido_simulado),
+                                 ("12 POIs", indice_largo, ruta_larga)):
+        individual = medir(indice, ruta, lotes=False)
+        lotes = medir(indice, ruta, lotes=True)
+        print(f"{nombre:<22}{len(ruta):>6}{individual:>12}{lotes:>8}{individual - lotes:>11}")
+    print("(llamadas a la API por recorrido)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# Benchmark de memoria: bytes asignados por iteración del bucle del GPS, por
+# cuadro de la marquesina de la LCD y por registro de la telemetría.
+# Uso (en el host): python tests/bench_memoria.py
+#
+# En el microcontrolador la memoria se libera solo cuando corre el
+# recolector (gc): cada objeto temporal de una iteración (diccionarios,
+# tuplas, listas, floats) ocupa el heap hasta la siguiente recolección, y las
+# recolecciones pausan el bucle. En el host se mide con tracemalloc el pico
+# de memoria sobre la línea base durante cada iteración; CPython libera los
+# temporales al instante, así que la cifra es una cota inferior de lo que se
+# asigna en el dispositivo. Ahí se mide con 'perfil memoria' (profiling.py).
+
+import os
+import sys
+import tracemalloc
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(os.path.dirname(AQUI), "software"))
+
+from lcd_falsa import LCDFalsa  # noqa: E402
+from geofence import MotorGeocercas  # noqa: E402
+from gps_replay import TrazaSintetica  # noqa: E402
+from lcd_framebuffer import FramebufferLCD, Marquesina  # noqa: E402
+from poi_index import IndicePOI  # noqa: E402
+from telemetry import Telemetria  # noqa: E402
+
+ITERACIONES = 2000
+NOMBRE = "Laboratorio de Innovación Maker Space"
+
+
+class Reloj:
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+
+def crear_indice():
+    """Rejilla de 20 x 20 POIs a 40 m (una zona densa de la ciudad)."""
+    indice = IndicePOI(lat_referencia=9.93)
+    for i in range(20):
+        for j in range(20):
+            indice.agregar(f"poi_{i}_{j}", f"Lugar {i}-{j}", 9.93 + i * 0.00036,
+                           -84.03 + j * 0.00036)
+    return indice
+
+
+def medir(funcion, veces):
+    """Pico de memoria sobre la línea base de cada llamada: (promedio, máximo) en bytes."""
+    picos = []
+    for _ in range(veces):
+        actual, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        funcion()
+        _, pico = tracemalloc.get_traced_memory()
+        picos.append(pico - actual)
+    return sum(picos) / len(picos), max(picos)
+
+
+def main():
+    indice = crear_indice()
+    reloj = Reloj()
+    puntos = [indice.poi(f"poi_{i}_{i}") for i in range(0, 20, 3)]
+    gps = TrazaSintetica(puntos, pausa=40, ruido_metros=4.0, semilla=1, reloj=reloj)
+    motor = MotorGeocercas(indice)
+
+    def iteracion_gps():
+        ubicacion = gps.get_current_location()
+        motor.actualizar(ubicacion["lat"], ubicacion["lon"], reloj.t)
+        reloj.t += 1.0
+
+    pantalla = FramebufferLCD(LCDFalsa())
+    marquesina = Marquesina(NOMBRE)
+
+    def cuadro_con_cadenas():
+        pantalla.escribir_linea(marquesina.cuadro(), 1)
+        pantalla.actualizar()
+
+    def cuadro_marquesina():
+        marquesina.dibujar(pantalla, 1)
+        pantalla.actualizar()
+
+    telemetria = Telemetria(indice=indice, reloj_ms=lambda: 1000)
+
+    def registro_telemetria():
+        telemetria.registrar_fix(9.93, -84.03, 1.0)
+        telemetria.registrar_evento("entrada", "poi_3_3", 9.93, -84.03)
+
+    tracemalloc.start()
+    try:
+        print(f"{'Escenario':<22}{'prom. B':>9}{'máx. B':>9}")
+        for nombre, funcion in (("iteración del GPS", iteracion_gps),
+                                ("marquesina (cuadro)", cuadro_con_cadenas),
+                                ("marquesina (dibujar)", cuadro_marquesina),
+                                ("telemetría (2 reg.)", registro_telemetria)):
+            medir(funcion, 50)  # Calentamiento: cachés e internados de CPython.
+            promedio, maximo = medir(funcion, ITERACIONES)
+            print(f"{nombre:<22}{promedio:>9.0f}{maximo:>9}")
+    finally:
+        tracemalloc.stop()
+
+
+if __name__ == "__main__":
+    main()
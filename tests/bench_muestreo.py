@@ -0,0 +1,151 @@
+# Benchmark: muestreo fijo del GPS (1 s) vs. adaptativo (gps_scheduler.py).
+# Uso (en el host): python tests/bench_muestreo.py
+#
+# Reproduce recorridos grabados y sintéticos (gps_replay.py) en tiempo
+# virtual y pasa cada lectura por el motor de geocercas, igual que
+# runtime.tarea_gps. Compara los despertares del bucle del GPS, los bytes
+# que transporta el UART (el GPS se configura a la frecuencia del muestreo)
+# y el retraso de cada entrada a un POI frente al muestreo fijo.
+
+import os
+import random
+import sys
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(os.path.dirname(AQUI), "software"))
+if AQUI not in sys.path:
+    sys.path.insert(0, AQUI)
+
+from bench_recorridos import POIS_EDIFICIOS  # noqa: E402
+from geofence import ENTRADA, MotorGeocercas  # noqa: E402
+from gps_replay import ReproductorNMEA, TrazaSintetica, hora_nmea  # noqa: E402
+from gps_scheduler import PlanificadorGPS  # noqa: E402
+from poi_index import IndicePOI  # noqa: E402
+from runtime import PERIODO_GPS  # noqa: E402
+
+REGISTRO = os.path.join(AQUI, "datos", "recorrido_cenfotec.nmea")
+POIS_CAMPUS = POIS_EDIFICIOS[:3]
+# Un barrio con POIs separados por 400 m (como un recorrido por la ciudad).
+POIS_BARRIO = [(f"parada_{i}", f"Parada {i}", 9.93310 + i * 0.0036, -84.03220) for i in range(6)]
+HORA = 3600
+
+
+def bytes_por_segundo():
+    """Bytes por segundo del registro NMEA grabado a 1 Hz (RMC, GGA, GSA, etc.)."""
+    with open(REGISTRO, "rb") as archivo:
+        lineas = archivo.readlines()
+    horas = {hora_nmea(linea) for linea in lineas} - {None}
+    return sum(len(linea) + (0 if linea.endswith(b"\r\n") else 1) for linea in lineas) / len(horas)
+
+
+def indice_de(pois):
+    indice = IndicePOI(lat_referencia=9.93)
+    for poi_id, nombre, lat, lon in pois:
+        indice.agregar(poi_id, nombre, lat, lon)
+    return indice
+
+
+def registro(reloj):
+    return ReproductorNMEA(REGISTRO, repetir=True, reloj=reloj)
+
+
+class _LecturaPorInstante:
+    """
+    Caminata cuyo ruido y pérdidas dependen solo del instante de la lectura,
+    no de cuántas lecturas se hicieron antes: los dos modos ven el mismo GPS.
+    """
+
+    def __init__(self, traza, reloj):
+        self.traza = traza
+        self.reloj = reloj
+
+    def get_current_location(self):
+        t = self.reloj()
+        random.seed(int(t * 1000))
+        return self.traza.ubicacion_en(t)
+
+
+def caminata(pois, ruido_metros, perdida, pausa=60):
+    puntos = [{"lat": lat, "lon": lon} for _, _, lat, lon in pois]
+
+    def crear(reloj):
+        traza = TrazaSintetica(puntos, pausa=pausa, ruido_metros=ruido_metros, perdida=perdida)
+        return _LecturaPorInstante(traza, reloj)
+    return crear
+
+
+RECORRIDOS = {
+    "registro_nmea_1h": (registro, POIS_CAMPUS, HORA),
+    "campus_2h": (caminata(POIS_CAMPUS, 3.0, 0.0), POIS_CAMPUS, 2 * HORA),
+    "campus_ruidoso_2h": (caminata(POIS_CAMPUS, 8.0, 0.1), POIS_CAMPUS, 2 * HORA),
+    "edificios_3h": (caminata(POIS_EDIFICIOS, 4.0, 0.05), POIS_EDIFICIOS, 3 * HORA),
+    "barrio_3h": (caminata(POIS_BARRIO, 4.0, 0.05, pausa=120), POIS_BARRIO, 3 * HORA),
+}
+
+
+def recorrer(crear_fuente, pois, duracion, adaptativo):
+    """
+    Muestrea una fuente en tiempo virtual como runtime.tarea_gps.
+
+    Returns:
+        tuple: (lecturas, entradas [(t, poi_id)], planificador o None).
+    """
+    ahora = [0.0]
+    fuente = crear_fuente(lambda: ahora[0])
+    motor = MotorGeocercas(indice_de(pois))
+    planificador = PlanificadorGPS() if adaptativo else None
+    lecturas = 0
+    entradas = []
+    while ahora[0] < duracion:
+        lecturas += 1
+        ubicacion = fuente.get_current_location()
+        periodo = PERIODO_GPS
+        if ubicacion is not None:
+            for tipo, poi_id in motor.actualizar(ubicacion.lat, ubicacion.lon, ahora[0]):
+                if tipo == ENTRADA:
+                    entradas.append((ahora[0], poi_id))
+            if planificador is not None:
+                periodo = planificador.actualizar(motor)
+        elif planificador is not None:
+            periodo = planificador.sin_fix()
+        ahora[0] += periodo
+    return lecturas, entradas, planificador
+
+
+def retrasos(fijas, adaptativas, ventana=60.0):
+    """Retraso de cada entrada adaptativa frente a la misma entrada con periodo fijo."""
+    pendientes = list(adaptativas)
+    resultado = []
+    perdidas = 0
+    for t, poi_id in fijas:
+        pareja = next((e for e in pendientes if e[1] == poi_id and abs(e[0] - t) <= ventana), None)
+        if pareja is None:
+            perdidas += 1
+            continue
+        pendientes.remove(pareja)
+        resultado.append(pareja[0] - t)
+    return resultado, perdidas, len(pendientes)
+
+
+def main():
+    por_segundo = bytes_por_segundo()
+    print(f"{'Recorrido':<20}{'lecturas':>16}{'UART (KB)':>16}{'entradas':>10}"
+          f"{'retraso medio/máx':>19}{'perdidas':>9}{'comandos':>9}")
+    for nombre, (crear, pois, duracion) in RECORRIDOS.items():
+        lecturas_fijo, fijas, _ = recorrer(crear, pois, duracion, adaptativo=False)
+        lecturas, adaptativas, planificador = recorrer(crear, pois, duracion, adaptativo=True)
+        diferencias, perdidas, extra = retrasos(fijas, adaptativas)
+        medio = sum(diferencias) / len(diferencias) if diferencias else 0.0
+        maximo = max(diferencias) if diferencias else 0.0
+        # A 1 Hz el GPS envía una posición por segundo; adaptativo, una por lectura.
+        kb_fijo = duracion * por_segundo / 1024
+        kb = lecturas * por_segundo / 1024
+        print(f"{nombre:<20}{lecturas_fijo:>7} -> {lecturas:<6}{kb_fijo:>7.0f} -> {kb:<6.0f}"
+              f"{len(fijas):>4}/{len(adaptativas):<4}{medio:>+9.2f} / {maximo:<+6.1f}s"
+              f"{perdidas:>6}{planificador.cambios:>9}")
+    print(f"(UART: {por_segundo:.0f} bytes por posición, según el registro grabado; "
+          "retraso: entrada adaptativa menos entrada con periodo fijo)")
+
+
+if __name__ == "__main__":
+    main()
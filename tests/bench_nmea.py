@@ -0,0 +1,129 @@
+# Benchmark del parser NMEA incremental contra el enfoque de 'adafruit_gps'.
+# Uso (en el host): python tests/bench_nmea.py
+#
+# Mide sentencias por segundo y memoria asignada por fix al procesar el
+# registro grabado 'datos/recorrido_cenfotec.nmea'. El enfoque actual se
+# reproduce con la misma lógica de 'adafruit_gps.GPS.update()': leer una
+# línea, decodificarla a 'str', validar el checksum y hacer 'split(",")'.
+# En CPython la memoria se mide con el pico de 'tracemalloc' por fix; en
+# CircuitPython se usa 'gc.mem_alloc()' con el recolector desactivado.
+
+import gc
+import os
+import sys
+import time
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(os.path.dirname(AQUI), "software"))
+
+from gps_utils import ParserNMEA  # noqa: E402
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+REPETICIONES = 20
+
+
+def _grados(nmea, hemisferio):
+    """Conversión de 'ddmm.mmmm' igual a la de adafruit_gps (con cadenas)."""
+    if not nmea:
+        return None
+    punto = nmea.index(".")
+    grados = int(nmea[:punto - 2]) + float(nmea[punto - 2:]) / 60
+    return -grados if hemisferio in ("S", "W") else grados
+
+
+class ParserCadenas:
+    """Réplica del flujo actual: una cadena y una lista por cada sentencia."""
+
+    def __init__(self):
+        self.latitude = None
+        self.longitude = None
+        self.fixes = 0
+
+    def actualizar(self, linea):
+        sentencia = linea.decode("ascii").strip()
+        if len(sentencia) < 7 or sentencia[0] != "$" or sentencia[-3] != "*":
+            return False
+        suma = 0
+        for c in sentencia[1:-3]:
+            suma ^= ord(c)
+        if suma != int(sentencia[-2:], 16):
+            return False
+        tipo, *datos = sentencia[1:-3].split(",")
+        if tipo[2:] == "GGA" and len(datos) >= 9 and datos[5] not in ("", "0"):
+            self.latitude = _grados(datos[1], datos[2])
+            self.longitude = _grados(datos[3], datos[4])
+            float(datos[7])
+            float(datos[8])
+        elif tipo[2:] == "RMC" and len(datos) >= 8 and datos[1] == "A":
+            self.latitude = _grados(datos[2], datos[3])
+            self.longitude = _grados(datos[4], datos[5])
+            float(datos[6])
+            float(datos[7])
+        else:
+            return False
+        self.fixes += 1
+        return True
+
+
+def main():
+    with open(os.path.join(AQUI, "datos", "recorrido_cenfotec.nmea"), "rb") as archivo:
+        datos = archivo.read()
+    lineas = datos.splitlines(True)
+    sentencias = len(lineas)
+
+    # Los bytes llegan del UART en bloques de 64, como en 'ParserNMEA.leer_uart'.
+    bloques = [datos[i:i + 64] for i in range(0, len(datos), 64)]
+    incremental = ParserNMEA()
+
+    def procesar_incremental():
+        for bloque in bloques:
+            incremental.alimentar(bloque)
+
+    cadenas = ParserCadenas()
+
+    def procesar_cadenas():
+        for linea in lineas:
+            cadenas.actualizar(linea)
+
+    print(f"Registro: {sentencias} sentencias, {len(datos)} bytes, x{REPETICIONES} repeticiones")
+    print(f"{'Enfoque':<22}{'sentencias/s':>14}{'fixes':>8}{'bytes/fix':>12}")
+    for nombre, procesar, parser in (("adafruit_gps (str)", procesar_cadenas, cadenas),
+                                      ("ParserNMEA", procesar_incremental, incremental)):
+        procesar()  # Calentamiento.
+        fixes_vuelta = parser.fixes
+        inicio = time.perf_counter()
+        for _ in range(REPETICIONES):
+            procesar()
+        duracion = time.perf_counter() - inicio
+
+        gc.collect()
+        if hasattr(gc, "mem_alloc"):
+            gc.disable()
+            antes = gc.mem_alloc()
+            procesar()
+            asignados = gc.mem_alloc() - antes
+            gc.enable()
+        else:
+            # Pico de memoria al procesar las sentencias de una en una.
+            tracemalloc.start()
+            pico_total = 0
+            for linea in lineas:
+                tracemalloc.reset_peak()
+                base = tracemalloc.get_traced_memory()[0]
+                if parser is cadenas:
+                    cadenas.actualizar(linea)
+                else:
+                    incremental.alimentar(linea)
+                pico_total += tracemalloc.get_traced_memory()[1] - base
+            tracemalloc.stop()
+            asignados = pico_total
+        por_segundo = sentencias * REPETICIONES / duracion
+        print(f"{nombre:<22}{por_segundo:>14.0f}{fixes_vuelta:>8}{asignados / fixes_vuelta:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+# Benchmark del costo de la instrumentación (profiling.py) en el host.
+# Uso (en el host): python tests/bench_perfil.py
+#
+# Mide el costo por tramo de 'with perfil.medir(...)' desactivado y
+# activado frente a la misma sección sin instrumentar. En el ESP32 los
+# tiempos son mayores, pero la proporción es similar.
+
+import os
+import sys
+import time
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(os.path.dirname(AQUI), "software"))
+
+from profiling import Perfil  # noqa: E402
+
+REPETICIONES = 200_000
+
+
+def sin_instrumentar(perfil):
+    for _ in range(REPETICIONES):
+        pass
+
+
+def instrumentado(perfil):
+    for _ in range(REPETICIONES):
+        with perfil.medir("gps"):
+            pass
+
+
+def medir(funcion, perfil):
+    inicio = time.perf_counter()
+    funcion(perfil)
+    return (time.perf_counter() - inicio) / REPETICIONES * 1e9
+
+
+def main():
+    base = medir(sin_instrumentar, None)
+    desactivado = medir(instrumentado, Perfil(activo=False))
+    activado = medir(instrumentado, Perfil(activo=True))
+    print(f"Sin instrumentar:    {base:7.0f} ns por iteración")
+    print(f"Perfil desactivado:  {desactivado:7.0f} ns (+{desactivado - base:.0f} ns)")
+    print(f"Perfil activado:     {activado:7.0f} ns (+{activado - base:.0f} ns)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# Benchmark de extremo a extremo del firmware (code.py) en el hardware simulado.
+# Uso (en el host):
+#   python -m pytest tests/bench_recorridos.py    (con pytest-benchmark)
+#   python tests/bench_recorridos.py               (solo la tabla de métricas)
+#
+# Corre el firmware completo sobre rutas estándar con el reloj virtual y la
+# API de Gemini simulada (ver tests/simulador) y mide:
+#   - Latencia de iteración: retraso del bucle del GPS respecto a su periodo
+#     (las llamadas HTTP bloquean el bucle mientras esperan la red).
+#   - Llegada a pantalla: desde que se llega a un POI hasta que su
+#     descripción aparece en la LCD.
+#   - Llamadas a la API por ruta.
+#   - Pico de memoria (heap) del bucle principal, medido con tracemalloc.
+# Los tiempos de pytest-benchmark son los del host al simular cada ruta; las
+# métricas del firmware quedan en 'extra_info' de cada resultado.
+
+import contextlib
+import os
+import sys
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(os.path.dirname(AQUI), "software"))
+if AQUI not in sys.path:
+    sys.path.insert(0, AQUI)
+
+from simulador import CAMPUS, medir_recorrido  # noqa: E402
+
+# POIs del campus más cinco edificios a 120 m uno del otro.
+POIS_EDIFICIOS = [
+    ("cenfotec", "Universidad Cenfotec", 9.93310, -84.03220),
+    ("auditorio", "Auditorio", 9.93282, -84.03200),
+    ("maker_space", "Maker Space", 9.93305, -84.03215),
+] + [(f"edificio_{i}", f"Edificio {i}", 9.93310 + i * 0.00108, -84.03220) for i in range(1, 6)]
+
+RUTAS = {
+    # Ruta de code.py con el paquete de contenido (sin red).
+    "campus_paquete": dict(ruta=CAMPUS, paquete=True),
+    "campus_api": dict(ruta=CAMPUS),
+    "campus_api_sin_lotes": dict(ruta=CAMPUS, usar_lotes=False),
+    "campus_2_vueltas": dict(ruta=CAMPUS, vueltas=2),
+    "edificios_api": dict(ruta=[poi[0] for poi in POIS_EDIFICIOS], pois=POIS_EDIFICIOS),
+    "edificios_api_sin_lotes": dict(ruta=[poi[0] for poi in POIS_EDIFICIOS], pois=POIS_EDIFICIOS,
+                                    usar_lotes=False),
+}
+
+
+class _Descartar:
+    """Salida que descarta los mensajes del firmware (sin acumularlos en memoria)."""
+
+    def write(self, texto):
+        return len(texto)
+
+    def flush(self):
+        pass
+
+
+def medir(nombre):
+    """Mide una ruta sin imprimir los mensajes del firmware."""
+    with contextlib.redirect_stdout(_Descartar()):
+        return medir_recorrido(**RUTAS[nombre])
+
+
+try:
+    import pytest
+except ImportError:
+    pytest = None
+
+if pytest is not None:
+    @pytest.mark.parametrize("nombre", sorted(RUTAS))
+    def test_recorrido(benchmark, nombre):
+        metricas = benchmark.pedantic(medir, args=(nombre,), rounds=3, iterations=1)
+        benchmark.extra_info.update(metricas)
+        assert metricas["muestras_gps"] > 0
+        if RUTAS[nombre].get("paquete"):
+            assert metricas["llamadas_api"] == 0
+
+
+def main():
+    print(f"{'Ruta':<26}{'iter. max':>10}{'llegada':>9}{'máx.':>7}{'sin mostrar':>12}"
+          f"{'API':>5}{'heap KB':>9}")
+    for nombre in RUTAS:
+        m = medir(nombre)
+        print(f"{nombre:<26}{m['iteracion_max']:>9.2f}s{m['llegada_media']:>8.2f}s"
+              f"{m['llegada_max']:>6.2f}s{m['sin_mostrar']:>12}{m['llamadas_api']:>5}"
+              f"{m['heap_max'] / 1024:>9.0f}")
+    print("(tiempos en segundos del reloj virtual; 'llegada' es el promedio)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# Benchmark: recorridos largos reproducidos en el firmware simulado.
+# Uso (en el host):
+#   python tests/bench_replay.py
+#
+# Corre code.py en el simulador (tests/simulador) con una fuente de
+# gps_replay.py en lugar de la ruta fija: el registro NMEA grabado en el
+# campus (repetido) y caminatas sintéticas de varias horas con ruido y
+# pérdidas de señal. Con el reloj virtual, horas de caminata toman segundos,
+# así se revisan las geocercas, la caché y la precarga contra recorridos
+# realistas. Muestra el tiempo real de cada recorrido, las muestras del GPS,
+# las entradas a POIs consultadas, las llamadas a la API y los aciertos de
+# la caché.
+
+import contextlib
+import os
+import sys
+import time
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(os.path.dirname(AQUI), "software"))
+if AQUI not in sys.path:
+    sys.path.insert(0, AQUI)
+
+from bench_recorridos import POIS_EDIFICIOS, _Descartar  # noqa: E402
+from simulador import CAMPUS, medir_recorrido  # noqa: E402
+
+REGISTRO = os.path.join(AQUI, "datos", "recorrido_cenfotec.nmea")
+HORA = 3600
+
+
+def registro_nmea(firmware):
+    from gps_replay import ReproductorNMEA
+    return ReproductorNMEA(REGISTRO, repetir=True)
+
+
+def caminata(ruta, ruido_metros, perdida, pausa=60):
+    """Fábrica de una caminata sintética por los POIs de la ruta, en bucle."""
+    def crear(firmware):
+        from gps_replay import TrazaSintetica
+        puntos = [firmware.indice_pois.poi(poi_id) for poi_id in ruta]
+        return TrazaSintetica(puntos, pausa=pausa, ruido_metros=ruido_metros, perdida=perdida,
+                              semilla=1)
+    return crear
+
+
+EDIFICIOS = [poi[0] for poi in POIS_EDIFICIOS]
+RECORRIDOS = {
+    "registro_nmea_1h": dict(fuente=registro_nmea, duracion=HORA),
+    "campus_3h": dict(fuente=caminata(CAMPUS, 3.0, 0.0), duracion=3 * HORA),
+    "campus_ruidoso_3h": dict(fuente=caminata(CAMPUS, 8.0, 0.1), duracion=3 * HORA),
+    "edificios_4h": dict(fuente=caminata(EDIFICIOS, 4.0, 0.05), duracion=4 * HORA,
+                         pois=POIS_EDIFICIOS, ruta=EDIFICIOS),
+}
+
+
+def medir(nombre):
+    """Mide un recorrido sin imprimir los mensajes del firmware; agrega el tiempo real."""
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(_Descartar()):
+        metricas = medir_recorrido(**RECORRIDOS[nombre])
+    metricas["segundos_reales"] = time.perf_counter() - inicio
+    return metricas
+
+
+def main():
+    print(f"{'Recorrido':<20}{'simulado':>9}{'real':>8}{'muestras':>10}{'entradas':>10}"
+          f"{'API':>5}{'caché':>7}")
+    for nombre, opciones in RECORRIDOS.items():
+        m = medir(nombre)
+        print(f"{nombre:<20}{opciones['duracion'] / HORA:>8.0f}h{m['segundos_reales']:>7.1f}s"
+              f"{m['muestras_gps']:>10}{m['consultas']:>10}{m['llamadas_api']:>5}"
+              f"{m['aciertos_cache']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# Benchmark del planificador de recorridos (tour_planner.py): tiempo de
+# planificación y largo de la ruta según la cantidad de POIs.
+# Uso (en el host): python tests/bench_rutas.py [presupuesto_segundos]
+#
+# Para cada tamaño se arma una zona de POIs al azar (como una ciudad de
+# 1.5 km de lado), se calcula la matriz de distancias y se planifica desde el
+# primer POI. Compara el largo de la ruta en el orden de la lista (como el
+# recorrido escrito a mano), con el vecino más cercano y después de 2-opt.
+# En el microcontrolador los tiempos son mucho mayores: el presupuesto corta
+# 2-opt a tiempo y la ruta queda a medio mejorar (pruébese con 0.02 s).
+
+import os
+import random
+import sys
+import time
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(os.path.dirname(AQUI), "software"))
+
+import geo_utils  # noqa: E402
+from poi_index import IndicePOI  # noqa: E402
+from tour_planner import PRESUPUESTO_SEGUNDOS, MatrizDistancias, PlanificadorRecorrido  # noqa: E402
+
+LAT0, LON0 = 9.93000, -84.03000
+TAMANOS = (10, 25, 50, 100, 200, 400)
+
+
+def crear_indice(n, azar):
+    indice = IndicePOI(lat_referencia=LAT0)
+    for i in range(n):
+        indice.agregar(f"p{i}", f"Lugar {i}", LAT0 + azar.uniform(0, 0.0135),
+                       LON0 + azar.uniform(0, 0.0135))
+    return indice
+
+
+def main():
+    presupuesto = float(sys.argv[1]) if len(sys.argv) > 1 else PRESUPUESTO_SEGUNDOS
+    azar = random.Random(3)
+    print(f"NumPy: {'disponible' if geo_utils.np is not None else 'no disponible'}; "
+          f"presupuesto de 2-opt: {presupuesto} s")
+    print(f"{'POIs':>6}{'matriz KB':>10}{'matriz ms':>11}{'plan ms':>9}{'mejoras':>9}"
+          f"{'lista km':>10}{'vecino km':>11}{'2-opt km':>10}{'completo':>10}")
+    for n in TAMANOS:
+        indice = crear_indice(n, azar)
+        inicio = time.perf_counter()
+        matriz = MatrizDistancias(indice)
+        ms_matriz = (time.perf_counter() - inicio) * 1000
+        planificador = PlanificadorRecorrido(matriz, presupuesto=presupuesto)
+        planificador.planificar(inicio="p0")
+        ultimo = planificador.ultimo
+        lista = sum(matriz.distancia(i, i + 1) for i in range(n - 1))
+        print(f"{n:>6}{4 * n * n / 1024:>10.1f}{ms_matriz:>11.1f}{ultimo['segundos'] * 1000:>9.1f}"
+              f"{ultimo['mejoras']:>9}{lista / 1000:>10.1f}{ultimo['longitud_inicial'] / 1000:>11.2f}"
+              f"{ultimo['longitud'] / 1000:>10.2f}{'sí' if ultimo['completo'] else 'no':>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# Benchmark: codificación de la solicitud y lectura de la respuesta de Gemini.
+# Uso (en el host): python tests/bench_solicitud.py
+#
+# Compara el código anterior (diccionarios 'headers' y 'payload',
+# json.dumps del cuerpo y 'response.json()' de la respuesta completa, con
+# sus calificaciones de seguridad y metadatos) con llm_codec.py (plantilla
+# preserializada y extractor del texto sobre los bloques del socket). Mide el
+# pico de memoria con tracemalloc y el tiempo por llamada. En el dispositivo
+# el pico importa más que en el host: todo lo temporal queda en el heap hasta
+# la siguiente recolección.
+
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(os.path.dirname(AQUI), "software"))
+
+from llm_codec import ENCABEZADOS_JSON, ExtractorTexto, leer_texto, plantilla  # noqa: E402
+from llm_stream import ParserStreamGemini  # noqa: E402
+from test_llm_codec import RespuestaFalsa, respuesta_completa  # noqa: E402
+
+REPETICIONES = 2000
+PREGUNTA = ("Estoy en Laboratorio de Innovación Maker Space. Dime algo interesante de este "
+            "lugar en una oración simple.")
+TEXTO = ("El Maker Space de Cenfotec tiene impresoras 3D y cortadoras láser que los "
+         "estudiantes usan para prototipar sus proyectos de hardware.")
+TAMANO_BLOQUE = 256
+
+
+def evento_sse(texto, fin=False):
+    candidato = json.loads(respuesta_completa(texto))["candidates"][0]
+    if not fin:
+        del candidato["finishReason"]
+    return b"data: " + json.dumps({"candidates": [candidato]}).encode() + b"\r\n\r\n"
+
+
+def solicitud_anterior(pregunta, cuerpo_respuesta):
+    headers = {"Content-Type": "application/json"}
+    payload = {
+        "contents": [{"parts": [{"text": pregunta}]}],
+        "generationConfig": {"maxOutputTokens": 30}
+    }
+    cuerpo = json.dumps(payload).encode()  # Lo que hace 'post(json=...)'.
+    data = json.loads(bytes(cuerpo_respuesta))
+    return headers, cuerpo, data["candidates"][0]["content"]["parts"][0]["text"]
+
+
+def solicitud_nueva(pregunta, cuerpo_respuesta, extractor=ExtractorTexto()):
+    cuerpo = plantilla(30).cuerpo(pregunta)
+    return ENCABEZADOS_JSON, cuerpo, leer_texto(RespuestaFalsa(cuerpo_respuesta), extractor,
+                                                TAMANO_BLOQUE)
+
+
+class ParserAnterior(ParserStreamGemini):
+    """El parser SSE con json.loads en cada evento, como antes de llm_codec.py."""
+
+    def _procesar(self, carga):
+        datos = json.loads(str(carga, "utf-8"))
+        self.eventos += 1
+        return datos["candidates"][0]["content"]["parts"][0]["text"]
+
+
+def stream_anterior(eventos):
+    return leer_stream(ParserAnterior(), eventos)
+
+
+def stream_nuevo(eventos):
+    return leer_stream(ParserStreamGemini(), eventos)
+
+
+def leer_stream(parser, eventos):
+    partes = []
+    for i in range(0, len(eventos), 64):
+        partes.extend(parser.alimentar(eventos[i:i + 64]))
+    return "".join(partes)
+
+
+def medir(funcion, *argumentos):
+    funcion(*argumentos)  # Calienta las plantillas y cachés.
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    funcion(*argumentos)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    inicio = time.perf_counter()
+    for _ in range(REPETICIONES):
+        funcion(*argumentos)
+    microsegundos = (time.perf_counter() - inicio) / REPETICIONES * 1e6
+    return pico - base, microsegundos
+
+
+def main():
+    cuerpo = respuesta_completa(TEXTO)
+    palabras = TEXTO.split(" ")
+    trozos = [" ".join(palabras[i:i + 3]) + " " for i in range(0, len(palabras), 3)]
+    eventos = b"".join(evento_sse(t, i == len(trozos) - 1) for i, t in enumerate(trozos))
+    assert solicitud_anterior(PREGUNTA, cuerpo)[2] == solicitud_nueva(PREGUNTA, cuerpo)[2] == TEXTO
+    assert stream_anterior(eventos) == stream_nuevo(eventos)
+
+    print(f"Respuesta completa: {len(cuerpo)} B; stream: {len(trozos)} eventos, "
+          f"{len(eventos)} B")
+    print(f"{'Caso':<32}{'pico (B)':>10}{'us/llamada':>12}")
+    for nombre, funcion, argumentos in (
+            ("generateContent anterior", solicitud_anterior, (PREGUNTA, cuerpo)),
+            ("generateContent llm_codec", solicitud_nueva, (PREGUNTA, cuerpo)),
+            ("stream anterior (json.loads)", stream_anterior, (eventos,)),
+            ("stream llm_codec", stream_nuevo, (eventos,))):
+        pico, microsegundos = medir(funcion, *argumentos)
+        print(f"{nombre:<32}{pico:>10}{microsegundos:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# Benchmark de latencia: respuesta completa vs. streaming (llm_stream.py).
+# Uso (en el host): python tests/bench_stream.py
+#
+# Usa el servidor de Gemini falso de gemini_falso.py con una latencia hasta
+# el primer token y una pausa entre fragmentos parecidas a las de la API
+# real. Mide el tiempo hasta el primer carácter (TTFB) y el total.
+
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(os.path.dirname(AQUI), "software"))
+
+from gemini_falso import ServidorGeminiFalso, SesionHost  # noqa: E402
+from llm_stream import preguntar_gemini_stream  # noqa: E402
+
+PRIMER_TOKEN = 0.4      # Segundos hasta el primer fragmento.
+ENTRE_FRAGMENTOS = 0.15
+REPETICIONES = 5
+
+
+def completa(servidor):
+    """Enfoque actual: 'generateContent' y 'response.json()' del cuerpo completo."""
+    inicio = time.monotonic()
+    respuesta = SesionHost().post(servidor.url(), json={"contents": []})
+    texto = respuesta.json()["candidates"][0]["content"]["parts"][0]["text"]
+    respuesta.close()
+    total = time.monotonic() - inicio
+    return total, total, texto  # El primer carácter se ve al final.
+
+
+def streaming(servidor, tamano_chunk=64):
+    primero = []
+    inicio = time.monotonic()
+
+    def al_recibir(fragmento):
+        if not primero:
+            primero.append(time.monotonic() - inicio)
+
+    with contextlib.redirect_stdout(io.StringIO()):  # Oculta los mensajes del módulo.
+        texto = asyncio.run(preguntar_gemini_stream(
+            SesionHost(), servidor.url("streamGenerateContent"), "p", al_recibir,
+            tamano_chunk=tamano_chunk))
+    return primero[0], time.monotonic() - inicio, texto
+
+
+def main():
+    print(f"Servidor: {PRIMER_TOKEN} s al primer token, {ENTRE_FRAGMENTOS} s entre fragmentos")
+    print(f"{'Modo':<22}{'TTFB (ms)':>12}{'total (ms)':>12}")
+    with ServidorGeminiFalso(primer_token=PRIMER_TOKEN, entre_fragmentos=ENTRE_FRAGMENTOS,
+                             corte=48) as servidor:
+        for nombre, medir in (("generateContent", completa),
+                              ("stream, chunk 64 B", streaming),
+                              ("stream, chunk 16 B", lambda s: streaming(s, 16))):
+            resultados = [medir(servidor) for _ in range(REPETICIONES)]
+            ttfb = sum(r[0] for r in resultados) / REPETICIONES
+            total = sum(r[1] for r in resultados) / REPETICIONES
+            print(f"{nombre:<22}{ttfb * 1000:>12.0f}{total * 1000:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# Benchmark: bitácora con escritura diferida (telemetry.py) vs. una
+# escritura a la flash por registro.
+# Uso (en el host): python tests/bench_telemetria.py
+#
+# Simula una hora de recorrido (una lectura del GPS por segundo, una visita
+# por minuto con su consulta) y cuenta las aperturas y escrituras del
+# archivo, el tiempo que pasan las tareas del GPS y del LLM al registrar y
+# el que pasa la tarea de telemetría al volcar. En el microcontrolador cada escritura a la flash borra y
+# reescribe un sector de 4 KB, así que el número de escrituras importa más
+# que los bytes.
+
+import os
+import struct
+import sys
+import tempfile
+import time
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(os.path.dirname(AQUI), "software"))
+
+from poi_index import IndicePOI  # noqa: E402
+from telemetry import FORMATO_REGISTRO, FIX, Telemetria  # noqa: E402
+
+SEGUNDOS = 3600
+
+
+class Reloj:
+    def __init__(self):
+        self.ms = 0
+
+    def __call__(self):
+        return self.ms
+
+
+def crear_indice():
+    indice = IndicePOI(lat_referencia=9.93)
+    for i in range(60):
+        indice.agregar(f"poi_{i}", f"Lugar {i}", 9.93 + i * 0.0004, -84.03)
+    return indice
+
+
+def recorrido(registrar_fix, registrar_visita, reloj, despues=None):
+    """Llama a los registradores como lo harían las tareas durante una hora."""
+    for t in range(SEGUNDOS):
+        reloj.ms = t * 1000
+        registrar_fix(9.93 + t * 1e-6, -84.03)
+        if t % 60 == 30:
+            registrar_visita(f"poi_{t // 60}")
+        if despues is not None:
+            despues()
+
+
+def por_registro(ruta):
+    """Cada registro se agrega al archivo en cuanto ocurre."""
+    reloj = Reloj()
+    cuenta = {"escrituras": 0, "segundos": 0.0}
+
+    def escribir(tipo, a, b):
+        inicio = time.perf_counter()
+        with open(ruta, "ab") as archivo:
+            archivo.write(struct.pack(FORMATO_REGISTRO, tipo, 1, 0, reloj.ms, a, b))
+        cuenta["escrituras"] += 1
+        cuenta["segundos"] += time.perf_counter() - inicio
+
+    recorrido(lambda lat, lon: escribir(FIX, int(lat * 1e6), int(lon * 1e6)),
+              lambda poi_id: (escribir(2, 0, 0), escribir(3, 800, 1)), reloj)
+    return cuenta["escrituras"], cuenta["segundos"], 0.0
+
+
+def diferida(ruta):
+    """Los registros van al buffer; la tarea de telemetría vuelca cada minuto o al llenarse."""
+    reloj = Reloj()
+    telemetria = Telemetria(ruta, crear_indice(), reloj_ms=reloj)
+    registro = [0.0]
+    volcado = [0.0]
+
+    def fix(lat, lon):
+        inicio = time.perf_counter()
+        telemetria.registrar_fix(lat, lon, 1.0)
+        registro[0] += time.perf_counter() - inicio
+
+    def visita(poi_id):
+        inicio = time.perf_counter()
+        telemetria.registrar_evento("entrada", poi_id, 9.93, -84.03)
+        telemetria.registrar_latencia(poi_id, 0.8, 1)
+        registro[0] += time.perf_counter() - inicio
+
+    def tarea_telemetria():
+        if telemetria.debe_volcar():
+            inicio = time.perf_counter()
+            telemetria.volcar()
+            volcado[0] += time.perf_counter() - inicio
+
+    recorrido(fix, visita, reloj, tarea_telemetria)
+    telemetria.volcar()
+    return telemetria.volcados, registro[0], volcado[0]
+
+
+def main():
+    print(f"{'Modo':<14}{'escrituras':>11}{'KB':>7}{'registrar (ms)':>16}{'volcar (ms)':>13}")
+    with tempfile.TemporaryDirectory() as carpeta:
+        for nombre, modo in (("por registro", por_registro), ("diferida", diferida)):
+            ruta = os.path.join(carpeta, nombre + ".bin")
+            escrituras, en_bucle, en_tarea = modo(ruta)
+            print(f"{nombre:<14}{escrituras:>11}{os.path.getsize(ruta) / 1024:>7.0f}"
+                  f"{en_bucle * 1000:>16.1f}{en_tarea * 1000:>13.1f}")
+    print(f"({SEGUNDOS} lecturas del GPS y {SEGUNDOS // 60} visitas; 'escrituras' cuenta "
+          "las aperturas del archivo)")
+
+
+if __name__ == "__main__":
+    main()
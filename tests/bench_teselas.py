@@ -0,0 +1,132 @@
+# Benchmark: POIs de una ciudad en memoria completa y en teselas (poi_tiles.py).
+# Uso (en el host): python tests/bench_teselas.py [pois]
+#
+# Genera una ciudad sintética (por defecto 20 000 POIs en 12 x 12 km, más
+# densa en el centro) y compara el índice completo (IndicePOI cargado de un
+# CSV) con el archivo de teselas: memoria retenida y pico con tracemalloc
+# durante una caminata de una hora con una lectura del GPS por segundo. Sin
+# precarga, la búsqueda del GPS lee las teselas nuevas de la flash al
+# cruzarlas; con la precarga (cada 2 s, como la tarea de teselas) las
+# encuentra residentes. En el host el archivo queda en la caché del sistema
+# operativo, así que se cuentan las lecturas en lugar de medir su tiempo.
+
+import math
+import os
+import random
+import sys
+import tempfile
+import tracemalloc
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(os.path.dirname(AQUI), "software"))
+
+from geofence import MotorGeocercas  # noqa: E402
+from poi_index import cargar_indice  # noqa: E402
+from poi_tiles import IndiceTeselas, escribir_teselas  # noqa: E402
+
+POIS = 20000
+LADO_METROS = 12000.0
+LAT0, LON0 = 9.93300, -84.08000
+METROS_POR_GRADO = 111320.0
+SEGUNDOS_CAMINATA = 3600
+PERIODO_PRECARGA = 2
+
+
+def punto(este, norte):
+    return (LAT0 + norte / METROS_POR_GRADO,
+            LON0 + este / (METROS_POR_GRADO * math.cos(math.radians(LAT0))))
+
+
+def ciudad(cantidad, azar):
+    pois = []
+    for i in range(cantidad):
+        # La mitad de los POIs se concentra alrededor del centro.
+        if i % 2:
+            este = min(max(azar.gauss(LADO_METROS / 2, LADO_METROS / 8), 0), LADO_METROS)
+            norte = min(max(azar.gauss(LADO_METROS / 2, LADO_METROS / 8), 0), LADO_METROS)
+        else:
+            este, norte = azar.uniform(0, LADO_METROS), azar.uniform(0, LADO_METROS)
+        pois.append((f"poi_{i:05d}", f"Lugar de interés número {i}", *punto(este, norte)))
+    return pois
+
+
+def caminata(azar):
+    """Caminata a 1.4 m/s por el centro que cambia de rumbo cada 5 minutos."""
+    este, norte = LADO_METROS / 2, LADO_METROS / 2
+    rumbo = azar.uniform(0, 2 * math.pi)
+    for t in range(SEGUNDOS_CAMINATA):
+        if t % 300 == 0:
+            rumbo += azar.uniform(-math.pi / 2, math.pi / 2)
+        este += 1.4 * math.sin(rumbo)
+        norte += 1.4 * math.cos(rumbo)
+        yield punto(este, norte)
+
+
+def memoria(crear):
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    objeto = crear()
+    retenida, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return objeto, retenida - base, pico - base
+
+
+def recorrer(indice, ruta, precargar):
+    """
+    Pasa la caminata por las geocercas.
+
+    Returns:
+        int: Lecturas del GPS que leyeron la flash (sin contar la primera,
+            que parte sin teselas residentes).
+    """
+    motor = MotorGeocercas(indice)
+    con_carga = 0
+    for t, (lat, lon) in enumerate(ruta):
+        if precargar and t % PERIODO_PRECARGA == 0:
+            indice.precargar(lat, lon)
+        cargas = indice.cargas
+        motor.actualizar(lat, lon, float(t))
+        motor.distancia_borde()
+        if t and indice.cargas != cargas:
+            con_carga += 1
+    return con_carga
+
+
+def main():
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else POIS
+    azar = random.Random(7)
+    pois = ciudad(cantidad, azar)
+    ruta = list(caminata(azar))
+    with tempfile.TemporaryDirectory() as carpeta:
+        csv = os.path.join(carpeta, "ciudad.csv")
+        with open(csv, "w", encoding="utf-8") as archivo:
+            archivo.write("id,nombre,lat,lon\n")
+            for poi in pois:
+                archivo.write("%s,%s,%.7f,%.7f\n" % poi)
+        teselas = os.path.join(carpeta, "ciudad.tiles")
+        tamano = escribir_teselas(teselas, pois)
+        print(f"Ciudad: {cantidad} POIs; archivo de teselas: {tamano // 1024} KB")
+        print(f"{'Índice':<28}{'retenida (KB)':>15}{'pico (KB)':>11}{'lecturas con carga':>20}")
+
+        completo, retenida, pico = memoria(lambda: cargar_indice(csv))
+        print(f"{'IndicePOI (completo)':<28}{retenida // 1024:>15}{pico // 1024:>11}{'-':>20}")
+        del completo
+
+        for precargar in (False, True):
+            indice, retenida, pico = memoria(lambda: IndiceTeselas(teselas))
+            tracemalloc.start()
+            base, _ = tracemalloc.get_traced_memory()
+            con_carga = recorrer(indice, ruta, precargar)
+            final, pico_caminata = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            nombre = "IndiceTeselas con precarga" if precargar else "IndiceTeselas sin precarga"
+            print(f"{nombre:<28}{(retenida + final - base) // 1024:>15}"
+                  f"{(retenida + pico_caminata - base) // 1024:>11}{con_carga:>20}")
+            datos = indice.estadisticas()
+            indice.cerrar()
+        print(f"(con precarga: {datos['teselas']} teselas, {datos['cargas']} leídas de la flash, "
+              f"{datos['desalojos']} desalojos; a lo sumo {indice.max_residentes} residentes)")
+
+
+if __name__ == "__main__":
+    main()
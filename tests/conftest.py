@@ -0,0 +1,16 @@
+# conftest.py
+# Configuración de pytest para las pruebas que corren en el host (PC).
+# Agrega la carpeta 'software' al path para importar los módulos del proyecto
+# tal como se importan en el microcontrolador.
+
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Se agrega al final: "code.py" y "secrets.py" no deben ocultar a los módulos
+# homónimos de la biblioteca estándar que usa pytest.
+sys.path.append(os.path.join(RAIZ, "software"))
+
+# Scripts que se copian al microcontrolador: se ejecutan desde
+# test_simulador.py con el hardware simulado, no como módulos de pytest.
+collect_ignore = ["test_api_gemini.py", "test_wifi_conexion.py"]
@@ -0,0 +1,311 @@
+# gemini_falso.py
+# Servidor HTTP local que imita la API de Gemini, y una sesión HTTP para el
+# host con la misma API que 'adafruit_requests' (post, status_code,
+# iter_content, json, close).
+#
+# El servidor responde a ':generateContent' con el JSON completo y a
+# ':streamGenerateContent' con eventos SSE enviados con 'Transfer-Encoding:
+# chunked', uno por fragmento, con una pausa entre ellos para simular la
+# generación de tokens. También inyecta fallas (códigos de error con
+# 'Retry-After', conexiones cerradas sin respuesta o respuestas cortadas o
+# terminadas a la mitad) para probar la política de reintentos (resilience.py).
+#
+# 'UpstreamSimulado' imita la API del lado del gateway de la flota
+# (tools/gemini_gateway.py), sin HTTP: una corrutina con latencia que cuenta
+# las llamadas.
+
+import asyncio
+import errno
+import http.client
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from json import dumps  # 'post' recibe un parámetro llamado 'json'.
+from urllib.parse import urlsplit
+
+# Fallas que se pueden inyectar, además de un código de estado o una tupla
+# (código, segundos de Retry-After).
+DESCONECTAR = "desconectar"   # Cierra la conexión sin responder.
+CORTAR = "cortar"             # Envía el primer fragmento y cierra la conexión.
+TRUNCAR = "truncar"           # Envía el primer fragmento y termina el stream
+                              # sin 'finishReason'.
+
+FRAGMENTOS = ["Cenfotec abrió ", "sus puertas en ", "los años noventa ", "y formó a miles ",
+              "de ingenieros de software."]
+
+
+def evento(texto, fin=False):
+    """Un fragmento de respuesta tal como lo envía 'streamGenerateContent'."""
+    candidato = {"content": {"parts": [{"text": texto}], "role": "model"}, "index": 0}
+    if fin:
+        candidato["finishReason"] = "STOP"
+    return {"candidates": [candidato]}
+
+
+class ServidorGeminiFalso:
+    """
+    Servidor de Gemini falso en un hilo aparte.
+
+    Args:
+        fragmentos (list): Textos de la respuesta, en orden.
+        primer_token (float): Segundos antes del primer fragmento.
+        entre_fragmentos (float): Segundos entre fragmentos.
+        corte (int): Si es mayor que 0, cada evento se envía en bloques de
+            este tamaño (para que los eventos lleguen partidos).
+        fallas (list): Fallas a inyectar, una por solicitud, antes de las
+            respuestas correctas: un código de estado, (código, Retry-After),
+            DESCONECTAR, CORTAR o TRUNCAR.
+        responder (callable): Si se indica, recibe el texto de la pregunta y
+            retorna la respuesta completa (en lugar de unir los fragmentos).
+    """
+
+    def __init__(self, fragmentos=FRAGMENTOS, primer_token=0.0, entre_fragmentos=0.0,
+                 corte=0, fallas=(), responder=None):
+        self.fragmentos = list(fragmentos)
+        self.primer_token = primer_token
+        self.entre_fragmentos = entre_fragmentos
+        self.corte = corte
+        self.fallas = list(fallas)
+        self.responder = responder
+        self.solicitudes = []   # (ruta, cuerpo JSON) de cada solicitud.
+        self.envios = []        # Instante en que se envió cada fragmento.
+        servidor = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                largo = int(self.headers.get("Content-Length", 0))
+                servidor.solicitudes.append((self.path, json.loads(self.rfile.read(largo))))
+                falla = servidor.fallas.pop(0) if servidor.fallas else None
+                if falla == DESCONECTAR:
+                    self.close_connection = True
+                elif falla == CORTAR:
+                    self._stream(cortar=True)
+                elif falla == TRUNCAR:
+                    self._stream(truncar=True)
+                elif falla is not None:
+                    codigo, retry_after = falla if isinstance(falla, tuple) else (falla, None)
+                    self._responder(codigo, {"error": {"code": codigo, "message": "falla"}},
+                                    retry_after)
+                elif ":streamGenerateContent" in self.path:
+                    self._stream()
+                else:
+                    time.sleep(servidor.primer_token
+                               + servidor.entre_fragmentos * (len(servidor.fragmentos) - 1))
+                    servidor.envios.append(time.monotonic())
+                    self._responder(200, evento(servidor.respuesta(), fin=True))
+
+            def _responder(self, codigo, datos, retry_after=None):
+                cuerpo = json.dumps(datos).encode()
+                self.send_response(codigo)
+                self.send_header("Content-Type", "application/json")
+                if retry_after is not None:
+                    self.send_header("Retry-After", str(retry_after))
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def _chunk(self, datos):
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(datos), datos))
+                self.wfile.flush()
+
+            def _stream(self, cortar=False, truncar=False):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                time.sleep(servidor.primer_token)
+                ultimo = len(servidor.fragmentos) - 1
+                for i, texto in enumerate(servidor.fragmentos):
+                    if i:
+                        time.sleep(servidor.entre_fragmentos)
+                    datos = b"data: " + json.dumps(evento(texto, i == ultimo)).encode() + b"\r\n\r\n"
+                    paso = servidor.corte or len(datos)
+                    for j in range(0, len(datos), paso):
+                        self._chunk(datos[j:j + paso])
+                    servidor.envios.append(time.monotonic())
+                    if cortar:
+                        self.close_connection = True
+                        return
+                    if truncar:
+                        break
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+
+        self._http = ThreadingHTTPServer(("127.0.0.1", 0), Manejador)
+        self._hilo = threading.Thread(target=self._http.serve_forever, args=(0.05,), daemon=True)
+
+    def respuesta(self):
+        """Texto completo de la respuesta a la última solicitud."""
+        if self.responder is None:
+            return "".join(self.fragmentos)
+        cuerpo = self.solicitudes[-1][1]
+        return self.responder(cuerpo["contents"][0]["parts"][0]["text"])
+
+    def url(self, metodo="generateContent"):
+        host, puerto = self._http.server_address
+        return f"http://{host}:{puerto}/v1beta/models/gemini-1.5-flash:{metodo}?key=prueba"
+
+    def __enter__(self):
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *args):
+        self._http.shutdown()
+        self._http.server_close()
+
+
+class _ConexionPool(http.client.HTTPConnection):
+    """Conexión HTTP que abre su socket a través de un socketpool."""
+
+    def __init__(self, pool, host, puerto, timeout):
+        super().__init__(host, puerto, timeout=timeout)
+        self._pool = pool
+
+    def connect(self):
+        familia, tipo, _, _, direccion = self._pool.getaddrinfo(self.host, self.port)[0]
+        self.sock = self._pool.socket(familia, tipo)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(direccion)
+
+
+class RespuestaHost:
+    def __init__(self, sesion, clave, conexion, respuesta):
+        self._sesion = sesion
+        self._clave = clave
+        self._conexion = conexion
+        self._respuesta = respuesta
+        self.status_code = respuesta.status
+        self.headers = dict(respuesta.getheaders())
+        self._cuerpo = None
+
+    def iter_content(self, chunk_size=1):
+        # 'read1' retorna en cuanto hay datos, sin esperar 'chunk_size' bytes.
+        while True:
+            datos = self._respuesta.read1(chunk_size)
+            if not datos:
+                return
+            yield datos
+
+    @property
+    def content(self):
+        if self._cuerpo is None:
+            self._cuerpo = self._respuesta.read()
+        return self._cuerpo
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def close(self):
+        # Como 'adafruit_requests': si la respuesta se leyó completa y el
+        # servidor no pidió cerrar, el socket queda libre para la siguiente.
+        try:
+            self._respuesta.read()
+        except (OSError, http.client.HTTPException):
+            pass
+        if self._respuesta.will_close or not self._respuesta.isclosed():
+            self._sesion._cerrar(self._clave)
+
+
+class SesionHost:
+    """
+    Sesión HTTP mínima con la API de 'adafruit_requests.Session'.
+
+    Igual que 'adafruit_requests', mantiene abierta una conexión por servidor
+    (keep-alive). Con un socketpool, los sockets se abren a través de él.
+    """
+
+    def __init__(self, pool=None):
+        self.pool = pool
+        self._conexiones = {}
+        self.conexiones_abiertas = 0
+
+    def _cerrar(self, clave):
+        conexion = self._conexiones.pop(clave, None)
+        if conexion is not None:
+            conexion.close()
+
+    def _free_sockets(self):
+        # Como 'adafruit_requests': cierra los sockets que esperan otra solicitud.
+        for clave in list(self._conexiones):
+            self._cerrar(clave)
+
+    def post(self, url, headers=None, json=None, data=None, stream=False, timeout=60):
+        partes = urlsplit(url)
+        clave = (partes.hostname, partes.port)
+        conexion = self._conexiones.get(clave)
+        if conexion is None:
+            if self.pool is None:
+                conexion = http.client.HTTPConnection(partes.hostname, partes.port, timeout=timeout)
+            else:
+                conexion = _ConexionPool(self.pool, partes.hostname, partes.port, timeout)
+            self._conexiones[clave] = conexion
+            self.conexiones_abiertas += 1
+        cuerpo = data
+        headers = dict(headers or {})
+        if json is not None:
+            cuerpo = dumps(json).encode()
+            headers["Content-Type"] = "application/json"
+        ruta = partes.path + ("?" + partes.query if partes.query else "")
+        try:
+            conexion.request("POST", ruta, body=cuerpo, headers=headers)
+            respuesta = conexion.getresponse()
+        except socket.timeout as e:
+            self._cerrar(clave)
+            raise OSError(errno.ETIMEDOUT, "Se agotó el tiempo de espera") from e
+        except (OSError, http.client.HTTPException) as e:
+            # Como 'adafruit_requests', el error lleva el errno del socket; una
+            # conexión cerrada por el servidor se informa como ECONNRESET.
+            self._cerrar(clave)
+            raise OSError(getattr(e, "errno", None) or errno.ECONNRESET,
+                          f"Falló la solicitud: {e}") from e
+        return RespuestaHost(self, clave, conexion, respuesta)
+
+
+class UpstreamSimulado:
+    """
+    Upstream falso para el gateway: responde cada pregunta tras una latencia.
+
+    Args:
+        latencia (float): Segundos que tarda cada llamada.
+        fallas (list): Excepciones a lanzar, una por llamada, antes de responder.
+        omitir (set): Preguntas que se dejan sin respuesta cuando van en un
+            lote de varias (como una respuesta de lote incompleta).
+    """
+
+    def __init__(self, latencia=0.0, fallas=(), omitir=()):
+        self.latencia = latencia
+        self.fallas = list(fallas)
+        self.omitir = set(omitir)
+        self.llamadas = []   # Lista de preguntas de cada llamada.
+        self.instantes = []  # Instante en que empezó cada llamada.
+        self.en_curso = 0
+        self.max_en_curso = 0
+
+    def responder(self, pregunta):
+        return f"Respuesta a: {pregunta}"
+
+    async def __call__(self, lote):
+        self.llamadas.append([pregunta for pregunta, _ in lote])
+        self.instantes.append(time.monotonic())
+        self.en_curso += 1
+        self.max_en_curso = max(self.max_en_curso, self.en_curso)
+        try:
+            await asyncio.sleep(self.latencia)
+            if self.fallas:
+                raise self.fallas.pop(0)
+            if len(lote) > 1:
+                return [None if p in self.omitir else self.responder(p) for p, _ in lote]
+            return [self.responder(lote[0][0])]
+        finally:
+            self.en_curso -= 1
@@ -0,0 +1,62 @@
+# lcd_falsa.py
+# Pantalla LCD falsa para pruebas y benchmarks en el host.
+# Imita la API de 'Character_LCD_Mono' que usa el proyecto (clear,
+# cursor_position, column, row y message), guarda el contenido de cada celda
+# y cuenta las escrituras al bus: cada comando (borrar o mover el cursor) y
+# cada carácter cuenta como una escritura. Como en la librería, asignar
+# 'message' mueve el cursor a (column, row) antes del primer carácter y en
+# cada '\n', y después deja column y row en 0.
+
+
+class LCDFalsa:
+    def __init__(self, columnas=16, filas=2):
+        self.columnas = columnas
+        self.filas = filas
+        self.celdas = [[" "] * columnas for _ in range(filas)]
+        self.column = 0
+        self.row = 0
+        self.escrituras = 0
+        self.borrados = 0
+        self.historial = []  # Textos asignados a 'message', en orden.
+
+    def clear(self):
+        self.celdas = [[" "] * self.columnas for _ in range(self.filas)]
+        self.column = self.row = 0
+        self.escrituras += 1
+        self.borrados += 1
+
+    def cursor_position(self, columna, fila):
+        self.column = columna
+        self.row = min(fila, self.filas - 1)
+        self.escrituras += 1
+
+    @property
+    def message(self):
+        return self.historial[-1] if self.historial else ""
+
+    @message.setter
+    def message(self, texto):
+        # Igual que la librería: escribe desde (column, row) y cada '\n' pasa
+        # al inicio de la fila siguiente; los dos mueven el cursor.
+        self.historial.append(texto)
+        fila = self.row
+        columna = None
+        for c in texto:
+            if columna is None:
+                columna = self.column
+                self.cursor_position(columna, fila)
+            if c == "\n":
+                fila += 1
+                columna = 0
+                self.cursor_position(columna, fila)
+                continue
+            if columna < self.columnas:
+                # 'cursor_position' limita la fila a la última, como la librería.
+                self.celdas[self.row][columna] = c
+            columna += 1
+            self.escrituras += 1
+        self.column = self.row = 0
+
+    def pantalla(self):
+        """Contenido visible, con una línea por fila."""
+        return "\n".join("".join(fila) for fila in self.celdas)
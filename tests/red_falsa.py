@@ -0,0 +1,70 @@
+# red_falsa.py
+# Radio WiFi y socketpool falsos para probar la conexión en el host (Linux).
+# Imitan la parte de 'wifi.radio' y 'socketpool.SocketPool' que usa el
+# proyecto. Los sockets son sockets reales de CPython, así funcionan con el
+# servidor de Gemini falso (gemini_falso.py), pero se pueden "matar" para
+# simular un punto de acceso caído.
+
+import socket
+
+
+class RadioFalso:
+    """
+    Radio WiFi falso.
+
+    Args:
+        fallas (int): Cantidad de llamadas a 'connect()' que fallan antes de conectar.
+        conectado (bool): Estado inicial.
+    """
+
+    def __init__(self, fallas=0, conectado=False):
+        self.fallas = fallas
+        self.connected = conectado
+        self.ipv4_address = "192.168.4.20" if conectado else None
+        self.intentos = 0
+        self.timeouts = []  # Timeout pedido en cada llamada a 'connect()'.
+
+    def connect(self, ssid, password, timeout=None):
+        self.intentos += 1
+        self.timeouts.append(timeout)
+        if self.fallas > 0:
+            self.fallas -= 1
+            raise ConnectionError(f"No se encontró la red {ssid}")
+        self.connected = True
+        self.ipv4_address = "192.168.4.20"
+
+    def perder_conexion(self):
+        """Simula que el punto de acceso se cayó."""
+        self.connected = False
+        self.ipv4_address = None
+
+
+class SocketPoolFalso:
+    """Socketpool falso sobre los sockets de CPython."""
+
+    AF_INET = socket.AF_INET
+    SOCK_STREAM = socket.SOCK_STREAM
+
+    def __init__(self, radio):
+        self.radio = radio
+        self.sockets = []
+
+    def getaddrinfo(self, host, puerto, *args):
+        if not self.radio.connected:
+            raise OSError("Sin red")
+        return socket.getaddrinfo(host, puerto, socket.AF_INET, socket.SOCK_STREAM)
+
+    def socket(self, familia=AF_INET, tipo=SOCK_STREAM):
+        if not self.radio.connected:
+            raise OSError("Sin red")
+        nuevo = socket.socket(familia, tipo)
+        self.sockets.append(nuevo)
+        return nuevo
+
+    def matar_sockets(self):
+        """Corta todos los sockets abiertos, como si el AP los hubiera perdido."""
+        for viejo in self.sockets:
+            try:
+                viejo.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
@@ -0,0 +1,11 @@
+# simulador
+# Capa de simulación del hardware para correr el firmware en el host (PC).
+# Incluye los módulos de CircuitPython falsos (hardware.py), un reloj
+# virtual en el que las pausas no cuestan tiempo real (reloj.py), la API de
+# Gemini simulada con latencia configurable (gemini.py) y el entorno que
+# corre code.py y mide sus recorridos (entorno.py).
+
+from simulador.reloj import RelojVirtual, BucleVirtual, FinSimulacion, correr
+from simulador.gemini import GeminiSimulado, respuesta_simulada
+from simulador.hardware import LCDSimulada, RadioSimulado
+from simulador.entorno import CAMPUS, Medidor, Simulador, medir_recorrido
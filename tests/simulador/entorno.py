@@ -0,0 +1,335 @@
+# entorno.py
+# Módulo que arma el entorno simulado y corre el firmware (code.py) en el host.
+#
+# 'Simulador' instala en 'sys.modules' los módulos falsos (hardware, WiFi,
+# 'adafruit_requests', 'secrets' y un 'time' con el reloj virtual) y vuelve
+# a importar los módulos de software/ para que usen el reloj virtual. La
+# memoria flash (CIRCUITPY) es una carpeta temporal: los archivos de datos
+# se copian ahí y las rutas absolutas como '/cache_respuestas.txt' apuntan
+# a ella. Al salir, todo vuelve a quedar como estaba.
+
+import builtins
+import gc
+import importlib.util
+import os
+import runpy
+import shutil
+import sys
+import tempfile
+import tracemalloc
+import types
+
+from simulador.gemini import GeminiSimulado, modulo_requests
+from simulador.hardware import ConsolaSerial, LCDSimulada, RadioSimulado, modulos_hardware
+from simulador.reloj import RelojVirtual, correr, modulo_time
+
+SOFTWARE = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                        "software")
+SECRETOS = {"ssid": "RedSimulada", "password": "clave", "api_key": "simulada"}
+CAMPUS = ["cenfotec", "auditorio", "maker_space"]   # Los POIs de pois.csv, en ese orden.
+
+
+def _modulo_secrets():
+    """'secrets' del proyecto sin ocultar el módulo homónimo de la biblioteca estándar."""
+    import secrets as real
+    modulo = types.ModuleType("secrets")
+    modulo.__getattr__ = lambda nombre: getattr(real, nombre)
+    modulo.secrets = dict(SECRETOS)
+    return modulo
+
+
+def _modulos_proyecto():
+    return {nombre[:-3] for nombre in os.listdir(SOFTWARE) if nombre.endswith(".py")}
+
+
+class Simulador:
+    """
+    Entorno simulado para correr el firmware y los scripts del dispositivo.
+
+    Se usa como administrador de contexto:
+
+        with Simulador() as sim:
+            firmware = sim.importar_firmware()
+            sim.correr(firmware.main(), duracion=90)
+
+    Args:
+        paquete (bool): Si es False, el paquete de contenido no se copia a la
+            flash y todos los POIs se consultan a la API.
+        pois (list): Tuplas (id, nombre, lat, lon) para 'pois.csv'; por
+            defecto, las de software/pois.csv.
+        wifi_fallas (int): Intentos de conexión WiFi que fallan.
+        **latencias: Parámetros de GeminiSimulado (latencia_conexion,
+            primer_token, fallas, etc.).
+
+    Attributes:
+        reloj (RelojVirtual): Reloj de la simulación.
+        radio (RadioSimulado): Radio WiFi ('wifi.radio').
+        gemini (GeminiSimulado): API simulada.
+        lcd (LCDSimulada): LCD creada por el firmware (None hasta crearla).
+        consola (ConsolaSerial): Consola serial; también es 'sys.stdin'
+            mientras dura la simulación.
+        flash (str): Carpeta que hace de memoria flash.
+    """
+
+    def __init__(self, paquete=True, pois=None, wifi_fallas=0, **latencias):
+        self.paquete = paquete
+        self.pois = pois
+        self.reloj = RelojVirtual()
+        self.radio = RadioSimulado(self.reloj, fallas=wifi_fallas)
+        self.gemini = GeminiSimulado(self.reloj, **latencias)
+        self.lcd = None
+        self.consola = ConsolaSerial()
+        self.flash = None
+        self._guardados = {}
+        self._cwd = None
+        self._open = None
+        self._os = None
+        self._stdin = None
+
+    def _crear_lcd(self, columnas, filas):
+        self.lcd = LCDSimulada(self.reloj, columnas, filas)
+        return self.lcd
+
+    def _preparar_flash(self):
+        self.flash = tempfile.mkdtemp(prefix="flash_")
+        if self.pois is None:
+            shutil.copy(os.path.join(SOFTWARE, "pois.csv"), self.flash)
+        else:
+            with open(os.path.join(self.flash, "pois.csv"), "w") as archivo:
+                archivo.write("id,nombre,lat,lon\n")
+                for poi_id, nombre, lat, lon in self.pois:
+                    archivo.write(f"{poi_id},{nombre},{lat:.6f},{lon:.6f}\n")
+        if self.paquete:
+            shutil.copy(os.path.join(SOFTWARE, "contenido.pack"), self.flash)
+
+    def _en_flash(self, ruta):
+        # Los archivos en la raíz del dispositivo ('/x.txt') van a la flash simulada.
+        if isinstance(ruta, str) and ruta.startswith("/") and os.path.dirname(ruta) == "/":
+            return os.path.join(self.flash, ruta[1:])
+        return ruta
+
+    def _open_flash(self, ruta, *args, **opciones):
+        return self._open(self._en_flash(ruta), *args, **opciones)
+
+    def __enter__(self):
+        self._preparar_flash()
+        modulos = modulos_hardware(self.radio, self._crear_lcd, self.consola)
+        modulos["adafruit_requests"] = modulo_requests(self.gemini)
+        modulos["secrets"] = _modulo_secrets()
+        modulos["time"] = modulo_time(self.reloj)
+        # Los módulos del proyecto se vuelven a importar con los módulos falsos.
+        for nombre in list(modulos) + sorted(_modulos_proyecto()):
+            self._guardados[nombre] = sys.modules.pop(nombre, None)
+        sys.modules.update(modulos)
+        if SOFTWARE not in sys.path:
+            sys.path.append(SOFTWARE)
+        self._cwd = os.getcwd()
+        os.chdir(self.flash)
+        self._open = builtins.open
+        builtins.open = self._open_flash
+        self._os = (os.remove, os.rename)
+        remover, renombrar = self._os
+        os.remove = lambda ruta: remover(self._en_flash(ruta))
+        os.rename = lambda origen, destino: renombrar(self._en_flash(origen),
+                                                      self._en_flash(destino))
+        self._stdin = sys.stdin
+        sys.stdin = self.consola
+        return self
+
+    def __exit__(self, *args):
+        builtins.open = self._open
+        os.remove, os.rename = self._os
+        sys.stdin = self._stdin
+        os.chdir(self._cwd)
+        for nombre, modulo in self._guardados.items():
+            if modulo is None:
+                sys.modules.pop(nombre, None)
+            else:
+                sys.modules[nombre] = modulo
+        self._guardados = {}
+        shutil.rmtree(self.flash, ignore_errors=True)
+
+    def importar_firmware(self):
+        """
+        Importa code.py sin lanzar su bucle principal.
+
+        El arranque (LCD, conexión WiFi, índice de POIs) corre en el reloj
+        virtual; el bucle se lanza con 'correr(firmware.main(), ...)'.
+        """
+        # Se carga por ruta: 'code' también es un módulo de la biblioteca estándar.
+        spec = importlib.util.spec_from_file_location("code", os.path.join(SOFTWARE, "code.py"))
+        firmware = importlib.util.module_from_spec(spec)
+        sys.modules["code"] = firmware
+        spec.loader.exec_module(firmware)
+        return firmware
+
+    def correr_script(self, ruta):
+        """Corre un script del dispositivo (por ejemplo, tests/test_api_gemini.py)."""
+        return runpy.run_path(ruta, run_name="__main__")
+
+    def correr(self, corrutina, duracion=None):
+        """Ejecuta una corrutina en el reloj virtual (ver reloj.correr)."""
+        return correr(self.reloj, corrutina, duracion)
+
+
+class Medidor:
+    """
+    Mide un recorrido del firmware simulado.
+
+    Envuelve la ubicación simulada y la consulta de POIs de code.py para
+    registrar las muestras del GPS y el texto de cada POI, y compara los
+    cuadros de la LCD con esos textos. Con el muestreo adaptativo, también
+    registra el periodo que eligió el planificador después de cada muestra.
+    """
+
+    def __init__(self, sim, firmware):
+        self.sim = sim
+        self.firmware = firmware
+        self.muestras = []      # Instante de cada muestra del GPS.
+        self.textos = {}        # id del POI -> descripción consultada.
+        self.consultas = 0      # Entradas a geocercas que llegaron a consultarse.
+        self.periodos = []      # Periodo elegido después de cada muestra (adaptativo).
+        self._ubicacion = firmware.gps_simulado.get_current_location
+        self._consultar = firmware.consultar_poi
+        firmware.gps_simulado.get_current_location = self._muestrear
+        firmware.consultar_poi = self._consultar_poi
+        planificador = firmware.planificador_gps
+        if planificador is not None:
+            actualizar, sin_fix = planificador.actualizar, planificador.sin_fix
+            planificador.actualizar = lambda geocercas: self._periodo(actualizar(geocercas))
+            planificador.sin_fix = lambda: self._periodo(sin_fix())
+
+    def _periodo(self, periodo):
+        self.periodos.append(periodo)
+        return periodo
+
+    def _muestrear(self):
+        self.muestras.append(self.sim.reloj.monotonic())
+        return self._ubicacion()
+
+    async def _consultar_poi(self, poi_id, al_recibir=None):
+        self.consultas += 1
+        partes = []
+
+        def recibir(fragmento):
+            partes.append(fragmento)
+            al_recibir(fragmento)
+
+        texto = await self._consultar(poi_id, recibir if al_recibir is not None else None)
+        texto = texto or "".join(partes)
+        if texto and poi_id not in self.textos:
+            self.textos[poi_id] = texto.replace("\n", " ")
+        return texto
+
+    def latencias_iteracion(self, periodo):
+        """Retraso de cada iteración del GPS respecto a su periodo, en segundos."""
+        periodos = self.periodos or [periodo] * len(self.muestras)
+        return [max(0.0, b - a - p) for a, b, p in zip(self.muestras, self.muestras[1:], periodos)]
+
+    def latencias_llegada(self):
+        """
+        Segundos desde la llegada a cada punto del recorrido hasta que su
+        descripción aparece en la LCD (None si no apareció antes del siguiente).
+        Solo aplica a RecorridoSimulado; con otras fuentes retorna [].
+        """
+        gps = self.firmware.gps_simulado
+        if not hasattr(gps, "segundos_por_punto"):
+            return []
+        cuadros = self.sim.lcd.cuadros
+        resultado = []
+        llegada = gps._inicio
+        fin = self.muestras[-1] if self.muestras else llegada
+        while llegada < fin:
+            siguiente = llegada + gps.segundos_por_punto
+            poi_id = self.firmware.ruta_ids[len(resultado) % len(self.firmware.ruta_ids)]
+            texto = self.textos.get(poi_id)
+            mostrado = None
+            if texto:
+                for instante, visible in cuadros:
+                    primera = visible.split("\n")[0].rstrip()
+                    if llegada <= instante < siguiente and primera and texto.startswith(primera):
+                        mostrado = instante - llegada
+                        break
+            resultado.append(mostrado)
+            llegada = siguiente
+        return resultado
+
+
+def medir_recorrido(ruta=CAMPUS, vueltas=1, segundos_por_lugar=30, pois=None, paquete=False,
+                    usar_lotes=True, backend_llm=None, fuente=None, duracion=None,
+                    muestreo_adaptativo=True, **latencias):
+    """
+    Corre el firmware simulado sobre una ruta y mide su desempeño.
+
+    Args:
+        ruta (list): Ids de los POIs en orden de visita.
+        vueltas (int): Veces que se recorre la ruta (las siguientes usan la caché).
+        segundos_por_lugar (float): Tiempo en cada POI.
+        pois (list): POIs de la flash (ver Simulador).
+        paquete (bool): Si se copia el paquete de contenido a la flash.
+        usar_lotes (bool): Valor de 'USAR_LOTES' en code.py.
+        backend_llm (str): Valor de 'BACKEND_LLM' en code.py; por defecto, el suyo.
+        fuente (callable): Recibe el firmware y retorna la fuente de ubicación
+            (por ejemplo, un reproductor de gps_replay.py); reemplaza la ruta.
+        duracion (float): Segundos simulados; por defecto, los de la ruta.
+        muestreo_adaptativo (bool): Si es False, el GPS se lee con el periodo
+            fijo (sin el planificador de code.py).
+        **latencias: Parámetros de GeminiSimulado.
+
+    Returns:
+        dict: 'iteracion_max' y 'iteracion_media' (retraso del bucle del GPS
+            en segundos), 'llegada_max' y 'llegada_media' (de la llegada a un
+            POI a su descripción en la LCD), 'sin_mostrar' (llegadas sin
+            descripción), 'llamadas_api', 'heap_max' (bytes, pico de
+            tracemalloc durante el bucle principal), 'muestras_gps', 'consultas'
+            (entradas a POIs consultadas), 'aciertos_cache' y 'comandos_gps'
+            (cambios de frecuencia enviados al GPS).
+    """
+    with Simulador(paquete=paquete, pois=pois, **latencias) as sim:
+        firmware = sim.importar_firmware()
+        firmware.USAR_LOTES = usar_lotes
+        if backend_llm is not None:
+            firmware.BACKEND_LLM = backend_llm
+            firmware.backend_llm = firmware.crear_backend()
+        if not muestreo_adaptativo:
+            firmware.planificador_gps = None
+        if not usar_lotes:
+            firmware.precargador.max_pois = 2
+        lugares = [firmware.indice_pois.poi(poi_id) for poi_id in ruta]
+        firmware.ruta_ids = list(ruta)
+        firmware.recorrido = firmware.Recorrido(ruta)
+        if fuente is None:
+            firmware.gps_simulado = firmware.RecorridoSimulado(lugares, segundos_por_lugar)
+        else:
+            firmware.gps_simulado = fuente(firmware)
+        if duracion is None:
+            duracion = len(ruta) * vueltas * segundos_por_lugar
+        medidor = Medidor(sim, firmware)
+        # El pico de memoria se mide desde el arranque del bucle principal:
+        # en el host, el código importado no ocupa el heap como en el dispositivo.
+        gc.collect()
+        tracemalloc.start()
+        try:
+            sim.correr(firmware.main(), duracion=duracion)
+            _, heap_max = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        periodo = firmware.runtime.PERIODO_GPS
+        iteraciones = medidor.latencias_iteracion(periodo) or [0.0]
+        llegadas = medidor.latencias_llegada()
+        mostradas = [segundos for segundos in llegadas if segundos is not None] or [0.0]
+        return {
+            "iteracion_max": max(iteraciones),
+            "iteracion_media": sum(iteraciones) / len(iteraciones),
+            "llegada_max": max(mostradas),
+            "llegada_media": sum(mostradas) / len(mostradas),
+            "sin_mostrar": llegadas.count(None),
+            "llamadas_api": sim.gemini.llamadas(),
+            "heap_max": heap_max,
+            "muestras_gps": len(medidor.muestras),
+            "consultas": medidor.consultas,
+            "aciertos_cache": (firmware.cache_respuestas.aciertos_ram
+                               + firmware.cache_respuestas.aciertos_flash),
+            "comandos_gps": (firmware.planificador_gps.cambios
+                             if firmware.planificador_gps is not None else 0),
+        }
@@ -0,0 +1,185 @@
+# gemini.py
+# Módulo con la API de Gemini simulada y un 'adafruit_requests' falso.
+# A diferencia de gemini_falso.py, no abre sockets: la sesión entrega la
+# solicitud directamente a GeminiSimulado, y la latencia de la red y de la
+# generación avanza el reloj virtual. La sesión bloquea igual que la real:
+# mientras 'post' o 'iter_content' esperan, el bucle de asyncio no avanza.
+
+import json
+import types
+from json import loads  # 'post' recibe un parámetro llamado 'json'.
+from urllib.parse import urlsplit
+
+from gemini_falso import evento
+
+PALABRAS_POR_FRAGMENTO = 3
+
+
+def respuesta_simulada(pregunta):
+    """
+    Respuesta determinista para una pregunta del proyecto.
+
+    Las preguntas de un lote ('- id: nombre' por línea, ver llm_batch.py)
+    reciben un arreglo JSON; las demás, una oración sobre el lugar nombrado
+    en 'Estoy en <lugar>.'.
+    """
+    lugares = []
+    for linea in pregunta.splitlines():
+        if linea.startswith("- ") and ": " in linea:
+            poi_id, nombre = linea[2:].split(": ", 1)
+            lugares.append({"id": poi_id, "texto": _oracion(nombre)})
+    if lugares:
+        return json.dumps(lugares)
+    nombre = "este lugar"
+    if "Estoy en " in pregunta:
+        nombre = pregunta.split("Estoy en ", 1)[1].split(".", 1)[0]
+    return _oracion(nombre)
+
+
+def _oracion(nombre):
+    return f"{nombre} es parte del campus y guarda historias de cientos de estudiantes."
+
+
+def fragmentar(texto, palabras=PALABRAS_POR_FRAGMENTO):
+    """Divide un texto en fragmentos de unas pocas palabras, como el streaming."""
+    partes = texto.split(" ")
+    return [" ".join(partes[i:i + palabras]) + (" " if i + palabras < len(partes) else "")
+            for i in range(0, len(partes), palabras)]
+
+
+class GeminiSimulado:
+    """
+    API de Gemini simulada con latencia configurable.
+
+    Args:
+        reloj (RelojVirtual): Reloj de la simulación.
+        latencia_conexion (float): DNS, TCP y handshake TLS de la primera
+            solicitud de cada sesión (las siguientes reutilizan el socket).
+        ida_y_vuelta (float): Envío de la solicitud y llegada de los encabezados.
+        primer_token (float): Generación hasta el primer fragmento.
+        entre_fragmentos (float): Generación entre fragmentos.
+        responder (callable): Recibe la pregunta y retorna el texto completo.
+        fallas (list): Fallas a inyectar, una por solicitud: un código de
+            estado o (código, segundos de Retry-After).
+
+    Attributes:
+        solicitudes (list): Tuplas (instante, método, pregunta) de cada solicitud.
+    """
+
+    def __init__(self, reloj, latencia_conexion=1.2, ida_y_vuelta=0.15, primer_token=0.4,
+                 entre_fragmentos=0.08, responder=respuesta_simulada, fallas=()):
+        self.reloj = reloj
+        self.latencia_conexion = latencia_conexion
+        self.ida_y_vuelta = ida_y_vuelta
+        self.primer_token = primer_token
+        self.entre_fragmentos = entre_fragmentos
+        self.responder = responder
+        self.fallas = list(fallas)
+        self.solicitudes = []
+
+    def atender(self, url, cuerpo, nueva_conexion):
+        """
+        Atiende una solicitud POST.
+
+        Returns:
+            RespuestaSimulada: La respuesta; los encabezados ya llegaron.
+        """
+        self.reloj.avanzar(self.ida_y_vuelta + (self.latencia_conexion if nueva_conexion else 0))
+        ruta = urlsplit(url).path
+        metodo = ruta.rsplit(":", 1)[-1]
+        pregunta = cuerpo["contents"][0]["parts"][0]["text"]
+        self.solicitudes.append((self.reloj.monotonic(), metodo, pregunta))
+        falla = self.fallas.pop(0) if self.fallas else None
+        if falla is not None:
+            codigo, retry_after = falla if isinstance(falla, tuple) else (falla, None)
+            encabezados = {"Content-Type": "application/json"}
+            if retry_after is not None:
+                encabezados["Retry-After"] = str(retry_after)
+            error = {"error": {"code": codigo, "message": "falla simulada"}}
+            return RespuestaSimulada(self.reloj, codigo, encabezados, [json.dumps(error).encode()])
+
+        fragmentos = fragmentar(self.responder(pregunta))
+        if metodo == "streamGenerateContent":
+            ultimo = len(fragmentos) - 1
+            eventos = [b"data: " + json.dumps(evento(texto, i == ultimo)).encode() + b"\r\n\r\n"
+                       for i, texto in enumerate(fragmentos)]
+            esperas = [self.primer_token] + [self.entre_fragmentos] * ultimo
+            return RespuestaSimulada(self.reloj, 200, {"Content-Type": "text/event-stream"},
+                                     eventos, esperas)
+        # Sin streaming, los encabezados llegan con la respuesta completa.
+        self.reloj.avanzar(self.primer_token + self.entre_fragmentos * (len(fragmentos) - 1))
+        cuerpo = json.dumps(evento("".join(fragmentos), fin=True)).encode()
+        return RespuestaSimulada(self.reloj, 200, {"Content-Type": "application/json"}, [cuerpo])
+
+    def llamadas(self):
+        """Cantidad de solicitudes recibidas."""
+        return len(self.solicitudes)
+
+
+class RespuestaSimulada:
+    """Respuesta con la API de 'adafruit_requests.Response'."""
+
+    def __init__(self, reloj, codigo, encabezados, bloques, esperas=None):
+        self.reloj = reloj
+        self.status_code = codigo
+        self.headers = encabezados
+        self._bloques = bloques
+        self._esperas = esperas or [0.0] * len(bloques)
+
+    def iter_content(self, chunk_size=1):
+        while self._bloques:
+            self.reloj.avanzar(self._esperas.pop(0))
+            bloque = self._bloques.pop(0)
+            for i in range(0, len(bloque), chunk_size):
+                yield bloque[i:i + chunk_size]
+
+    @property
+    def content(self):
+        return b"".join(self.iter_content(1 << 16))
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def close(self):
+        self._bloques = []
+
+
+class SesionSimulada:
+    """
+    Sesión con la API de 'adafruit_requests.Session' que atiende las
+    solicitudes con GeminiSimulado.
+
+    La primera solicitud de la sesión paga la latencia de conexión. Sin WiFi,
+    'post' falla como la sesión real.
+    """
+
+    def __init__(self, gemini, socket_pool, ssl_context=None):
+        self.gemini = gemini
+        self.pool = socket_pool
+        self._conectada = False
+
+    def post(self, url, headers=None, json=None, data=None, stream=False, timeout=60):
+        radio = getattr(self.pool, "radio", None)
+        if radio is not None and not radio.connected:
+            self._conectada = False
+            raise OSError("Sin red")
+        nueva = not self._conectada
+        self._conectada = True
+        if json is None:
+            json = loads(bytes(data))
+        return self.gemini.atender(url, json, nueva)
+
+
+def modulo_requests(gemini):
+    """Crea un módulo 'adafruit_requests' cuyas sesiones usan GeminiSimulado."""
+    modulo = types.ModuleType("adafruit_requests")
+
+    def Session(socket_pool, ssl_context=None, session_id=None):
+        return SesionSimulada(gemini, socket_pool, ssl_context)
+
+    modulo.Session = Session
+    return modulo
@@ -0,0 +1,248 @@
+# hardware.py
+# Módulo con los módulos de CircuitPython falsos de la simulación: 'board',
+# 'digitalio', 'busio', 'wifi', 'socketpool', 'supervisor' y la librería de
+# la LCD ('adafruit_character_lcd.character_lcd'). Solo imitan la parte que
+# usa el proyecto. El radio WiFi y la LCD registran lo que pasa con el instante
+# del reloj virtual, para las mediciones de la simulación.
+
+import types
+
+from lcd_falsa import LCDFalsa
+from red_falsa import RadioFalso
+
+
+class Pin:
+    """Pin de la placa; solo guarda su nombre."""
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+
+    def __repr__(self):
+        return f"board.{self.nombre}"
+
+
+def _modulo_board():
+    modulo = types.ModuleType("board")
+    modulo.board_id = "simulador_esp32"
+    pines = {}
+
+    def pin(nombre):
+        if nombre.startswith("__"):
+            raise AttributeError(nombre)
+        if nombre not in pines:
+            pines[nombre] = Pin(nombre)
+        return pines[nombre]
+
+    # Cualquier pin existe: 'board.IO21', 'board.TX', etc.
+    modulo.__getattr__ = pin
+    return modulo
+
+
+class DigitalInOut:
+    def __init__(self, pin):
+        self.pin = pin
+        self.direction = None
+        self.pull = None
+        self.value = False
+
+    def switch_to_output(self, value=False, drive_mode=None):
+        self.value = value
+
+    def switch_to_input(self, pull=None):
+        self.pull = pull
+
+    def deinit(self):
+        pass
+
+
+def _modulo_digitalio():
+    modulo = types.ModuleType("digitalio")
+    modulo.DigitalInOut = DigitalInOut
+    modulo.Direction = types.SimpleNamespace(INPUT="input", OUTPUT="output")
+    modulo.Pull = types.SimpleNamespace(UP="up", DOWN="down")
+    modulo.DriveMode = types.SimpleNamespace(PUSH_PULL="push_pull", OPEN_DRAIN="open_drain")
+    return modulo
+
+
+class UART:
+    """
+    UART falso: 'read' entrega los bytes cargados con 'cargar' (por ejemplo,
+    sentencias NMEA) y 'write' guarda lo enviado (comandos PMTK).
+    """
+
+    def __init__(self, tx=None, rx=None, baudrate=9600, timeout=1, receiver_buffer_size=64):
+        self.baudrate = baudrate
+        self.pendiente = bytearray()
+        self.enviado = bytearray()
+
+    def cargar(self, datos):
+        self.pendiente += datos
+
+    @property
+    def in_waiting(self):
+        return len(self.pendiente)
+
+    def read(self, cantidad=None):
+        if not self.pendiente:
+            return None
+        if cantidad is None:
+            cantidad = len(self.pendiente)
+        datos = bytes(self.pendiente[:cantidad])
+        self.pendiente = self.pendiente[cantidad:]
+        return datos
+
+    def readinto(self, buf):
+        datos = self.read(len(buf))
+        if not datos:
+            return None
+        buf[:len(datos)] = datos
+        return len(datos)
+
+    def write(self, datos):
+        self.enviado += datos
+        return len(datos)
+
+    def reset_input_buffer(self):
+        self.pendiente = bytearray()
+
+    def deinit(self):
+        pass
+
+
+def _modulo_busio():
+    modulo = types.ModuleType("busio")
+    modulo.UART = UART
+    return modulo
+
+
+class RadioSimulado(RadioFalso):
+    """
+    Radio WiFi que tarda 'tiempo_conexion' segundos virtuales en conectar.
+
+    Args:
+        reloj (RelojVirtual): Reloj de la simulación.
+        tiempo_conexion (float): Segundos de cada intento de conexión.
+        fallas (int): Intentos que fallan antes de conectar.
+    """
+
+    def __init__(self, reloj, tiempo_conexion=2.0, fallas=0):
+        super().__init__(fallas=fallas)
+        self.reloj = reloj
+        self.tiempo_conexion = tiempo_conexion
+        self.conexiones = []  # Instante en que terminó cada conexión exitosa.
+
+    def connect(self, ssid, password, **opciones):
+        self.reloj.avanzar(self.tiempo_conexion)
+        super().connect(ssid, password, **opciones)
+        self.conexiones.append(self.reloj.monotonic())
+
+
+def _modulo_wifi(radio):
+    modulo = types.ModuleType("wifi")
+    modulo.radio = radio
+    return modulo
+
+
+class SocketPoolSimulado:
+    """Socketpool de la simulación: las sesiones simuladas no abren sockets reales."""
+
+    def __init__(self, radio):
+        self.radio = radio
+
+
+def _modulo_socketpool():
+    modulo = types.ModuleType("socketpool")
+    modulo.SocketPool = SocketPoolSimulado
+    return modulo
+
+
+class LCDSimulada(LCDFalsa):
+    """
+    LCD falsa que guarda cada cuadro visible con el instante en que apareció.
+
+    Attributes:
+        cuadros (list): Tuplas (instante, contenido visible) de cada cambio.
+    """
+
+    def __init__(self, reloj, columnas=16, filas=2):
+        super().__init__(columnas, filas)
+        self.reloj = reloj
+        self.cuadros = []
+
+    def _registrar(self):
+        visible = self.pantalla()
+        if not self.cuadros or self.cuadros[-1][1] != visible:
+            self.cuadros.append((self.reloj.monotonic(), visible))
+
+    def clear(self):
+        super().clear()
+        self._registrar()
+
+    @LCDFalsa.message.setter
+    def message(self, texto):
+        LCDFalsa.message.fset(self, texto)
+        self._registrar()
+
+
+class ConsolaSerial:
+    """
+    Consola serial de 'supervisor.runtime': las líneas escritas con
+    'escribir' quedan disponibles como 'serial_bytes_available'.
+    """
+
+    def __init__(self):
+        self.lineas = []
+
+    def escribir(self, linea):
+        self.lineas.append(linea + "\n")
+
+    @property
+    def serial_bytes_available(self):
+        return sum(len(linea) for linea in self.lineas)
+
+    def readline(self):
+        return self.lineas.pop(0) if self.lineas else ""
+
+
+def _modulo_supervisor(consola):
+    modulo = types.ModuleType("supervisor")
+    modulo.runtime = consola
+    return modulo
+
+
+def _modulos_lcd(crear_lcd):
+    paquete = types.ModuleType("adafruit_character_lcd")
+    paquete.__path__ = []
+    modulo = types.ModuleType("adafruit_character_lcd.character_lcd")
+
+    def Character_LCD_Mono(rs, en, d4, d5, d6, d7, columns, lines, backlight_pin=None,
+                           backlight_inverted=False):
+        return crear_lcd(columns, lines)
+
+    modulo.Character_LCD_Mono = Character_LCD_Mono
+    paquete.character_lcd = modulo
+    return {"adafruit_character_lcd": paquete, "adafruit_character_lcd.character_lcd": modulo}
+
+
+def modulos_hardware(radio, crear_lcd, consola):
+    """
+    Crea los módulos de hardware falsos.
+
+    Args:
+        radio (RadioSimulado): Radio que expone 'wifi.radio'.
+        crear_lcd (callable): Recibe (columnas, filas) y retorna la LCD.
+        consola (ConsolaSerial): Consola que expone 'supervisor.runtime'.
+
+    Returns:
+        dict: Nombre del módulo -> módulo, para instalar en 'sys.modules'.
+    """
+    modulos = {
+        "board": _modulo_board(),
+        "digitalio": _modulo_digitalio(),
+        "busio": _modulo_busio(),
+        "wifi": _modulo_wifi(radio),
+        "socketpool": _modulo_socketpool(),
+        "supervisor": _modulo_supervisor(consola),
+    }
+    modulos.update(_modulos_lcd(crear_lcd))
+    return modulos
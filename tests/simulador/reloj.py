@@ -0,0 +1,120 @@
+# reloj.py
+# Módulo con el reloj virtual de la simulación.
+# El tiempo solo avanza cuando el código simulado espera: 'time.sleep', las
+# pausas de asyncio o la latencia simulada de la red. Así un recorrido de
+# varios minutos se simula en una fracción de segundo y las mediciones no
+# dependen de la carga del host.
+
+import asyncio
+import selectors
+import sys
+import types
+
+
+class FinSimulacion(Exception):
+    """El código simulado se quedó esperando sin nada programado."""
+
+
+class RelojVirtual:
+    """
+    Reloj que avanza solo de forma explícita.
+
+    Args:
+        inicio (float): Segundos iniciales de 'monotonic()'.
+        epoca (float): Valor de 'time()' en el instante inicial.
+    """
+
+    def __init__(self, inicio=1000.0, epoca=1767225600.0):
+        self.ahora = inicio
+        self._desfase_epoca = epoca - inicio
+
+    def monotonic(self):
+        return self.ahora
+
+    def time(self):
+        return self.ahora + self._desfase_epoca
+
+    def avanzar(self, segundos):
+        if segundos > 0:
+            self.ahora += segundos
+
+    def sleep(self, segundos):
+        self.avanzar(segundos)
+
+
+def modulo_time(reloj):
+    """
+    Crea un módulo 'time' que usa el reloj virtual.
+
+    'monotonic', 'time' y 'sleep' (y sus variantes en nanosegundos) usan el
+    reloj; el resto de los atributos son los del módulo 'time' real.
+    """
+    real = sys.modules["time"]
+    modulo = types.ModuleType("time")
+    modulo.__getattr__ = lambda nombre: getattr(real, nombre)
+    modulo.monotonic = reloj.monotonic
+    modulo.time = reloj.time
+    modulo.sleep = reloj.sleep
+    modulo.monotonic_ns = lambda: int(reloj.monotonic() * 1e9)
+    modulo.time_ns = lambda: int(reloj.time() * 1e9)
+    return modulo
+
+
+class _SelectorVirtual:
+    """
+    Selector que no bloquea: revisa los descriptores sin esperar y, si no hay
+    eventos, adelanta el reloj hasta el siguiente temporizador.
+    """
+
+    def __init__(self, reloj):
+        self._reloj = reloj
+        self._real = selectors.DefaultSelector()
+
+    def __getattr__(self, nombre):
+        return getattr(self._real, nombre)
+
+    def select(self, timeout=None):
+        eventos = self._real.select(0)
+        if eventos or timeout == 0:
+            return eventos
+        if timeout is None:
+            raise FinSimulacion("Todas las tareas esperan un evento que nunca llegará")
+        self._reloj.avanzar(timeout)
+        return []
+
+
+class BucleVirtual(asyncio.SelectorEventLoop):
+    """Bucle de asyncio cuyas pausas avanzan el reloj virtual en lugar de esperar."""
+
+    def __init__(self, reloj):
+        super().__init__(_SelectorVirtual(reloj))
+        self.reloj = reloj
+
+    def time(self):
+        return self.reloj.monotonic()
+
+
+def correr(reloj, corrutina, duracion=None):
+    """
+    Ejecuta una corrutina en un bucle virtual.
+
+    Args:
+        reloj (RelojVirtual): Reloj de la simulación.
+        corrutina (coroutine): Corrutina a ejecutar.
+        duracion (float): Si se indica, la corrutina se cancela al pasar estos
+            segundos virtuales (para las tareas que no terminan nunca).
+
+    Returns:
+        El resultado de la corrutina, o None si se canceló por la duración.
+    """
+    bucle = BucleVirtual(reloj)
+    try:
+        if duracion is None:
+            return bucle.run_until_complete(corrutina)
+        try:
+            return bucle.run_until_complete(asyncio.wait_for(corrutina, duracion))
+        except asyncio.TimeoutError:
+            return None
+    finally:
+        bucle.run_until_complete(bucle.shutdown_asyncgens())
+        bucle.close()
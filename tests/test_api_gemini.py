@@ -5,10 +5,11 @@ import ssl
 import wifi
 import adafruit_requests as requests
 from secrets import secrets
+from llm_backends import endpoint_gemini
 
 # Configuración de la API.
 API_KEY = secrets["api_key"]
-ENDPOINT = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent?key={API_KEY}"
+ENDPOINT = endpoint_gemini(API_KEY)
 
 # Conexión al WiFi (necesaria para la prueba de la API).
 try:
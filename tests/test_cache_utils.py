@@ -0,0 +1,122 @@
+# Pruebas de la caché de respuestas de Gemini (cache_utils.py).
+
+import cache_utils
+from cache_utils import CacheRespuestas, RelojEncendido, clave_cache
+
+
+class RelojFalso:
+    """Reloj controlado por la prueba para simular el paso del tiempo."""
+
+    def __init__(self):
+        self.ahora = 1000.0
+
+    def __call__(self):
+        return self.ahora
+
+
+def test_clave_normaliza_la_pregunta():
+    assert clave_cache("auditorio", "  Dime ALGO   interesante ") == "auditorio|dime algo interesante"
+
+
+def test_lru_expulsa_la_entrada_menos_usada():
+    cache = CacheRespuestas(max_entradas=2)
+    cache.guardar("a", "p", "A")
+    cache.guardar("b", "p", "B")
+    assert cache.obtener("a", "p") == "A"  # 'a' pasa a ser la más reciente.
+    cache.guardar("c", "p", "C")           # Se expulsa 'b'.
+    assert cache.obtener("b", "p") is None
+    assert cache.obtener("a", "p") == "A"
+    assert cache.obtener("c", "p") == "C"
+    stats = cache.estadisticas()
+    assert stats["aciertos_ram"] == 3
+    assert stats["fallos"] == 1
+    assert stats["expulsiones"] == 1
+
+
+def test_entradas_expiran_con_el_ttl():
+    reloj = RelojFalso()
+    cache = CacheRespuestas(ttl=60, reloj=reloj)
+    cache.guardar("a", "p", "A")
+    reloj.ahora += 59
+    assert cache.obtener("a", "p") == "A"
+    reloj.ahora += 2
+    assert cache.obtener("a", "p") is None
+
+
+def test_nivel_flash_sobrevive_reinicios(tmp_path):
+    ruta = str(tmp_path / "cache.txt")
+    cache = CacheRespuestas(ruta_flash=ruta)
+    cache.guardar("auditorio", "Dato del auditorio", "Es el espacio principal.\nSegunda línea")
+
+    # Una instancia nueva simula el reinicio del microcontrolador.
+    reiniciada = CacheRespuestas(ruta_flash=ruta)
+    assert reiniciada.obtener("auditorio", "dato del auditorio") == "Es el espacio principal. Segunda línea"
+    assert reiniciada.estadisticas()["aciertos_flash"] == 1
+    # La segunda lectura ya sale de RAM.
+    reiniciada.obtener("auditorio", "dato del auditorio")
+    assert reiniciada.estadisticas()["aciertos_ram"] == 1
+
+
+def test_la_vigencia_sigue_entre_reinicios_sin_rtc(tmp_path):
+    ruta = str(tmp_path / "cache.txt")
+    monotonico = RelojFalso()
+    cache = CacheRespuestas(ttl=100, ruta_flash=ruta, reloj=RelojEncendido(monotonico=monotonico))
+    cache.guardar("a", "p", "A")
+    monotonico.ahora += 40
+    cache.guardar("b", "p", "B")
+
+    # Cada arranque el reloj vuelve a empezar; las marcas continúan desde
+    # la más reciente del archivo ('b', a los 40 s de uso).
+    for _ in range(2):
+        monotonico = RelojFalso()
+        monotonico.ahora = 3.0
+        reiniciada = CacheRespuestas(ttl=100, ruta_flash=ruta,
+                                     reloj=RelojEncendido(monotonico=monotonico))
+        assert reiniciada.obtener("a", "p") == "A"
+        monotonico.ahora += 30
+        reiniciada.guardar("c", "p", "C")
+    # 'a' tiene 100 s de uso: ya expiró; 'b' tiene 60 s y sigue vigente.
+    assert reiniciada.obtener("a", "p") is None
+    assert reiniciada.obtener("b", "p") == "B"
+
+
+def test_flash_se_compacta_al_superar_el_tamano(tmp_path):
+    ruta = tmp_path / "cache.txt"
+    cache = CacheRespuestas(ruta_flash=str(ruta), max_bytes_flash=2000)
+    for i in range(100):
+        cache.guardar(f"poi{i % 5}", "p", "x" * 40 + str(i))
+    assert ruta.stat().st_size <= 2000
+    # La versión más reciente de cada POI sigue disponible tras compactar.
+    reiniciada = CacheRespuestas(ruta_flash=str(ruta))
+    assert reiniciada.obtener("poi4", "p") == "x" * 40 + "99"
+
+
+def test_fallos_no_leen_la_flash(tmp_path, monkeypatch):
+    ruta = str(tmp_path / "cache.txt")
+    cache = CacheRespuestas(ruta_flash=ruta)
+    for i in range(20):
+        cache.guardar(f"poi{i}", "Dato del lugar", f"Texto {i}")
+    cache.guardar("poi3", "Otra pregunta", "Otro texto")
+
+    aperturas = []
+
+    def abrir(*args):
+        aperturas.append(args)
+        return open(*args)
+
+    reiniciada = CacheRespuestas(ruta_flash=ruta)
+    monkeypatch.setattr(cache_utils, "open", abrir, raising=False)
+    # Un POI que nunca se guardó es un fallo sin abrir el archivo.
+    assert reiniciada.obtener("nuevo", "Dato del lugar") is None
+    assert aperturas == []
+    # Uno guardado se lee con una sola apertura, directo a su línea.
+    assert reiniciada.obtener("poi3", "dato del lugar") == "Texto 3"
+    assert reiniciada.obtener("poi3", "otra pregunta") == "Otro texto"
+    assert reiniciada.obtener("poi3", "sin guardar") is None
+    assert len(aperturas) == 3
+
+    # El índice sigue al día tras guardar y compactar.
+    reiniciada.max_bytes_flash = 200
+    reiniciada.guardar("poi21", "p", "Nuevo")
+    reiniciada._ram.clear()
+    assert reiniciada.obtener("poi21", "p") == "Nuevo"
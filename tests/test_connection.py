@@ -0,0 +1,199 @@
+# Pruebas del gestor de conexión (connection.py) con el radio y el socketpool
+# falsos de red_falsa.py y el servidor de Gemini falso.
+
+import asyncio
+import sys
+import time
+import types
+
+import pytest
+
+import runtime
+from connection import TIMEOUT_WIFI, GestorConexion, cerrar_sockets
+from gemini_falso import FRAGMENTOS, ServidorGeminiFalso, SesionHost
+from llm_stream import preguntar_gemini_stream
+from red_falsa import RadioFalso, SocketPoolFalso
+from resilience import EsperaExponencial
+
+
+class RelojFalso:
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+
+def crear_gestor(radio, reloj=time.monotonic):
+    pools = []
+
+    def crear_pool(radio):
+        pools.append(SocketPoolFalso(radio))
+        return pools[-1]
+
+    gestor = GestorConexion(radio, "ExpoCenfo", "clave", crear_pool, SesionHost, reloj=reloj)
+    return gestor, pools
+
+
+def enviar(gestor, servidor):
+    respuesta = gestor.post(servidor.url(), json={"contents": []}, timeout=2)
+    texto = respuesta.json()["candidates"][0]["content"]["parts"][0]["text"]
+    respuesta.close()
+    return texto
+
+
+def test_reutiliza_la_conexion_entre_consultas():
+    radio = RadioFalso()
+    gestor, pools = crear_gestor(radio)
+    gestor.conectar()
+    with ServidorGeminiFalso() as servidor:
+        for _ in range(3):
+            assert enviar(gestor, servidor) == "".join(FRAGMENTOS)
+        # También como sesión del cliente con streaming.
+        texto = asyncio.run(preguntar_gemini_stream(
+            gestor, servidor.url("streamGenerateContent"), "p"))
+        assert texto == "".join(FRAGMENTOS)
+    assert len(pools) == 1 and len(pools[0].sockets) == 1
+    datos = gestor.estadisticas()
+    assert datos["sesiones"] == 1 and datos["conexiones_wifi"] == 1
+    assert datos["wifi"] is not None and datos["primera_solicitud"] is not None
+    assert datos["reutilizada"] is not None
+
+
+def test_renueva_la_sesion_al_reconectar_el_wifi():
+    radio = RadioFalso()
+    gestor, pools = crear_gestor(radio)
+    gestor.conectar()
+    with ServidorGeminiFalso() as servidor:
+        enviar(gestor, servidor)
+        radio.perder_conexion()
+        assert not gestor.connected
+        try:
+            enviar(gestor, servidor)
+            assert False, "Debió fallar sin WiFi"
+        except ConnectionError:
+            pass
+        gestor.conectar()
+        enviar(gestor, servidor)
+    # El socket anterior no se volvió a usar y quedó cerrado; el pool es el mismo.
+    assert len(pools) == 1 and len(pools[0].sockets) == 2
+    assert pools[0].sockets[0].fileno() == -1 and pools[0].sockets[1].fileno() != -1
+    assert gestor.estadisticas()["sesiones"] == 2
+
+
+def test_socket_muerto_se_detecta_sin_esperar_el_timeout():
+    radio = RadioFalso()
+    gestor, pools = crear_gestor(radio)
+    gestor.conectar()
+    with ServidorGeminiFalso() as servidor:
+        enviar(gestor, servidor)
+        pools[0].matar_sockets()
+        inicio = time.monotonic()
+        assert enviar(gestor, servidor) == "".join(FRAGMENTOS)
+        assert time.monotonic() - inicio < 1.0  # El timeout es de 2 s.
+    assert gestor.sockets_muertos == 1
+    assert gestor.estadisticas()["sesiones"] == 2
+
+
+def test_renueva_la_sesion_tras_mucha_inactividad():
+    radio = RadioFalso()
+    reloj = RelojFalso()
+    gestor, pools = crear_gestor(radio, reloj)
+    gestor.conectar()
+    with ServidorGeminiFalso() as servidor:
+        enviar(gestor, servidor)
+        reloj.t += 30
+        enviar(gestor, servidor)
+        assert gestor.sesiones == 1
+        reloj.t += gestor.max_inactividad + 1
+        enviar(gestor, servidor)
+    assert gestor.sesiones == 2 and gestor.sockets_muertos == 0
+    # Solo se renovó la sesión, no el pool.
+    assert len(pools) == 1 and len(pools[0].sockets) == 2
+    assert pools[0].sockets[0].fileno() == -1 and pools[0].sockets[1].fileno() != -1
+
+
+def test_timeout_de_lectura_no_repite_la_solicitud():
+    radio = RadioFalso()
+    gestor, pools = crear_gestor(radio)
+    gestor.conectar()
+    with ServidorGeminiFalso() as servidor:
+        gestor.post(servidor.url(), json={"contents": []}, timeout=0.2).close()
+        # La solicitud llegó, pero la respuesta tarda más que el timeout:
+        # repetirla la cobraría dos veces.
+        servidor.primer_token = 0.5
+        with pytest.raises(OSError):
+            gestor.post(servidor.url(), json={"contents": []}, timeout=0.2)
+        assert len(servidor.solicitudes) == 2
+    assert gestor.sockets_muertos == 0 and pools[0].sockets[0].fileno() == -1
+
+
+def test_cierra_los_sockets_con_el_connection_manager(monkeypatch):
+    # 'adafruit_requests' 3.x: los sockets son del pool, no de la sesión.
+    cerrados = []
+    modulo = types.ModuleType("adafruit_connection_manager")
+    modulo.connection_manager_close_all = cerrados.append
+    monkeypatch.setitem(sys.modules, "adafruit_connection_manager", modulo)
+    pool = object()
+    assert cerrar_sockets(object(), pool)
+    assert cerrados == [pool]
+
+
+def test_avisa_si_no_puede_cerrar_los_sockets(capsys):
+    assert not cerrar_sockets(object())
+    assert "No se pudieron cerrar" in capsys.readouterr().out
+
+
+def test_tarea_wifi_reconecta_con_espera_exponencial():
+    radio = RadioFalso(fallas=3)
+    gestor, _ = crear_gestor(radio)
+    instantes = []
+    conectar = gestor.conectar
+
+    def conectar_registrando():
+        instantes.append(time.monotonic())
+        conectar()
+
+    async def principal():
+        estado = runtime.Estado()
+        espera = EsperaExponencial(base=0.02, maxima=1.0, aleatorio=lambda: 1.0)
+        tarea = asyncio.create_task(runtime.tarea_wifi(
+            estado, gestor, conectar_registrando, periodo=0.02, espera=espera))
+        await asyncio.sleep(0.4)
+        tarea.cancel()
+        await asyncio.gather(tarea, return_exceptions=True)
+        return estado
+
+    estado = asyncio.run(principal())
+    assert radio.intentos == 4 and gestor.connected
+    assert radio.timeouts == [TIMEOUT_WIFI] * 4
+    assert estado.wifi_conectado and estado.reconexiones == 1
+    # Esperas de 0.02, 0.04 y 0.08 s entre los intentos fallidos.
+    pausas = [b - a for a, b in zip(instantes, instantes[1:])]
+    assert pausas[0] < pausas[1] < pausas[2]
+
+
+def test_tarea_wifi_cede_el_control_antes_de_conectar():
+    # La conexión bloquea el bucle: antes de cada intento corren las demás
+    # tareas que estaban listas (por ejemplo, la del GPS).
+    radio = RadioFalso()
+    gestor, _ = crear_gestor(radio)
+    orden = []
+
+    def conectar():
+        orden.append("wifi")
+        gestor.conectar()
+
+    async def gps():
+        orden.append("gps")
+
+    async def principal():
+        estado = runtime.Estado()
+        tarea = asyncio.create_task(runtime.tarea_wifi(estado, gestor, conectar, periodo=0.01))
+        asyncio.create_task(gps())
+        await asyncio.sleep(0.02)
+        tarea.cancel()
+        await asyncio.gather(tarea, return_exceptions=True)
+
+    asyncio.run(principal())
+    assert orden == ["gps", "wifi"]
@@ -0,0 +1,73 @@
+# Pruebas del paquete de contenido sin conexión (content_pack.py) y de la
+# herramienta que lo construye (tools/build_content_pack.py).
+
+import os
+import sys
+
+import pytest
+
+from content_pack import PaqueteContenido, abrir_paquete, escribir_paquete
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(RAIZ, "tools"))
+
+import build_content_pack  # noqa: E402
+
+
+def test_ida_y_vuelta_con_busqueda_por_id(tmp_path):
+    textos = {f"poi_{i:04d}": f"Descripción número {i} con tildes: áéíóú." for i in range(500)}
+    ruta = str(tmp_path / "contenido.pack")
+    tamano = escribir_paquete(ruta, textos)
+    assert os.path.getsize(ruta) == tamano
+
+    with PaqueteContenido(ruta) as paquete:
+        assert len(paquete) == 500
+        assert paquete.texto("poi_0000") == textos["poi_0000"]
+        assert paquete.texto("poi_0499") == textos["poi_0499"]
+        lecturas = paquete.lecturas
+        assert paquete.texto("poi_0250") == textos["poi_0250"]
+        # Búsqueda binaria: unas 9 lecturas del índice más el registro, no 500.
+        assert paquete.lecturas - lecturas <= 12
+        assert paquete.texto("no_existe") is None
+        assert "poi_0042" in paquete and "x" * 40 not in paquete
+        assert list(paquete.ids()) == sorted(textos)
+
+
+def test_archivo_invalido_o_inexistente(tmp_path):
+    ruta = tmp_path / "otro.bin"
+    ruta.write_bytes(b"no es un paquete")
+    with pytest.raises(ValueError):
+        PaqueteContenido(str(ruta))
+    assert abrir_paquete(str(ruta)) is None
+    assert abrir_paquete(str(tmp_path / "falta.pack")) is None
+
+
+def test_id_demasiado_largo(tmp_path):
+    with pytest.raises(ValueError):
+        escribir_paquete(str(tmp_path / "p.pack"), {"x" * 30: "texto"})
+
+
+def test_herramienta_importa_y_genera_con_llm_falso(tmp_path):
+    pois = tmp_path / "pois.csv"
+    pois.write_text("id,nombre,lat,lon\n"
+                    "cenfotec,Universidad Cenfotec,9.93310,-84.03220\n"
+                    "auditorio,Auditorio,9.93282,-84.03200\n", encoding="utf-8")
+    importados = tmp_path / "respuestas.csv"
+    importados.write_text("id,texto\nauditorio,Sala principal, con 300 butacas.\n",
+                          encoding="utf-8")
+    salida = str(tmp_path / "contenido.pack")
+
+    build_content_pack.main(["--pois", str(pois), "--importar", str(importados),
+                             "--llm", "falso", "--salida", salida])
+
+    with PaqueteContenido(salida) as paquete:
+        assert paquete.texto("auditorio") == "Sala principal, con 300 butacas."
+        # El prompt sale de models/prompt_base.txt con el nombre del lugar.
+        assert paquete.texto("cenfotec") == ("Dato: Estoy en Universidad Cenfotec. "
+                                             "Dame un dato interesante.")
+
+
+def test_paquete_del_repositorio_cubre_los_pois():
+    with PaqueteContenido(os.path.join(RAIZ, "software", "contenido.pack")) as paquete:
+        assert sorted(paquete.ids()) == ["auditorio", "cenfotec", "maker_space"]
+        assert paquete.texto("auditorio").startswith("El Auditorio es el espacio principal")
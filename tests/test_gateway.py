@@ -0,0 +1,246 @@
+# Pruebas del gateway de la flota (tools/gemini_gateway.py): caché compartida,
+# unión de solicitudes idénticas, lotes, cuota y el servidor HTTP con el
+# protocolo de Gemini que usan los dispositivos.
+
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import threading
+import urllib.request
+
+import pytest
+
+from gemini_falso import SesionHost, UpstreamSimulado
+from llm_batch import ClienteLotes
+from llm_stream import endpoint_stream, preguntar_gemini_stream
+from resilience import LimitadorTokens
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(RAIZ, "tools"))
+
+import gemini_gateway  # noqa: E402
+from gemini_gateway import CacheCompartida, ColaLlena, Gateway, ServidorGateway  # noqa: E402
+
+
+def sin_cuota():
+    return LimitadorTokens(60000, 100)
+
+
+def correr(corrutina):
+    """Ejecuta una prueba que necesita el bucle de asyncio (el gateway crea sus primitivas)."""
+    return asyncio.run(corrutina())
+
+
+def test_une_solicitudes_identicas_en_una_llamada():
+    upstream = UpstreamSimulado(latencia=0.05)
+
+    async def prueba():
+        gateway = Gateway(upstream, limitador=sin_cuota())
+        textos = await asyncio.gather(*[gateway.preguntar("Háblame del Aula 1")
+                                        for _ in range(50)])
+        await gateway.cerrar()
+        return gateway, textos
+
+    gateway, textos = correr(prueba)
+    assert upstream.llamadas == [["Háblame del Aula 1"]]
+    assert set(textos) == {"Respuesta a: Háblame del Aula 1"}
+    assert gateway.unidas == 49
+
+
+def test_responde_desde_la_cache_compartida():
+    upstream = UpstreamSimulado()
+
+    async def prueba():
+        gateway = Gateway(upstream, limitador=sin_cuota())
+        primera = await gateway.preguntar("p", {"maxOutputTokens": 30})
+        segunda = await gateway.preguntar("p", {"maxOutputTokens": 30})
+        otra_config = await gateway.preguntar("p", {"maxOutputTokens": 60})
+        await gateway.cerrar()
+        return gateway, primera, segunda, otra_config
+
+    gateway, primera, segunda, otra_config = correr(prueba)
+    assert primera == segunda == otra_config
+    # La configuración es parte de la clave: la tercera pregunta sí llama.
+    assert len(upstream.llamadas) == 2
+    assert gateway.estadisticas()["aciertos_cache"] == 1
+
+
+def test_cache_expulsa_lru_y_respuestas_vencidas():
+    ahora = [0.0]
+    cache = CacheCompartida(max_entradas=2, vigencia=10, reloj=lambda: ahora[0])
+    cache.guardar("a", "A")
+    cache.guardar("b", "B")
+    assert cache.obtener("a") == "A"
+    cache.guardar("c", "C")          # Expulsa "b", la usada hace más tiempo.
+    assert cache.obtener("b") is None
+    assert cache.expulsiones == 1
+    ahora[0] = 11
+    assert cache.obtener("a") is None
+    assert len(cache) == 1
+
+
+def test_junta_preguntas_distintas_en_lotes():
+    upstream = UpstreamSimulado(latencia=0.02)
+
+    async def prueba():
+        gateway = Gateway(upstream, limitador=sin_cuota(), tamano_lote=4)
+        preguntas = [f"POI {i}" for i in range(4)] + ["JSON"]
+        tareas = [gateway.preguntar(p) for p in preguntas[:4]]
+        # Un lote de llm_batch.py (pide JSON) no se anida en otro lote.
+        tareas.append(gateway.preguntar("JSON", {"responseMimeType": "application/json"}))
+        textos = await asyncio.gather(*tareas)
+        await gateway.cerrar()
+        return textos
+
+    textos = correr(prueba)
+    assert textos[0] == "Respuesta a: POI 0"
+    assert sorted(map(len, upstream.llamadas)) == [1, 4]
+    assert ["JSON"] in upstream.llamadas
+
+
+def test_pregunta_sola_lo_que_falto_en_el_lote():
+    upstream = UpstreamSimulado(omitir={"POI 2"})
+
+    async def prueba():
+        gateway = Gateway(upstream, limitador=sin_cuota())
+        textos = await asyncio.gather(*[gateway.preguntar(f"POI {i}") for i in range(4)])
+        await gateway.cerrar()
+        return textos
+
+    textos = correr(prueba)
+    assert textos[2] == "Respuesta a: POI 2"
+    assert upstream.llamadas[-1] == ["POI 2"]
+    assert len(upstream.llamadas) == 2
+
+
+def test_error_del_upstream_llega_a_todos_y_no_se_guarda():
+    upstream = UpstreamSimulado(latencia=0.01, fallas=[OSError("API caída")])
+
+    async def prueba():
+        gateway = Gateway(upstream, limitador=sin_cuota())
+        resultados = await asyncio.gather(*[gateway.preguntar("p") for _ in range(3)],
+                                          return_exceptions=True)
+        despues = await gateway.preguntar("p")
+        await gateway.cerrar()
+        return gateway, resultados, despues
+
+    gateway, resultados, despues = correr(prueba)
+    assert all(isinstance(r, OSError) for r in resultados)
+    assert despues == "Respuesta a: p"
+    assert gateway.errores == 1
+
+
+def test_cuota_de_la_flota_espacia_las_llamadas():
+    upstream = UpstreamSimulado()
+
+    async def prueba():
+        # 10 llamadas por segundo, sin ráfaga; una pregunta por llamada.
+        gateway = Gateway(upstream, limitador=LimitadorTokens(600, 1), tamano_lote=1,
+                          ventana=0)
+        await asyncio.gather(*[gateway.preguntar(f"POI {i}") for i in range(4)])
+        await gateway.cerrar()
+        return gateway
+
+    gateway = correr(prueba)
+    instantes = upstream.instantes
+    assert len(instantes) == 4
+    assert instantes[-1] - instantes[0] >= 0.25
+    assert gateway.esperas_cuota > 0
+
+
+def test_rechaza_con_la_cola_llena():
+    upstream = UpstreamSimulado(latencia=0.05)
+
+    async def prueba():
+        gateway = Gateway(upstream, limitador=sin_cuota(), max_pendientes=2)
+        tareas = [asyncio.ensure_future(gateway.preguntar(f"POI {i}")) for i in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(ColaLlena):
+            await gateway.preguntar("POI 3")
+        # Una pregunta ya en cola se une, no cuenta como nueva.
+        await gateway.preguntar("POI 0")
+        await asyncio.gather(*tareas)
+        await gateway.cerrar()
+
+    correr(prueba)
+
+
+def test_upstream_gemini_separa_el_lote(monkeypatch):
+    upstream = gemini_gateway.UpstreamGemini("clave")
+    enviados = []
+
+    def generar(pregunta, configuracion):
+        enviados.append((pregunta, configuracion))
+        return json.dumps([{"id": "1", "texto": "Uno."}, {"id": "3", "texto": "Tres."}])
+
+    monkeypatch.setattr(upstream, "_generar", generar)
+    lote = [("Pregunta\nuno", {"maxOutputTokens": 30}), ("dos", {"maxOutputTokens": 30}),
+            ("tres", {"maxOutputTokens": 30})]
+    textos = asyncio.run(upstream(lote))
+    assert textos == ["Uno.", None, "Tres."]
+    pregunta, configuracion = enviados[0]
+    assert "- 1: Pregunta uno" in pregunta.splitlines()
+    assert configuracion["responseMimeType"] == "application/json"
+    assert configuracion["maxOutputTokens"] > 90
+
+
+@contextlib.contextmanager
+def gateway_en_hilo(upstream, **opciones):
+    """Servidor del gateway con su propio bucle de asyncio en un hilo aparte."""
+    bucle = asyncio.new_event_loop()
+    hilo = threading.Thread(target=bucle.run_forever, daemon=True)
+    hilo.start()
+
+    async def iniciar():
+        gateway = Gateway(upstream, limitador=sin_cuota(), **opciones)
+        return await ServidorGateway(gateway, "127.0.0.1", 0).iniciar()
+
+    servidor = asyncio.run_coroutine_threadsafe(iniciar(), bucle).result(5)
+    try:
+        yield servidor
+    finally:
+        asyncio.run_coroutine_threadsafe(servidor.cerrar(), bucle).result(5)
+        bucle.call_soon_threadsafe(bucle.stop)
+        hilo.join(5)
+        bucle.close()
+
+
+def test_dispositivos_usan_el_gateway_como_endpoint():
+    upstream = UpstreamSimulado(latencia=0.01)
+    with gateway_en_hilo(upstream) as servidor:
+        base = f"http://127.0.0.1:{servidor.puerto}"
+        endpoint = base + "/v1beta/models/gemini-1.5-flash:generateContent"
+        sesion = SesionHost()
+        partes = []
+        texto = asyncio.run(preguntar_gemini_stream(sesion, endpoint_stream(endpoint),
+                                                    "Háblame del Aula 1", partes.append))
+        assert texto == "Respuesta a: Háblame del Aula 1"
+        assert partes == [texto]
+
+        # Los lotes de llm_batch.py usan 'generateContent' con JSON.
+        upstream.responder = lambda pregunta: json.dumps(
+            [{"id": "a", "texto": "Dato A."}, {"id": "b", "texto": "Dato B."}])
+        cliente = ClienteLotes(sesion, endpoint)
+        textos = asyncio.run(cliente.preguntar([("a", "A", "pa"), ("b", "B", "pb")]))
+        assert textos == {"a": "Dato A.", "b": "Dato B."}
+        assert sesion.conexiones_abiertas == 1  # Keep-alive.
+
+        with urllib.request.urlopen(base + "/estado", timeout=5) as respuesta:
+            estado = json.loads(respuesta.read())
+        assert estado["solicitudes"] == 2
+        assert estado["llamadas_upstream"] == 2
+
+
+def test_servidor_responde_errores_con_retry_after():
+    upstream = UpstreamSimulado(fallas=[OSError("API caída")])
+    with gateway_en_hilo(upstream) as servidor:
+        url = f"http://127.0.0.1:{servidor.puerto}/v1beta/models/m:generateContent"
+        respuesta = SesionHost().post(url, json={"contents": [{"parts": [{"text": "p"}]}]})
+        assert respuesta.status_code == 503
+        assert respuesta.headers["Retry-After"] == str(gemini_gateway.RETRY_AFTER)
+        respuesta.close()
+        respuesta = SesionHost().post(url, data=b"no es json")
+        assert respuesta.status_code == 400
+        respuesta.close()
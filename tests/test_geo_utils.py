@@ -0,0 +1,76 @@
+# Pruebas de la geometría por lotes (geo_utils.py).
+
+import random
+from array import array
+
+import pytest
+
+import geo_utils
+from geo_utils import (AUTOMATICO, EQUIRECTANGULAR, HAVERSINE, PuntosGeo,
+                       desplazar, haversine_distance, initial_bearing)
+
+LAT0, LON0 = 9.93300, -84.03200
+
+
+def crear_tabla(n, dispersion, semilla=11, lat0=LAT0):
+    rnd = random.Random(semilla)
+    tabla = PuntosGeo(lat0, LON0)
+    puntos = []
+    for _ in range(n):
+        lat = lat0 + rnd.uniform(-dispersion, dispersion)
+        lon = LON0 + rnd.uniform(-dispersion, dispersion)
+        tabla.agregar(lat, lon)
+        puntos.append((lat, lon))
+    return tabla, puntos
+
+
+def test_haversine_y_rumbo():
+    assert haversine_distance(LAT0, LON0, LAT0, LON0) == 0.0
+    # Un grado de latitud mide unos 111.2 km.
+    assert abs(haversine_distance(0, 0, 1, 0) - 111195) < 1
+    assert abs(initial_bearing(0, 0, 1, 0) - 0.0) < 1e-9
+    assert abs(initial_bearing(0, 0, 0, 1) - 90.0) < 1e-9
+    lat, lon = desplazar(LAT0, LON0, 90.0, 100.0)
+    assert abs(haversine_distance(LAT0, LON0, lat, lon) - 100.0) < 0.01
+
+
+def test_lote_haversine_coincide_con_la_funcion_escalar():
+    tabla, puntos = crear_tabla(500, 0.5)
+    for usar_numpy in (False, True):
+        salida = tabla.distancias(9.95, -84.0, metodo=HAVERSINE, usar_numpy=usar_numpy)
+        for d, (lat, lon) in zip(salida, puntos):
+            esperado = haversine_distance(9.95, -84.0, lat, lon)
+            assert abs(d - esperado) <= max(0.05, esperado * 1e-6)
+
+
+@pytest.mark.parametrize("lat0", [LAT0, -35.0, 60.0, 70.0])
+def test_error_equirectangular_acotado_bajo_un_kilometro(lat0):
+    # Puntos a menos de ~1 km (la longitud se reparte más lejos en latitudes altas).
+    tabla, puntos = crear_tabla(2000, 0.009, lat0=lat0)
+    salida = tabla.distancias(lat0, LON0, metodo=EQUIRECTANGULAR, usar_numpy=False)
+    peor = 0.0
+    for d, (lat, lon) in zip(salida, puntos):
+        esperado = haversine_distance(lat0, LON0, lat, lon)
+        if esperado <= geo_utils.DISTANCIA_MAX_EQUIRECTANGULAR:
+            peor = max(peor, abs(d - esperado))
+    assert peor < 0.1
+
+
+def test_automatico_usa_haversine_para_puntos_lejanos():
+    tabla = PuntosGeo(LAT0, LON0)
+    tabla.agregar(LAT0 + 0.001, LON0)  # ~111 m
+    tabla.agregar(LAT0 + 3.0, LON0 + 3.0)  # ~470 km
+    salida = array("f", [0.0, 0.0, -1.0])  # Se reutiliza un array más grande.
+    tabla.distancias(LAT0, LON0, salida=salida, metodo=AUTOMATICO, usar_numpy=False)
+    assert abs(salida[1] - haversine_distance(LAT0, LON0, LAT0 + 3.0, LON0 + 3.0)) < 1.0
+    assert salida[2] == -1.0
+
+
+def test_salida_demasiado_pequena():
+    tabla, _ = crear_tabla(3, 0.01)
+    try:
+        tabla.distancias(LAT0, LON0, salida=array("f", [0.0]))
+    except ValueError:
+        pass
+    else:
+        assert False, "Se esperaba ValueError"
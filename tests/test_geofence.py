@@ -0,0 +1,135 @@
+# Pruebas del filtro de posición y las geocercas (geofence.py).
+
+import math
+import random
+
+from geofence import (ENTRADA, PERMANENCIA, SALIDA, FiltroAlfaBeta, MotorGeocercas,
+                      evaluar_traza)
+from poi_index import IndicePOI
+
+METROS_POR_GRADO = 111320.0
+LAT0, LON0 = 9.93300, -84.03200
+
+
+def punto(este, norte):
+    """Convierte un desplazamiento en metros desde (LAT0, LON0) a grados."""
+    return (LAT0 + norte / METROS_POR_GRADO,
+            LON0 + este / (METROS_POR_GRADO * math.cos(math.radians(LAT0))))
+
+
+def crear_motor(**opciones):
+    indice = IndicePOI(lat_referencia=LAT0)
+    lat, lon = punto(0, 0)
+    indice.agregar("plaza", "Plaza", lat, lon)
+    return MotorGeocercas(indice, **opciones)
+
+
+def test_ruido_estacionario_solo_dispara_una_entrada():
+    rnd = random.Random(1)
+    motor = crear_motor()
+    eventos = []
+    for t in range(300):
+        lat, lon = punto(rnd.gauss(0, 4), rnd.gauss(0, 4))
+        eventos += motor.actualizar(lat, lon, float(t))
+    assert eventos == [(ENTRADA, "plaza"), (PERMANENCIA, "plaza")]
+
+
+def test_histeresis_en_el_borde_de_la_geocerca():
+    """Oscilar alrededor del radio de entrada no genera entradas y salidas repetidas."""
+    rnd = random.Random(2)
+    motor = crear_motor(radio_entrada=25.0, radio_salida=35.0)
+    tipos = []
+    for t in range(600):
+        lat, lon = punto(25.0 + rnd.uniform(-4, 4), 0)
+        tipos += [tipo for tipo, _ in motor.actualizar(lat, lon, float(t))]
+    assert tipos.count(ENTRADA) <= 1
+    assert SALIDA not in tipos
+
+
+def test_atravesar_la_geocerca():
+    motor = crear_motor(permanencia=1000.0)
+    eventos = []
+    for t, x in enumerate(range(-100, 101, 2)):  # Caminando hacia el este a 2 m/s.
+        lat, lon = punto(float(x), 0)
+        eventos += motor.actualizar(lat, lon, float(t))
+    assert eventos == [(ENTRADA, "plaza"), (SALIDA, "plaza")]
+    assert motor.dentro() == []
+
+
+def test_salida_desde_fuera_del_radio_de_busqueda():
+    motor = crear_motor()
+    for t in range(5):
+        motor.actualizar(*punto(0, 0), float(t))
+    assert motor.dentro() == ["plaza"]
+    # Un salto de 200 m (por ejemplo, tras perder la señal): la plaza ya no
+    # aparece en la búsqueda, pero su geocerca se cierra igual.
+    tipos = []
+    for t in range(5, 10):
+        tipos += [tipo for tipo, _ in motor.actualizar(*punto(200, 0), float(t))]
+    assert tipos == [SALIDA]
+
+
+def test_grupo_denso_revisa_los_poi_mas_cercanos():
+    # 20 POIs en un parche de 20 m, más que los buffers de la búsqueda.
+    rnd = random.Random(4)
+    # Una sola celda: la rejilla entrega los POIs en el orden en que se agregaron.
+    indice = IndicePOI(tamano_celda=1000.0, lat_referencia=LAT0)
+    for i in range(20):
+        indice.agregar(f"kiosko_{i}", f"Kiosko {i}", *punto(rnd.uniform(5, 25), rnd.uniform(-10, 10)))
+    indice.agregar("plaza", "Plaza", *punto(0, 0))
+    motor = MotorGeocercas(indice, permanencia=1000.0)
+    eventos = []
+    for t in range(5):
+        eventos += motor.actualizar(*punto(0, 0), float(t))
+    # El POI en la posición del usuario entra aunque se agregó al final.
+    assert eventos[0] == (ENTRADA, "plaza")
+
+    # Junto al parche, los kioskos desplazan a la plaza de la búsqueda, pero
+    # sigue a 15 m (dentro del radio de salida): no sale.
+    tipos = []
+    for t in range(5, 10):
+        tipos += [(tipo, poi_id) for tipo, poi_id in motor.actualizar(*punto(15, 0), float(t))
+                  if poi_id == "plaza"]
+    assert tipos == [] and "plaza" in motor.dentro()
+
+
+def test_sin_eventos_no_crea_listas():
+    motor = crear_motor()
+    primera = motor.actualizar(*punto(500, 0), 0.0)
+    assert primera == () and motor.actualizar(*punto(500, 0), 1.0) is primera
+
+
+def test_radios_personalizados_por_poi():
+    motor = crear_motor()
+    motor.configurar_radio("plaza", 60.0, 80.0)
+    lat, lon = punto(50.0, 0)
+    eventos = []
+    for t in range(5):
+        eventos += motor.actualizar(lat, lon, float(t))
+    assert eventos == [(ENTRADA, "plaza")]
+
+
+def test_filtro_reduce_el_ruido():
+    rnd = random.Random(3)
+    filtro = FiltroAlfaBeta()
+    errores_crudos = []
+    errores_filtrados = []
+    for t in range(200):
+        lat, lon = punto(rnd.gauss(0, 4), rnd.gauss(0, 4))
+        flat, flon = filtro.actualizar(lat, lon, float(t))
+        if t > 20:
+            errores_crudos.append(abs(lat - LAT0))
+            errores_filtrados.append(abs(flat - LAT0))
+    assert sum(errores_filtrados) < 0.8 * sum(errores_crudos)
+
+
+def test_metricas_de_una_traza():
+    traza = []
+    for t, x in enumerate(range(-500, 501, 2)):
+        lat, lon = punto(float(x), 0)
+        traza.append((lat, lon, float(t)))
+    metricas = evaluar_traza(traza, crear_motor())
+    assert abs(metricas["km"] - 1.0) < 0.02
+    assert metricas["entradas"] == 1
+    assert metricas["salidas"] == 1
+    assert abs(metricas["entradas_por_km"] - 1.0) < 0.05
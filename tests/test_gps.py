@@ -1,20 +1,7 @@
 # Script para probar la lógica de la función Haversine, que simula el GPS.
 
-import math
-import time
-
-def haversine_distance(lat1, lon1, lat2, lon2):
-    """
-    Calcula la distancia Haversine entre dos puntos.
-    (Función extraída del código principal para pruebas de unidad).
-    """
-    R = 6371000  # Radio de la Tierra en metros
-    phi1, phi2 = math.radians(lat1), math.radians(lat2)
-    delta_phi = math.radians(lat2 - lat1)
-    delta_lambda = math.radians(lon2 - lon1)
-    a = math.sin(delta_phi / 2.0)**2 + math.cos(phi1) * math.cos(phi2) * math.sin(delta_lambda / 2.0)**2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    return R * c
+# La función se importa del módulo que usa el código principal (geo_utils.py).
+from geo_utils import haversine_distance
 
 # Puntos de prueba para validar la función Haversine.
 test_points = [
@@ -0,0 +1,156 @@
+# Pruebas de las fuentes de ubicación para reproducir recorridos (gps_replay.py).
+
+import os
+
+from geo_utils import haversine_distance
+from gps_replay import (ReproductorGPX, ReproductorNMEA, TrazaSintetica, abrir_traza,
+                        hora_nmea, leer_gpx, segundos_iso, sentencias_nmea)
+import gps_utils
+from gps_utils import ParserNMEA
+
+RUTA_REGISTRO = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "datos", "recorrido_cenfotec.nmea")
+CENFOTEC = {"lat": 9.93310, "lon": -84.03220}
+AUDITORIO = {"lat": 9.93282, "lon": -84.03200}
+
+GPX = """<?xml version="1.0"?>
+<gpx version="1.1"><trk><trkseg>
+  <trkpt lat="9.93310" lon="-84.03220"><ele>1150</ele><time>2025-08-18T15:30:00Z</time></trkpt>
+  <trkpt lon='-84.03200' lat='9.93282'><time>2025-08-18T15:30:20Z</time></trkpt>
+  <trkpt lat="9.93250" lon="-84.03180"><time>2025-08-18T15:31:00Z</time></trkpt>
+</trkseg></trk></gpx>
+"""
+
+
+def coordenadas(ubicacion):
+    return ubicacion["lat"], ubicacion["lon"]
+
+
+class Reloj:
+    def __init__(self):
+        self.t = 100.0
+
+    def __call__(self):
+        return self.t
+
+
+def test_hora_nmea():
+    assert hora_nmea(b"$GPGGA,153012.50,0955.98,N,08401.93,W,1,08,0.9,1150,M,6,M,,*00\r\n") == 55812.5
+    assert hora_nmea(b"$GPGSA,A,3,04,05,,,,,,,,,,,2.5,1.3,2.1*39\r\n") is None
+    assert hora_nmea(b"$GPRMC,,V,,,,,,,,,,N*53\r\n") is None
+
+
+def test_nmea_respeta_la_hora_de_cada_sentencia():
+    reloj = Reloj()
+    gps = ReproductorNMEA(RUTA_REGISTRO, velocidad=10, reloj=reloj)
+    assert gps.get_current_location() is None  # Las primeras sentencias no tienen fix.
+    horas = []
+    while not gps.terminado:
+        reloj.t += 1
+        if gps.get_current_location() is not None:
+            horas.append(gps.parser.valores[gps_utils.HORA])
+    # 120 s de registro a 10x: 12 s del reloj, una lectura cada 10 s del registro.
+    assert 11 <= reloj.t - 100 <= 13
+    assert horas[0] < horas[1] < horas[-2]
+    assert horas[-1] == 153159.0
+
+
+def test_nmea_desde_lineas_cruza_la_medianoche_y_repite():
+    lineas = [s for s in sentencias_nmea(TrazaSintetica([CENFOTEC, AUDITORIO], repetir=False),
+                                         4, hora_inicio=86398.0)]
+    reloj = Reloj()
+    gps = ReproductorNMEA(lineas, repetir=True, reloj=reloj)
+    assert gps.get_current_location() is not None
+    reloj.t += 3.5  # 23:59:58 + 3.5 s: la hora ya pasó la medianoche.
+    gps.get_current_location()
+    assert gps.parser.valores[gps_utils.HORA] == 1.0
+    reloj.t += 2
+    gps.get_current_location()
+    assert gps.vueltas == 1 and not gps.terminado
+
+
+def test_segundos_iso():
+    assert segundos_iso("1970-01-02T00:00:01Z") == 86401
+    assert segundos_iso("2025-08-18T15:30:00Z") == 1755531000
+    assert segundos_iso("2025-08-18T17:30:00.5+02:00") == 1755531000.5
+    assert segundos_iso("2024-02-29T00:00:00Z") - segundos_iso("2024-02-28T00:00:00Z") == 86400
+
+
+def test_leer_gpx():
+    lats, lons, tiempos = leer_gpx(GPX)
+    assert list(tiempos) == [0.0, 20.0, 60.0]
+    assert lats[1] == 9.93282 and lons[1] == -84.03200
+    _, _, sin_hora = leer_gpx('<trkpt lat="1" lon="2"/><trkpt lat="1.1" lon="2"/>', 5)
+    assert list(sin_hora) == [0.0, 5.0]
+
+
+def test_gpx_interpola_y_termina():
+    reloj = Reloj()
+    gps = ReproductorGPX(GPX, velocidad=2, reloj=reloj)
+    reloj.t += 5  # 10 s de la traza: mitad del primer tramo.
+    ubicacion = gps.get_current_location()
+    assert abs(ubicacion["lat"] - (9.93310 + 9.93282) / 2) < 1e-9
+    reloj.t += 40
+    assert coordenadas(gps.get_current_location()) == (9.93250, -84.03180)
+    assert gps.terminado
+
+
+def test_sintetica_camina_a_la_velocidad_indicada():
+    reloj = Reloj()
+    traza = TrazaSintetica([CENFOTEC, AUDITORIO], velocidad_marcha=1.0, pausa=10, repetir=False,
+                           reloj=reloj)
+    distancia = haversine_distance(CENFOTEC["lat"], CENFOTEC["lon"],
+                                   AUDITORIO["lat"], AUDITORIO["lon"])
+    assert abs(traza.duracion() - (20 + distancia)) < 1e-6
+    reloj.t += 5
+    assert coordenadas(traza.get_current_location()) == coordenadas(CENFOTEC)  # En la pausa.
+    reloj.t += 5 + distancia / 2
+    mitad = traza.get_current_location()
+    assert abs(haversine_distance(CENFOTEC["lat"], CENFOTEC["lon"], mitad["lat"], mitad["lon"])
+               - distancia / 2) < 0.1
+    reloj.t += 1000
+    assert coordenadas(traza.get_current_location()) == coordenadas(AUDITORIO)
+    assert traza.terminado
+
+
+def test_sintetica_ruido_y_perdidas():
+    traza = TrazaSintetica([CENFOTEC], ruido_metros=5.0, perdida=0.2, semilla=7)
+    errores = []
+    perdidas = 0
+    for t in range(4000):
+        ubicacion = traza.ubicacion_en(t)
+        if ubicacion is None:
+            perdidas += 1
+        else:
+            errores.append(haversine_distance(CENFOTEC["lat"], CENFOTEC["lon"],
+                                              ubicacion["lat"], ubicacion["lon"]))
+    assert 0.17 < perdidas / 4000 < 0.23
+    # Ruido gaussiano de 5 m por eje: error cuadrático medio de 5 * sqrt(2).
+    ecm = (sum(e * e for e in errores) / len(errores)) ** 0.5
+    assert 6.5 < ecm < 7.7
+    # La misma semilla repite el recorrido.
+    a = TrazaSintetica([CENFOTEC], ruido_metros=5.0, semilla=3)
+    primeras = [coordenadas(a.ubicacion_en(t)) for t in range(5)]
+    b = TrazaSintetica([CENFOTEC], ruido_metros=5.0, semilla=3)
+    assert [coordenadas(b.ubicacion_en(t)) for t in range(5)] == primeras
+
+
+def test_sentencias_sinteticas_pasan_por_el_parser():
+    traza = TrazaSintetica([CENFOTEC, AUDITORIO], repetir=False)
+    parser = ParserNMEA()
+    for linea in sentencias_nmea(traza, 20, periodo=2.0):
+        parser.alimentar((linea + "\r\n").encode())
+    assert parser.errores == 0
+    esperada = traza.ubicacion_en(18.0)
+    assert parser.ubicacion() is parser.ubicacion()  # Instancia reutilizada.
+    ubicacion = parser.ubicacion()
+    assert haversine_distance(esperada["lat"], esperada["lon"],
+                              ubicacion["lat"], ubicacion["lon"]) < 0.5
+    assert abs(parser.valores[gps_utils.VELOCIDAD] - 1.4 * 1.943844) < 0.05  # Nudos.
+
+
+def test_abrir_traza_elige_el_lector(tmp_path):
+    ruta = tmp_path / "caminata.gpx"
+    ruta.write_text(GPX)
+    assert isinstance(abrir_traza(str(ruta)), ReproductorGPX)
+    assert isinstance(abrir_traza(RUTA_REGISTRO), ReproductorNMEA)
@@ -0,0 +1,124 @@
+# Pruebas del muestreo adaptativo del GPS (gps_scheduler.py) y de la
+# distancia al borde de las geocercas que usa (geofence.py).
+
+import math
+
+import pytest
+
+from geofence import MotorGeocercas
+from gps_scheduler import PlanificadorGPS
+from gps_utils import comando_frecuencia
+from poi_index import IndicePOI
+
+METROS_POR_GRADO = 111320.0
+LAT0, LON0 = 9.93300, -84.03200
+
+
+def punto(este, norte):
+    """Convierte un desplazamiento en metros desde (LAT0, LON0) a grados."""
+    return (LAT0 + norte / METROS_POR_GRADO,
+            LON0 + este / (METROS_POR_GRADO * math.cos(math.radians(LAT0))))
+
+
+def crear_motor(*posiciones):
+    """Motor con un POI en cada posición (metros al este de LAT0, LON0)."""
+    indice = IndicePOI(lat_referencia=LAT0)
+    for i, este in enumerate(posiciones):
+        indice.agregar(f"poi{i}", f"POI {i}", *punto(este, 0))
+    return MotorGeocercas(indice)
+
+
+def quedarse(motor, este, desde, segundos):
+    for t in range(segundos):
+        motor.actualizar(*punto(este, 0), float(desde + t))
+
+
+class _Motor:
+    """Motor de geocercas falso con borde y rapidez fijos."""
+
+    def __init__(self, borde, velocidad=0.0):
+        self.borde = borde
+        self.filtro = self
+        self.rapidez = velocidad
+
+    def velocidad(self):
+        return self.rapidez
+
+    def distancia_borde(self, radio_vista):
+        return self.borde
+
+
+def test_comando_pmtk220():
+    assert comando_frecuencia(1000) == b"PMTK220,1000"
+    with pytest.raises(ValueError):
+        comando_frecuencia(20000)
+
+
+def test_lejos_alarga_el_periodo_de_a_un_nivel():
+    comandos = []
+    planificador = PlanificadorGPS(comandos.append)
+    lejos = _Motor(borde=200.0)
+    periodos = [planificador.actualizar(lejos) for _ in range(8)]
+    assert periodos == [1.0, 2.0, 2.0, 5.0, 5.0, 10.0, 10.0, 10.0]
+    assert comandos == [b"PMTK220,2000", b"PMTK220,5000", b"PMTK220,10000"]
+
+
+def test_cerca_de_una_geocerca_vuelve_de_inmediato_al_periodo_corto():
+    comandos = []
+    planificador = PlanificadorGPS(comandos.append)
+    motor = _Motor(borde=200.0)
+    for _ in range(6):
+        planificador.actualizar(motor)
+    motor.borde = 8.0
+    assert planificador.actualizar(motor) == 1.0
+    assert comandos[-1] == b"PMTK220,1000"
+    assert planificador.sin_fix() == 1.0
+    assert planificador.estadisticas()["cambios"] == len(comandos)
+
+
+def test_mas_rapido_lee_mas_seguido():
+    planificador = PlanificadorGPS()
+    caminando = planificador.periodo_deseado(40.0, 1.2)
+    en_bus = planificador.periodo_deseado(40.0, 10.0)
+    assert caminando > 5 * en_bus
+    # Quieto se supone al menos la rapidez de alguien que empieza a caminar.
+    assert planificador.periodo_deseado(40.0, 0.0) == planificador.periodo_deseado(40.0, 0.5)
+
+
+def test_distancia_al_borde_de_entrada_y_salida():
+    motor = crear_motor(0.0, 300.0)
+    assert motor.distancia_borde() == 0.0  # Sin lecturas: no se sabe.
+
+    # A 150 m de ambos POIs: ninguno en el radio de vista.
+    quedarse(motor, 150.0, 0, 1)
+    assert motor.borde is None
+    assert motor.distancia_borde() == pytest.approx(100.0 - 25.0)
+
+    # A 60 m del primero: fuera del radio de búsqueda, se mira más lejos.
+    motor = crear_motor(0.0, 300.0)
+    quedarse(motor, 60.0, 0, 1)
+    assert motor.distancia_borde() == pytest.approx(60.0 - 25.0, abs=1.0)
+
+    # Dentro del primero: lo que importa es su borde de salida.
+    motor = crear_motor(0.0, 300.0)
+    quedarse(motor, 0.0, 0, 5)
+    assert motor.dentro() == ["poi0"]
+    assert motor.distancia_borde() == pytest.approx(35.0, abs=0.5)
+
+
+def test_poi_fuera_del_radio_de_busqueda_cuenta_aunque_haya_otro_ocupado():
+    motor = crear_motor(0.0, 40.0)
+    quedarse(motor, 0.0, 0, 5)
+    assert motor.dentro() == ["poi0"]
+    # El segundo POI está a 40 m (fuera del radio de búsqueda de 35 m), pero
+    # su borde de entrada (15 m) está más cerca que la salida del primero.
+    assert motor.distancia_borde() == pytest.approx(15.0, abs=0.5)
+
+
+def test_distancia_minima_del_indice():
+    indice = IndicePOI(lat_referencia=LAT0)
+    indice.agregar("a", "A", *punto(30, 0))
+    indice.agregar("b", "B", *punto(80, 0))
+    assert indice.distancia_minima(LAT0, LON0, 100) == pytest.approx(30.0, abs=0.1)
+    assert indice.distancia_minima(LAT0, LON0, 100, excluir={0}) == pytest.approx(80.0, abs=0.1)
+    assert indice.distancia_minima(LAT0, LON0, 20) is None
@@ -0,0 +1,107 @@
+# Pruebas del framebuffer de la LCD (lcd_framebuffer.py).
+
+from lcd_falsa import LCDFalsa
+from lcd_framebuffer import FramebufferLCD, Marquesina, codigos_lcd
+
+
+def test_primer_cuadro_redibuja_toda_la_pantalla():
+    lcd = LCDFalsa()
+    pantalla = FramebufferLCD(lcd)
+    escrituras = pantalla.mostrar("Hola\nMundo")
+    assert lcd.pantalla() == "Hola            \nMundo           "
+    # Un movimiento de cursor y 16 caracteres por fila.
+    assert escrituras == 2 * (1 + 16)
+    assert lcd.borrados == 0
+
+
+def test_solo_envia_las_celdas_que_cambian():
+    lcd = LCDFalsa()
+    pantalla = FramebufferLCD(lcd)
+    pantalla.mostrar("Distancia: 10 m\nAuditorio")
+    antes = lcd.escrituras
+    escrituras = pantalla.mostrar("Distancia: 12 m\nAuditorio")
+    assert lcd.pantalla() == "Distancia: 12 m \nAuditorio       "
+    assert escrituras == 2  # Cursor + el dígito que cambió.
+    assert lcd.escrituras - antes == escrituras
+    # Un cuadro idéntico no escribe nada.
+    assert pantalla.mostrar("Distancia: 12 m\nAuditorio") == 0
+
+
+def test_tramos_cercanos_se_unen():
+    lcd = LCDFalsa()
+    pantalla = FramebufferLCD(lcd)
+    pantalla.mostrar("aaaaaaaaaaaaaaaa")
+    # Cambian las columnas 0 y 2: se envían juntas (cursor + 3 caracteres).
+    assert pantalla.mostrar("bab" + "a" * 13) == 4
+    # Cambian las columnas 0 y 3: dos tramos (2 cursores + 2 caracteres).
+    assert pantalla.mostrar("aabb" + "a" * 12) == 4
+    assert lcd.pantalla().split("\n")[0] == "aabb" + "a" * 12
+
+
+def test_invalidar_fuerza_un_redibujo():
+    lcd = LCDFalsa()
+    pantalla = FramebufferLCD(lcd)
+    pantalla.mostrar("Hola")
+    lcd.clear()  # Otro código borró la pantalla.
+    pantalla.invalidar()
+    pantalla.mostrar("Hola")
+    assert lcd.pantalla().startswith("Hola")
+
+
+def test_caracteres_no_ascii():
+    lcd = LCDFalsa()
+    FramebufferLCD(lcd).mostrar("Año 2€")
+    assert lcd.pantalla().startswith("Ano 2?")
+
+
+def test_texto_con_tildes_se_translitera():
+    lcd = LCDFalsa()
+    pantalla = FramebufferLCD(lcd)
+    pantalla.mostrar("¿Educación?\n¡Sin señal!")
+    assert lcd.pantalla() == "Educacion?      \nSin senal!      "
+
+    # Al quitar '¿' la fila se rellena hasta el final.
+    pantalla.escribir_linea("¿Qué hay aquí?", 0)
+    pantalla.actualizar()
+    assert lcd.pantalla().split("\n")[0] == "Que hay aqui?   "
+
+    marquesina = Marquesina("Pingüino ÁÉÍÓÚÑ en la exposición")
+    assert marquesina.texto.startswith("Pinguino AEIOUN en la exposicion")
+    assert len(codigos_lcd(marquesina.texto)) == len(marquesina.texto)
+    marquesina.dibujar(pantalla, 1)
+    pantalla.actualizar()
+    assert lcd.pantalla().split("\n")[1] == "Pinguino AEIOUN "
+
+
+def test_marquesina_desplaza_textos_largos():
+    corta = Marquesina("Auditorio")
+    assert not corta.necesaria()
+    assert corta.cuadro() == "Auditorio"
+    larga = Marquesina("Universidad Cenfotec", separador=" ")
+    assert larga.necesaria()
+    assert larga.cuadro() == "Universidad Cenf"
+    assert larga.cuadro() == "niversidad Cenfo"
+    for _ in range(19):
+        larga.cuadro()
+    assert larga.cuadro() == "Universidad Cenf"  # Vuelve a empezar.
+
+
+def test_marquesina_dibuja_en_el_framebuffer():
+    lcd = LCDFalsa()
+    pantalla = FramebufferLCD(lcd)
+    larga = Marquesina("Universidad Cenfotec", separador=" ")
+    comparada = Marquesina("Universidad Cenfotec", separador=" ")
+    for _ in range(25):
+        larga.dibujar(pantalla, 1)
+        pantalla.actualizar()
+        assert lcd.pantalla().split("\n")[1] == comparada.cuadro()
+    Marquesina("Maker Space").dibujar(pantalla, 0)
+    pantalla.actualizar()
+    assert lcd.pantalla().startswith("Maker Space     \n")
+
+
+def test_mostrar_con_mas_lineas_que_filas():
+    lcd = LCDFalsa()
+    pantalla = FramebufferLCD(lcd)
+    pantalla.mostrar("Una linea demasiado larga\nDos\nTres")
+    assert lcd.pantalla() == "Una linea demasi\nDos             "
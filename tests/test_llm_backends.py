@@ -0,0 +1,294 @@
+# test_llm_backends.py
+# Pruebas de los backends del LLM (llm_backends.py): el histograma de
+# latencias, los proveedores y la consulta cubierta.
+
+import asyncio
+import json
+
+import pytest
+
+from cache_utils import CacheRespuestas
+from gemini_falso import FRAGMENTOS, ServidorGeminiFalso, SesionHost
+from llm_backends import (BackendCache, BackendGemini, BackendSimulado, ConsultaCubierta,
+                          HistogramaLatencia, endpoint_gemini, modelo_de)
+from resilience import EsperaExponencial, LimitadorTokens, PoliticaLLM
+
+
+class PaqueteFalso:
+    def __init__(self, textos):
+        self.textos = textos
+
+    def texto(self, poi_id):
+        return self.textos.get(poi_id)
+
+
+class NoDisponible(BackendSimulado):
+    def disponible(self):
+        return False
+
+
+class ConLotes(BackendSimulado):
+    """Backend que responde lotes sin red; omite los POIs de 'omitir'."""
+
+    def __init__(self, omitir=(), **opciones):
+        super().__init__(latencia=0.0, **opciones)
+        self.omitir = omitir
+        self.lotes = []
+
+    async def _pedir_lote(self, lugares):
+        self.lotes.append([poi_id for poi_id, _, _ in lugares])
+        return {poi_id: f"{self.nombre}: {nombre}" for poi_id, nombre, _ in lugares
+                if poi_id not in self.omitir}
+
+
+class CortaTrasFragmento(BackendSimulado):
+    """Backend que entrega un fragmento y luego falla (conexión cortada)."""
+
+    async def _preguntar(self, pregunta, recibir, poi_id):
+        await asyncio.sleep(self.latencia)
+        recibir("Primer ")
+        await asyncio.sleep(0)
+        return None
+
+
+LUGARES = [("a", "A", "¿A?"), ("b", "B", "¿B?"), ("c", "C", "¿C?")]
+
+
+def preguntar(backend, pregunta="p", poi_id="a", fragmentos=None):
+    al_recibir = fragmentos.append if fragmentos is not None else None
+    return asyncio.run(backend.preguntar(pregunta, al_recibir, poi_id))
+
+
+def responder(nombre):
+    return lambda pregunta: f"{nombre} responde"
+
+
+def test_endpoints():
+    url = endpoint_gemini("abc")
+    assert url == ("https://generativelanguage.googleapis.com/v1beta/models/"
+                   "gemini-1.5-flash:generateContent?key=abc")
+    assert modelo_de(url) == "gemini-1.5-flash"
+    assert endpoint_gemini(modelo="m", url_base="http://gw:8080/v1beta/models/") == \
+        "http://gw:8080/v1beta/models/m:generateContent"
+    assert endpoint_gemini("{clave}").format(clave="x").endswith("?key=x")
+
+
+def test_histograma_percentiles_y_envejecimiento():
+    histograma = HistogramaLatencia(max_muestras=100)
+    assert histograma.percentil(0.9) is None
+    for _ in range(80):
+        histograma.registrar(0.2)
+    for _ in range(18):
+        histograma.registrar(2.0)
+    # El percentil es el límite superior de la cubeta: a lo sumo 25% más.
+    assert 0.2 <= histograma.percentil(0.5) <= 0.25
+    assert 2.0 <= histograma.percentil(0.9) <= 2.5
+    histograma.registrar(60.0)  # Más allá de la última cubeta: se usa el máximo.
+    assert histograma.percentil(1.0) == 60.0
+    assert histograma.resumen()["max_ms"] == 60000
+    # Al llegar a 100 muestras se envejece: 40 + 9 + 0 (la más lenta se pierde).
+    histograma.registrar(2.0)
+    assert histograma.cantidad == 49 and histograma.total == 100
+    assert histograma.percentil(1.0) <= 2.5
+
+
+def test_backend_simulado_cache_y_metricas():
+    cache = CacheRespuestas()
+    backend = BackendSimulado(latencia=0.05, responder=responder("sim"), cache=cache)
+    fragmentos = []
+    assert preguntar(backend, fragmentos=fragmentos) == "sim responde"
+    # Sin streaming, la respuesta completa llega como un fragmento.
+    assert fragmentos == ["sim responde"]
+    assert backend.histograma.cantidad == 1
+    assert 0.05 <= backend.histograma.percentil(0.5) <= 0.1
+    # Un acierto de la caché no llama al backend ni cuenta como latencia.
+    assert preguntar(backend) == "sim responde"
+    assert backend.consultas == 1 and backend.histograma.cantidad == 1
+
+
+def test_backend_simulado_por_fragmentos_y_fallas():
+    backend = BackendSimulado(latencia=0.0, responder=responder("uno dos"),
+                              entre_fragmentos=0.01)
+    fragmentos = []
+    assert preguntar(backend, fragmentos=fragmentos) == "uno dos responde"
+    assert fragmentos == ["uno ", "dos ", "responde"]
+    falla = BackendSimulado(latencia=0.0, probabilidad_falla=1.0)
+    assert preguntar(falla) is None
+    assert falla.fallidas == 1 and falla.histograma.cantidad == 0
+
+
+def test_backend_cache_no_usa_la_red():
+    cache = CacheRespuestas()
+    cache.guardar("a", "p", "guardada")
+    backend = BackendCache(cache, PaqueteFalso({"b": "del paquete"}))
+    assert preguntar(backend) == "guardada"
+    assert preguntar(backend, poi_id="b") == "del paquete"
+    assert preguntar(backend, poi_id="c") is None
+    # La precarga tampoco sale a la red: responde uno por uno lo que tiene.
+    assert asyncio.run(backend.preguntar_lote([("a", "A", "p"), ("b", "B", "p"),
+                                               ("c", "C", "p")])) == \
+        {"a": "guardada", "b": "del paquete"}
+
+
+def test_backend_gemini_pide_el_lote_en_una_llamada():
+    def responder_lote(prompt):
+        # El lote lista los POIs como '- id: nombre'; 'c' queda fuera.
+        lineas = [linea[2:].split(": ", 1) for linea in prompt.splitlines()
+                  if linea.startswith("- ")]
+        if not lineas:
+            return "Individual."
+        return json.dumps([{"id": poi_id, "texto": f"Dato de {nombre}."}
+                           for poi_id, nombre in lineas if poi_id != "c"])
+
+    cache = CacheRespuestas()
+    cache.guardar("b", "¿B?", "guardada")
+    with ServidorGeminiFalso(responder=responder_lote) as servidor:
+        backend = BackendGemini(SesionHost(), servidor.url(), streaming=False, cache=cache)
+        lugares = LUGARES + [("d", "D", "¿D?")]
+        resultado = asyncio.run(backend.preguntar_lote(lugares))
+    # 'b' sale de la caché; 'a', 'c' y 'd' van en un lote y 'c' se pide sola.
+    assert resultado == {"a": "Dato de A.", "b": "guardada", "c": "Individual.",
+                         "d": "Dato de D."}
+    assert len(servidor.solicitudes) == 2
+    assert cache.obtener("d", "¿D?") == "Dato de D."
+    assert backend.estadisticas()["lotes"]["pois_por_lote"] == 2
+
+
+def test_lote_cubierto_va_al_backend_disponible():
+    primario = ConLotes(nombre="primario", responder=responder("primario"))
+    secundario = ConLotes(omitir=("c",), nombre="secundario",
+                          responder=responder("secundario"))
+    cache = CacheRespuestas()
+    cubierta = ConsultaCubierta(primario, secundario, espera_inicial=1.0, cache=cache)
+    resultado = asyncio.run(cubierta.preguntar_lote(LUGARES))
+    assert resultado == {"a": "primario: A", "b": "primario: B", "c": "primario: C"}
+    assert primario.lotes == [["a", "b", "c"]] and secundario.lotes == []
+
+    # Sin el primario, el lote va al secundario; lo que falta se consulta con
+    # 'preguntar', que empieza por el primario.
+    primario.disponible = lambda: False
+    lugares = [("d", "D", "¿D?"), ("c", "C", "¿C2?")]
+    assert asyncio.run(cubierta.preguntar_lote(lugares)) == \
+        {"d": "secundario: D", "c": "primario responde"}
+    assert secundario.lotes == [["d", "c"]]
+    assert cache.obtener("d", "¿D?") == "secundario: D"
+
+
+@pytest.mark.parametrize("streaming", [True, False])
+def test_backend_gemini(streaming):
+    politica = PoliticaLLM(espera=EsperaExponencial(base=0.01, maxima=1.0))
+    with ServidorGeminiFalso(fallas=[503]) as servidor:
+        backend = BackendGemini(SesionHost(), servidor.url(), politica=politica,
+                                streaming=streaming)
+        fragmentos = []
+        texto = preguntar(backend, fragmentos=fragmentos)
+    assert texto == "".join(fragmentos) and texto
+    assert len(fragmentos) == (len(FRAGMENTOS) if streaming else 1)
+    assert backend.nombre == "gemini-1.5-flash"
+    metodos = [ruta.split(":")[1].split("?")[0] for ruta, _ in servidor.solicitudes]
+    assert metodos == ["streamGenerateContent" if streaming else "generateContent"] * 2
+    assert backend.histograma.cantidad == 1
+
+
+def test_disponible_no_consume_tokens():
+    limitador = LimitadorTokens(por_minuto=1, capacidad=1)
+    politica = PoliticaLLM(limitador=limitador)
+    assert politica.disponible() and politica.disponible()
+    assert politica.turno() == 0
+    assert not politica.disponible() and politica.rapidas == 0
+    sin_red = PoliticaLLM(hay_red=lambda: False)
+    assert not sin_red.disponible()
+    sin_red.cortacircuitos.abrir(10)
+    assert not PoliticaLLM(cortacircuitos=sin_red.cortacircuitos).disponible()
+
+
+def test_primario_rapido_no_se_cubre():
+    secundario = BackendSimulado(latencia=0.0, responder=responder("secundario"))
+    cubierta = ConsultaCubierta(BackendSimulado(latencia=0.02, responder=responder("primario")),
+                                secundario, espera_inicial=0.3, espera_minima=0.1)
+    assert preguntar(cubierta) == "primario responde"
+    assert cubierta.cubiertas == 0 and secundario.consultas == 0
+
+
+def test_primario_lento_gana_el_secundario_y_se_cancela_el_primario():
+    primario = BackendSimulado(latencia=2.0, responder=responder("primario"))
+    secundario = BackendSimulado(latencia=0.05, responder=responder("secundario"))
+    cache = CacheRespuestas()
+    cubierta = ConsultaCubierta(primario, secundario, espera_inicial=0.1, espera_minima=0.05,
+                                cache=cache)
+
+    async def principal():
+        inicio = asyncio.get_running_loop().time()
+        texto = await cubierta.preguntar("p", None, "a")
+        return texto, asyncio.get_running_loop().time() - inicio
+
+    texto, segundos = asyncio.run(principal())
+    assert texto == "secundario responde" and segundos < 0.5
+    assert (cubierta.cubiertas, cubierta.ganadas) == (1, 1)
+    assert primario.canceladas == 1 and primario.histograma.cantidad == 0
+    # La respuesta ganadora queda en la caché del backend exterior.
+    assert cache.obtener("a", "p") == "secundario responde"
+
+
+def test_solo_el_primero_en_responder_escribe_en_la_lcd():
+    # El primario empieza a transmitir después de cubrir, pero antes que el
+    # secundario: el secundario se cancela y sus fragmentos no se muestran.
+    primario = BackendSimulado(latencia=0.15, responder=responder("primario lento"),
+                               entre_fragmentos=0.05)
+    secundario = BackendSimulado(latencia=0.5, responder=responder("secundario"))
+    cubierta = ConsultaCubierta(primario, secundario, espera_inicial=0.05, espera_minima=0.05)
+    fragmentos = []
+    assert preguntar(cubierta, fragmentos=fragmentos) == "primario lento responde"
+    assert fragmentos == ["primario ", "lento ", "responde"]
+    assert cubierta.cubiertas == 1 and cubierta.ganadas == 0
+    assert secundario.canceladas == 1
+
+
+def test_falla_del_primario_la_cubre_el_secundario():
+    secundario = BackendSimulado(latencia=0.0, responder=responder("secundario"))
+    cubierta = ConsultaCubierta(BackendSimulado(latencia=0.0, probabilidad_falla=1.0),
+                                secundario, espera_inicial=1.0)
+    assert preguntar(cubierta) == "secundario responde"
+    assert cubierta.recuperadas == 1 and cubierta.cubiertas == 0
+    # Si ambos fallan, la consulta falla.
+    cubierta.secundario = BackendSimulado(latencia=0.0, probabilidad_falla=1.0)
+    assert preguntar(cubierta) is None and cubierta.fallidas == 1
+
+
+def test_falla_del_primario_tras_su_primer_fragmento_la_cubre_el_secundario():
+    # El primario gana la cobertura (el secundario se cancela) y luego se corta.
+    secundario = BackendSimulado(latencia=0.3, responder=responder("secundario"))
+    cubierta = ConsultaCubierta(CortaTrasFragmento(latencia=0.1), secundario,
+                                espera_inicial=0.05, espera_minima=0.05)
+    fragmentos = []
+    assert preguntar(cubierta, fragmentos=fragmentos) == "secundario responde"
+    assert fragmentos == ["Primer ", "secundario responde"]
+    assert secundario.canceladas == 1 and secundario.consultas == 2
+    assert cubierta.cubiertas == 1 and cubierta.recuperadas == 1
+    # Sin un segundo backend disponible, la consulta falla.
+    cubierta.secundario = NoDisponible(latencia=0.0)
+    assert preguntar(cubierta) is None
+
+
+def test_no_se_cubre_si_el_secundario_no_puede_salir():
+    secundario = NoDisponible(latencia=0.0)
+    cubierta = ConsultaCubierta(BackendSimulado(latencia=0.2, responder=responder("primario")),
+                                secundario, espera_inicial=0.05, espera_minima=0.05)
+    assert preguntar(cubierta) == "primario responde"
+    assert cubierta.cubiertas == 0 and secundario.consultas == 0
+
+
+def test_la_espera_sigue_el_percentil_del_primario():
+    primario = BackendSimulado(latencia=0.0)
+    cubierta = ConsultaCubierta(primario, BackendSimulado(), espera_inicial=2.0,
+                                espera_minima=0.1, espera_maxima=5.0, muestras_minimas=10)
+    assert cubierta.espera_cobertura() == 2.0
+    for _ in range(9):
+        primario.histograma.registrar(0.4)
+    primario.histograma.registrar(1.0)
+    assert 0.4 <= cubierta.espera_cobertura() <= 0.5
+    for _ in range(10):
+        primario.histograma.registrar(30.0)
+    assert cubierta.espera_cobertura() == 5.0
+    datos = cubierta.estadisticas()
+    assert datos["espera_cobertura_ms"] == 5000 and datos["primario"]["cantidad"] == 20
@@ -0,0 +1,123 @@
+# Pruebas de las consultas por lotes (llm_batch.py) contra el servidor de
+# Gemini falso.
+
+import asyncio
+import json
+
+import pytest
+
+from gemini_falso import ServidorGeminiFalso, SesionHost
+from llm_batch import ClienteLotes, construir_prompt_lote, separar_respuesta
+from resilience import EsperaExponencial, PoliticaLLM
+
+LUGARES = [("cenfotec", "Universidad Cenfotec", "¿Cenfotec?"),
+           ("auditorio", "Auditorio", "¿Auditorio?"),
+           ("maker_space", "Maker Space", "¿Maker Space?")]
+
+
+def responder_lote(prompt, omitir=()):
+    """Responde un lote con un objeto por cada línea '- id: nombre' del prompt."""
+    elementos = []
+    for linea in prompt.splitlines():
+        if linea.startswith("- "):
+            poi_id, nombre = linea[2:].split(": ", 1)
+            if poi_id not in omitir:
+                elementos.append({"id": poi_id, "texto": f"Dato de {nombre}."})
+    return json.dumps(elementos, ensure_ascii=False)
+
+
+def crear_cliente(servidor):
+    politica = PoliticaLLM(espera=EsperaExponencial(base=0.01, maxima=1.0))
+    return ClienteLotes(SesionHost(), servidor.url(), politica=politica, tamano_lote=3)
+
+
+def test_prompt_lista_los_lugares():
+    prompt = construir_prompt_lote([("a", "Lugar A"), ("b", "Lugar B")])
+    assert prompt.endswith("Lugares:\n- a: Lugar A\n- b: Lugar B")
+    assert "arreglo JSON" in prompt
+
+
+def test_separar_respuesta():
+    ids = ["a", "b"]
+    assert separar_respuesta('[{"id": "a", "texto": " Uno. "}, {"id": "b", "texto": "Dos."}]',
+                             ids) == {"a": "Uno.", "b": "Dos."}
+    # Bloque de código alrededor, ids desconocidos y textos vacíos se ignoran.
+    texto = '```json\n[{"id": "b", "texto": "Dos."}, {"id": "z", "texto": "X"}, {"id": "a"}]\n```'
+    assert separar_respuesta(texto, ids) == {"b": "Dos."}
+    # Arreglo de textos: se asignan en orden.
+    assert separar_respuesta('["Uno.", "Dos."]', ids) == {"a": "Uno.", "b": "Dos."}
+    with pytest.raises(ValueError):
+        separar_respuesta('[{"id": "a", "texto": "Corta', ids)  # Truncada.
+    with pytest.raises(ValueError):
+        separar_respuesta("No sé.", ids)
+
+
+def test_un_lote_reemplaza_varias_llamadas():
+    with ServidorGeminiFalso(responder=responder_lote) as servidor:
+        cliente = crear_cliente(servidor)
+        resultado = asyncio.run(cliente.preguntar(LUGARES))
+        assert len(servidor.solicitudes) == 1
+        cuerpo = servidor.solicitudes[0][1]
+        assert cuerpo["generationConfig"]["responseMimeType"] == "application/json"
+
+    assert resultado == {"cenfotec": "Dato de Universidad Cenfotec.",
+                         "auditorio": "Dato de Auditorio.", "maker_space": "Dato de Maker Space."}
+    assert cliente.estadisticas()["llamadas_ahorradas"] == 2
+
+
+def test_respuesta_invalida_o_incompleta_omite_los_pois():
+    # Los POIs que faltan los consulta por separado el backend (BackendLLM.preguntar_lote).
+    with ServidorGeminiFalso(responder=lambda prompt: "Lo siento, no puedo.") as servidor:
+        cliente = crear_cliente(servidor)
+        assert asyncio.run(cliente.preguntar(LUGARES)) == {}
+    assert cliente.estadisticas()["respuestas_invalidas"] == 1
+    assert cliente.estadisticas()["llamadas_ahorradas"] == -1
+
+    with ServidorGeminiFalso(responder=lambda p: responder_lote(p, omitir=("auditorio",))) as servidor:
+        cliente = crear_cliente(servidor)
+        resultado = asyncio.run(cliente.preguntar(LUGARES))
+    assert sorted(resultado) == ["cenfotec", "maker_space"]
+
+
+def test_divide_en_lotes_y_no_pide_la_sobra():
+    lugares = LUGARES + [("biblioteca", "Biblioteca", "¿Biblioteca?")]
+    with ServidorGeminiFalso(responder=responder_lote) as servidor:
+        cliente = crear_cliente(servidor)
+        resultado = asyncio.run(cliente.preguntar(lugares))
+        # Un lote de 3; el cuarto POI, solo, queda para la consulta individual.
+        assert len(servidor.solicitudes) == 1
+    assert len(resultado) == 3 and "biblioteca" not in resultado
+
+
+class RespuestaCortada:
+    """Respuesta 200 cuya conexión se corta a la mitad del cuerpo."""
+
+    status_code = 200
+    headers = {"Content-Type": "application/json"}
+
+    def __init__(self):
+        self.cerrada = False
+
+    def iter_content(self, chunk_size=1):
+        yield b'{"candidates": [{"content": {"parts": [{"text": "[{\\"id'
+        raise OSError("Conexión cortada")
+
+    def close(self):
+        self.cerrada = True
+
+
+class SesionCortada:
+    def __init__(self):
+        self.respuestas = []
+
+    def post(self, url, **opciones):
+        self.respuestas.append(RespuestaCortada())
+        return self.respuestas[-1]
+
+
+def test_respuesta_cortada_se_cierra():
+    sesion = SesionCortada()
+    politica = PoliticaLLM(espera=EsperaExponencial(base=0.01, maxima=0.01))
+    cliente = ClienteLotes(sesion, "http://gemini", politica=politica, tamano_lote=3)
+    assert asyncio.run(cliente.preguntar(LUGARES)) == {}
+    assert sesion.respuestas and all(r.cerrada for r in sesion.respuestas)
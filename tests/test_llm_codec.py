@@ -0,0 +1,97 @@
+# test_llm_codec.py
+# Pruebas de la plantilla de solicitudes y del extractor del texto de las
+# respuestas de Gemini (llm_codec.py).
+
+import json
+import random
+
+import pytest
+
+from llm_codec import ExtractorTexto, PlantillaSolicitud, leer_texto, plantilla
+
+TEXTO = 'Cenfotec "abrió" en 1991 \\ con café ☕ y 😀.\nFin\t/ <b> \x01'
+
+
+def respuesta_completa(*partes):
+    """Cuerpo de 'generateContent' con los metadatos que envía la API real."""
+    return json.dumps({
+        "candidates": [{
+            "content": {"parts": [{"text": parte} for parte in partes], "role": "model"},
+            "finishReason": "STOP",
+            "index": 0,
+            "safetyRatings": [{"category": c, "probability": "NEGLIGIBLE"} for c in (
+                "HARM_CATEGORY_SEXUALLY_EXPLICIT", "HARM_CATEGORY_HATE_SPEECH",
+                "HARM_CATEGORY_HARASSMENT", "HARM_CATEGORY_DANGEROUS_CONTENT")],
+        }],
+        "usageMetadata": {"promptTokenCount": 19, "candidatesTokenCount": 24,
+                          "totalTokenCount": 43},
+        "modelVersion": "gemini-1.5-flash-001",
+    }, indent=2).encode()
+
+
+def extraer(datos, cortes):
+    extractor = ExtractorTexto()
+    for inicio, fin in zip(cortes, cortes[1:]):
+        extractor.alimentar(datos[inicio:fin])
+    return extractor.texto()
+
+
+class RespuestaFalsa:
+    def __init__(self, datos):
+        self.datos = datos
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.datos), chunk_size):
+            yield self.datos[i:i + chunk_size]
+
+
+@pytest.mark.parametrize("pregunta", ["Estoy en Cenfotec.", TEXTO, "", "x" * 3000])
+def test_plantilla_equivale_a_json_dumps(pregunta):
+    solicitud = PlantillaSolicitud(30, {"responseMimeType": "application/json"}, capacidad=64)
+    cuerpo = solicitud.cuerpo(pregunta)
+    assert json.loads(bytes(cuerpo)) == {
+        "contents": [{"parts": [{"text": pregunta}]}],
+        "generationConfig": {"maxOutputTokens": 30, "responseMimeType": "application/json"},
+    }
+
+
+def test_plantilla_reutiliza_el_buffer():
+    solicitud = PlantillaSolicitud(30)
+    solicitud.cuerpo("x" * 2000)
+    assert solicitud.crecimientos == 1
+    corto = solicitud.cuerpo("corta")
+    assert json.loads(bytes(corto))["contents"][0]["parts"][0]["text"] == "corta"
+    assert solicitud.crecimientos == 1
+    assert plantilla(30) is plantilla(30) and plantilla(30) is not plantilla(45)
+
+
+def test_extractor_con_cortes_arbitrarios():
+    datos = respuesta_completa(TEXTO)
+    assert extraer(datos, [0, len(datos)]) == TEXTO
+    # Byte por byte: la clave, los escapes y los caracteres UTF-8 quedan partidos.
+    assert extraer(datos, list(range(len(datos) + 1))) == TEXTO
+    azar = random.Random(3)
+    for _ in range(50):
+        cortes = sorted({0, len(datos)} | {azar.randrange(len(datos)) for _ in range(8)})
+        assert extraer(datos, cortes) == TEXTO
+
+
+def test_extractor_une_las_partes_y_distingue_la_clave():
+    datos = respuesta_completa("Primera parte. ", "Segunda parte.")
+    assert extraer(datos, [0, len(datos)]) == "Primera parte. Segunda parte."
+    # '"text"' dentro de otra cadena o como valor no es la clave.
+    engano = b'{"nota": "\\"text\\": no", "tipo": "text", "text" : "si"}'
+    assert extraer(engano, [0, 20, len(engano)]) == "si"
+
+
+def test_extractor_sin_texto():
+    bloqueada = json.dumps({"candidates": [{"finishReason": "SAFETY"}]}).encode()
+    assert extraer(bloqueada, [0, len(bloqueada)]) is None
+    # Cadena sin terminar (respuesta cortada): no cuenta.
+    assert extraer(b'{"text": "a medias', [0, 18]) is None
+
+
+def test_leer_texto_reutiliza_el_extractor():
+    extractor = ExtractorTexto()
+    assert leer_texto(RespuestaFalsa(respuesta_completa("uno")), extractor) == "uno"
+    assert leer_texto(RespuestaFalsa(respuesta_completa("dos")), extractor, 7) == "dos"
@@ -0,0 +1,163 @@
+# Pruebas del streaming de respuestas de Gemini (llm_stream.py) y de la
+# política de reintentos contra un servidor HTTP local que imita la API e
+# inyecta fallas.
+
+import asyncio
+import json
+import time
+
+from cache_utils import CacheRespuestas
+from gemini_falso import CORTAR, DESCONECTAR, FRAGMENTOS, TRUNCAR, ServidorGeminiFalso, SesionHost, evento
+from llm_stream import ParserStreamGemini, endpoint_stream, preguntar_gemini_stream
+from resilience import ABIERTO, CortaCircuitos, EsperaExponencial, LimitadorTokens, PoliticaLLM
+
+
+def politica_rapida(**opciones):
+    """Política con esperas cortas para las pruebas."""
+    return PoliticaLLM(espera=EsperaExponencial(base=0.01, maxima=1.0), **opciones)
+
+
+def consultar(servidor, politica, al_recibir=None, cache=None):
+    return asyncio.run(preguntar_gemini_stream(
+        SesionHost(), servidor.url("streamGenerateContent"), "p", al_recibir,
+        cache=cache, poi_id="a", politica=politica))
+
+
+def sse(*textos):
+    ultimo = len(textos) - 1
+    return b"".join(b"data: " + json.dumps(evento(t, i == ultimo)).encode() + b"\r\n\r\n"
+                    for i, t in enumerate(textos))
+
+
+def test_endpoint_stream():
+    url = "https://x/v1beta/models/gemini-1.5-flash:generateContent?key=abc"
+    assert endpoint_stream(url) == ("https://x/v1beta/models/gemini-1.5-flash:"
+                                    "streamGenerateContent?alt=sse&key=abc")
+
+
+def test_parser_con_cortes_arbitrarios():
+    datos = sse("Año ", "del café ", "en Cenfotec.")
+    completo = ParserStreamGemini().alimentar(datos)
+    assert completo == ["Año ", "del café ", "en Cenfotec."]
+
+    # Byte por byte: los cortes caen a mitad de líneas y de caracteres UTF-8.
+    parser = ParserStreamGemini()
+    fragmentos = []
+    for i in range(len(datos)):
+        fragmentos += parser.alimentar(datos[i:i + 1])
+    assert fragmentos == completo
+    assert parser.eventos == 3 and parser.terminado and parser.errores == 0
+
+
+def test_parser_ignora_lineas_extra_y_cuenta_errores():
+    parser = ParserStreamGemini()
+    datos = b": comentario\n\nevent: mensaje\ndata: {roto\n" + sse("Hola")
+    assert parser.alimentar(datos) == ["Hola"]
+    assert parser.errores == 1
+
+
+def test_stream_entrega_fragmentos_antes_del_final():
+    recibidos = []
+    cache = CacheRespuestas()
+    with ServidorGeminiFalso(entre_fragmentos=0.05, corte=7) as servidor:
+        def al_recibir(fragmento):
+            recibidos.append((time.monotonic(), fragmento))
+
+        texto = asyncio.run(preguntar_gemini_stream(
+            SesionHost(), servidor.url("streamGenerateContent"), "¿Qué es Cenfotec?",
+            al_recibir, cache=cache, poi_id="cenfotec"))
+
+    assert texto == "".join(FRAGMENTOS)
+    assert [f for _, f in recibidos] == FRAGMENTOS
+    # El primer fragmento llegó antes de que el servidor enviara el último.
+    assert recibidos[0][0] < servidor.envios[-1]
+    ruta, cuerpo = servidor.solicitudes[0]
+    assert ":streamGenerateContent" in ruta
+    assert cuerpo["contents"][0]["parts"][0]["text"] == "¿Qué es Cenfotec?"
+    assert cache.obtener("cenfotec", "¿Qué es Cenfotec?") == texto
+
+
+def test_stream_reintenta_errores_y_usa_la_cache():
+    cache = CacheRespuestas()
+    with ServidorGeminiFalso(fallas=[503, DESCONECTAR]) as servidor:
+        texto = consultar(servidor, politica_rapida(), cache=cache)
+        assert texto == "".join(FRAGMENTOS)
+        assert len(servidor.solicitudes) == 3
+
+        recibidos = []
+        assert consultar(servidor, politica_rapida(), recibidos.append, cache) == texto
+        assert recibidos == [texto]
+        assert len(servidor.solicitudes) == 3  # La caché evitó la llamada.
+
+
+def test_stream_respeta_retry_after():
+    with ServidorGeminiFalso(fallas=[(429, 0.3)]) as servidor:
+        inicio = time.monotonic()
+        assert consultar(servidor, politica_rapida()) == "".join(FRAGMENTOS)
+        assert time.monotonic() - inicio >= 0.3
+
+
+def test_stream_no_reintenta_errores_definitivos_ni_respuestas_cortadas():
+    with ServidorGeminiFalso(fallas=[400, CORTAR]) as servidor:
+        assert consultar(servidor, politica_rapida()) is None
+        assert len(servidor.solicitudes) == 1
+
+        # La respuesta se cortó después del primer fragmento: ya se mostró
+        # parte del texto, así que no se reintenta.
+        recibidos = []
+        assert consultar(servidor, politica_rapida(), recibidos.append) is None
+        assert recibidos == FRAGMENTOS[:1]
+        assert len(servidor.solicitudes) == 2
+
+
+def test_stream_terminado_sin_finish_reason_no_se_guarda():
+    cache = CacheRespuestas()
+    politica = politica_rapida()
+    with ServidorGeminiFalso(fallas=[TRUNCAR]) as servidor:
+        # El servidor termina el cuerpo 'chunked' limpiamente después del
+        # primer fragmento: se retorna lo recibido, sin reintentar.
+        recibidos = []
+        assert consultar(servidor, politica, recibidos.append, cache) == FRAGMENTOS[0]
+        assert recibidos == FRAGMENTOS[:1]
+        assert len(servidor.solicitudes) == 1
+        assert cache.obtener("a", "p") is None
+        assert politica.cortacircuitos.fallas == 1
+
+        # La siguiente consulta va a la API y guarda la respuesta completa.
+        assert consultar(servidor, politica, cache=cache) == "".join(FRAGMENTOS)
+        assert len(servidor.solicitudes) == 2
+        assert cache.obtener("a", "p") == "".join(FRAGMENTOS)
+
+
+def test_circuito_abierto_falla_rapido_y_se_recupera():
+    politica = politica_rapida(cortacircuitos=CortaCircuitos(umbral=3, tiempo_abierto=0.3))
+    with ServidorGeminiFalso(fallas=[503] * 4) as servidor:
+        assert consultar(servidor, politica) is None
+        assert politica.cortacircuitos.estado == ABIERTO
+        assert len(servidor.solicitudes) == 3
+
+        # Con el circuito abierto no se llama a la API.
+        inicio = time.monotonic()
+        assert consultar(servidor, politica) is None
+        assert time.monotonic() - inicio < 0.05
+        assert len(servidor.solicitudes) == 3 and politica.rapidas == 1
+
+        # Pasado el tiempo, la prueba falla (cuarta falla) y el circuito se
+        # abre por el doble; la siguiente prueba funciona y lo cierra.
+        time.sleep(0.3)
+        assert consultar(servidor, politica) is None
+        assert len(servidor.solicitudes) == 4
+        time.sleep(0.6)
+        assert consultar(servidor, politica) == "".join(FRAGMENTOS)
+        assert politica.cortacircuitos.fallas == 0
+
+
+def test_limitador_espacia_las_solicitudes():
+    politica = politica_rapida(limitador=LimitadorTokens(por_minuto=600, capacidad=1))
+    with ServidorGeminiFalso() as servidor:
+        inicio = time.monotonic()
+        for _ in range(3):
+            assert consultar(servidor, politica)
+        # Una solicitud inmediata y luego una cada 0.1 s.
+        assert time.monotonic() - inicio >= 0.2
+        assert politica.solicitudes == 3
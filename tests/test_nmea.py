@@ -0,0 +1,110 @@
+# Pruebas del parser NMEA incremental (gps_utils.ParserNMEA).
+
+import os
+
+import gps_utils
+from gps_utils import ParserNMEA
+
+RUTA_REGISTRO = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "datos", "recorrido_cenfotec.nmea")
+
+GGA = b"$GPGGA,123519,4807.038,N,01131.000,E,1,08,0.9,545.4,M,46.9,M,,*47\r\n"
+RMC = b"$GPRMC,123519,A,4807.038,N,01131.000,E,022.4,084.4,230394,003.1,W*6A\r\n"
+
+
+def sentencia(cuerpo):
+    """Arma una sentencia NMEA con su checksum."""
+    suma = 0
+    for c in cuerpo.encode():
+        suma ^= c
+    return f"${cuerpo}*{suma:02X}\r\n".encode()
+
+
+def test_decodifica_gga():
+    parser = ParserNMEA()
+    assert parser.alimentar(GGA) == 1
+    assert abs(parser.latitude - 48.1173) < 1e-6
+    assert abs(parser.longitude - 11.516666) < 1e-6
+    assert parser.calidad_fix == 1
+    assert parser.satelites == 8
+    assert parser.valores[gps_utils.HDOP] == 0.9
+    assert parser.valores[gps_utils.ALTITUD] == 545.4
+    assert parser.valores[gps_utils.HORA] == 123519.0
+
+
+def test_decodifica_rmc():
+    parser = ParserNMEA()
+    assert parser.alimentar(RMC) == 1
+    assert parser.has_fix
+    assert parser.valores[gps_utils.VELOCIDAD] == 22.4
+    assert parser.valores[gps_utils.RUMBO] == 84.4
+
+
+def test_has_fix_sigue_a_la_ultima_sentencia():
+    parser = ParserNMEA()
+    parser.alimentar(RMC)
+    assert parser.has_fix
+    # Una GGA posterior con calidad 0 indica que se perdió el fix.
+    parser.alimentar(sentencia("GPGGA,123520,,,,,0,00,99.9,,M,,M,,"))
+    assert not parser.has_fix
+    parser.alimentar(GGA)
+    assert parser.has_fix
+    # Y al revés: una RMC con estado 'V' después de una GGA válida.
+    parser.alimentar(sentencia("GPRMC,123521,V,,,,,,,230394,,"))
+    assert not parser.has_fix
+
+
+def test_hemisferios_sur_y_oeste():
+    parser = ParserNMEA()
+    parser.alimentar(sentencia("GPGGA,153000.00,0955.9861,S,08401.9311,W,1,10,1.18,1150.3,M,6.0,M,,"))
+    assert parser.latitude < 0 and parser.longitude < 0
+
+
+def test_descarta_checksum_invalido():
+    parser = ParserNMEA()
+    assert parser.alimentar(GGA.replace(b"*47", b"*48")) == 0
+    assert parser.errores == 1
+    assert not parser.has_fix
+
+
+def test_sentencias_partidas_entre_lecturas():
+    parser = ParserNMEA()
+    datos = GGA + RMC
+    fixes = 0
+    for i in range(0, len(datos), 7):
+        fixes += parser.alimentar(datos[i:i + 7])
+    assert fixes == 2
+
+
+def test_leer_uart_usa_el_buffer_de_lectura():
+    class UARTFalso:
+        def __init__(self, datos):
+            self.datos = datos
+
+        def readinto(self, buffer):
+            n = min(len(buffer), len(self.datos))
+            buffer[:n] = self.datos[:n]
+            self.datos = self.datos[n:]
+            return n or None
+
+    parser = ParserNMEA(tamano_lectura=16)
+    uart = UARTFalso(GGA)
+    fixes = 0
+    while uart.datos:
+        fixes += parser.leer_uart(uart)
+    assert fixes == 1
+    ubicacion = parser.ubicacion()
+    assert (ubicacion["lat"], ubicacion["lon"]) == (parser.latitude, parser.longitude)
+    assert (ubicacion.lat, ubicacion.lon) == (parser.latitude, parser.longitude)
+
+
+def test_registro_grabado_del_campus():
+    with open(RUTA_REGISTRO, "rb") as archivo:
+        datos = archivo.read()
+    parser = ParserNMEA()
+    fixes = parser.alimentar(datos)
+    # 120 segundos con RMC y GGA válidos; la sentencia corrupta se descarta.
+    assert fixes == 240
+    assert parser.errores == 1
+    assert abs(parser.latitude - 9.9331) < 0.0002
+    assert abs(parser.longitude + 84.0322) < 0.0002
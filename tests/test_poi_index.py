@@ -0,0 +1,114 @@
+# Pruebas del índice espacial de puntos de interés (poi_index.py).
+
+import os
+import random
+from array import array
+
+from geo_utils import haversine_distance
+from poi_index import IndicePOI, cargar_indice
+
+RUTA_POIS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         "software", "pois.csv")
+
+
+def test_carga_archivo_de_datos():
+    """El archivo de datos del proyecto se carga completo en el índice."""
+    indice = cargar_indice(RUTA_POIS)
+    assert len(indice) == 3
+    assert indice.poi("auditorio")["nombre"] == "Auditorio"
+    assert indice.poi("no_existe") is None
+    assert indice.nombre("auditorio") == "Auditorio"
+    assert indice.nombre("no_existe") is None
+
+
+def test_mas_cercano_en_el_campus():
+    """Desde las coordenadas del Auditorio, el POI más cercano es el Auditorio."""
+    indice = cargar_indice(RUTA_POIS)
+    auditorio = indice.poi("auditorio")
+    poi_id, distancia = indice.mas_cercano(auditorio["lat"], auditorio["lon"], 25.0)
+    assert poi_id == "auditorio"
+    assert distancia < 0.01
+    # Lejos del campus no hay ningún POI dentro del radio.
+    assert indice.mas_cercano(9.95, -84.05, 25.0) is None
+
+
+def test_coincide_con_busqueda_lineal():
+    """Con miles de POIs, el índice da el mismo resultado que recorrerlos todos."""
+    rnd = random.Random(7)
+    indice = IndicePOI(tamano_celda=50.0, lat_referencia=9.93)
+    puntos = []
+    for i in range(3000):
+        lat = 9.93 + rnd.uniform(-0.02, 0.02)
+        lon = -84.03 + rnd.uniform(-0.02, 0.02)
+        indice.agregar(f"p{i}", f"Lugar {i}", lat, lon)
+        puntos.append((f"p{i}", lat, lon))
+
+    indices = array("H", [0] * 3000)
+    distancias = array("d", [0.0] * 3000)
+    for _ in range(50):
+        lat = 9.93 + rnd.uniform(-0.02, 0.02)
+        lon = -84.03 + rnd.uniform(-0.02, 0.02)
+        radio = rnd.choice([20.0, 75.0, 200.0])
+        lineal = sorted((haversine_distance(lat, lon, plat, plon), pid)
+                        for pid, plat, plon in puntos)
+        esperados = [pid for d, pid in lineal if d <= radio]
+        assert [pid for pid, _ in indice.en_radio(lat, lon, radio)] == esperados
+        cercano = indice.mas_cercano(lat, lon, radio)
+        assert (cercano[0] if cercano else None) == (esperados[0] if esperados else None)
+        # 'buscar' llena los buffers con los mismos POIs, sin orden.
+        n = indice.buscar(lat, lon, radio, indices, distancias)
+        assert sorted(indice.ids[indices[k]] for k in range(n)) == sorted(esperados)
+
+
+def test_buffers_llenos_conservan_los_mas_cercanos():
+    rnd = random.Random(8)
+    indice = IndicePOI(tamano_celda=50.0, lat_referencia=9.93)
+    for i in range(200):
+        indice.agregar(f"p{i}", f"Lugar {i}", 9.93 + rnd.uniform(-0.0005, 0.0005),
+                       -84.03 + rnd.uniform(-0.0005, 0.0005))
+    indices, distancias = array("H", [0] * 8), array("d", [0.0] * 8)
+    n = indice.buscar(9.93, -84.03, 200.0, indices, distancias)
+    esperados = [pid for pid, _ in indice.en_radio(9.93, -84.03, 200.0)][:8]
+    assert n == 8 and sorted(indice.ids[indices[k]] for k in range(n)) == sorted(esperados)
+
+
+def test_mas_de_65536_pois():
+    # Con índices 'H' el POI 65536 quedaría guardado como el 0.
+    indice = IndicePOI(tamano_celda=1000.0, lat_referencia=9.93)
+    for i in range(70000):
+        indice.agregar(f"p{i}", "", 9.93 + (i % 100) * 0.001, -84.03)
+    indice.agregar("lejano", "Lejano", 10.5, -84.03)
+    indices, distancias = array("L", [0] * 4), array("d", [0.0] * 4)
+    assert indice.buscar(10.5, -84.03, 10.0, indices, distancias) == 1
+    assert indices[0] == 70000 and indice.ids[indices[0]] == "lejano"
+
+
+def test_referencia_es_el_centro_de_las_latitudes(tmp_path):
+    # La primera fila está cerca del ecuador y las demás a 60° norte: con
+    # la primera como referencia, las celdas serían angostas en longitud y
+    # la búsqueda no llegaría a los POIs del borde del radio.
+    ruta = tmp_path / "pois.csv"
+    filas = ["id,nombre,lat,lon", "ecuador,Ecuador,0.0,10.0"]
+    for i in range(50):
+        filas.append(f"p{i},Lugar {i},{60.0 + i * 0.0001},{10.0 + i * 0.001}")
+    ruta.write_text("\n".join(filas) + "\n")
+    indice = cargar_indice(str(ruta), tamano_celda=100.0)
+    centro = IndicePOI(100.0, lat_referencia=(0.0 + 60.0049) / 2)
+    assert indice._grados_lon == centro._grados_lon
+    for pid, plat, plon in [("p0", 60.0, 10.0), ("p49", 60.0049, 10.049)]:
+        lineal = sorted(haversine_distance(plat, plon, indice.lats[i], indice.lons[i])
+                        for i in range(len(indice)))
+        radio = 300.0
+        esperados = [d for d in lineal if d <= radio]
+        assert len(indice.en_radio(plat, plon, radio)) == len(esperados)
+
+
+def test_rechaza_ids_duplicados():
+    indice = IndicePOI()
+    indice.agregar("a", "A", 9.93, -84.03)
+    try:
+        indice.agregar("a", "A otra vez", 9.94, -84.03)
+    except ValueError:
+        pass
+    else:
+        assert False, "Se esperaba ValueError por id duplicado"
@@ -0,0 +1,184 @@
+# test_poi_tiles.py
+# Pruebas del índice de POIs en teselas (poi_tiles.py) y de la herramienta
+# que construye el archivo (tools/build_poi_tiles.py).
+
+import asyncio
+import math
+import os
+import random
+import sys
+from array import array
+
+import pytest
+
+import runtime
+from geofence import ENTRADA, MotorGeocercas
+from poi_index import IndicePOI
+from poi_tiles import IndiceTeselas, abrir_teselas, escribir_teselas
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(RAIZ, "tools"))
+
+import build_poi_tiles  # noqa: E402
+import decode_telemetry  # noqa: E402
+
+METROS_POR_GRADO = 111320.0
+LAT0, LON0 = 9.93300, -84.03200
+
+
+def punto(este, norte):
+    """Convierte un desplazamiento en metros desde (LAT0, LON0) a grados."""
+    return (LAT0 + norte / METROS_POR_GRADO,
+            LON0 + este / (METROS_POR_GRADO * math.cos(math.radians(LAT0))))
+
+
+def ciudad(cantidad=3000, lado=4000.0, semilla=1):
+    """POIs al azar en un cuadrado de 'lado' metros."""
+    azar = random.Random(semilla)
+    return [(f"poi_{i:05d}", f"Lugar {i}", *punto(azar.uniform(0, lado), azar.uniform(0, lado)))
+            for i in range(cantidad)]
+
+
+@pytest.fixture
+def archivo(tmp_path):
+    pois = ciudad()
+    ruta = str(tmp_path / "pois.tiles")
+    escribir_teselas(ruta, pois)
+    return ruta, pois
+
+
+def test_busquedas_equivalen_a_indice_poi(archivo):
+    ruta, pois = archivo
+    completo = IndicePOI(lat_referencia=LAT0)
+    for poi in pois:
+        completo.agregar(*poi)
+    azar = random.Random(2)
+    indices, distancias = array("L", [0] * 64), array("d", [0.0] * 64)
+    pocos, distancias_pocos = array("L", [0] * 3), array("d", [0.0] * 3)
+    with IndiceTeselas(ruta, max_residentes=4) as teselas:
+        assert len(teselas) == len(pois)
+        for _ in range(200):
+            lat, lon = punto(azar.uniform(-100, 4100), azar.uniform(-100, 4100))
+            radio = azar.choice((25.0, 60.0, 150.0))
+            # Las coordenadas se guardan en 1e-7 grados: las distancias difieren
+            # en milímetros y dos POIs casi a la misma distancia pueden cambiar de orden.
+            esperados = sorted(poi_id for poi_id, _ in completo.en_radio(lat, lon, radio))
+            assert sorted(poi_id for poi_id, _ in teselas.en_radio(lat, lon, radio)) == esperados
+            n = teselas.buscar(lat, lon, radio, indices, distancias)
+            # Los índices de 'buscar' son globales: 'ids[i]' los traduce.
+            assert sorted(teselas.ids[indices[k]] for k in range(n)) == esperados
+            minima = completo.distancia_minima(lat, lon, radio)
+            assert teselas.distancia_minima(lat, lon, radio) == \
+                (minima if minima is None else pytest.approx(minima, abs=0.01))
+            cercano = completo.mas_cercano(lat, lon, radio)
+            assert teselas.mas_cercano(lat, lon, radio) == \
+                (cercano if cercano is None else (cercano[0], pytest.approx(cercano[1], abs=0.01)))
+            assert teselas.residentes() <= 4
+            # Con buffers chicos quedan los más cercanos.
+            n = teselas.buscar(lat, lon, radio, pocos, distancias_pocos)
+            cercanos = [poi_id for poi_id, _ in teselas.en_radio(lat, lon, radio)][:3]
+            assert sorted(teselas.ids[pocos[k]] for k in range(n)) == sorted(cercanos)
+        assert teselas.desalojos > 0
+
+
+def test_busquedas_por_id_e_indice_global(archivo):
+    ruta, pois = archivo
+    with IndiceTeselas(ruta, max_residentes=2) as teselas:
+        # Sin teselas residentes, el id se busca en el índice de ids del archivo.
+        poi = teselas.poi("poi_01234")
+        assert poi["nombre"] == "Lugar 1234"
+        assert poi["lat"] == pytest.approx(pois[1234][2], abs=1e-7)
+        assert 0 < teselas.lecturas_ids <= 13
+        # Ya residente, no se lee el índice.
+        lecturas = teselas.lecturas_ids
+        i = teselas.posicion("poi_01234")
+        assert teselas.lecturas_ids == lecturas
+        assert teselas.ids[i] == "poi_01234" and teselas.nombres[i] == "Lugar 1234"
+        assert teselas.nombre("poi_00007") == "Lugar 7"
+        assert teselas.poi("no_existe") is None and teselas.posicion("x" * 40) is None
+        # 'recorrer' sigue el orden de los índices sin pasar por el LRU.
+        cargas = teselas.cargas
+        orden = [poi_id for poi_id, _, _, _ in teselas.recorrer()]
+        assert sorted(orden) == sorted(poi[0] for poi in pois)
+        assert orden[i] == "poi_01234" and teselas.cargas == cargas
+        with pytest.raises(IndexError):
+            teselas.ids[len(pois)]
+
+
+def test_precarga_en_la_direccion_del_movimiento(archivo):
+    ruta, _ = archivo
+    indices, distancias = array("L", [0] * 16), array("d", [0.0] * 16)
+    with IndiceTeselas(ruta) as teselas:
+        # Caminata hacia el este a 1.4 m/s con una lectura por segundo; la
+        # precarga corre cada 2 s, como la tarea de teselas.
+        for t in range(0, 2500):
+            lat, lon = punto(200.0 + 1.4 * t, 2000.0)
+            if t % 2 == 0:
+                teselas.precargar(lat, lon)
+            cargas = teselas.cargas
+            teselas.buscar(lat, lon, 35.0, indices, distancias)
+            # La búsqueda del GPS nunca lee la flash.
+            assert teselas.cargas == cargas
+            assert teselas.residentes() <= teselas.max_residentes
+        assert teselas.cargas == teselas.precargas > 10
+
+
+def test_geocercas_sobre_teselas(archivo):
+    ruta, pois = archivo
+    poi_id, _, lat, lon = pois[42]
+    with IndiceTeselas(ruta, max_residentes=4) as teselas:
+        motor = MotorGeocercas(teselas)
+        eventos = []
+        for t in range(5):
+            eventos.extend(motor.actualizar(lat, lon, float(t)))
+        assert (ENTRADA, poi_id) in eventos
+
+
+def test_tarea_de_teselas_precarga_la_ubicacion(archivo):
+    ruta, pois = archivo
+    with IndiceTeselas(ruta) as teselas:
+        estado = runtime.Estado()
+        estado.ubicacion = {"lat": pois[0][2], "lon": pois[0][3]}
+
+        async def principal():
+            tarea = asyncio.create_task(runtime.tarea_teselas(estado, teselas, periodo=0.01))
+            await asyncio.sleep(0.03)
+            estado.activo = False
+            await tarea
+
+        asyncio.run(principal())
+        assert teselas.precargas > 0
+        assert teselas.nombre(pois[0][0]) == pois[0][1] and teselas.lecturas_ids == 0
+
+
+def test_archivo_invalido_y_datos_invalidos(tmp_path):
+    ruta = tmp_path / "otro.bin"
+    ruta.write_bytes(b"no es un archivo de teselas")
+    with pytest.raises(ValueError):
+        IndiceTeselas(str(ruta))
+    assert abrir_teselas(str(ruta)) is None
+    assert abrir_teselas(str(tmp_path / "falta.tiles")) is None
+    with pytest.raises(ValueError):
+        escribir_teselas(str(tmp_path / "a.tiles"), [("a", "A", 0.0, 0.0), ("a", "B", 1.0, 1.0)])
+    with pytest.raises(ValueError):
+        escribir_teselas(str(tmp_path / "b.tiles"), [("x" * 30, "X", 0.0, 0.0)])
+
+
+def test_herramienta_une_csv_y_decodifica_telemetria(tmp_path):
+    ciudad_csv = tmp_path / "ciudad.csv"
+    ciudad_csv.write_text("id,nombre,lat,lon\n"
+                          "teatro,Teatro Nacional, San José,9.93340,-84.07710\n"
+                          "cenfotec,Universidad Cenfotec,9.93310,-84.03220\n", encoding="utf-8")
+    salida = str(tmp_path / "pois.tiles")
+    campus = os.path.join(RAIZ, "software", "pois.csv")
+
+    build_poi_tiles.main([str(ciudad_csv), campus, "--salida", salida])
+
+    with IndiceTeselas(salida) as teselas:
+        assert len(teselas) == 4  # 'cenfotec' está en ambos archivos.
+        assert teselas.nombre("teatro") == "Teatro Nacional, San José"
+        assert teselas.poi("maker_space")["nombre"] == "Maker Space"
+        orden = [poi_id for poi_id, _, _, _ in teselas.recorrer()]
+    # La telemetría guarda el índice global; el decodificador lo traduce.
+    assert decode_telemetry.cargar_ids(salida) == orden
+    assert decode_telemetry.cargar_ids(campus) == ["cenfotec", "auditorio", "maker_space"]
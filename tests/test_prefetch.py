@@ -0,0 +1,83 @@
+# Pruebas de la precarga de descripciones (prefetch.py).
+
+from cache_utils import CacheRespuestas
+from poi_index import IndicePOI
+from prefetch import Precargador
+
+
+def crear_indice():
+    """Cuatro POIs en línea recta hacia el norte, separados unos 100 m, y uno al este."""
+    indice = IndicePOI(lat_referencia=9.93)
+    for i in range(4):
+        indice.agregar(f"norte{i}", f"Norte {i}", 9.930 + i * 0.0009, -84.030)
+    indice.agregar("este", "Este", 9.930, -84.029)
+    return indice
+
+
+def test_predice_por_ruta():
+    precargador = Precargador(crear_indice(), lambda poi_id: True)
+    ruta = ["norte0", "norte1", "norte2", "norte3"]
+    assert precargador.predecir_por_ruta(ruta, 0) == ["norte1", "norte2"]
+    assert precargador.predecir_por_ruta(ruta, 2) == ["norte3"]
+    assert precargador.predecir_por_ruta(ruta, 3) == []
+
+
+def test_no_repite_consultas_exitosas():
+    consultados = []
+
+    def consultar(poi_id):
+        consultados.append(poi_id)
+        return poi_id != "norte2"  # La consulta de 'norte2' falla.
+
+    precargador = Precargador(crear_indice(), consultar)
+    precargador.precargar(["norte1", "norte2"])
+    precargador.precargar(["norte1", "norte2"])
+    # 'norte1' ya estaba precargado; 'norte2' se reintenta porque falló.
+    assert consultados == ["norte1", "norte2", "norte2"]
+    precargador.olvidar()
+    precargador.precargar(["norte1"])
+    assert consultados[-1] == "norte1"
+
+
+def test_filtrar_lote_espera_a_que_falten_varios():
+    precargador = Precargador(crear_indice(), max_pois=4)
+    assert precargador.filtrar_lote(["norte1", "norte2", "norte3", "este"]) == [
+        "norte1", "norte2", "norte3", "este"]
+    for poi_id in ("norte1", "norte2", "norte3", "este"):
+        precargador.marcar_precargado(poi_id)
+    # Solo falta uno de cuatro y el próximo ya está: se espera.
+    assert precargador.filtrar_lote(["norte2", "norte3", "este", "norte0"]) == []
+    # Falta la mitad: se pide el lote.
+    precargador.olvidar("norte3")
+    assert precargador.filtrar_lote(["norte2", "norte3", "este", "norte0"]) == [
+        "norte3", "norte0"]
+    # Si falta el próximo POI, se pide aunque sea solo.
+    assert precargador.filtrar_lote(["norte3"]) == ["norte3"]
+
+
+def test_vuelve_a_precargar_lo_que_la_cache_expulso():
+    cache = CacheRespuestas(max_entradas=2)
+    consultados = []
+
+    def consultar(poi_id):
+        consultados.append(poi_id)
+        cache.guardar(poi_id, "p", "Texto")
+        return True
+
+    precargador = Precargador(crear_indice(), consultar,
+                              disponible=lambda poi_id: cache.contiene(poi_id, "p"))
+    precargador.precargar(["norte1", "norte2"])
+    precargador.precargar(["norte1", "norte2"])
+    assert consultados == ["norte1", "norte2"]
+    cache.guardar("norte3", "p", "Texto")  # Se expulsa 'norte1'.
+    precargador.precargar(["norte1", "norte2"])
+    assert consultados == ["norte1", "norte2", "norte1"]
+    # Revisar la caché no cuenta aciertos ni fallos.
+    assert cache.estadisticas()["fallos"] == 0
+
+
+def test_registro_sin_disponible_esta_acotado():
+    precargador = Precargador(crear_indice(), lambda poi_id: True, max_registrados=2)
+    precargador.precargar(["norte1", "norte2", "norte3"])
+    # Solo se recuerdan los dos más recientes.
+    assert precargador.filtrar_nuevos(["norte1", "norte2", "norte3"]) == ["norte1"]
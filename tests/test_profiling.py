@@ -0,0 +1,183 @@
+# test_profiling.py
+# Pruebas de la instrumentación (software/profiling.py).
+
+import asyncio
+import contextlib
+import io
+
+from profiling import MonitorMemoria, Perfil, atender_comando
+from runtime import Estado, tarea_comandos
+from simulador import Simulador
+
+
+class RelojNs:
+    """Reloj en nanosegundos que avanza a mano."""
+
+    def __init__(self):
+        self.ahora = 0
+
+    def __call__(self):
+        return self.ahora
+
+
+def test_desactivado_no_registra_nada():
+    perfil = Perfil()
+    with perfil.medir("gps"):
+        pass
+    perfil.contar("api_solicitudes")
+    assert perfil.medir("gps") is perfil.medir("lcd")
+    assert perfil.eventos == 0
+    assert perfil.resumen() == {}
+    assert perfil.contadores == {}
+
+
+def test_tramos_y_contadores():
+    reloj = RelojNs()
+    perfil = Perfil(activo=True, reloj_ns=reloj)
+    for duracion_ms in (2, 4, 30):
+        with perfil.medir("https_post"):
+            reloj.ahora += duracion_ms * 1_000_000
+    with perfil.medir("lcd"):
+        reloj.ahora += 500_000
+    perfil.contar("api_solicitudes")
+    perfil.contar("api_solicitudes", 2)
+
+    resumen = perfil.resumen()
+    assert resumen["https_post"]["cantidad"] == 3
+    assert resumen["https_post"]["total_ms"] == 36
+    assert resumen["https_post"]["promedio_ms"] == 12
+    assert resumen["https_post"]["max_ms"] == 30
+    assert resumen["https_post"]["p95_ms"] == 30
+    assert resumen["lcd"]["total_ms"] == 0.5
+    assert perfil.contadores == {"api_solicitudes": 3}
+    # El tramo de cada nombre se reutiliza.
+    assert perfil.medir("lcd") is perfil.medir("lcd")
+
+
+def test_el_buffer_circular_guarda_los_ultimos():
+    reloj = RelojNs()
+    perfil = Perfil(capacidad=4, activo=True, reloj_ns=reloj)
+    for i in range(1, 7):
+        with perfil.medir("gps"):
+            reloj.ahora += i * 1000
+    assert perfil.recientes("gps") == [3, 4, 5, 6]
+    # Los acumulados cuentan todos los tramos.
+    assert perfil.resumen()["gps"]["cantidad"] == 6
+    assert perfil.resumen()["gps"]["total_ms"] == 0.021
+
+
+def test_limite_de_nombres():
+    perfil = Perfil(max_nombres=2, activo=True)
+    for nombre in ("a", "b", "c"):
+        with perfil.medir(nombre):
+            pass
+    assert sorted(perfil.resumen()) == ["a", "b"]
+
+
+def test_reiniciar_conserva_los_nombres():
+    perfil = Perfil(activo=True)
+    with perfil.medir("gps"):
+        pass
+    perfil.contar("x")
+    perfil.reiniciar()
+    assert perfil.eventos == 0 and perfil.resumen() == {} and perfil.contadores == {}
+    with perfil.medir("gps"):
+        pass
+    assert perfil.resumen()["gps"]["cantidad"] == 1
+
+
+def test_volcar_a_archivo_y_a_consola(tmp_path, capsys):
+    reloj = RelojNs()
+    perfil = Perfil(activo=True, reloj_ns=reloj)
+    with perfil.medir("geocercas"):
+        reloj.ahora += 1_500_000
+    perfil.contar("consultas")
+
+    ruta = tmp_path / "perfil.txt"
+    texto = perfil.volcar(str(ruta))
+    assert ruta.read_text().strip() == texto
+    assert "geocercas" in texto and "contador consultas: 1" in texto
+
+    # Sin poder escribir, el resumen sale por la consola.
+    perfil.volcar(str(tmp_path / "no_existe" / "perfil.txt"))
+    assert "geocercas" in capsys.readouterr().out
+
+
+def test_comandos_de_consola(tmp_path):
+    perfil = Perfil()
+    with contextlib.redirect_stdout(io.StringIO()) as salida:
+        assert atender_comando("perfil on", perfil)
+        assert perfil.activo
+        with perfil.medir("gps"):
+            pass
+        assert atender_comando("PERFIL", perfil)
+        assert atender_comando("perfil archivo", perfil, ruta=str(tmp_path / "p.txt"))
+        assert atender_comando("perfil reset", perfil)
+        assert perfil.eventos == 0
+        assert atender_comando("perfil off", perfil)
+        assert not perfil.activo
+        assert not atender_comando("hola", perfil)
+    assert "gps" in salida.getvalue()
+    assert (tmp_path / "p.txt").exists()
+
+
+class GCFalso:
+    """'gc' de CircuitPython con la memoria asignada a mano."""
+
+    def __init__(self):
+        self.asignada = 1000
+
+    def mem_alloc(self):
+        return self.asignada
+
+    def mem_free(self):
+        return 100000 - self.asignada
+
+
+def test_monitor_de_memoria():
+    gc_falso = GCFalso()
+    monitor = MonitorMemoria(gc_falso)
+    for asignada in (1000, 1200, 1300, 400, 700):  # 400: el gc recolectó.
+        gc_falso.asignada = asignada
+        monitor.muestrear()
+    resumen = monitor.resumen()
+    assert resumen["iteraciones"] == 3 and resumen["recolecciones"] == 1
+    assert resumen["bytes_max"] == 300
+    assert resumen["bytes_promedio"] == (200 + 100 + 300) / 3
+    assert resumen["libre_min"] == 100000 - 1300
+    assert "B/iteración" in monitor.texto()
+    # En CPython no hay 'gc.mem_alloc': no mide, pero el comando responde.
+    assert not MonitorMemoria(object()).disponible
+    with contextlib.redirect_stdout(io.StringIO()) as salida:
+        assert atender_comando("perfil memoria", Perfil())
+    assert "Memoria" in salida.getvalue()
+
+
+def test_tarea_de_comandos():
+    estado = Estado()
+    lineas = ["", "perfil on", None]
+    atendidas = []
+
+    def leer():
+        return lineas.pop(0) if lineas else None
+
+    def atender(linea):
+        atendidas.append(linea)
+        estado.activo = False
+
+    asyncio.run(tarea_comandos(estado, leer, atender, periodo=0))
+    assert atendidas == ["perfil on"]
+
+
+def test_firmware_instrumentado_vuelca_por_la_consola(capsys):
+    with Simulador(paquete=False) as sim:
+        firmware = sim.importar_firmware()
+        sim.consola.escribir("perfil on")
+        sim.correr(firmware.main(), duracion=45)
+        sim.consola.escribir("perfil")
+        sim.correr(firmware.main(), duracion=1)
+        resumen = firmware.perfil.resumen()
+    assert {"gps", "geocercas", "https_post", "json", "lcd", "consulta"} <= set(resumen)
+    assert firmware.perfil.contadores["api_solicitudes"] >= 1
+    salida = capsys.readouterr().out
+    assert "https_post" in salida.split("Perfil:")[-1]
@@ -0,0 +1,136 @@
+# Pruebas de la política de reintentos (resilience.py) con un reloj falso.
+
+from resilience import (ABIERTO, CERRADO, SEMIABIERTO, CortaCircuitos, EsperaExponencial,
+                        LimitadorTokens, PoliticaLLM, leer_retry_after)
+
+
+class RelojFalso:
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+
+def test_espera_exponencial_con_jitter():
+    maxima = EsperaExponencial(base=1.0, maxima=10.0, aleatorio=lambda: 1.0)
+    assert [maxima.espera(i) for i in range(6)] == [1.0, 2.0, 4.0, 8.0, 10.0, 10.0]
+    mitad = EsperaExponencial(base=1.0, maxima=10.0, aleatorio=lambda: 0.5)
+    assert mitad.espera(2) == 2.0
+    # 'Retry-After' manda sobre el cálculo, con el mismo tope.
+    assert mitad.espera(0, retry_after=7) == 7
+    assert mitad.espera(0, retry_after=60) == 10.0
+
+
+def test_leer_retry_after():
+    assert leer_retry_after({"retry-after": "5"}) == 5.0
+    assert leer_retry_after({"Retry-After": "2.5"}) == 2.5
+    assert leer_retry_after({"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}) is None
+    assert leer_retry_after({}) is None and leer_retry_after(None) is None
+
+
+def test_limitador_respeta_la_cuota():
+    reloj = RelojFalso()
+    limitador = LimitadorTokens(por_minuto=6, capacidad=2, reloj=reloj)
+    # Ráfaga inicial de 2 solicitudes, luego una cada 10 s.
+    assert limitador.tomar() == 0 and limitador.tomar() == 0
+    assert limitador.tomar() == 10.0
+    reloj.t = 4.0
+    assert abs(limitador.tomar() - 6.0) < 1e-9
+    reloj.t = 10.0
+    assert limitador.tomar() == 0
+    # En 10 minutos no se pasa de la cuota aunque se pida sin parar.
+    concedidas = 0
+    while reloj.t < 610.0:
+        if limitador.tomar() == 0:
+            concedidas += 1
+        reloj.t += 0.5
+    assert concedidas <= 60 + 2
+
+
+def test_cortacircuitos_abre_prueba_y_cierra():
+    reloj = RelojFalso()
+    circuito = CortaCircuitos(umbral=3, tiempo_abierto=30, tiempo_maximo=100, reloj=reloj)
+    for _ in range(2):
+        circuito.fallo()
+    assert circuito.estado == CERRADO and circuito.permitir()
+    circuito.fallo()
+    assert circuito.estado == ABIERTO and not circuito.permitir()
+    assert circuito.restante() == 30
+
+    # Pasado el tiempo se permite una prueba; si falla, se abre el doble.
+    reloj.t = 30.0
+    assert circuito.permitir() and circuito.estado == SEMIABIERTO
+    circuito.fallo()
+    assert circuito.estado == ABIERTO and circuito.restante() == 60
+    reloj.t = 90.0
+    assert circuito.permitir()
+    circuito.fallo()
+    assert circuito.restante() == 100  # Tope.
+
+    reloj.t = 190.0
+    assert circuito.permitir()
+    circuito.exito()
+    assert circuito.estado == CERRADO and circuito.fallas == 0
+    assert circuito.aperturas == 3
+
+
+def test_semiabierto_deja_pasar_una_sola_prueba():
+    reloj = RelojFalso()
+    circuito = CortaCircuitos(umbral=1, tiempo_abierto=30, tiempo_prueba=20, reloj=reloj)
+    circuito.fallo()
+    reloj.t = 30.0
+    assert circuito.permitir()
+    # Mientras la prueba no termina, las demás consultas se rechazan.
+    assert not circuito.permitir() and not circuito.permitir()
+    assert circuito.estado == SEMIABIERTO and circuito.restante() == 20
+    circuito.exito()
+    assert circuito.permitir() and circuito.permitir()
+
+    # Una prueba que nunca informa su resultado no bloquea para siempre.
+    circuito.fallo()
+    reloj.t = 100.0
+    assert circuito.permitir() and not circuito.permitir()
+    reloj.t = 120.0
+    assert circuito.permitir() and not circuito.permitir()
+    assert not PoliticaLLM(cortacircuitos=circuito).disponible()
+
+
+def test_errores_de_la_solicitud_no_abren_el_circuito():
+    reloj = RelojFalso()
+    politica = PoliticaLLM(cortacircuitos=CortaCircuitos(umbral=2, reloj=reloj))
+    for _ in range(5):
+        assert politica.registrar(400, {}, 0) is None
+    assert politica.cortacircuitos.estado == CERRADO and politica.permitir()
+    # Una prueba que recibe un 400 muestra que la API responde: se cierra.
+    politica.registrar(503, {}, 0)
+    politica.registrar(503, {}, 1)
+    assert politica.cortacircuitos.estado == ABIERTO
+    reloj.t = 30.0
+    assert politica.permitir()
+    politica.registrar(400, {}, 0)
+    assert politica.cortacircuitos.estado == CERRADO
+
+
+def test_politica_decide_cuando_reintentar():
+    reloj = RelojFalso()
+    politica = PoliticaLLM(intentos=3, espera=EsperaExponencial(aleatorio=lambda: 1.0),
+                           cortacircuitos=CortaCircuitos(umbral=10, reloj=reloj))
+    assert politica.registrar(503, {}, 0) == 1.0
+    assert politica.registrar(None, None, 1) == 2.0      # Excepción (red).
+    assert politica.registrar(503, {}, 2) is None        # Último intento.
+    assert politica.registrar(429, {"Retry-After": "3"}, 0) == 3.0
+    assert politica.registrar(400, {}, 0) is None        # No se arregla reintentando.
+    # Un 'Retry-After' mayor al tope abre el circuito por ese tiempo.
+    assert politica.registrar(429, {"Retry-After": "120"}, 0) is None
+    assert not politica.permitir() and politica.cortacircuitos.restante() == 120
+    assert politica.rapidas == 1
+
+
+def test_politica_sin_red_falla_de_inmediato():
+    conectado = [False]
+    politica = PoliticaLLM(hay_red=lambda: conectado[0])
+    assert not politica.permitir()
+    conectado[0] = True
+    assert politica.permitir()
+    assert politica.cortacircuitos.fallas == 0  # Sin red no cuenta como falla de la API.
@@ -0,0 +1,149 @@
+# Pruebas de las tareas concurrentes (runtime.py) con hardware falso.
+# Demuestran que una consulta lenta al LLM o un mensaje largo en la LCD no
+# detienen el muestreo del GPS. Las que miden huecos entre muestras corren
+# en el reloj virtual (tests/simulador), así no dependen de la carga del host.
+
+import asyncio
+import time
+
+import runtime
+from gps_utils import RecorridoSimulado
+from lcd_falsa import LCDFalsa
+from poi_index import IndicePOI
+from prefetch import Precargador
+from simulador import RelojVirtual, correr
+
+PERIODO_GPS = 0.02
+LATENCIA_LLM = 0.3
+
+
+class RadioFalso:
+    """Radio WiFi falso que empieza desconectado."""
+
+    def __init__(self):
+        self.connected = False
+
+    def conectar(self):
+        self.connected = True
+
+
+class GPSFalso:
+    """Envuelve una fuente de ubicación y registra el instante de cada muestra."""
+
+    def __init__(self, fuente, reloj=time.monotonic):
+        self.fuente = fuente
+        self.reloj = reloj
+        self.instantes = []
+
+    def get_current_location(self):
+        self.instantes.append(self.reloj())
+        return self.fuente.get_current_location()
+
+
+def crear_indice():
+    indice = IndicePOI(lat_referencia=9.93)
+    indice.agregar("cenfotec", "Universidad Cenfotec", 9.93310, -84.03220)
+    indice.agregar("auditorio", "Auditorio", 9.93282, -84.03200)
+    indice.agregar("maker_space", "Maker Space", 9.93305, -84.03215)
+    return indice
+
+
+def test_gps_sigue_muestreando_durante_consultas_y_paginado(monkeypatch):
+    # runtime.py lee 'time.monotonic' en cada llamada: se usa el reloj virtual.
+    reloj = RelojVirtual()
+    monkeypatch.setattr(time, "monotonic", reloj.monotonic)
+    indice = crear_indice()
+    ruta = ["cenfotec", "auditorio", "maker_space"]
+    gps = GPSFalso(RecorridoSimulado([indice.poi(i) for i in ruta], segundos_por_punto=0.5,
+                                     reloj=reloj.monotonic), reloj.monotonic)
+    lcd = LCDFalsa()
+    radio = RadioFalso()
+    consultas = []
+
+    async def consultar(poi_id):
+        consultas.append(poi_id)
+        await asyncio.sleep(LATENCIA_LLM)  # Consulta lenta "en vuelo".
+        return f"Dato sobre {poi_id}. " * 3  # Texto de varias páginas.
+
+    precargador = Precargador(indice)
+
+    def predecir(poi_id):
+        return precargador.predecir_por_ruta(ruta, ruta.index(poi_id))
+
+    async def principal():
+        estado = runtime.Estado(pausa_pagina=0.1)
+        tarea = asyncio.create_task(runtime.ejecutar(
+            estado, gps.get_current_location, indice, consultar, lcd, radio, radio.conectar,
+            precargador=precargador, predecir=predecir, periodo_gps=PERIODO_GPS,
+            pausa_consultas=0.0, periodo_wifi=0.1))
+        await asyncio.sleep(1.2)
+        tarea.cancel()
+        try:
+            await tarea
+        except asyncio.CancelledError:
+            pass
+        return estado
+
+    estado = correr(reloj, principal())
+
+    # El GPS nunca se detuvo más de unos pocos periodos, aunque cada consulta
+    # tarda 15 periodos y cada página de la LCD 5 periodos.
+    huecos = [b - a for a, b in zip(gps.instantes, gps.instantes[1:])]
+    assert max(huecos) < 5 * PERIODO_GPS
+    assert estado.muestras_gps > 30
+
+    # Se consultó el primer POI, se precargó el siguiente del recorrido y la
+    # llegada al segundo POI interrumpió la precarga del tercero.
+    assert consultas[:3] == ["cenfotec", "auditorio", "auditorio"]
+    assert "maker_space" in consultas
+    assert lcd.historial[:2] == ["Consultando...  ", "Universidad Cenf"]
+    assert "Dato sobre cenfo" in lcd.historial
+    # El framebuffer nunca borra la pantalla completa.
+    assert lcd.borrados == 0
+
+    # La tarea de WiFi reconectó el radio.
+    assert radio.connected and estado.reconexiones == 1
+
+
+def test_respuesta_por_streaming_se_muestra_mientras_llega():
+    indice = crear_indice()
+    lcd = LCDFalsa()
+    fragmentos = ["Cenfotec abrio ", "sus puertas ", "en los noventa."]
+    mostrado_antes_del_final = []
+
+    async def consultar(poi_id, al_recibir):
+        for fragmento in fragmentos:
+            await asyncio.sleep(0.1)  # Generación de tokens en el servidor.
+            al_recibir(fragmento)
+        await asyncio.sleep(0.05)
+        mostrado_antes_del_final.append(lcd.pantalla())
+        return "".join(fragmentos)
+
+    async def principal():
+        estado = runtime.Estado(pausa_pagina=0.2)
+        estado.encolar_consulta("cenfotec")
+        tareas = [asyncio.create_task(runtime.tarea_llm(estado, indice, consultar, pausa=0.0,
+                                                        streaming=True)),
+                  asyncio.create_task(runtime.tarea_lcd(estado, runtime.FramebufferLCD(lcd)))]
+        await asyncio.sleep(0.15)
+        primera = lcd.pantalla()
+        await asyncio.sleep(0.45)
+        segunda = lcd.pantalla()
+        for tarea in tareas:
+            tarea.cancel()
+        await asyncio.gather(*tareas, return_exceptions=True)
+        return primera, segunda
+
+    primera, segunda = asyncio.run(principal())
+    # A los 0.15 s ya está el primer fragmento en pantalla.
+    assert primera == "Cenfotec abrio  \n                "
+    # La primera página se llenó antes de que terminara la respuesta.
+    assert mostrado_antes_del_final == ["Cenfotec abrio s\nus puertas en lo"]
+    assert segunda == "s noventa.      \n                "
+
+
+def test_paginar_respeta_el_tamano_de_la_lcd():
+    assert runtime.paginar("Hola") == ["Hola"]
+    assert runtime.paginar("Estado\nlinea 2") == ["Estado\nlinea 2"]
+    paginas = runtime.paginar("a" * 16 + "b" * 16 + "c" * 5)
+    assert paginas == ["a" * 16 + "\n" + "b" * 16, "c" * 5]
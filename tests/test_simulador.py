@@ -0,0 +1,177 @@
+# test_simulador.py
+# Pruebas de la capa de simulación (tests/simulador) y del firmware
+# completo (code.py) corriendo sobre ella.
+
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+from simulador import FinSimulacion, RelojVirtual, Simulador, correr, medir_recorrido
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_las_pausas_avanzan_el_reloj_virtual_sin_esperar():
+    reloj = RelojVirtual()
+    inicio_real = time.monotonic()
+
+    async def dormir():
+        await asyncio.sleep(3600)
+        return "listo"
+
+    assert correr(reloj, dormir()) == "listo"
+    assert reloj.monotonic() == pytest.approx(1000.0 + 3600)
+    assert time.monotonic() - inicio_real < 1.0
+
+
+def test_la_duracion_corta_las_tareas_que_no_terminan():
+    reloj = RelojVirtual()
+    vueltas = []
+
+    async def para_siempre():
+        while True:
+            vueltas.append(reloj.monotonic())
+            await asyncio.sleep(1.0)
+
+    assert correr(reloj, para_siempre(), duracion=10.5) is None
+    assert len(vueltas) == 11
+
+
+def test_detecta_tareas_que_esperan_para_siempre():
+    async def esperar():
+        await asyncio.Event().wait()
+
+    with pytest.raises(FinSimulacion):
+        correr(RelojVirtual(), esperar())
+
+
+def test_el_entorno_se_restaura_al_salir():
+    with Simulador() as sim:
+        import board
+        import time as time_simulado
+        assert board.IO21.nombre == "IO21"
+        time_simulado.sleep(30)
+        assert time_simulado.monotonic() == sim.reloj.monotonic()
+    assert "board" not in sys.modules
+    assert sys.modules["time"] is time
+    import secrets
+    assert not hasattr(secrets, "secrets")
+
+
+def test_streaming_con_latencia_simulada():
+    with Simulador(paquete=False, latencia_conexion=1.0, ida_y_vuelta=0.1, primer_token=0.5,
+                   entre_fragmentos=0.1) as sim:
+        import adafruit_requests
+        import socketpool
+        import wifi
+        from llm_stream import preguntar_gemini_stream
+
+        wifi.radio.connect("RedSimulada", "clave")
+        sesion = adafruit_requests.Session(socketpool.SocketPool(wifi.radio))
+        url = "https://api.simulada/v1beta/models/gemini:streamGenerateContent?alt=sse"
+        llegadas = []
+        inicio = sim.reloj.monotonic()
+        texto = sim.correr(preguntar_gemini_stream(
+            sesion, url, "Estoy en Auditorio. Dime algo.",
+            al_recibir=lambda fragmento: llegadas.append(sim.reloj.monotonic() - inicio)))
+        assert texto.startswith("Auditorio es parte del campus")
+        # Conexión + ida y vuelta + primer token; luego un fragmento cada 0.1 s.
+        assert llegadas[0] == pytest.approx(1.6)
+        assert llegadas[1] - llegadas[0] == pytest.approx(0.1)
+
+        # La segunda solicitud reutiliza la conexión.
+        inicio = sim.reloj.monotonic()
+        llegadas.clear()
+        sim.correr(preguntar_gemini_stream(sesion, url, "Estoy en Maker Space.",
+                                           al_recibir=lambda f: llegadas.append(
+                                               sim.reloj.monotonic() - inicio)))
+        assert llegadas[0] == pytest.approx(0.6)
+        assert sim.gemini.llamadas() == 2
+
+
+def test_scripts_del_dispositivo_corren_en_el_host(capsys):
+    with Simulador() as sim:
+        sim.correr_script(os.path.join(AQUI, "test_wifi_conexion.py"))
+        sim.correr_script(os.path.join(AQUI, "test_api_gemini.py"))
+    salida = capsys.readouterr().out
+    assert "¡Éxito! Conectado a la red WiFi." in salida
+    assert "Prueba de la API de Gemini finalizada con éxito." in salida
+    assert sim.gemini.llamadas() == 1
+
+
+def test_firmware_con_paquete_no_usa_la_api():
+    metricas = medir_recorrido(paquete=True, muestreo_adaptativo=False)
+    assert metricas["llamadas_api"] == 0
+    assert metricas["muestras_gps"] >= 85
+    # Solo la conexión WiFi inicial (2 s, dentro del bucle) retrasa el GPS.
+    assert metricas["iteracion_max"] <= 1.0 + 1e-6
+
+
+def test_firmware_consulta_gemini_y_muestra_la_respuesta():
+    metricas = medir_recorrido(paquete=False)
+    assert 0 < metricas["llamadas_api"] <= 3
+    assert 0 < metricas["llegada_max"] < 10
+    assert metricas["heap_max"] > 0
+
+
+def test_backend_de_cache_no_usa_la_api_ni_al_precargar():
+    # Con WiFi y sin paquete, la precarga por lotes pasa por el backend: el
+    # de caché responde sin red.
+    metricas = medir_recorrido(paquete=False, backend_llm="cache")
+    assert metricas["llamadas_api"] == 0
+    assert metricas["consultas"] > 0
+
+
+def test_la_segunda_vuelta_usa_la_cache():
+    una = medir_recorrido(paquete=False, vueltas=1)
+    dos = medir_recorrido(paquete=False, vueltas=2)
+    assert dos["llamadas_api"] == una["llamadas_api"]
+
+
+def test_firmware_con_el_registro_nmea_reproducido():
+    registro = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            "datos", "recorrido_cenfotec.nmea")
+
+    def fuente(firmware):
+        from gps_replay import ReproductorNMEA
+        return ReproductorNMEA(registro, velocidad=2, repetir=True)
+
+    # 10 minutos de registro (cinco vueltas) en 300 s simulados.
+    metricas = medir_recorrido(paquete=False, fuente=fuente, duracion=300)
+    assert metricas["consultas"] >= 5
+    assert metricas["llamadas_api"] <= 3
+    assert metricas["aciertos_cache"] > 0  # Las vueltas siguientes salen de la caché.
+
+
+def test_arranque_no_espera_al_wifi(capsys):
+    with Simulador(paquete=True) as sim:
+        inicio = sim.reloj.monotonic()
+        firmware = sim.importar_firmware()
+        # Las librerías de red se importan con la primera sesión HTTPS.
+        assert not hasattr(firmware, "requests") and not hasattr(firmware, "ssl")
+        assert not sim.radio.connected
+        sim.correr(firmware.main(), duracion=5)
+        hitos = firmware.arranque.hitos
+    assert hitos["primera_ubicacion"] < hitos["wifi"]
+    assert hitos["primera_descripcion"] < 5
+    assert sim.radio.conexiones[0] - inicio == pytest.approx(hitos["wifi"])
+    salida = capsys.readouterr().out
+    assert "Arranque: importaciones" in salida and "pois" in salida
+
+
+def test_muestreo_adaptativo_lee_menos_sin_perder_entradas():
+    # Dos POIs a 200 m entre sí y del campus: en el camino no hay geocercas cerca.
+    pois = [("cenfotec", "Universidad Cenfotec", 9.93310, -84.03220),
+            ("auditorio", "Auditorio", 9.93282, -84.03200),
+            ("maker_space", "Maker Space", 9.93305, -84.03215),
+            ("norte", "Norte", 9.93670, -84.03220), ("sur", "Sur", 9.93490, -84.03220)]
+    opciones = dict(ruta=["norte", "sur"], pois=pois, vueltas=2, segundos_por_lugar=60)
+    fijo = medir_recorrido(muestreo_adaptativo=False, **opciones)
+    adaptativo = medir_recorrido(**opciones)
+    assert adaptativo["consultas"] == fijo["consultas"] == 4
+    assert adaptativo["muestras_gps"] < 0.5 * fijo["muestras_gps"]
+    assert adaptativo["comandos_gps"] > 0
+    assert adaptativo["iteracion_max"] <= 1.0 + 1e-6
@@ -0,0 +1,31 @@
+# test_startup.py
+# Pruebas del registro del arranque (software/startup.py).
+
+from startup import RegistroArranque
+
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 100.0
+
+    def __call__(self):
+        return self.ahora
+
+
+def test_etapas_e_hitos(capsys):
+    reloj = Reloj()
+    arranque = RegistroArranque(reloj)
+    reloj.ahora += 0.5
+    arranque.etapa("importaciones")
+    reloj.ahora += 0.25
+    arranque.etapa("lcd")
+    assert arranque.etapas == [("importaciones", 0.5), ("lcd", 0.25)]
+    assert arranque.total() == 0.75
+    assert arranque.texto() == "Arranque: importaciones 0.50 s, lcd 0.25 s (total 0.75 s)"
+
+    reloj.ahora += 2
+    assert arranque.hito("wifi")
+    reloj.ahora += 1
+    assert not arranque.hito("wifi")
+    assert arranque.hitos == {"wifi": 2.75}
+    assert "Arranque: wifi a los 2.75 s." in capsys.readouterr().out
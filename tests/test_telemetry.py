@@ -0,0 +1,261 @@
+# test_telemetry.py
+# Pruebas de la bitácora de telemetría (software/telemetry.py), de su
+# decodificador en el host (tools/decode_telemetry.py) y de la tarea que la
+# vuelca (runtime.py).
+
+import asyncio
+import io
+import os
+import sys
+
+import pytest
+
+import runtime
+from cache_utils import CacheRespuestas
+from geofence import ENTRADA, SALIDA
+from gps_utils import RecorridoSimulado
+from poi_index import IndicePOI
+from telemetry import (CONSULTA, NIVEL_PAQUETE, PRECARGA, TAMANO_ENCABEZADO, TAMANO_REGISTRO,
+                       Telemetria, decodificar)
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(RAIZ, "tools"))
+
+from decode_telemetry import escribir_csv, leer_bitacoras, main, resumir  # noqa: E402
+
+
+class RelojMs:
+    def __init__(self):
+        self.ahora = 0
+
+    def __call__(self):
+        return self.ahora
+
+
+class ArchivosContados:
+    """Cuenta las aperturas para agregar y las escrituras de un archivo de la flash."""
+
+    def __init__(self, monkeypatch, ruta):
+        self.aperturas = 0
+        self.escrituras = 0
+        abrir = open
+        contador = self
+
+        class Archivo:
+            def __init__(self, archivo):
+                self.archivo = archivo
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                self.archivo.close()
+
+            def tell(self):
+                return self.archivo.tell()
+
+            def write(self, datos):
+                contador.escrituras += 1
+                return self.archivo.write(datos)
+
+        def abrir_contado(nombre, *args, **opciones):
+            if nombre == ruta and args and args[0] == "ab":
+                contador.aperturas += 1
+                return Archivo(abrir(nombre, *args, **opciones))
+            return abrir(nombre, *args, **opciones)
+
+        monkeypatch.setattr("builtins.open", abrir_contado)
+
+
+def crear_indice():
+    indice = IndicePOI(lat_referencia=9.93)
+    indice.agregar("cenfotec", "Universidad Cenfotec", 9.93310, -84.03220)
+    indice.agregar("auditorio", "Auditorio", 9.93282, -84.03200)
+    return indice
+
+
+def leer(ruta):
+    with open(ruta, "rb") as archivo:
+        return decodificar(archivo.read())
+
+
+def test_registros_de_ida_y_vuelta(tmp_path):
+    ruta = str(tmp_path / "telemetria.bin")
+    reloj = RelojMs()
+    telemetria = Telemetria(ruta, crear_indice(), reloj_ms=reloj)
+    reloj.ahora = 1500
+    telemetria.registrar_fix(9.933101, -84.032203, 2.0)
+    telemetria.registrar_sin_fix(1.0)
+    telemetria.registrar_evento(ENTRADA, "auditorio", 9.93282, -84.03200)
+    telemetria.registrar_evento(SALIDA, "desconocido", 9.93282, -84.03200)
+    telemetria.registrar_latencia("cenfotec", 0.8125, 1)
+    telemetria.registrar_latencia(None, 2.5, 3, PRECARGA)
+    telemetria.registrar_acierto("cenfotec", NIVEL_PAQUETE)
+    assert telemetria.volcar() == TAMANO_ENCABEZADO + 8 * TAMANO_REGISTRO
+    assert os.path.getsize(ruta) == TAMANO_ENCABEZADO + 8 * TAMANO_REGISTRO
+
+    registros = leer(ruta)
+    assert [r["tipo"] for r in registros] == [
+        "inicio", "fix", "fix", "evento_poi", "evento_poi", "latencia", "latencia",
+        "acierto_cache"]
+    inicio, fix, sin_fix, entrada, salida, consulta, precarga, acierto = registros
+    assert inicio["t_ms"] == 0 and fix["t_ms"] == 1500
+    assert fix["con_fix"] and fix["periodo_ms"] == 2000
+    assert fix["lat"] == pytest.approx(9.933101, abs=2e-6)
+    assert fix["lon"] == pytest.approx(-84.032203, abs=2e-6)
+    assert not sin_fix["con_fix"] and "lat" not in sin_fix
+    assert entrada["evento"] == "entrada" and entrada["poi"] == 1
+    assert salida["evento"] == "salida" and salida["poi"] is None
+    assert consulta["origen"] == "consulta" and consulta["latencia_ms"] == 812
+    assert consulta["resultado"] == 1 and consulta["poi"] == 0
+    assert precarga["origen"] == "precarga" and precarga["resultado"] == 3
+    assert acierto["nivel"] == "paquete"
+
+
+def test_volcado_por_marca_o_por_tiempo_y_en_pocas_escrituras(tmp_path, monkeypatch):
+    ruta = str(tmp_path / "telemetria.bin")
+    reloj = RelojMs()
+    telemetria = Telemetria(ruta, capacidad=16, marca=12, periodo_volcado=60, reloj_ms=reloj)
+    archivos = ArchivosContados(monkeypatch, ruta)
+
+    for i in range(10):
+        telemetria.registrar_fix(9.93, -84.03, 1.0)
+    assert not telemetria.debe_volcar()
+    telemetria.registrar_fix(9.93, -84.03, 1.0)
+    assert telemetria.debe_volcar()  # 12 pendientes (con el INICIO).
+    telemetria.volcar()
+    # Encabezado y un solo bloque de registros.
+    assert (archivos.aperturas, archivos.escrituras) == (1, 2)
+
+    # Con menos pendientes que la marca, se vuelca al pasar el periodo. Los
+    # pendientes dan la vuelta al buffer: dos vistas, sin copiarlo.
+    for i in range(8):
+        telemetria.registrar_fix(9.93, -84.03, 1.0)
+    reloj.ahora += 59999
+    assert not telemetria.debe_volcar()
+    reloj.ahora += 1
+    assert telemetria.debe_volcar()
+    assert len(telemetria.pendientes_en_orden()) == 2
+    telemetria.volcar()
+    assert (archivos.aperturas, archivos.escrituras) == (2, 4)
+    assert len(leer(ruta)) == 20
+    assert not telemetria.debe_volcar()
+
+
+def test_buffer_lleno_descarta_los_mas_antiguos_y_lo_anota(tmp_path):
+    ruta = str(tmp_path / "telemetria.bin")
+    telemetria = Telemetria(ruta, capacidad=8, reloj_ms=RelojMs())
+    for i in range(12):
+        telemetria.registrar_latencia(None, i / 1000, 1)
+    assert telemetria.pendientes == 8 and telemetria.perdidos == 5
+    telemetria.volcar()
+    registros = leer(ruta)
+    assert registros[0] == {"sesion": 0, "t_ms": 0, "tipo": "perdidos", "perdidos": 5}
+    assert [r["latencia_ms"] for r in registros[1:]] == list(range(4, 12))
+    # El aviso se escribe una sola vez.
+    telemetria.registrar_latencia(None, 0.5, 1)
+    telemetria.volcar()
+    assert [r["tipo"] for r in leer(ruta)].count("perdidos") == 1
+
+
+def test_rotacion_y_sesiones_entre_archivos(tmp_path):
+    ruta = str(tmp_path / "telemetria.bin")
+    tamano = TAMANO_ENCABEZADO + 4 * TAMANO_REGISTRO
+    primera = Telemetria(ruta, max_bytes=tamano, reloj_ms=RelojMs())
+    for _ in range(3):
+        primera.registrar_fix(9.93, -84.03, 1.0)
+    primera.volcar()
+    # Un reinicio: la segunda sesión escribe en el mismo archivo, que está lleno.
+    segunda = Telemetria(ruta, max_bytes=tamano, reloj_ms=RelojMs())
+    segunda.registrar_fix(9.93, -84.03, 1.0)
+    segunda.volcar()
+    segunda.registrar_fix(9.93, -84.03, 5.0)
+    segunda.volcar()
+    assert os.path.exists(ruta + ".old")
+
+    registros = leer_bitacoras([ruta + ".old", ruta])
+    assert [(r["sesion"], r["tipo"]) for r in registros] == [
+        (0, "inicio"), (0, "fix"), (0, "fix"), (0, "fix"),
+        (1, "inicio"), (1, "fix"), (1, "fix")]
+    assert registros[-1]["periodo_ms"] == 5000
+
+
+def test_sin_flash_los_registros_quedan_en_ram(tmp_path):
+    carpeta = tmp_path / "solo_lectura"
+    telemetria = Telemetria(str(carpeta / "telemetria.bin"), reloj_ms=RelojMs())
+    telemetria.registrar_sin_fix(1.0)
+    assert telemetria.volcar() == 0  # La carpeta no existe: OSError.
+    assert telemetria.ruta is None and telemetria.pendientes == 2
+    datos = b"".join(bytes(v) for v in telemetria.pendientes_en_orden())
+    assert [r["tipo"] for r in decodificar(datos)] == ["inicio", "fix"]
+
+
+def test_aciertos_de_la_cache():
+    telemetria = Telemetria(indice=crear_indice(), reloj_ms=RelojMs())
+    cache = CacheRespuestas(telemetria=telemetria)
+    cache.guardar("auditorio", "¿Qué es?", "Un auditorio.")
+    cache.obtener("auditorio", "¿Qué es?")
+    cache.obtener("cenfotec", "¿Qué es?")
+    datos = b"".join(bytes(v) for v in telemetria.pendientes_en_orden())
+    aciertos = [r for r in decodificar(datos) if r["tipo"] == "acierto_cache"]
+    assert aciertos == [{"sesion": 0, "t_ms": 0, "tipo": "acierto_cache", "nivel": "ram",
+                         "poi": 1}]
+
+
+def test_tareas_llenan_la_bitacora_y_la_vuelcan_al_terminar(tmp_path):
+    ruta = str(tmp_path / "telemetria.bin")
+    indice = crear_indice()
+    telemetria = Telemetria(ruta, indice, periodo_volcado=0.05)
+    gps = RecorridoSimulado([indice.poi("cenfotec"), indice.poi("auditorio")],
+                            segundos_por_punto=0.3)
+
+    async def consultar(poi_id):
+        await asyncio.sleep(0.05)
+        return f"Dato sobre {poi_id}."
+
+    async def principal():
+        estado = runtime.Estado()
+        llm = asyncio.create_task(runtime.tarea_llm(estado, indice, consultar,
+                                                    telemetria=telemetria))
+        tareas = [
+            asyncio.create_task(runtime.tarea_gps(estado, gps.get_current_location,
+                                                  runtime.MotorGeocercas(indice), periodo=0.02,
+                                                  telemetria=telemetria)),
+            asyncio.create_task(runtime.tarea_telemetria(estado, telemetria, periodo=0.02)),
+        ]
+        await asyncio.sleep(0.8)
+        llm.cancel()
+        estado.activo = False
+        await asyncio.gather(*tareas)
+
+    asyncio.run(principal())
+    assert telemetria.pendientes == 0 and telemetria.volcados > 1
+
+    registros = leer_bitacoras([ruta], ids=indice.ids)
+    resumen = resumir(registros)
+    assert resumen["lecturas"]["con_fix"] > 20
+    assert resumen["entradas"]["cenfotec"] >= 1 and resumen["salidas"]["cenfotec"] >= 1
+    assert resumen["latencias"]["consulta"]["cantidad"] >= 1
+    assert resumen["latencias"]["consulta"]["p50_ms"] >= 50
+    assert resumen["perdidos"] == 0
+    # El CSV tiene una fila por registro y las columnas de todos los tipos.
+    salida = io.StringIO()
+    escribir_csv(registros, salida)
+    lineas = salida.getvalue().splitlines()
+    assert len(lineas) == len(registros) + 1
+    assert lineas[0].startswith("sesion,t_ms,tipo,poi,lat,lon")
+
+
+def test_herramienta_json(tmp_path, capsys):
+    ruta = str(tmp_path / "telemetria.bin")
+    telemetria = Telemetria(ruta, crear_indice(), reloj_ms=RelojMs())
+    telemetria.registrar_evento(ENTRADA, "cenfotec", 9.93310, -84.03220)
+    telemetria.registrar_latencia("cenfotec", 1.2, 1, CONSULTA)
+    telemetria.volcar()
+    salida = str(tmp_path / "campo.json")
+    main([ruta, "--formato", "json", "--pois", os.path.join(RAIZ, "software", "pois.csv"),
+          "--salida", salida])
+    assert "3 registros" in capsys.readouterr().out
+    with open(salida, encoding="utf-8") as archivo:
+        texto = archivo.read()
+    assert '"poi": "cenfotec"' in texto
@@ -0,0 +1,158 @@
+# test_tour_planner.py
+# Pruebas del planificador de recorridos (software/tour_planner.py).
+
+import itertools
+import random
+
+import pytest
+
+from geo_utils import haversine_distance
+from poi_index import IndicePOI
+from tour_planner import (MatrizDistancias, PlanificadorRecorrido, Recorrido, cargar_o_calcular,
+                          vecino_mas_cercano)
+
+LAT0, LON0 = 9.93000, -84.03000
+
+
+class RelojFalso:
+    """Reloj que avanza un paso fijo en cada lectura."""
+
+    def __init__(self, paso):
+        self.t = 0.0
+        self.paso = paso
+
+    def __call__(self):
+        self.t += self.paso
+        return self.t
+
+
+def indice_aleatorio(n, semilla=1):
+    azar = random.Random(semilla)
+    indice = IndicePOI(lat_referencia=LAT0)
+    for i in range(n):
+        indice.agregar(f"p{i}", f"Lugar {i}", LAT0 + azar.uniform(0, 0.01),
+                       LON0 + azar.uniform(0, 0.01))
+    return indice
+
+
+def longitud(matriz, ruta):
+    return sum(matriz.distancia(matriz.posicion(a), matriz.posicion(b))
+               for a, b in zip(ruta, ruta[1:]))
+
+
+def test_matriz_de_distancias():
+    indice = indice_aleatorio(6)
+    matriz = MatrizDistancias(indice)
+    assert matriz.n == 6 and matriz.ids == indice.ids
+    for i in range(6):
+        assert matriz.distancia(i, i) == 0.0
+        for j in range(6):
+            esperada = haversine_distance(indice.lats[i], indice.lons[i],
+                                          indice.lats[j], indice.lons[j])
+            assert matriz.distancia(i, j) == pytest.approx(esperada, abs=0.05)
+            assert matriz.distancia(i, j) == pytest.approx(matriz.distancia(j, i), abs=0.01)
+
+
+def test_pois_en_linea_se_visitan_en_orden():
+    indice = IndicePOI(lat_referencia=LAT0)
+    for i in (3, 0, 4, 1, 2):
+        indice.agregar(f"p{i}", f"Lugar {i}", LAT0 + i * 0.001, LON0)
+    planificador = PlanificadorRecorrido(MatrizDistancias(indice))
+    assert planificador.planificar(inicio="p0") == ["p0", "p1", "p2", "p3", "p4"]
+    # Desde una ubicación, empieza por el extremo más cercano.
+    assert planificador.planificar(lat=LAT0 + 0.0045, lon=LON0) == ["p4", "p3", "p2", "p1", "p0"]
+    assert planificador.ultimo["completo"]
+
+
+@pytest.mark.parametrize("semilla", range(5))
+def test_dos_opt_mejora_el_vecino_mas_cercano_y_se_acerca_al_optimo(semilla):
+    indice = indice_aleatorio(8, semilla)
+    matriz = MatrizDistancias(indice)
+    planificador = PlanificadorRecorrido(matriz)
+    ruta = planificador.planificar(inicio="p0")
+    assert sorted(ruta) == sorted(indice.ids) and ruta[0] == "p0"
+    assert longitud(matriz, ruta) == pytest.approx(planificador.ultimo["longitud"], rel=1e-4)
+    assert planificador.ultimo["longitud"] <= planificador.ultimo["longitud_inicial"]
+    optima = min(longitud(matriz, ["p0"] + list(resto))
+                 for resto in itertools.permutations(indice.ids[1:]))
+    assert planificador.ultimo["longitud"] <= optima * 1.1
+
+
+def test_presupuesto_de_tiempo():
+    matriz = MatrizDistancias(indice_aleatorio(60))
+    # Cada lectura del reloj avanza 10 ms: con 50 ms, 2-opt se corta a medias.
+    planificador = PlanificadorRecorrido(matriz, presupuesto=0.05, reloj=RelojFalso(0.01))
+    ruta = planificador.planificar(inicio="p0")
+    assert sorted(ruta) == sorted(matriz.ids)
+    assert not planificador.ultimo["completo"]
+    assert planificador.ultimo["longitud"] <= planificador.ultimo["longitud_inicial"]
+
+
+def test_subconjunto_de_pois():
+    matriz = MatrizDistancias(indice_aleatorio(10))
+    ruta = PlanificadorRecorrido(matriz).planificar(["p7", "p2", "p5", "no_existe"], inicio="p5")
+    assert ruta[0] == "p5" and sorted(ruta) == ["p2", "p5", "p7"]
+
+
+def test_vecino_mas_cercano_sin_matriz():
+    indice = indice_aleatorio(150)
+    # Un POI lejano (a más de CELDAS_BUSQUEDA_VECINO celdas) se encuentra
+    # recorriendo los pendientes.
+    indice.agregar("lejos", "Lejos", LAT0 + 0.2, LON0)
+    ruta = vecino_mas_cercano(indice, inicio="p5")
+    assert ruta[0] == "p5" and ruta[-1] == "lejos"
+    assert sorted(ruta) == sorted(indice.ids)
+    # Es el mismo orden que el vecino más cercano sobre la matriz.
+    matriz = MatrizDistancias(indice)
+    planificador = PlanificadorRecorrido(matriz)
+    inicio = matriz.posicion("p5")
+    orden = planificador._vecino_mas_cercano(
+        [inicio], [i for i in range(matriz.n) if i != inicio], None)
+    assert ruta == [matriz.ids[i] for i in orden]
+    assert vecino_mas_cercano(IndicePOI()) == []
+
+
+def test_matriz_guardada_en_flash(tmp_path):
+    ruta = str(tmp_path / "distancias.bin")
+    indice = indice_aleatorio(12)
+    calculada = cargar_o_calcular(ruta, indice)
+    cargada = MatrizDistancias.cargar(ruta, indice)
+    assert cargada is not None and cargada.valores == calculada.valores
+    assert cargar_o_calcular(ruta, indice).valores == calculada.valores
+    # Si cambian los POIs, la matriz guardada ya no sirve.
+    otro = indice_aleatorio(12, semilla=2)
+    otro.agregar("nuevo", "Nuevo", LAT0, LON0)
+    assert MatrizDistancias.cargar(ruta, otro) is None
+    assert cargar_o_calcular(ruta, otro).n == 13
+    # Sin flash (carpeta inexistente), se calcula igual.
+    assert cargar_o_calcular(str(tmp_path / "no" / "d.bin"), indice).n == 12
+
+
+def test_recorrido_avanza_y_replanifica_fuera_de_orden():
+    indice = IndicePOI(lat_referencia=LAT0)
+    for i in range(5):
+        indice.agregar(f"p{i}", f"Lugar {i}", LAT0 + i * 0.001, LON0)
+    planificador = PlanificadorRecorrido(MatrizDistancias(indice))
+    recorrido = Recorrido(planificador.planificar(inicio="p2"), planificador)
+    assert recorrido.ruta[0] == "p2"
+    recorrido.visitar("p2")
+    siguiente = recorrido.proximos(1)[0]
+    assert siguiente in ("p1", "p3")
+    # Llega a un extremo sin pasar por el siguiente: se replanifica desde ahí.
+    recorrido.visitar("p4")
+    assert recorrido.proximos(4) == ["p3", "p1", "p0"]
+    assert recorrido.replanificaciones == 1
+
+
+def test_recorrido_fijo_y_nueva_vuelta():
+    recorrido = Recorrido(["a", "b", "c", "d"])
+    recorrido.visitar("a")
+    assert recorrido.proximos(2) == ["b", "c"]
+    recorrido.visitar("c")
+    assert recorrido.proximos(2) == ["d"]
+    recorrido.visitar("b")   # Ya quedó atrás: no cambia lo pendiente.
+    assert recorrido.proximos(2) == ["d"]
+    recorrido.visitar("d")
+    assert recorrido.proximos(2) == []
+    recorrido.visitar("a")
+    assert recorrido.proximos(2) == ["b", "c"]
@@ -0,0 +1,144 @@
+# build_content_pack.py
+# Herramienta del host (PC) para construir el paquete de contenido sin
+# conexión (ver software/content_pack.py).
+#
+# Lee la lista de POIs y la plantilla de 'models/prompt_base.txt', toma las
+# descripciones de un archivo importado o las genera con Gemini (o con un
+# LLM falso para las pruebas) y escribe el paquete binario que se copia al
+# microcontrolador junto a code.py.
+#
+# Uso:
+#   python tools/build_content_pack.py --importar models/respuestas_pois.csv
+#   python tools/build_content_pack.py --llm gemini   (usa GEMINI_API_KEY)
+#   python tools/build_content_pack.py --llm falso --salida /tmp/prueba.pack
+
+import argparse
+import json
+import os
+import sys
+import urllib.request
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(RAIZ, "software"))
+
+from content_pack import PaqueteContenido, escribir_paquete  # noqa: E402
+from llm_backends import endpoint_gemini  # noqa: E402
+from poi_index import cargar_indice  # noqa: E402
+
+# --- CONFIGURACIÓN ---
+ARCHIVO_POIS = os.path.join(RAIZ, "software", "pois.csv")
+ARCHIVO_PROMPT = os.path.join(RAIZ, "models", "prompt_base.txt")
+ARCHIVO_SALIDA = os.path.join(RAIZ, "software", "contenido.pack")
+MARCADOR_NOMBRE = "[NOMBRE_DEL_LUGAR]"
+ENDPOINT = endpoint_gemini("{clave}")
+MAX_TOKENS = 60  # Sin la LCD esperando, se permite una oración algo más larga.
+
+
+def construir_prompt(plantilla, nombre):
+    """Reemplaza el marcador de la plantilla por el nombre del lugar."""
+    return plantilla.replace(MARCADOR_NOMBRE, nombre).strip()
+
+
+def cargar_importados(ruta):
+    """
+    Lee descripciones ya escritas de un archivo 'id,texto' (el texto puede tener comas).
+
+    Returns:
+        dict: id del POI -> descripción.
+    """
+    textos = {}
+    with open(ruta, "r", encoding="utf-8") as archivo:
+        archivo.readline()  # Encabezado
+        for linea in archivo:
+            linea = linea.strip()
+            if not linea or linea.startswith("#"):
+                continue
+            poi_id, texto = linea.split(",", 1)
+            textos[poi_id.strip()] = texto.strip()
+    return textos
+
+
+def llm_falso(prompt):
+    """LLM determinista para las pruebas: resume la última línea del prompt."""
+    return "Dato: " + prompt.splitlines()[-1]
+
+
+def llm_gemini(clave):
+    """Retorna una función que consulta Gemini desde el host."""
+    def consultar(prompt):
+        payload = {
+            "contents": [{"parts": [{"text": prompt}]}],
+            "generationConfig": {"maxOutputTokens": MAX_TOKENS},
+        }
+        solicitud = urllib.request.Request(
+            ENDPOINT.format(clave=clave), data=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(solicitud, timeout=30) as respuesta:
+            datos = json.loads(respuesta.read())
+        return datos["candidates"][0]["content"]["parts"][0]["text"].strip()
+    return consultar
+
+
+def generar_textos(indice, plantilla, llm=None, importados=None):
+    """
+    Arma la descripción de cada POI del índice.
+
+    Los textos importados tienen prioridad; el resto se genera con el LLM.
+
+    Args:
+        indice (IndicePOI): POIs a incluir.
+        plantilla (str): Plantilla del prompt con el marcador del nombre.
+        llm (callable): Recibe el prompt y retorna el texto (None: solo importados).
+        importados (dict): id -> descripción ya escrita.
+
+    Returns:
+        dict: id del POI -> descripción. Los POIs sin texto se omiten.
+    """
+    importados = importados or {}
+    textos = {}
+    for poi_id, nombre in zip(indice.ids, indice.nombres):
+        if poi_id in importados:
+            textos[poi_id] = importados[poi_id]
+        elif llm is not None:
+            textos[poi_id] = " ".join(llm(construir_prompt(plantilla, nombre)).split())
+        else:
+            print(f"Aviso: '{poi_id}' no tiene descripción y se omite.")
+    return textos
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Construye el paquete de contenido sin conexión.")
+    parser.add_argument("--pois", default=ARCHIVO_POIS, help="CSV 'id,nombre,lat,lon' de los POIs.")
+    parser.add_argument("--prompt", default=ARCHIVO_PROMPT, help="Plantilla del prompt.")
+    parser.add_argument("--importar", help="CSV 'id,texto' con descripciones ya escritas.")
+    parser.add_argument("--llm", choices=("gemini", "falso"),
+                        help="Genera las descripciones que falten con este LLM.")
+    parser.add_argument("--salida", default=ARCHIVO_SALIDA, help="Archivo del paquete.")
+    opciones = parser.parse_args(argumentos)
+
+    indice = cargar_indice(opciones.pois)
+    with open(opciones.prompt, "r", encoding="utf-8") as archivo:
+        plantilla = archivo.read()
+    importados = cargar_importados(opciones.importar) if opciones.importar else None
+    llm = None
+    if opciones.llm == "falso":
+        llm = llm_falso
+    elif opciones.llm == "gemini":
+        clave = os.environ.get("GEMINI_API_KEY")
+        if not clave:
+            parser.error("Define la variable de entorno GEMINI_API_KEY para usar Gemini.")
+        llm = llm_gemini(clave)
+
+    textos = generar_textos(indice, plantilla, llm, importados)
+    tamano = escribir_paquete(opciones.salida, textos)
+    # Verificación: el lector del microcontrolador recupera cada texto.
+    with PaqueteContenido(opciones.salida) as paquete:
+        for poi_id, texto in textos.items():
+            if paquete.texto(poi_id) != texto:
+                raise SystemExit(f"Error: el paquete no recupera el texto de '{poi_id}'.")
+    print(f"Paquete escrito en {opciones.salida}: {len(textos)} POIs, {tamano} bytes.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+# build_poi_tiles.py
+# Herramienta del host (PC) para construir el archivo de teselas de POIs
+# (ver software/poi_tiles.py).
+#
+# Lee uno o más CSV 'id,nombre,lat,lon' (por ejemplo, los POIs de una ciudad
+# exportados de OpenStreetMap más el pois.csv del campus), los divide en
+# teselas geográficas y escribe el archivo binario que se copia al
+# microcontrolador junto a code.py. El CSV se lee línea por línea, así
+# también sirve para conjuntos grandes.
+#
+# Uso:
+#   python tools/build_poi_tiles.py ciudad.csv software/pois.csv
+#   python tools/build_poi_tiles.py ciudad.csv --tamano 500 --salida /tmp/pois.tiles
+
+import argparse
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(RAIZ, "software"))
+
+from poi_tiles import IndiceTeselas, TAMANO_TESELA_METROS, escribir_teselas  # noqa: E402
+
+# --- CONFIGURACIÓN ---
+ARCHIVO_POIS = os.path.join(RAIZ, "software", "pois.csv")
+ARCHIVO_SALIDA = os.path.join(RAIZ, "software", "pois.tiles")
+
+
+def leer_pois(rutas):
+    """
+    Lee los POIs de uno o más CSV 'id,nombre,lat,lon' (el nombre puede tener comas).
+
+    Un id repetido en un archivo posterior se ignora, así el pois.csv del
+    campus puede agregarse a un conjunto que ya lo incluye.
+
+    Returns:
+        list: Tuplas (id, nombre, lat, lon) en el orden de los archivos.
+    """
+    pois = []
+    vistos = set()
+    for ruta in rutas:
+        with open(ruta, "r", encoding="utf-8") as archivo:
+            archivo.readline()  # Encabezado
+            for linea in archivo:
+                linea = linea.strip()
+                if not linea or linea.startswith("#"):
+                    continue
+                poi_id, resto = linea.split(",", 1)
+                nombre, lat, lon = resto.rsplit(",", 2)
+                if poi_id in vistos:
+                    continue
+                vistos.add(poi_id)
+                pois.append((poi_id, nombre, float(lat), float(lon)))
+    return pois
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Construye el archivo de teselas de POIs.")
+    parser.add_argument("pois", nargs="*", default=[ARCHIVO_POIS],
+                        help="CSV 'id,nombre,lat,lon' de los POIs.")
+    parser.add_argument("--tamano", type=float, default=TAMANO_TESELA_METROS,
+                        help="Lado de cada tesela en metros.")
+    parser.add_argument("--salida", default=ARCHIVO_SALIDA, help="Archivo de teselas.")
+    opciones = parser.parse_args(argumentos)
+
+    pois = leer_pois(opciones.pois)
+    if not pois:
+        raise SystemExit("Error: no hay POIs en los archivos indicados.")
+    try:
+        tamano = escribir_teselas(opciones.salida, pois, opciones.tamano)
+    except ValueError as e:
+        raise SystemExit(f"Error: {e}")
+
+    # Verificación: el lector del microcontrolador recupera cada POI por su id.
+    with IndiceTeselas(opciones.salida, max_residentes=4) as indice:
+        for poi_id, nombre, lat, lon in pois:
+            poi = indice.poi(poi_id)
+            if poi is None or poi["nombre"] != nombre or abs(poi["lat"] - lat) > 1e-6:
+                raise SystemExit(f"Error: el archivo no recupera el POI '{poi_id}'.")
+        print(f"Teselas escritas en {opciones.salida}: {len(pois)} POIs en "
+              f"{indice.cantidad_teselas} teselas de {opciones.tamano:.0f} m "
+              f"(hasta {indice.max_por_tesela} POIs por tesela), {tamano} bytes.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+# decode_telemetry.py
+# Herramienta del host (PC) para leer la bitácora de telemetría del
+# dispositivo (ver software/telemetry.py).
+#
+# Convierte los registros binarios a CSV o JSON (una fila por registro) o
+# imprime un resumen: lecturas del GPS por periodo, visitas a cada POI,
+# latencias de las consultas y aciertos de la caché. Los índices de POI se
+# traducen a ids con el mismo pois.csv (o archivo de teselas, ver
+# software/poi_tiles.py) que se copió al dispositivo.
+#
+# Uso:
+#   python tools/decode_telemetry.py telemetria.bin --formato csv --salida campo.csv
+#   python tools/decode_telemetry.py telemetria.bin.old telemetria.bin --formato json
+#   python tools/decode_telemetry.py telemetria.bin --resumen
+
+import argparse
+import csv
+import json
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(RAIZ, "software"))
+
+from poi_index import cargar_indice  # noqa: E402
+from poi_tiles import IndiceTeselas, MAGICO as MAGICO_TESELAS  # noqa: E402
+from telemetry import decodificar  # noqa: E402
+
+# --- CONFIGURACIÓN ---
+ARCHIVO_POIS = os.path.join(RAIZ, "software", "pois.csv")
+COLUMNAS = ("sesion", "t_ms", "tipo", "poi", "lat", "lon", "con_fix", "periodo_ms", "evento",
+            "origen", "latencia_ms", "resultado", "nivel", "perdidos", "capacidad")
+
+
+def leer_bitacoras(rutas, ids=None):
+    """
+    Lee y decodifica varias bitácoras en orden (por ejemplo, '.old' y la actual).
+
+    Las sesiones se numeran de forma continua entre archivos.
+
+    Args:
+        rutas (list): Archivos de la bitácora.
+        ids (list): Ids de los POIs por índice; si se indica, 'poi' es el id.
+
+    Returns:
+        list: Registros decodificados (ver telemetry.decodificar).
+    """
+    registros = []
+    for ruta in rutas:
+        with open(ruta, "rb") as archivo:
+            leidos = decodificar(archivo.read())
+        base = registros[-1]["sesion"] + 1 if registros else 0
+        if leidos and leidos[0]["tipo"] != "inicio" and registros:
+            base -= 1  # El archivo continúa la sesión del anterior.
+        for registro in leidos:
+            registro["sesion"] += base
+            if ids is not None and registro.get("poi") is not None:
+                indice = registro["poi"]
+                registro["poi"] = ids[indice] if indice < len(ids) else indice
+        registros.extend(leidos)
+    return registros
+
+
+def percentil(valores, fraccion):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * fraccion))]
+
+
+def resumir(registros):
+    """
+    Returns:
+        dict: 'sesiones', 'lecturas' (con y sin fix, por periodo en ms),
+            'entradas' y 'salidas' por POI, latencias por origen ('cantidad',
+            'p50_ms', 'p95_ms', 'max_ms', 'fallidas'), aciertos por nivel y
+            registros perdidos.
+    """
+    datos = {
+        "sesiones": len({r["sesion"] for r in registros}),
+        "lecturas": {"con_fix": 0, "sin_fix": 0, "por_periodo_ms": {}},
+        "entradas": {},
+        "salidas": {},
+        "latencias": {},
+        "aciertos": {},
+        "perdidos": 0,
+    }
+    latencias = {}
+    for registro in registros:
+        tipo = registro["tipo"]
+        if tipo == "fix":
+            lecturas = datos["lecturas"]
+            lecturas["con_fix" if registro["con_fix"] else "sin_fix"] += 1
+            por_periodo = lecturas["por_periodo_ms"]
+            por_periodo[registro["periodo_ms"]] = por_periodo.get(registro["periodo_ms"], 0) + 1
+        elif tipo == "evento_poi":
+            visitas = datos["entradas" if registro["evento"] == "entrada" else "salidas"]
+            visitas[registro["poi"]] = visitas.get(registro["poi"], 0) + 1
+        elif tipo == "latencia":
+            latencias.setdefault(registro["origen"], []).append(registro)
+        elif tipo == "acierto_cache":
+            datos["aciertos"][registro["nivel"]] = datos["aciertos"].get(registro["nivel"], 0) + 1
+        elif tipo == "perdidos":
+            datos["perdidos"] += registro["perdidos"]
+    for origen, lista in latencias.items():
+        milisegundos = [r["latencia_ms"] for r in lista]
+        datos["latencias"][origen] = {
+            "cantidad": len(lista),
+            "p50_ms": percentil(milisegundos, 0.5),
+            "p95_ms": percentil(milisegundos, 0.95),
+            "max_ms": max(milisegundos),
+            "fallidas": sum(1 for r in lista if not r["resultado"]),
+        }
+    return datos
+
+
+def cargar_ids(ruta):
+    """Ids de los POIs en el orden de sus índices, desde pois.csv o un archivo de teselas."""
+    with open(ruta, "rb") as archivo:
+        es_teselas = archivo.read(len(MAGICO_TESELAS)) == MAGICO_TESELAS
+    if not es_teselas:
+        return cargar_indice(ruta).ids
+    with IndiceTeselas(ruta) as teselas:
+        return [poi[0] for poi in teselas.recorrer()]
+
+
+def escribir_csv(registros, salida):
+    escritor = csv.DictWriter(salida, fieldnames=COLUMNAS, restval="", lineterminator="\n")
+    escritor.writeheader()
+    escritor.writerows(registros)
+
+
+def escribir_json(registros, salida):
+    json.dump(registros, salida, ensure_ascii=False, indent=1)
+    salida.write("\n")
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Decodifica la bitácora de telemetría.")
+    parser.add_argument("bitacoras", nargs="+", help="Archivos .bin, del más antiguo al actual.")
+    parser.add_argument("--formato", choices=("csv", "json"), default="csv")
+    parser.add_argument("--pois", default=ARCHIVO_POIS,
+                        help="CSV 'id,nombre,lat,lon' o archivo de teselas copiado al "
+                             "dispositivo ('' para dejar los índices).")
+    parser.add_argument("--salida", help="Archivo de salida (por defecto, la consola).")
+    parser.add_argument("--resumen", action="store_true", help="Imprime solo un resumen.")
+    opciones = parser.parse_args(argumentos)
+
+    ids = cargar_ids(opciones.pois) if opciones.pois else None
+    try:
+        registros = leer_bitacoras(opciones.bitacoras, ids)
+    except ValueError as e:
+        raise SystemExit(f"Error: {e}")
+
+    salida = open(opciones.salida, "w", encoding="utf-8", newline="") if opciones.salida \
+        else sys.stdout
+    try:
+        if opciones.resumen:
+            escribir_json(resumir(registros), salida)
+        elif opciones.formato == "csv":
+            escribir_csv(registros, salida)
+        else:
+            escribir_json(registros, salida)
+    finally:
+        if salida is not sys.stdout:
+            salida.close()
+    if opciones.salida:
+        print(f"{len(registros)} registros escritos en {opciones.salida}.")
+
+
+if __name__ == "__main__":
+    main()
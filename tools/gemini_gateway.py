@@ -0,0 +1,505 @@
+# gemini_gateway.py
+# Servicio del host (PC o Raspberry Pi) que hace de intermediario entre una
+# flota de dispositivos DescubreCR y la API de Gemini.
+#
+# Los dispositivos de un mismo lugar apuntan su ENDPOINT al gateway en lugar
+# de la API pública y siguen usando el mismo protocolo ('generateContent' y
+# 'streamGenerateContent' con SSE), así el firmware no cambia. El gateway:
+#   - Responde desde una caché compartida las preguntas ya hechas por
+#     cualquier dispositivo.
+#   - Une las solicitudes idénticas en curso: si diez dispositivos llegan al
+#     mismo POI a la vez, se hace una sola llamada y todos reciben la respuesta.
+#   - Junta preguntas distintas en lotes (una llamada con varias preguntas,
+#     como llm_batch.py) y respeta una cuota de la API para toda la flota.
+# La clave de la API solo vive en el gateway.
+#
+# Uso:
+#   python tools/gemini_gateway.py --puerto 8080          (usa GEMINI_API_KEY)
+#   python tools/gemini_gateway.py --upstream eco          (sin API, para pruebas)
+# En el dispositivo (code.py):
+#   ENDPOINT = endpoint_gemini(url_base="http://192.168.4.2:8080/v1beta/models/")
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import urllib.request
+from collections import OrderedDict
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(RAIZ, "software"))
+
+from llm_backends import endpoint_gemini  # noqa: E402
+from llm_batch import separar_respuesta  # noqa: E402
+from resilience import LimitadorTokens  # noqa: E402
+
+# --- CONFIGURACIÓN ---
+PUERTO = 8080
+TAMANO_LOTE = 4               # Preguntas máximas por llamada a la API.
+VENTANA_LOTE = 0.05           # Segundos que se espera para juntar un lote.
+LLAMADAS_SIMULTANEAS = 4      # Llamadas a la API en curso a la vez.
+CUOTA_POR_MINUTO = 60         # Cuota de la API para toda la flota.
+RAFAGA = 4
+MAX_PENDIENTES = 500          # Preguntas en cola antes de responder 429.
+MAX_ENTRADAS_CACHE = 5000
+VIGENCIA_CACHE = 24 * 3600.0  # Segundos que una respuesta sigue siendo válida.
+RETRY_AFTER = 5               # Segundos sugeridos a los dispositivos tras un error.
+ENDPOINT = endpoint_gemini("{clave}")
+INSTRUCCIONES_LOTE = (
+    "Responde cada una de las siguientes preguntas por separado. Responde solo con "
+    "un arreglo JSON de objetos con las claves \"id\" y \"texto\", en el mismo orden."
+)
+
+
+class CacheCompartida:
+    """
+    Caché en memoria de las respuestas, compartida por toda la flota.
+
+    Expulsa la entrada usada hace más tiempo (LRU) al pasar de 'max_entradas'
+    y descarta las respuestas con más de 'vigencia' segundos.
+    """
+
+    def __init__(self, max_entradas=MAX_ENTRADAS_CACHE, vigencia=VIGENCIA_CACHE,
+                 reloj=time.monotonic):
+        self.max_entradas = max_entradas
+        self.vigencia = vigencia
+        self.reloj = reloj
+        self._entradas = OrderedDict()  # clave -> (texto, instante)
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def obtener(self, clave):
+        """Retorna la respuesta guardada, o None si no está o venció."""
+        entrada = self._entradas.get(clave)
+        if entrada is None or self.reloj() - entrada[1] > self.vigencia:
+            if entrada is not None:
+                del self._entradas[clave]
+            self.fallos += 1
+            return None
+        self._entradas.move_to_end(clave)
+        self.aciertos += 1
+        return entrada[0]
+
+    def guardar(self, clave, texto):
+        self._entradas[clave] = (texto, self.reloj())
+        self._entradas.move_to_end(clave)
+        while len(self._entradas) > self.max_entradas:
+            self._entradas.popitem(last=False)
+            self.expulsiones += 1
+
+
+class ColaLlena(Exception):
+    """El gateway tiene demasiadas preguntas en cola (se responde 429)."""
+
+
+class _Solicitud:
+    """Pregunta en cola, con el futuro que esperan los dispositivos."""
+
+    def __init__(self, clave, pregunta, configuracion, futuro):
+        self.clave = clave
+        self.pregunta = pregunta
+        self.configuracion = configuracion
+        self.futuro = futuro
+
+
+def clave_pregunta(pregunta, configuracion):
+    """Clave de la caché: la pregunta y la configuración de generación."""
+    return json.dumps(configuracion or {}, sort_keys=True) + "\n" + pregunta
+
+
+class Gateway:
+    """
+    Caché, unión de solicitudes, lotes y cuota de la flota.
+
+    Args:
+        upstream (coroutine function): Recibe una lista de (pregunta,
+            configuración) y retorna una lista con el texto de cada una
+            (None si no se obtuvo); lanza una excepción si la llamada falló.
+        cache (CacheCompartida): Caché de respuestas; por defecto una nueva.
+        limitador (LimitadorTokens): Cuota de llamadas de toda la flota.
+        tamano_lote (int): Preguntas máximas por llamada.
+        ventana (float): Segundos que se espera para juntar un lote.
+        simultaneas (int): Llamadas al upstream en curso a la vez.
+        max_pendientes (int): Preguntas en cola antes de rechazar.
+    """
+
+    def __init__(self, upstream, cache=None, limitador=None, tamano_lote=TAMANO_LOTE,
+                 ventana=VENTANA_LOTE, simultaneas=LLAMADAS_SIMULTANEAS,
+                 max_pendientes=MAX_PENDIENTES):
+        self.upstream = upstream
+        self.cache = cache if cache is not None else CacheCompartida()
+        self.limitador = limitador if limitador is not None else LimitadorTokens(
+            CUOTA_POR_MINUTO, RAFAGA)
+        self.tamano_lote = tamano_lote
+        self.ventana = ventana
+        self.max_pendientes = max_pendientes
+        self._simultaneas = asyncio.Semaphore(simultaneas)
+        self._en_vuelo = {}      # clave -> futuro de la respuesta
+        self._pendientes = []    # _Solicitud en orden de llegada
+        self._hay_pendientes = asyncio.Event()
+        self._despachador = None
+        self._llamadas_en_curso = set()
+        self.solicitudes = 0
+        self.unidas = 0          # Solicitudes que esperaron una llamada ya en curso.
+        self.llamadas_upstream = 0
+        self.preguntas_upstream = 0
+        self.esperas_cuota = 0.0  # Segundos esperados por la cuota de la flota.
+        self.errores = 0
+
+    async def preguntar(self, pregunta, configuracion=None):
+        """
+        Obtiene la respuesta a una pregunta de un dispositivo.
+
+        Returns:
+            str: La respuesta.
+
+        Raises:
+            ColaLlena: Si hay demasiadas preguntas en cola.
+            Exception: El error del upstream, si la llamada falló.
+        """
+        self.solicitudes += 1
+        clave = clave_pregunta(pregunta, configuracion)
+        texto = self.cache.obtener(clave)
+        if texto is not None:
+            return texto
+        futuro = self._en_vuelo.get(clave)
+        if futuro is not None:
+            self.unidas += 1
+        else:
+            if len(self._pendientes) >= self.max_pendientes:
+                raise ColaLlena("Demasiadas preguntas en cola")
+            futuro = asyncio.get_running_loop().create_future()
+            self._en_vuelo[clave] = futuro
+            self._pendientes.append(_Solicitud(clave, pregunta, configuracion, futuro))
+            self._hay_pendientes.set()
+            self._iniciar()
+        # 'shield': si un dispositivo se desconecta, los demás siguen esperando.
+        return await asyncio.shield(futuro)
+
+    def _iniciar(self):
+        if self._despachador is None or self._despachador.done():
+            self._despachador = asyncio.get_running_loop().create_task(self._despachar())
+
+    async def cerrar(self):
+        """Detiene el despachador y espera las llamadas en curso."""
+        if self._despachador is not None:
+            self._despachador.cancel()
+            try:
+                await self._despachador
+            except asyncio.CancelledError:
+                pass
+        if self._llamadas_en_curso:
+            await asyncio.gather(*self._llamadas_en_curso, return_exceptions=True)
+
+    def _tomar_lote(self):
+        """
+        Saca de la cola hasta 'tamano_lote' preguntas con la misma configuración.
+
+        Las preguntas que ya piden una respuesta JSON (los lotes de
+        llm_batch.py) van solas: no se pueden anidar en otro lote.
+        """
+        primera = self._pendientes[0]
+        limite = 1 if "responseMimeType" in (primera.configuracion or {}) else self.tamano_lote
+        lote = []
+        restantes = []
+        for solicitud in self._pendientes:
+            if len(lote) < limite and solicitud.configuracion == primera.configuracion:
+                lote.append(solicitud)
+            else:
+                restantes.append(solicitud)
+        self._pendientes = restantes
+        if not restantes:
+            self._hay_pendientes.clear()
+        return lote
+
+    async def _despachar(self):
+        while True:
+            await self._hay_pendientes.wait()
+            # Espera un momento para juntar más preguntas, salvo que ya haya un lote.
+            if len(self._pendientes) < self.tamano_lote:
+                await asyncio.sleep(self.ventana)
+            await self._simultaneas.acquire()
+            espera = self.limitador.tomar()
+            while espera:
+                self.esperas_cuota += espera
+                await asyncio.sleep(espera)
+                espera = self.limitador.tomar()
+            lote = self._tomar_lote()
+            tarea = asyncio.get_running_loop().create_task(self._llamar(lote))
+            self._llamadas_en_curso.add(tarea)
+            tarea.add_done_callback(self._llamadas_en_curso.discard)
+
+    async def _llamar(self, lote):
+        """Hace una llamada al upstream y entrega las respuestas a quienes esperan."""
+        faltantes = []
+        try:
+            self.llamadas_upstream += 1
+            self.preguntas_upstream += len(lote)
+            try:
+                textos = await self.upstream([(s.pregunta, s.configuracion) for s in lote])
+            except Exception as e:
+                self.errores += 1
+                for solicitud in lote:
+                    self._terminar(solicitud, error=e)
+                return
+            textos = list(textos) + [None] * (len(lote) - len(textos))
+            for solicitud, texto in zip(lote, textos):
+                if texto:
+                    self.cache.guardar(solicitud.clave, texto)
+                    self._terminar(solicitud, texto)
+                else:
+                    faltantes.append(solicitud)
+        finally:
+            self._simultaneas.release()
+        for solicitud in faltantes:
+            if len(lote) == 1:
+                self.errores += 1
+                self._terminar(solicitud, error=ValueError("La API no respondió la pregunta"))
+            else:
+                # El lote no trajo esta respuesta: se pregunta sola.
+                await self._reintentar_solo(solicitud)
+
+    async def _reintentar_solo(self, solicitud):
+        await self._simultaneas.acquire()
+        espera = self.limitador.tomar()
+        while espera:
+            self.esperas_cuota += espera
+            await asyncio.sleep(espera)
+            espera = self.limitador.tomar()
+        await self._llamar([solicitud])
+
+    def _terminar(self, solicitud, texto=None, error=None):
+        self._en_vuelo.pop(solicitud.clave, None)
+        if solicitud.futuro.done():
+            return
+        if error is not None:
+            solicitud.futuro.set_exception(error)
+            # Evita el aviso de "excepción nunca leída" si nadie esperaba.
+            solicitud.futuro.exception()
+        else:
+            solicitud.futuro.set_result(texto)
+
+    def estadisticas(self):
+        """
+        Returns:
+            dict: Solicitudes de los dispositivos, aciertos de la caché,
+                solicitudes unidas, llamadas y preguntas enviadas al upstream,
+                segundos esperados por la cuota y errores.
+        """
+        return {
+            "solicitudes": self.solicitudes,
+            "aciertos_cache": self.cache.aciertos,
+            "unidas": self.unidas,
+            "llamadas_upstream": self.llamadas_upstream,
+            "preguntas_upstream": self.preguntas_upstream,
+            "esperas_cuota": round(self.esperas_cuota, 3),
+            "errores": self.errores,
+            "en_cache": len(self.cache),
+        }
+
+
+# --- UPSTREAM ---
+def construir_prompt_lote(lote):
+    """Une varias preguntas en una sola, con un id numérico por pregunta."""
+    lineas = [INSTRUCCIONES_LOTE, "Preguntas:"]
+    for i, (pregunta, _) in enumerate(lote):
+        lineas.append(f"- {i + 1}: {' '.join(pregunta.split())}")
+    return "\n".join(lineas)
+
+
+class UpstreamGemini:
+    """
+    Llama a la API de Gemini con la clave del gateway.
+
+    Un lote de varias preguntas se envía como una sola pregunta que pide un
+    arreglo JSON; las que no vengan en la respuesta quedan en None y el
+    gateway las pregunta solas. La llamada HTTP corre en un hilo para no
+    detener el bucle de asyncio.
+    """
+
+    def __init__(self, clave, endpoint=ENDPOINT, timeout=30):
+        self.url = endpoint.format(clave=clave)
+        self.timeout = timeout
+
+    def _generar(self, pregunta, configuracion):
+        payload = {"contents": [{"parts": [{"text": pregunta}]}]}
+        if configuracion:
+            payload["generationConfig"] = configuracion
+        solicitud = urllib.request.Request(self.url, data=json.dumps(payload).encode("utf-8"),
+                                           headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(solicitud, timeout=self.timeout) as respuesta:
+            datos = json.loads(respuesta.read())
+        return datos["candidates"][0]["content"]["parts"][0]["text"].strip()
+
+    async def __call__(self, lote):
+        if len(lote) == 1:
+            pregunta, configuracion = lote[0]
+            return [await asyncio.to_thread(self._generar, pregunta, configuracion)]
+        configuracion = dict(lote[0][1] or {})
+        tokens = sum((c or {}).get("maxOutputTokens", 60) for _, c in lote)
+        configuracion["maxOutputTokens"] = tokens + 15 * len(lote)  # Más la estructura JSON.
+        configuracion["responseMimeType"] = "application/json"
+        texto = await asyncio.to_thread(self._generar, construir_prompt_lote(lote), configuracion)
+        ids = [str(i + 1) for i in range(len(lote))]
+        try:
+            partes = separar_respuesta(texto, ids)
+        except ValueError:
+            return [None] * len(lote)
+        return [partes.get(poi_id) for poi_id in ids]
+
+
+async def upstream_eco(lote, latencia=0.2):
+    """Upstream de prueba: responde sin llamar a la API."""
+    await asyncio.sleep(latencia)
+    return [f"Respuesta de prueba: {' '.join(pregunta.split())[:60]}" for pregunta, _ in lote]
+
+
+# --- SERVIDOR HTTP ---
+def respuesta_gemini(texto):
+    """Cuerpo de respuesta con el formato de 'generateContent'."""
+    return {"candidates": [{"content": {"parts": [{"text": texto}], "role": "model"},
+                            "finishReason": "STOP", "index": 0}]}
+
+
+class ServidorGateway:
+    """
+    Servidor HTTP/1.1 (asyncio) con el protocolo de la API de Gemini.
+
+    Atiende 'POST .../modelo:generateContent' (JSON) y
+    'POST .../modelo:streamGenerateContent?alt=sse' (la respuesta completa
+    como un solo evento SSE), y 'GET /estado' con las estadísticas. Mantiene
+    las conexiones abiertas (keep-alive), como espera connection.py.
+    """
+
+    def __init__(self, gateway, host="0.0.0.0", puerto=PUERTO):
+        self.gateway = gateway
+        self.host = host
+        self.puerto = puerto
+        self._servidor = None
+        self._escritores = set()  # Conexiones abiertas, para cerrarlas al terminar.
+        self.conexiones = 0
+
+    async def iniciar(self):
+        self._servidor = await asyncio.start_server(self._atender, self.host, self.puerto)
+        self.puerto = self._servidor.sockets[0].getsockname()[1]
+        return self
+
+    async def cerrar(self):
+        if self._servidor is not None:
+            self._servidor.close()
+            for escritor in list(self._escritores):
+                escritor.close()
+            await self._servidor.wait_closed()
+        await self.gateway.cerrar()
+
+    async def _atender(self, lector, escritor):
+        self.conexiones += 1
+        self._escritores.add(escritor)
+        try:
+            while True:
+                linea = await lector.readline()
+                if not linea.strip():
+                    break
+                metodo, ruta, _ = linea.decode("latin-1").split(" ", 2)
+                encabezados = {}
+                while True:
+                    linea = await lector.readline()
+                    if linea in (b"\r\n", b"\n", b""):
+                        break
+                    nombre, _, valor = linea.decode("latin-1").partition(":")
+                    encabezados[nombre.strip().lower()] = valor.strip()
+                cuerpo = await lector.readexactly(int(encabezados.get("content-length", 0)))
+                codigo, tipo, datos, extra = await self._responder(metodo, ruta, cuerpo)
+                cabecera = [f"HTTP/1.1 {codigo} {_RAZONES.get(codigo, '')}",
+                            f"Content-Type: {tipo}", f"Content-Length: {len(datos)}"]
+                cabecera += [f"{nombre}: {valor}" for nombre, valor in extra]
+                escritor.write(("\r\n".join(cabecera) + "\r\n\r\n").encode("latin-1") + datos)
+                await escritor.drain()
+                if encabezados.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            self._escritores.discard(escritor)
+            escritor.close()
+
+    async def _responder(self, metodo, ruta, cuerpo):
+        """Retorna (código, tipo, cuerpo en bytes, encabezados extra)."""
+        if metodo == "GET" and ruta.split("?")[0] == "/estado":
+            return 200, "application/json", json.dumps(self.gateway.estadisticas()).encode(), ()
+        base = ruta.split("?")[0]
+        stream = base.endswith(":streamGenerateContent")
+        if metodo != "POST" or not (stream or base.endswith(":generateContent")):
+            return 404, "application/json", b'{"error": {"message": "No encontrado"}}', ()
+        try:
+            datos = json.loads(cuerpo)
+            pregunta = "".join(parte.get("text", "") for parte in datos["contents"][0]["parts"])
+            configuracion = datos.get("generationConfig")
+        except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+            return 400, "application/json", b'{"error": {"message": "Solicitud invalida"}}', ()
+        reintento = (("Retry-After", str(RETRY_AFTER)),)
+        try:
+            texto = await self.gateway.preguntar(pregunta, configuracion)
+        except ColaLlena:
+            return 429, "application/json", b'{"error": {"message": "Gateway saturado"}}', reintento
+        except Exception as e:
+            print(f"Error del upstream: {e}")
+            return 503, "application/json", b'{"error": {"message": "API no disponible"}}', reintento
+        respuesta = json.dumps(respuesta_gemini(texto)).encode("utf-8")
+        if stream:
+            return 200, "text/event-stream", b"data: " + respuesta + b"\r\n\r\n", ()
+        return 200, "application/json", respuesta, ()
+
+
+_RAZONES = {200: "OK", 400: "Bad Request", 404: "Not Found", 429: "Too Many Requests",
+            503: "Service Unavailable"}
+
+
+async def servir(gateway, host, puerto):
+    servidor = await ServidorGateway(gateway, host, puerto).iniciar()
+    print(f"Gateway escuchando en http://{host}:{servidor.puerto}")
+    try:
+        await servidor._servidor.serve_forever()
+    finally:
+        await servidor.cerrar()
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Gateway con caché de Gemini para una flota.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--puerto", type=int, default=PUERTO)
+    parser.add_argument("--upstream", choices=("gemini", "eco"), default="gemini")
+    parser.add_argument("--cuota", type=float, default=CUOTA_POR_MINUTO,
+                        help="Llamadas por minuto a la API para toda la flota.")
+    parser.add_argument("--lote", type=int, default=TAMANO_LOTE, help="Preguntas por llamada.")
+    opciones = parser.parse_args(argumentos)
+
+    if opciones.upstream == "eco":
+        upstream = upstream_eco
+    else:
+        clave = os.environ.get("GEMINI_API_KEY")
+        if not clave:
+            parser.error("Define la variable de entorno GEMINI_API_KEY para usar Gemini.")
+        upstream = UpstreamGemini(clave)
+
+    async def iniciar():
+        # El gateway crea sus primitivas de asyncio dentro del bucle.
+        gateway = Gateway(upstream, limitador=LimitadorTokens(opciones.cuota, RAFAGA),
+                          tamano_lote=opciones.lote)
+        await servir(gateway, opciones.host, opciones.puerto)
+
+    try:
+        asyncio.run(iniciar())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())